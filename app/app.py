@@ -2,17 +2,38 @@
 # -*- coding: utf-8 -*-
 
 import os
+
+# 生产模式：IDS_ASYNC_MODE=eventlet（或gevent）使用协程服务器。补丁必须在导入其他模块之前完成，
+# 使各模块的线程、time.sleep、队列和socket与事件循环协作
+ASYNC_MODE = os.environ.get('IDS_ASYNC_MODE')
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+import hmac
 import time
+import atexit
 import threading
 import logging
-from flask import Flask, render_template, jsonify, request
+from functools import wraps
+from flask import Flask, Response, render_template, request
 from flask_socketio import SocketIO
 
-# 导入自定义模块
-from modules.traffic_detection.detector import TrafficDetector
-from modules.intrusion_prevention.prevention import IntrusionPrevention
-from modules.alert_response.alerter import AlertSystem
-from modules.network_monitoring.monitor import NetworkMonitor
+# 导入自定义模块（四个系统模块及其依赖在首次使用时才导入，见下方工厂函数）
+from modules.intrusion_prevention.cluster_sync import BlockListSync
+from modules.network_monitoring.collector import StatsAgent, StatsCollector
+from modules.network_monitoring.broadcaster import StreamBroadcaster
+from modules.network_monitoring.event_bus import EventBusClient
+from modules.metrics.registry import REGISTRY
+from modules.metrics.tracing import TRACER
+from modules.metrics.profiler import PROFILER, MEMORY_PROFILER
+from modules.scheduling.scheduler import SCHEDULER
+from modules.data_storage.metrics_log import MetricsLog
+from modules.web.lazy import LazyModule
+from modules.web.responses import json_response, make_etag, not_modified
 
 # 配置日志
 logging.basicConfig(
@@ -28,16 +49,152 @@ logger = logging.getLogger(__name__)
 # 初始化Flask应用
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.urandom(24)
-socketio = SocketIO(app)
+# 开发模式使用线程服务器
+socketio = SocketIO(app, async_mode=ASYNC_MODE or 'threading')
 
 # 创建数据目录
 os.makedirs('data', exist_ok=True)
 
-# 初始化系统模块
-traffic_detector = TrafficDetector()
-intrusion_prevention = IntrusionPrevention()
-alert_system = AlertSystem()
-network_monitor = NetworkMonitor(socketio)
+# 实时推送层：合并为每250ms一帧，按客户端发送差量
+broadcaster = StreamBroadcaster(socketio, interval=0.25)
+broadcaster.start_broadcast()
+
+# 多工作进程部署（由 serve.py 设置环境变量）：0号为主工作进程，运行各模块并把推送数据
+# 发布到消息队列；其他工作进程订阅消息队列，为连接到本进程的客户端推送
+WORKER_ID = int(os.environ.get('IDS_WORKER_ID', 0))
+event_bus = None
+if os.environ.get('IDS_EVENT_BUS'):
+    bus_host, bus_port = os.environ['IDS_EVENT_BUS'].rsplit(':', 1)
+    event_bus = EventBusClient(bus_host, int(bus_port))
+    if WORKER_ID == 0:
+        event_bus.start_publisher()
+        broadcaster.attach_event_bus(event_bus)
+    else:
+        event_bus.start_subscriber(broadcaster.publish)
+
+# 集群阻止列表同步（可选），各节点需配置相同的共享密钥，只接受来自 IDS_CLUSTER_PEERS 中地址的报文，例如:
+# IDS_CLUSTER_BIND=0.0.0.0:9470 IDS_CLUSTER_PEERS=10.0.0.2:9470,10.0.0.3:9470 IDS_CLUSTER_KEY=<共享密钥>
+cluster_config = None
+if os.environ.get('IDS_CLUSTER_PEERS'):
+    cluster_host, cluster_port = os.environ.get('IDS_CLUSTER_BIND', '0.0.0.0:9470').rsplit(':', 1)
+    cluster_config = (
+        cluster_host,
+        int(cluster_port),
+        [p.strip() for p in os.environ['IDS_CLUSTER_PEERS'].split(',') if p.strip()]
+    )
+
+# 数据面进程（可选）：IDS_DATA_PLANE=process 时抓包、检测与防御在独立进程中运行，
+# 本进程只负责Web、API和告警推送，计数和威胁事件通过共享内存传递
+data_plane = None
+if os.environ.get('IDS_DATA_PLANE') == 'process':
+    from modules.data_plane.process import DataPlaneClient
+    data_plane = DataPlaneClient(cluster=cluster_config)
+    atexit.register(data_plane.stop_process)
+
+cluster_sync = None
+if cluster_config and not data_plane:
+    cluster_sync = BlockListSync(*cluster_config)
+
+# 多传感器统计汇总（可选）:
+# 收集器模式 IDS_COLLECTOR_BIND=0.0.0.0:9471
+# 传感器推送 IDS_COLLECTOR_ADDR=10.0.0.1:9471
+# 两端都需要相同的共享密钥 IDS_COLLECTOR_KEY，收集器只接受签名正确的汇总
+stats_collector = None
+if os.environ.get('IDS_COLLECTOR_BIND'):
+    collector_host, collector_port = os.environ['IDS_COLLECTOR_BIND'].rsplit(':', 1)
+    stats_collector = StatsCollector(collector_host, int(collector_port))
+    stats_collector.start_collector()
+
+stats_agent = None
+if os.environ.get('IDS_COLLECTOR_ADDR'):
+    collector_host, collector_port = os.environ['IDS_COLLECTOR_ADDR'].rsplit(':', 1)
+    stats_agent = StatsAgent(collector_host, int(collector_port), os.environ.get('IDS_SENSOR_ID'))
+
+# 慢追踪日志（可选）：端到端耗时超过阈值的追踪按采样率记录，例如:
+# IDS_SLOW_TRACE_MS=50 IDS_SLOW_TRACE_SAMPLE=0.1
+slow_trace_log = None
+if os.environ.get('IDS_SLOW_TRACE_MS'):
+    slow_trace_log = MetricsLog('data/traces', segment_seconds=86400, retention_days=7)
+    slow_trace_log.start_log()
+    TRACER.slow_threshold_ms = float(os.environ['IDS_SLOW_TRACE_MS'])
+    TRACER.slow_sample_rate = float(os.environ.get('IDS_SLOW_TRACE_SAMPLE', 0.1))
+    TRACER.slow_log = slow_trace_log
+
+# 压测负载（可选）：入侵防御、告警和网络监控的模拟数据改为按指定速率（每秒事件数）生成的可复现负载，例如:
+# IDS_LOAD_RATE=100000 IDS_LOAD_SEED=7
+load_rate = float(os.environ.get('IDS_LOAD_RATE', 0))
+load_seed = int(os.environ.get('IDS_LOAD_SEED', 0))
+
+def _load_generator(offset, interval=0.1):
+    from modules.simulation.load_generator import LoadGenerator
+    return LoadGenerator(rate=load_rate, seed=load_seed + offset, interval=interval)
+
+# 诊断接口（可选）：设置 IDS_ADMIN_TOKEN 后启用采样分析与内存快照接口，请求需带 X-Admin-Token 头，例如:
+# curl -X POST -H 'X-Admin-Token: <令牌>' 'http://localhost:8080/api/admin/profile/start?seconds=30'
+ADMIN_TOKEN = os.environ.get('IDS_ADMIN_TOKEN')
+
+# 系统模块：首次使用时才导入并构造（通常在 /api/start），只查看页面、日志或运行指标时
+# 不加载Scapy、pandas、smtplib等重依赖，也不创建各模块的数据目录
+def _create_traffic_detector():
+    from modules.traffic_detection.detector import TrafficDetector
+    return TrafficDetector()
+
+def _create_intrusion_prevention():
+    from modules.intrusion_prevention.prevention import IntrusionPrevention
+    prevention = IntrusionPrevention()
+    prevention.attach_event_store(event_store)
+    if load_rate:
+        prevention.set_load_generator(_load_generator(0))
+    if cluster_sync:
+        prevention.attach_cluster_sync(cluster_sync)
+    return prevention
+
+def _create_alert_system():
+    from modules.alert_response.alerter import AlertSystem
+    from modules.alert_response.sinks import create_sink
+    alerts = AlertSystem(broadcaster)
+    alerts.attach_event_store(event_store)
+    if load_rate:
+        alerts.set_load_generator(_load_generator(1))
+    # 外部告警输出（可选），多个地址以逗号分隔，例如:
+    # IDS_ALERT_SINKS=https://siem.example.com/hook,udp://10.0.0.5:514
+    for sink_target in os.environ.get('IDS_ALERT_SINKS', '').split(','):
+        if sink_target.strip():
+            alerts.add_sink(create_sink(sink_target.strip()))
+    return alerts
+
+def _create_network_monitor():
+    from modules.network_monitoring.monitor import NetworkMonitor
+    monitor = NetworkMonitor(broadcaster)
+    monitor.set_alert_callback(alert_system.process_alert)
+    if load_rate:
+        monitor.set_load_generator(_load_generator(2, interval=1))
+    if stats_agent:
+        monitor.attach_stats_agent(stats_agent)
+    return monitor
+
+def _create_event_store():
+    # 告警与威胁持久化存储
+    from modules.data_storage.store import EventStore
+    store = EventStore('data/ids_events.db', retention_days=int(os.environ.get('IDS_RETENTION_DAYS', 30)))
+    store.start_store()
+    return store
+
+def _create_traffic_analytics():
+    # 历史流量分析（读取流量归档与监控指标日志）
+    from modules.data_storage.analytics import TrafficAnalytics
+    return TrafficAnalytics('data/traffic', metrics_log=MetricsLog('data/monitoring/metrics'))
+
+traffic_detector = LazyModule(_create_traffic_detector, '流量检测模块')
+intrusion_prevention = LazyModule(_create_intrusion_prevention, '入侵防御模块')
+alert_system = LazyModule(_create_alert_system, '告警响应模块')
+network_monitor = LazyModule(_create_network_monitor, '网络监控模块')
+event_store = LazyModule(_create_event_store, '事件存储')
+traffic_analytics = LazyModule(_create_traffic_analytics, '历史流量分析')
+
+if data_plane:
+    # 数据面转发的威胁在本进程写入持久化存储
+    data_plane.attach_event_store(event_store)
 
 # 管理系统状态
 system_status = {
@@ -47,6 +204,8 @@ system_status = {
     'detected_threats': 0,
     'blocked_attacks': 0
 }
+# 启动/停止的检查与设置需原子执行，避免并发请求重复启动模块
+_control_lock = threading.Lock()
 
 # 路由定义
 @app.route('/')
@@ -66,65 +225,410 @@ def settings():
     return render_template('settings.html')
 
 # API路由
+def _metric_total(name):
+    metric = REGISTRY.get(name)
+    return int(metric.total()) if metric else 0
+
 @app.route('/api/status')
 def get_status():
-    return jsonify(system_status)
+    # 计数来自运行指标；独立数据面时来自共享内存
+    # 每次请求生成新的响应，不修改共享的系统状态
+    if data_plane:
+        counters = data_plane.get_counters()
+        counts = (counters.get('packets_total', 0), counters.get('threats', 0), counters.get('blocks', 0))
+    else:
+        counts = (_metric_total('ids_packets_total'), _metric_total('ids_threats_total'),
+                  _metric_total('ids_blocks_total'))
+    return json_response(dict(system_status, processed_packets=counts[0], detected_threats=counts[1],
+                              blocked_attacks=counts[2]))
+
+@app.route('/api/latency')
+def get_latency():
+    # 各阶段及端到端延迟分布（毫秒）
+    # 抓包到阻止的各阶段在数据面进程中记录
+    result = {'stages': data_plane.call('get_latency') if data_plane and data_plane.is_alive else TRACER.report()}
+    if slow_trace_log:
+        since = request.args.get('since', time.time() - 3600, type=float)
+        limit = min(request.args.get('limit', 100, type=int), 1000)
+        result['slow_traces'] = list(slow_trace_log.read(since, limit=limit))
+    return json_response(result)
+
+@app.route('/api/scheduler/stats')
+def get_scheduler_stats():
+    # 中心调度器各任务的执行次数、耗时和下次执行时间
+    return json_response(SCHEDULER.get_stats())
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus文本格式
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/api/start', methods=['POST'])
 def start_system():
-    if not system_status['is_running']:
-        system_status['is_running'] = True
-        system_status['start_time'] = time.time()
-        
-        # 启动各个模块
-        threading.Thread(target=traffic_detector.start_capture).start()
-        threading.Thread(target=intrusion_prevention.start_prevention).start()
-        threading.Thread(target=alert_system.start_alerting).start()
-        threading.Thread(target=network_monitor.start_monitoring).start()
+    if WORKER_ID != 0:
+        return json_response({'success': False, 'message': '只有主工作进程可以控制系统'}), 409
+    with _control_lock:
+        if not system_status['is_running']:
+            # 启动各个模块：周期工作注册到中心调度器，启动后立即返回
+            if data_plane:
+                try:
+                    data_plane.start_data_plane()
+                except (RuntimeError, OSError, EOFError) as e:
+                    # 数据面未启动时保持停止状态，可以再次尝试启动
+                    logger.error(f"系统启动失败: {str(e)}")
+                    return json_response({'success': False, 'message': str(e)}), 500
+            else:
+                traffic_detector.start_capture()
+                intrusion_prevention.start_prevention()
+            alert_system.start_alerting()
+            network_monitor.start_monitoring()
+            if cluster_sync:
+                cluster_sync.start_sync()
+            if stats_agent:
+                stats_agent.start_agent()
+            system_status['is_running'] = True
+            system_status['start_time'] = time.time()
         
-        logger.info("系统已启动")
-        return jsonify({'success': True, 'message': '系统已启动'})
+            logger.info("系统已启动")
+            return json_response({'success': True, 'message': '系统已启动'})
     
-    return jsonify({'success': False, 'message': '系统已在运行中'})
+        return json_response({'success': False, 'message': '系统已在运行中'})
 
 @app.route('/api/stop', methods=['POST'])
 def stop_system():
-    if system_status['is_running']:
-        system_status['is_running'] = False
+    if WORKER_ID != 0:
+        return json_response({'success': False, 'message': '只有主工作进程可以控制系统'}), 409
+    with _control_lock:
+        if system_status['is_running']:
+            system_status['is_running'] = False
         
-        # 停止各个模块
-        traffic_detector.stop_capture()
-        intrusion_prevention.stop_prevention()
-        alert_system.stop_alerting()
-        network_monitor.stop_monitoring()
+            # 停止各个模块
+            if data_plane:
+                data_plane.stop_data_plane()
+            else:
+                traffic_detector.stop_capture()
+                intrusion_prevention.stop_prevention()
+            alert_system.stop_alerting()
+            network_monitor.stop_monitoring()
+            if cluster_sync:
+                cluster_sync.stop_sync()
+            if stats_agent:
+                stats_agent.stop_agent()
         
-        logger.info("系统已停止")
-        return jsonify({'success': True, 'message': '系统已停止'})
+            logger.info("系统已停止")
+            return json_response({'success': True, 'message': '系统已停止'})
     
-    return jsonify({'success': False, 'message': '系统未运行'})
+        return json_response({'success': False, 'message': '系统未运行'})
+
+def _page_args():
+    # 分页参数：cursor 向更早翻页，since 只取更新的数据（增量轮询）
+    return {
+        'severity': request.args.get('severity'),
+        'ip': request.args.get('ip'),
+        'cursor': request.args.get('cursor', type=int),
+        'since': request.args.get('since', type=int),
+        'limit': max(1, min(request.args.get('limit', 100, type=int), 1000))
+    }
+
+def _store_page(kind, key):
+    """从持久化存储分页查询（history=1 或带时间范围时）"""
+    args = _page_args()
+    etag = make_etag('store', event_store.version(kind))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    try:
+        events, next_cursor = event_store.query(
+            kind,
+            event_type=request.args.get('type'),
+            start_time=request.args.get('start'),
+            end_time=request.args.get('end'),
+            **args
+        )
+    except ValueError as e:
+        return json_response({'success': False, 'message': str(e)}), 400
+    return json_response({key: events, 'next_cursor': next_cursor, 'latest': event_store.latest_id(kind)}, etag=etag)
+
+def _wants_history():
+    return any(request.args.get(k) for k in ('history', 'start', 'end'))
 
 @app.route('/api/logs')
 def get_logs():
-    limit = request.args.get('limit', 100, type=int)
-    return jsonify({'logs': alert_system.get_recent_alerts(limit)})
+    if _wants_history():
+        return _store_page('alerts', 'logs')
+    
+    # 内存中的最近告警，按索引过滤，从新到旧
+    version = alert_system.get_alerts_version()
+    etag = make_etag('alerts', version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    logs, next_cursor = alert_system.query_alerts(alert_type=request.args.get('type'), **_page_args())
+    return json_response({'logs': logs, 'next_cursor': next_cursor, 'latest': version - 1}, etag=etag)
+
+@app.route('/api/alerts/stats')
+def get_alert_stats():
+    window = request.args.get('window')
+    if window and window not in alert_system.alert_stats.windows:
+        return json_response({'success': False, 'message': f'不支持的时间窗口: {window}'}), 400
+    return json_response(alert_system.get_alert_stats(window))
+
+@app.route('/api/incidents')
+def get_incidents():
+    # 已关闭的事件从持久化存储中查询
+    if _wants_history() or request.args.get('cursor'):
+        return _store_page('incidents', 'incidents')
+    
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    return json_response({
+        'incidents': alert_system.get_incidents(limit),
+        'stats': alert_system.get_correlation_stats()
+    })
+
+@app.route('/api/sinks')
+def get_sinks():
+    return json_response({'sinks': alert_system.get_sink_stats()})
 
 @app.route('/api/threats')
 def get_threats():
-    return jsonify({'threats': intrusion_prevention.get_recent_threats()})
+    if _wants_history():
+        return _store_page('threats', 'threats')
+    
+    # 内存中的最近威胁，从新到旧
+    threat_source = data_plane or intrusion_prevention
+    version = threat_source.threat_seq
+    etag = make_etag('threats', version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    threats, next_cursor = threat_source.query_threats(threat_type=request.args.get('type'), **_page_args())
+    return json_response({'threats': threats, 'next_cursor': next_cursor, 'latest': version}, etag=etag)
+
+@app.route('/api/traffic')
+def get_traffic():
+    timeframe = request.args.get('timeframe', 'hour')
+    return json_response({'timeframe': timeframe, 'traffic': network_monitor.get_traffic_by_timeframe(timeframe)})
+
+@app.route('/api/metrics/history')
+def get_metrics_history():
+    # start/end 为epoch秒，默认返回最近一小时
+    end = request.args.get('end', time.time(), type=float)
+    start = request.args.get('start', end - 3600, type=float)
+    limit = min(request.args.get('limit', 3600, type=int), 86400)
+    records = list(network_monitor.metrics_log.read(start, end, limit))
+    return json_response({'records': records, 'count': len(records)})
+
+def _analytics_range():
+    # start/end 为epoch秒，默认最近24小时
+    end = request.args.get('end', type=float)
+    start = request.args.get('start', (end or time.time()) - 86400, type=float)
+    return start, end
+
+@app.route('/api/analytics/series')
+def get_analytics_series():
+    start, end = _analytics_range()
+    try:
+        result = traffic_analytics.series(
+            request.args.get('source', 'traffic'),
+            request.args.get('field', 'size'),
+            start, end,
+            interval=request.args.get('interval', 60, type=int),
+            agg=request.args.get('agg', 'sum'),
+            group_by=request.args.get('group_by')
+        )
+    except (ValueError, KeyError) as e:
+        return json_response({'success': False, 'message': str(e)}), 400
+    return json_response(result)
+
+@app.route('/api/analytics/percentiles')
+def get_analytics_percentiles():
+    start, end = _analytics_range()
+    try:
+        percentiles = [float(p) for p in request.args.get('p', '50,95,99').split(',')]
+        if not all(0 <= p <= 100 for p in percentiles):
+            raise ValueError("百分位必须在0到100之间")
+        result = traffic_analytics.percentiles(
+            request.args.get('source', 'traffic'),
+            request.args.get('field', 'size'),
+            start, end,
+            percentiles=percentiles,
+            group_by=request.args.get('group_by')
+        )
+    except (ValueError, KeyError) as e:
+        return json_response({'success': False, 'message': str(e)}), 400
+    return json_response(result)
+
+@app.route('/api/analytics/top')
+def get_analytics_top():
+    start, end = _analytics_range()
+    try:
+        result = traffic_analytics.top(
+            request.args.get('source', 'traffic'),
+            request.args.get('group_by', 'src_ip'),
+            start, end,
+            field=request.args.get('field'),
+            limit=min(request.args.get('limit', 10, type=int), 1000)
+        )
+    except (ValueError, KeyError) as e:
+        return json_response({'success': False, 'message': str(e)}), 400
+    return json_response({'top': result})
+
+@app.route('/api/stream/stats')
+def get_stream_stats():
+    stats = broadcaster.get_stats()
+    stats['worker_id'] = WORKER_ID
+    if event_bus:
+        stats['event_bus'] = event_bus.get_stats()
+    return json_response(stats)
+
+@app.route('/api/data-plane/stats')
+def get_data_plane_stats():
+    if not data_plane:
+        return json_response({'success': False, 'message': '未启用独立数据面进程'}), 404
+    return json_response(data_plane.get_stats())
+
+@app.route('/api/fleet/stats')
+def get_fleet_stats():
+    if not stats_collector:
+        return json_response({'success': False, 'message': '未启用收集器模式'}), 404
+    return json_response(stats_collector.get_fleet_stats())
+
+# 诊断接口：未调用时分析器没有任何线程或钩子
+def admin_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return json_response({'success': False, 'message': '未启用诊断接口'}), 404
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+            return json_response({'success': False, 'message': '无效的管理令牌'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def _collapsed_response():
+    # 折叠栈文本，可直接交给 flamegraph.pl 或 speedscope
+    return Response(PROFILER.collapsed(), mimetype='text/plain; charset=utf-8')
+
+@app.route('/api/admin/profile/start', methods=['POST'])
+@admin_required
+def start_profile():
+    seconds = max(0.1, min(request.args.get('seconds', 10, type=float), 300))
+    interval = max(1, request.args.get('interval_ms', 10, type=float)) / 1000
+    skip_idle = request.args.get('skip_idle', 0, type=int) == 1
+    if not PROFILER.start(seconds, interval, skip_idle):
+        return json_response({'success': False, 'message': '采样分析正在进行中'}), 409
+    return json_response({'success': True, 'status': PROFILER.get_status()})
+
+@app.route('/api/admin/profile/stop', methods=['POST'])
+@admin_required
+def stop_profile():
+    PROFILER.stop()
+    return _collapsed_response()
+
+@app.route('/api/admin/profile')
+@admin_required
+def get_profile():
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    return json_response({'status': PROFILER.get_status(), 'top': [
+        {'function': name, 'self': own, 'total': total} for name, own, total in PROFILER.top_functions(limit)]})
+
+@app.route('/api/admin/profile/collapsed')
+@admin_required
+def get_profile_collapsed():
+    return _collapsed_response()
+
+def _memory_args():
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        raise ValueError(f"不支持的分组方式: {group_by}")
+    return max(1, min(request.args.get('limit', 20, type=int), 500)), group_by
+
+@app.route('/api/admin/memory/start', methods=['POST'])
+@admin_required
+def start_memory_profile():
+    frames = max(1, min(request.args.get('frames', 10, type=int), 100))
+    if not MEMORY_PROFILER.start(frames):
+        return json_response({'success': False, 'message': '内存分配追踪已开启'}), 409
+    return json_response({'success': True, 'status': MEMORY_PROFILER.get_status()})
+
+@app.route('/api/admin/memory/stop', methods=['POST'])
+@admin_required
+def stop_memory_profile():
+    return json_response({'success': MEMORY_PROFILER.stop()})
+
+@app.route('/api/admin/memory')
+@admin_required
+def get_memory_status():
+    return json_response(MEMORY_PROFILER.get_status())
+
+@app.route('/api/admin/memory/snapshot', methods=['POST'])
+@admin_required
+def take_memory_snapshot():
+    # 拍摄快照作为之后 /diff 的基线
+    try:
+        limit, group_by = _memory_args()
+        top = MEMORY_PROFILER.snapshot(limit, group_by)
+        return json_response({'top': top, 'status': MEMORY_PROFILER.get_status()})
+    except ValueError as e:
+        return json_response({'success': False, 'message': str(e)}), 400
+    except RuntimeError as e:
+        return json_response({'success': False, 'message': str(e)}), 409
+
+@app.route('/api/admin/memory/top')
+@admin_required
+def get_memory_top():
+    try:
+        limit, group_by = _memory_args()
+        return json_response({'top': MEMORY_PROFILER.top(limit, group_by)})
+    except ValueError as e:
+        return json_response({'success': False, 'message': str(e)}), 400
+    except RuntimeError as e:
+        return json_response({'success': False, 'message': str(e)}), 409
+
+@app.route('/api/admin/memory/diff')
+@admin_required
+def get_memory_diff():
+    # 与基线快照相比增长最多的分配位置（例如 ip_data、告警索引、traffic_data 的增长）
+    try:
+        limit, group_by = _memory_args()
+        return json_response({'diff': MEMORY_PROFILER.diff(limit, group_by)})
+    except ValueError as e:
+        return json_response({'success': False, 'message': str(e)}), 400
+    except RuntimeError as e:
+        return json_response({'success': False, 'message': str(e)}), 409
 
 # Socket.IO 事件
 @socketio.on('connect')
 def handle_connect():
+    broadcaster.add_client(request.sid, channels=[])
     logger.info(f"客户端已连接: {request.sid}")
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    broadcaster.remove_client(request.sid)
     logger.info(f"客户端已断开连接: {request.sid}")
 
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    broadcaster.subscribe(request.sid, (data or {}).get('channels', []))
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    broadcaster.unsubscribe(request.sid, (data or {}).get('channels', []))
+
+@socketio.on('resync')
+def handle_resync():
+    broadcaster.resync(request.sid)
+
 # 主函数
 if __name__ == '__main__':
+    port = int(os.environ.get('IDS_PORT', 8080))
     try:
         logger.info("网络入侵检测与防御系统启动中...")
-        socketio.run(app, host='0.0.0.0', port=8080, debug=True)
+        if ASYNC_MODE:
+            # 生产模式：协程服务器，不启用调试和自动重载
+            logger.info(f"生产模式: {ASYNC_MODE}, 工作进程 {WORKER_ID}, 端口 {port}")
+            socketio.run(app, host='0.0.0.0', port=port, debug=False, use_reloader=False, log_output=False)
+        else:
+            socketio.run(app, host='0.0.0.0', port=port, debug=True)
     except Exception as e:
         logger.error(f"系统启动失败: {str(e)}")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""告警二级索引基准测试：对比线性扫描与索引查询
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_alert_index --alerts 1000000
+"""
+
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from modules.alert_response.alert_index import AlertIndex
+
+ALERT_TYPES = ['SQL注入攻击', 'XSS攻击', 'DDoS攻击', '端口扫描', '暴力破解', '异常流量', '可疑文件下载']
+SEVERITIES = ['低', '中', '高']
+
+
+def generate_alerts(count, seed=42):
+    """生成按时间递增的告警"""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(hours=48)
+    step = 48 * 3600 / count
+    for i in range(count):
+        yield {
+            'alert_id': f"ALERT-{i}",
+            'timestamp': (start + timedelta(seconds=i * step)).isoformat(),
+            'alert_type': rng.choice(ALERT_TYPES),
+            'severity': rng.choice(SEVERITIES),
+            'src_ip': f"192.168.{rng.randint(0, 15)}.{rng.randint(2, 254)}",
+            'dst_ip': f"10.0.0.{rng.randint(2, 254)}",
+        }
+
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<28} {elapsed * 1000:10.3f} ms  ({len(result)} 条)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='告警索引基准测试')
+    parser.add_argument('--alerts', type=int, default=1000000, help='保留的告警数量')
+    parser.add_argument('--repeat', type=int, default=5, help='每个查询重复次数')
+    args = parser.parse_args()
+
+    alerts = list(generate_alerts(args.alerts + args.alerts // 10))
+    index = AlertIndex(max_alerts=args.alerts)
+
+    start = time.perf_counter()
+    for alert in alerts:
+        index.add(alert)
+    elapsed = time.perf_counter() - start
+    print(f"索引写入: {len(alerts)} 条, {len(alerts) / elapsed:,.0f} 条/秒（含 {len(alerts) - args.alerts} 次淘汰）")
+    linear = alerts[-args.alerts:]
+
+    ip = linear[-1]['src_ip']
+    cutoff = datetime.now() - timedelta(hours=1)
+    cutoff_str = cutoff.isoformat()
+    cutoff_ts = cutoff.timestamp()
+
+    print("线性扫描:")
+    timed('按严重程度', lambda: [a for a in linear if a['severity'] == '高'][-100:], args.repeat)
+    timed('按类型', lambda: [a for a in linear if a['alert_type'] == '端口扫描'][-100:], args.repeat)
+    timed('按IP', lambda: [a for a in linear if a['src_ip'] == ip or a['dst_ip'] == ip][-100:], args.repeat)
+    timed('按时间范围', lambda: [a for a in linear if a['timestamp'] >= cutoff_str][-1000:], args.repeat)
+
+    print("索引查询:")
+    timed('按严重程度', lambda: index.query('severity', '高', 100), args.repeat)
+    timed('按类型', lambda: index.query('alert_type', '端口扫描', 100), args.repeat)
+    timed('按IP', lambda: index.query_ip(ip, 100), args.repeat)
+    timed('按时间范围', lambda: index.since(cutoff_ts, 1000), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""历史流量分析基准测试："最近30天按协议统计每分钟字节数"
+
+在临时目录生成一年的流量归档（与 TrafficDetector 保存的JSON格式相同），
+分别测量首次查询（解析归档并写入按天列式缓存）、新实例查询（读取磁盘缓存）
+与结果缓存命中的耗时。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_analytics --days 365 --files-per-day 4 --packets-per-file 1000
+"""
+
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from modules.data_storage.analytics import TrafficAnalytics
+
+PROTOCOLS = [('TCP', 'tcp'), ('HTTP/HTTPS', 'http'), ('UDP', 'udp'), ('ICMP', 'icmp')]
+
+
+def generate_archives(directory, days, files_per_day, packets_per_file, seed=42):
+    """按天生成流量归档文件，返回数据包总数"""
+    rng = random.Random(seed)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    step = 86400 / (files_per_day * packets_per_file)
+    total = 0
+    for d in range(days, 0, -1):
+        day_start = today - timedelta(days=d)
+        for f in range(files_per_day):
+            packets = []
+            for i in range(packets_per_file):
+                ts = day_start + timedelta(seconds=(f * packets_per_file + i) * step)
+                protocol, packet_type = rng.choice(PROTOCOLS)
+                packets.append({
+                    'timestamp': ts.isoformat(),
+                    'src_ip': f"192.168.{rng.randint(0, 3)}.{rng.randint(2, 254)}",
+                    'dst_ip': f"10.0.0.{rng.randint(2, 254)}",
+                    'src_port': rng.randint(1024, 65535),
+                    'dst_port': rng.choice([80, 443, 53, 22, 8080]),
+                    'protocol': protocol,
+                    'size': rng.randint(40, 1500),
+                    'type': packet_type
+                })
+            # 文件名为最后一个数据包之后的保存时间
+            saved = ts + timedelta(seconds=1)
+            with open(os.path.join(directory, f"traffic_{saved.strftime('%Y%m%d_%H%M%S')}.json"), 'w') as fp:
+                json.dump(packets, fp)
+            total += packets_per_file
+    return total
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='历史流量分析基准测试')
+    parser.add_argument('--days', type=int, default=365, help='归档天数')
+    parser.add_argument('--files-per-day', type=int, default=4, help='每天的归档文件数')
+    parser.add_argument('--packets-per-file', type=int, default=1000, help='每个文件的数据包数')
+    parser.add_argument('--window-days', type=int, default=30, help='查询的天数')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        traffic_dir = os.path.join(workdir, 'traffic')
+        cache_dir = os.path.join(workdir, 'analytics')
+        os.makedirs(traffic_dir)
+
+        start = time.perf_counter()
+        total = generate_archives(traffic_dir, args.days, args.files_per_day, args.packets_per_file)
+        print(f"生成 {args.days} 天归档: {total:,} 个数据包, "
+              f"{args.days * args.files_per_day} 个文件, 耗时 {time.perf_counter() - start:.1f} 秒")
+
+        # 查询范围结束于今天零点（已结束的时间范围，结果可缓存）
+        end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        begin = end - args.window_days * 86400
+
+        def query(analytics):
+            return analytics.series('traffic', 'size', begin, end, interval=60, agg='sum', group_by='protocol')
+
+        analytics = TrafficAnalytics(traffic_dir, cache_dir=cache_dir)
+        result, cold_ms = timed(lambda: query(analytics))
+        points = len(result['timestamps'])
+        print(f"最近{args.window_days}天按协议每分钟字节数: {points:,} 个时间点 x {len(result['series'])} 个协议")
+        print(f"  首次查询（解析归档并建立缓存）: {cold_ms:.0f} ms, 解析 {analytics.stats['days_built']} 天")
+
+        analytics = TrafficAnalytics(traffic_dir, cache_dir=cache_dir)
+        warm, warm_ms = timed(lambda: query(analytics))
+        print(f"  新实例查询（读取按天列式缓存）: {warm_ms:.0f} ms, 加载 {analytics.stats['days_loaded']} 天")
+
+        _, hit_ms = timed(lambda: query(analytics))
+        print(f"  结果缓存命中: {hit_ms:.3f} ms")
+
+        _, p_ms = timed(lambda: analytics.percentiles('traffic', 'size', begin, end, group_by='protocol'))
+        _, top_ms = timed(lambda: analytics.top('traffic', 'src_ip', begin, end, field='size', limit=10))
+        print(f"  按协议的包大小百分位: {p_ms:.0f} ms, 源IP字节数TOP10: {top_ms:.0f} ms")
+
+        expected = sum(sum(values) for values in result['series'].values())
+        actual = sum(sum(values) for values in warm['series'].values())
+        print(f"校验: 首次与缓存查询的字节总数 {'一致' if expected == actual else '不一致'} ({int(actual):,})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
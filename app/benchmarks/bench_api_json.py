@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""API响应序列化基准测试：仪表盘轮询 /api/logs 的开销
+
+对比原实现（jsonify 返回全部告警；调试模式下缩进并排序键）与分页、
+紧凑JSON/orjson序列化、gzip压缩以及未变化时直接返回304的开销。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_api_json --alerts 10000
+"""
+
+import json
+import gzip
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from modules.alert_response.alert_index import AlertIndex
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ALERT_TYPES = ['SQL注入攻击', 'XSS攻击', 'DDoS攻击', '端口扫描', '暴力破解', '异常流量', '可疑文件下载']
+SEVERITIES = ['低', '中', '高']
+
+
+def build_index(count, seed=42):
+    rng = random.Random(seed)
+    index = AlertIndex(max_alerts=count)
+    start = datetime.now() - timedelta(hours=24)
+    for i in range(count):
+        alert_type = rng.choice(ALERT_TYPES)
+        index.add({
+            'alert_id': f"ALERT-{i}",
+            'timestamp': (start + timedelta(seconds=i * 86400 / count)).isoformat(),
+            'alert_type': alert_type,
+            'severity': rng.choice(SEVERITIES),
+            'src_ip': f"192.168.{rng.randint(0, 15)}.{rng.randint(2, 254)}",
+            'dst_ip': f"10.0.0.{rng.randint(2, 254)}",
+            'port': rng.randint(1, 65535),
+            'protocol': rng.choice(['TCP', 'UDP', 'HTTP']),
+            'details': f"检测到{alert_type}攻击尝试"
+        })
+    return index
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API响应序列化基准测试')
+    parser.add_argument('--alerts', type=int, default=10000, help='内存中保留的告警数量')
+    parser.add_argument('--page', type=int, default=100, help='每页数量')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    index = build_index(args.alerts)
+    all_alerts = index.recent(args.alerts)
+
+    print(f"{args.alerts} 条告警, 每种方式重复 {args.repeat} 次（毫秒/请求, 响应字节数）")
+    rows = [
+        ('全部告警, jsonify调试模式（缩进+排序键）',
+         lambda: json.dumps({'logs': all_alerts}, indent=2, sort_keys=True).encode('utf-8')),
+        ('全部告警, jsonify（排序键, ASCII转义）',
+         lambda: json.dumps({'logs': all_alerts}, sort_keys=True, separators=(',', ':')).encode('utf-8')),
+        ('全部告警, 紧凑JSON',
+         lambda: json.dumps({'logs': all_alerts}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')),
+    ]
+    if orjson is not None:
+        rows.append(('全部告警, orjson', lambda: orjson.dumps({'logs': all_alerts})))
+        dumps = orjson.dumps
+    else:
+        dumps = lambda payload: json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def paged():
+        logs, next_cursor = index.page(limit=args.page)
+        return dumps({'logs': logs, 'next_cursor': next_cursor, 'latest': index.version - 1})
+
+    rows.append((f'分页 {args.page} 条（查询+序列化）', paged))
+    rows.append((f'分页 {args.page} 条 + gzip', lambda: gzip.compress(paged(), compresslevel=5)))
+    # 未变化时只比较版本号，不查询也不序列化
+    rows.append(('未变化, 返回304', lambda: b'' if f'W/"{index.version}"' == f'W/"{index.version}"' else paged()))
+
+    baseline = None
+    for label, func in rows:
+        ms, body = timed(func, args.repeat)
+        baseline = baseline or ms
+        print(f"  {label:<36} {ms:9.3f} ms {len(body):>10,} 字节  ({baseline / max(ms, 1e-6):,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
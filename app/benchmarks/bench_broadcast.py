@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""实时推送基准测试：对比逐事件全量广播与合并差量推送
+
+模拟仪表盘客户端（部分为慢客户端，延迟确认），统计服务端发送字节数与CPU耗时，
+并在抽样客户端上应用差量，校验最终状态与服务端一致。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_broadcast --clients 500 --seconds 60
+"""
+
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from modules.network_monitoring.broadcaster import StreamBroadcaster
+
+PROTOCOLS = ['TCP', 'UDP', 'HTTP', 'HTTPS', 'ICMP', 'DNS', 'Other']
+ATTACKS = ['SQL注入', 'XSS攻击', 'DDoS攻击', '端口扫描', '暴力破解', '异常流量', '病毒/木马']
+CHANNELS = ['network_stats', 'traffic_update', 'new_alert']
+MB = 1024 * 1024
+
+
+class MonitorSimulator:
+    """按 NetworkMonitor 的数据格式生成每秒状态与告警"""
+
+    def __init__(self, seed=42):
+        self.rng = random.Random(seed)
+        self.start = datetime.now()
+        self.history = []
+        self.protocol_stats = {p: 0 for p in PROTOCOLS}
+        self.attack_stats = {a: 0 for a in ATTACKS}
+        self.ip_data = {}
+
+    def tick(self, second):
+        rng = self.rng
+        timestamp = (self.start + timedelta(seconds=second)).isoformat()
+        self.history.append({'timestamp': timestamp, 'incoming': rng.randint(100, 1000), 'outgoing': rng.randint(50, 500)})
+        self.history = self.history[-60:]
+        for _ in range(3):
+            self.protocol_stats[rng.choice(PROTOCOLS)] += rng.randint(1, 10)
+        for _ in range(5):
+            ip = f"192.168.1.{rng.randint(2, 254)}"
+            data = self.ip_data.setdefault(ip, {'in_traffic': 0, 'out_traffic': 0, 'threats': 0,
+                                                'last_seen': timestamp, 'is_blocked': False})
+            data['in_traffic'] += rng.randint(1, 100)
+            data['out_traffic'] += rng.randint(1, 50)
+            data['last_seen'] = timestamp
+        top_ips = sorted(self.ip_data.items(), key=lambda x: x[1]['in_traffic'] + x[1]['out_traffic'], reverse=True)[:5]
+        network_stats = {
+            'timestamp': timestamp,
+            'traffic_in': self.history[-1]['incoming'] * 1024,
+            'traffic_out': self.history[-1]['outgoing'] * 1024,
+            'connections': rng.randint(10, 100),
+            'packets_processed': rng.randint(100, 1000),
+            'threats_detected': sum(self.attack_stats.values()),
+            'ips_blocked': 0,
+            'protocol_stats': self.protocol_stats,
+            'attack_stats': self.attack_stats,
+            'ip_data': dict(top_ips)
+        }
+        traffic_update = {'history': self.history, 'protocols': self.protocol_stats}
+        return network_stats, traffic_update
+
+    def alert(self, second):
+        attack_type = self.rng.choice(ATTACKS)
+        self.attack_stats[attack_type] += 1
+        return {
+            'timestamp': (self.start + timedelta(seconds=second)).isoformat(),
+            'alert_id': f"ALERT-{second}-{self.rng.randint(1000, 9999)}",
+            'alert_type': attack_type,
+            'severity': self.rng.choice(['低', '中', '高']),
+            'src_ip': f"192.168.1.{self.rng.randint(2, 254)}",
+            'dst_ip': f"10.0.0.{self.rng.randint(2, 254)}",
+            'port': self.rng.randint(1, 65535),
+            'protocol': self.rng.choice(['TCP', 'UDP', 'HTTP']),
+            'details': f"检测到{attack_type}攻击尝试"
+        }
+
+
+def apply_patch(value, node):
+    """与 static/js/stream.js 中 applyPatch 相同的差量应用逻辑"""
+    if 'v' in node:
+        return node['v']
+    if 's' in node:
+        return (value or [])[node['s']:] + node['a']
+    result = dict(value or {})
+    for key, child in node['d'].items():
+        result[key] = apply_patch(result.get(key), child)
+    for key in node.get('r', []):
+        result.pop(key, None)
+    return result
+
+
+class FakeSocketIO:
+    """记录每个客户端收到的字节数，按客户端延迟模拟确认"""
+
+    def __init__(self, ack_delays, verify_sids):
+        self.ack_delays = ack_delays
+        self.verify_sids = verify_sids
+        self.now = 0
+        self.bytes_sent = 0
+        self.event_bytes = 0
+        self.frames = 0
+        self.serialize_time = 0
+        self.client_time = 0
+        self.pending_acks = []
+        self.client_state = {sid: {} for sid in verify_sids}
+        self.client_events = {sid: 0 for sid in verify_sids}
+
+    def emit(self, event, data, to=None, callback=None):
+        start = time.perf_counter()
+        self.bytes_sent += len(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        middle = time.perf_counter()
+        self.serialize_time += middle - start
+        # 以下为模拟客户端的开销，不计入服务端CPU
+        self.event_bytes += len(json.dumps(data['events'], ensure_ascii=False).encode('utf-8'))
+        self.frames += 1
+        if to in self.client_state:
+            state = self.client_state[to]
+            for channel, update in data['state'].items():
+                state[channel] = apply_patch(state.get(channel), update['p'])
+            self.client_events[to] += sum(len(events) for events in data['events'].values())
+        self.pending_acks.append((self.now + self.ack_delays[to], callback))
+        self.client_time += time.perf_counter() - middle
+
+    def deliver_acks(self):
+        ready = [cb for due, cb in self.pending_acks if due <= self.now]
+        self.pending_acks = [(due, cb) for due, cb in self.pending_acks if due > self.now]
+        for callback in ready:
+            callback()
+
+
+def run_naive(args):
+    """原方案：每秒向所有客户端发送完整状态，每条告警单独广播"""
+    sim = MonitorSimulator(args.seed)
+    rng = random.Random(args.seed)
+    bytes_sent = 0
+    event_bytes = 0
+    messages = 0
+    start = time.process_time()
+    for second in range(args.seconds):
+        for _ in range(rng.randint(0, args.alerts_per_second * 2)):
+            payload = json.dumps(sim.alert(second), ensure_ascii=False).encode('utf-8')
+            bytes_sent += len(payload) * args.clients
+            event_bytes += len(payload) * args.clients
+            messages += args.clients
+        for data in sim.tick(second):
+            payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            bytes_sent += len(payload) * args.clients
+            messages += args.clients
+    # 广播时每条消息只序列化一次（对原方案最有利的估计）
+    return bytes_sent, event_bytes, messages, time.process_time() - start
+
+
+def run_stream(args):
+    """推送层：250ms合并、按客户端差量、慢客户端跳帧"""
+    sids = [f"client-{i}" for i in range(args.clients)]
+    slow = set(random.Random(args.seed + 1).sample(sids, int(args.clients * args.slow_ratio)))
+    ack_delays = {sid: (args.slow_delay if sid in slow else 0) for sid in sids}
+    verify = set(sids[::max(1, args.clients // 10)]) | set(list(slow)[:5])
+
+    sim = MonitorSimulator(args.seed)
+    rng = random.Random(args.seed)
+    socketio = FakeSocketIO(ack_delays, verify)
+    broadcaster = StreamBroadcaster(socketio, interval=0.25)
+    for sid in sids:
+        broadcaster.add_client(sid, CHANNELS)
+
+    latest = {}
+    alerts_published = 0
+    start = time.process_time()
+    ticks_per_second = int(1 / broadcaster.interval)
+    for second in range(args.seconds):
+        alerts = [sim.alert(second) for _ in range(rng.randint(0, args.alerts_per_second * 2))]
+        for tick in range(ticks_per_second):
+            socketio.now = second + tick * broadcaster.interval
+            socketio.deliver_acks()
+            # 告警均匀分布在各帧之间
+            for alert in alerts[tick::ticks_per_second]:
+                broadcaster.emit('new_alert', alert)
+                alerts_published += 1
+            if tick == 0:
+                network_stats, traffic_update = sim.tick(second)
+                broadcaster.emit('network_stats', network_stats)
+                broadcaster.emit('traffic_update', traffic_update)
+                latest = {'network_stats': json.loads(json.dumps(network_stats)),
+                          'traffic_update': json.loads(json.dumps(traffic_update))}
+            broadcaster.flush_frames(now=socketio.now)
+    elapsed = time.process_time() - start - socketio.client_time
+
+    # 收尾：所有客户端确认后再推送一轮，校验抽样客户端的最终状态
+    socketio.now += args.slow_delay + 1
+    socketio.deliver_acks()
+    broadcaster.flush_frames(now=socketio.now)
+    socketio.now += args.slow_delay + 1
+    socketio.deliver_acks()
+    mismatched = [sid for sid in verify if socketio.client_state[sid] != latest]
+    fast_events = [socketio.client_events[sid] for sid in verify if sid not in slow]
+
+    return {
+        'bytes': socketio.bytes_sent,
+        'event_bytes': socketio.event_bytes,
+        'frames': socketio.frames,
+        'cpu': elapsed,
+        'serialize': socketio.serialize_time,
+        'skipped': broadcaster.stats['frames_skipped'],
+        'slow_clients': len(slow),
+        'verified': len(verify),
+        'mismatched': len(mismatched),
+        'alerts_published': alerts_published,
+        'fast_client_events': min(fast_events) if fast_events else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='实时推送基准测试')
+    parser.add_argument('--clients', type=int, default=500, help='模拟的仪表盘客户端数量')
+    parser.add_argument('--seconds', type=int, default=60, help='模拟时长（秒）')
+    parser.add_argument('--alerts-per-second', type=int, default=5, help='平均每秒告警数')
+    parser.add_argument('--slow-ratio', type=float, default=0.1, help='慢客户端比例')
+    parser.add_argument('--slow-delay', type=float, default=2.0, help='慢客户端确认延迟（秒）')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{args.clients} 个客户端, 模拟 {args.seconds} 秒, 平均 {args.alerts_per_second} 条告警/秒")
+
+    naive_bytes, naive_events, naive_messages, naive_cpu = run_naive(args)
+    print("逐事件全量广播:")
+    print(f"  发送 {naive_messages:,} 条消息, {naive_bytes / MB:.1f} MB"
+          f"（状态 {(naive_bytes - naive_events) / MB:.1f} MB, 告警 {naive_events / MB:.1f} MB）, CPU {naive_cpu:.2f} 秒")
+
+    result = run_stream(args)
+    print("合并差量推送:")
+    print(f"  发送 {result['frames']:,} 帧, {result['bytes'] / MB:.1f} MB"
+          f"（状态 {(result['bytes'] - result['event_bytes']) / MB:.1f} MB, 告警 {result['event_bytes'] / MB:.1f} MB）, "
+          f"CPU {result['cpu']:.2f} 秒（其中逐客户端序列化 {result['serialize']:.2f} 秒）")
+    print(f"  慢客户端 {result['slow_clients']} 个, 跳过 {result['skipped']:,} 帧")
+    print(f"  抽样校验 {result['verified']} 个客户端, 状态不一致 {result['mismatched']} 个; "
+          f"快客户端收到告警 {result['fast_client_events']}/{result['alerts_published']} 条")
+    naive_state = naive_bytes - naive_events
+    result_state = result['bytes'] - result['event_bytes']
+    print(f"总字节数减少 {naive_bytes / max(result['bytes'], 1):.1f} 倍, 状态数据减少 {naive_state / max(result_state, 1):.1f} 倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""集群同步基准测试：接入 IntrusionPrevention 时阻止列表的收敛时间
+
+在本机启动若干节点（BlockListSync + IntrusionPrevention，各自的阻止记录文件），
+在第一个节点上通过 block_ip 阻止 --ips 个IP，测量：
+    所有节点的 blocked_ips 都包含全部IP的时间（收敛）
+    所有节点的阻止记录文件都写入全部IP的时间（落盘）
+收敛期间另一个节点的调度线程同时处理威胁（process_threat），与同步线程并发修改阻止列表。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_cluster_sync --ips 10000 --nodes 3
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+
+from modules.intrusion_prevention.cluster_sync import BlockListSync
+from modules.intrusion_prevention.prevention import IntrusionPrevention
+from modules.simulation.load_generator import LoadGenerator
+
+
+def persisted_ips(prevention):
+    """阻止记录文件中的IP"""
+    try:
+        with open(prevention.blocks_file) as f:
+            return {block['ip'] for block in json.load(f)}
+    except (OSError, ValueError):
+        return set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='集群同步基准测试')
+    parser.add_argument('--ips', type=int, default=10000, help='在第一个节点上阻止的IP数量')
+    parser.add_argument('--nodes', type=int, default=3, help='节点数量')
+    parser.add_argument('--base-port', type=int, default=19570, help='第一个节点的UDP端口')
+    parser.add_argument('--timeout', type=float, default=60, help='最长等待时间（秒）')
+    parser.add_argument('--seed', type=int, default=7, help='并发威胁的随机种子')
+    args = parser.parse_args()
+
+    # 每次阻止都写INFO日志，测量时只保留警告
+    logging.basicConfig(level=logging.WARNING)
+
+    ports = [args.base_port + i for i in range(args.nodes)]
+    # 模块在当前目录下创建 data/，放到临时目录中运行
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        nodes, preventions = [], []
+        try:
+            for port in ports:
+                peers = [f"127.0.0.1:{p}" for p in ports if p != port]
+                node = BlockListSync('127.0.0.1', port, peers, key='bench-cluster-key')
+                prevention = IntrusionPrevention(mode='auto')
+                prevention.blocks_file = os.path.join(tmp, f'blocked_ips_{port}.json')
+                prevention.attach_cluster_sync(node)
+                node.start_sync()
+                nodes.append(node)
+                preventions.append(prevention)
+
+            # 另一个节点同时处理威胁
+            stop = threading.Event()
+            threats = list(LoadGenerator(seed=args.seed).threats(20000))
+
+            def process_threats():
+                for threat in threats:
+                    if stop.is_set():
+                        return
+                    preventions[-1].process_threat(threat)
+
+            worker = threading.Thread(target=process_threats, daemon=True)
+
+            ips = [f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}" for i in range(args.ips)]
+            start = time.perf_counter()
+            worker.start()
+            for ip in ips:
+                preventions[0].block_ip(ip)
+            issued = time.perf_counter() - start
+
+            expected = set(ips)
+            converged = persisted = None
+            while time.perf_counter() - start < args.timeout:
+                elapsed = time.perf_counter() - start
+                if converged is None and all(expected <= p.blocked_ips for p in preventions):
+                    converged = elapsed
+                if converged is not None and all(expected <= persisted_ips(p) for p in preventions):
+                    persisted = elapsed
+                    break
+                time.sleep(0.05)
+            stop.set()
+            worker.join()
+            for prevention in preventions:
+                prevention._persist_blocks()
+
+            print(f"节点 {args.nodes} 个，阻止 {args.ips:,} 个IP")
+            print(f"  第一个节点 block_ip 完成: {issued:.3f} 秒")
+            print(f"  所有节点阻止列表一致:     {converged:.3f} 秒（block_ip 完成后 {converged - issued:.3f} 秒）"
+                  if converged is not None else "  未收敛")
+            print(f"  所有节点阻止记录已落盘:   {persisted:.3f} 秒" if persisted is not None else "  未全部落盘")
+            for node, prevention in zip(nodes, preventions):
+                stats = node.get_stats()
+                print(f"  节点 {node.bind_port}: 阻止 {len(prevention.blocked_ips):,} 个，"
+                      f"远端更新 {stats.get('remote_updates', 0):,}，文件 {len(persisted_ips(prevention)):,} 个")
+        finally:
+            for node in nodes:
+                node.stop_sync()
+            for prevention in preventions:
+                prevention._persist_task.cancel()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
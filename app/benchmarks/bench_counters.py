@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""共享计数基准测试：多线程更新的吞吐、丢失的更新和快照一致性
+
+多个线程模拟抓包处理，每个包更新总数和协议类型两个计数，同时一个读线程不断读取快照
+（模拟 /api/status 与推送），检查"总数 == 各类型之和"。对比：
+不加锁的字典（原实现）、字典 + 锁、按线程分片的 ShardedCounters
+（inc 逐个更新、add 原子更新、apply 以 prepare() 预先转换的增量原子更新，detector 使用的方式）。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_counters --threads 8 --packets 200000
+"""
+
+import sys
+import time
+import argparse
+import threading
+
+from modules.metrics.counters import ShardedCounters
+
+TYPES = ('tcp', 'udp', 'icmp', 'http', 'other')
+
+
+class UnlockedDict:
+    def __init__(self):
+        self.stats = dict.fromkeys(('total',) + TYPES, 0)
+
+    def update(self, packet_type):
+        self.stats['total'] += 1
+        self.stats[packet_type] += 1
+
+    def snapshot(self):
+        return dict(self.stats)
+
+
+class LockedDict(UnlockedDict):
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+    def update(self, packet_type):
+        with self.lock:
+            self.stats['total'] += 1
+            self.stats[packet_type] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+class ShardedInc:
+    def __init__(self):
+        self.stats = ShardedCounters(('total',) + TYPES)
+
+    def update(self, packet_type):
+        self.stats.inc('total')
+        self.stats.inc(packet_type)
+
+    def snapshot(self):
+        return self.stats.snapshot()
+
+
+class ShardedAdd(ShardedInc):
+    def update(self, packet_type):
+        self.stats.add({'total': 1, packet_type: 1})
+
+
+class ShardedApply(ShardedInc):
+    def __init__(self):
+        super().__init__()
+        self.deltas = {t: self.stats.prepare({'total': 1, t: 1}) for t in TYPES}
+
+    def update(self, packet_type):
+        self.stats.apply(self.deltas[packet_type])
+
+
+def run(counters, threads, packets):
+    """返回 (每秒更新数, 丢失的更新, 快照次数, 不一致的快照)"""
+    start_barrier = threading.Barrier(threads + 1)
+    done = threading.Event()
+
+    def writer(seed):
+        update = counters.update
+        start_barrier.wait()
+        for i in range(packets):
+            update(TYPES[(i + seed) % len(TYPES)])
+
+    snapshots = [0, 0]
+
+    def reader():
+        while not done.is_set():
+            snapshot = counters.snapshot()
+            snapshots[0] += 1
+            if snapshot['total'] != sum(snapshot[t] for t in TYPES):
+                snapshots[1] += 1
+            time.sleep(0.001)
+
+    workers = [threading.Thread(target=writer, args=(s,)) for s in range(threads)]
+    for worker in workers:
+        worker.start()
+    reader_thread = threading.Thread(target=reader)
+    reader_thread.start()
+    start_barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    reader_thread.join()
+
+    final = counters.snapshot()
+    lost = threads * packets * 2 - final['total'] - sum(final[t] for t in TYPES)
+    return threads * packets / elapsed, lost, snapshots[0], snapshots[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='共享计数基准测试')
+    parser.add_argument('--threads', type=int, default=8, help='更新计数的线程数')
+    parser.add_argument('--packets', type=int, default=200000, help='每个线程处理的数据包数')
+    parser.add_argument('--switch-interval', type=float, default=0.0001,
+                        help='线程切换间隔（秒），调小后更容易暴露不加锁时的竞争')
+    args = parser.parse_args()
+    sys.setswitchinterval(args.switch_interval)
+
+    print(f"{args.threads} 个线程，每线程 {args.packets} 个包（每包更新2个计数）")
+    for label, counters in (('字典（不加锁）', UnlockedDict()), ('字典 + 锁', LockedDict()),
+                            ('ShardedCounters.inc', ShardedInc()), ('ShardedCounters.add', ShardedAdd()),
+                            ('ShardedCounters.apply', ShardedApply())):
+        rate, lost, snapshots, inconsistent = run(counters, args.threads, args.packets)
+        print(f"  {label:<20} {rate:>12,.0f} 包/秒, 丢失更新 {lost:>7}, "
+              f"快照 {snapshots:>5} 次, 不一致 {inconsistent:>4} 次")
+
+
+if __name__ == "__main__":
+    main()
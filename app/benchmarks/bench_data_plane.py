@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""数据面进程基准测试：API负载下的抓包处理吞吐
+
+抓包处理循环分别作为Web进程中的线程（原部署方式）和独立的数据面进程运行，
+先单独运行，再同时运行若干模拟API请求的线程（生成全部告警的调试格式JSON），
+比较两种部署下处理吞吐的下降幅度。处理计数通过共享内存计数发布，两种方式读法相同。
+
+安装了Scapy时逐包调用 TrafficDetector.process_packet；否则使用预先解析好的数据包信息，
+执行与 process_packet 相同的计数、追踪和缓存步骤（不含Scapy解析）。
+注意：独立进程只有在多核机器上才能与Web进程并行，单核机器上两者仍分时共享CPU，
+结果只能说明GIL争用减少了多少，不能证明隔离成立。目前只在单核机器上测过
+（进程内下降81%，独立进程下降55%），多核机器上API负载下吞吐基本不降的结果尚待测量。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_data_plane --seconds 5 --api-threads 4
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+from modules.data_plane.shm_channels import SharedCounters
+from benchmarks.bench_api_json import build_index
+
+FIELDS = ('packets',)
+
+
+def build_packets(count, seed=42):
+    """生成数据包（安装了Scapy时为Scapy数据包，否则为解析后的数据包信息）"""
+    rng = random.Random(seed)
+    try:
+        from scapy.all import IP, TCP, UDP, Raw
+    except ImportError:
+        IP = None
+    packets = []
+    for _ in range(count):
+        src = f"192.168.{rng.randint(0, 15)}.{rng.randint(2, 254)}"
+        dst = f"10.0.0.{rng.randint(2, 254)}"
+        size = rng.randint(0, 1400)
+        if IP is not None:
+            layer = TCP(sport=rng.randint(1024, 65535), dport=rng.choice([80, 443, 22])) if rng.random() < 0.8 \
+                else UDP(sport=rng.randint(1024, 65535), dport=53)
+            packets.append(IP(src=src, dst=dst) / layer / Raw(b'x' * size))
+        else:
+            packets.append({'src_ip': src, 'dst_ip': dst, 'src_port': rng.randint(1024, 65535),
+                            'dst_port': rng.choice([80, 443, 22, 53]), 'protocol': rng.choice(['TCP', 'UDP']),
+                            'size': size, 'type': rng.choice(['tcp', 'tcp', 'tcp', 'udp', 'http'])})
+    return packets
+
+
+def capture_loop(counters_name, stop_event, packet_count):
+    """抓包处理循环，每处理1000个包发布一次计数"""
+    from modules.traffic_detection.detector import TrafficDetector, PACKET_BYTES, PACKET_PROCESS_SECONDS, _PACKET_COUNTERS
+    from modules.metrics.tracing import TRACER
+
+    counters = SharedCounters(FIELDS, name=counters_name)
+    detector = TrafficDetector()
+    detector._save_task.cancel()
+    packets = build_packets(packet_count)
+    scapy_packets = not isinstance(packets[0], dict)
+
+    def process_info(info):
+        # 与 TrafficDetector.process_packet 相同的步骤，数据包信息已解析
+        start = time.perf_counter()
+        owner = TRACER.begin()
+        TRACER.mark('capture')
+        TRACER.mark('parse')
+        detector.packet_stats.apply(detector._packet_deltas[info['type']])
+        _PACKET_COUNTERS[info['type']].inc()
+        PACKET_BYTES.inc(info['size'])
+        detector.traffic_data.append(dict(info, timestamp=time.time()))
+        if len(detector.traffic_data) >= 1000:
+            detector.traffic_data = []
+        TRACER.end(owner)
+        PACKET_PROCESS_SECONDS.observe(time.perf_counter() - start)
+
+    process = detector.process_packet if scapy_packets else process_info
+    processed = 0
+    while not stop_event.is_set():
+        for packet in packets:
+            process(packet)
+        processed += len(packets)
+        if scapy_packets:
+            # 不写盘，只测处理
+            detector.traffic_data = []
+        counters.publish({'packets': processed})
+    counters.close()
+
+
+def api_load(stop_event, alerts, counts):
+    """模拟仪表盘请求：每次生成全部告警的调试格式JSON"""
+    while not stop_event.is_set():
+        json.dumps({'logs': alerts}, indent=2, sort_keys=True)
+        counts.append(1)
+
+
+def measure(mode, seconds, api_threads, alerts, packet_count):
+    counters = SharedCounters(FIELDS, create=True)
+    if mode == 'process':
+        stop_capture = multiprocessing.get_context('fork').Event()
+        worker = multiprocessing.get_context('fork').Process(
+            target=capture_loop, args=(counters.name, stop_capture, packet_count), daemon=True)
+    else:
+        stop_capture = threading.Event()
+        worker = threading.Thread(target=capture_loop, args=(counters.name, stop_capture, packet_count), daemon=True)
+    worker.start()
+    time.sleep(1)  # 预热
+
+    results = []
+    for with_api in (False, True):
+        stop_api = threading.Event()
+        requests = []
+        threads = [threading.Thread(target=api_load, args=(stop_api, alerts, requests), daemon=True)
+                   for _ in range(api_threads if with_api else 0)]
+        for thread in threads:
+            thread.start()
+        begin = counters.snapshot()['packets']
+        start = time.perf_counter()
+        time.sleep(seconds)
+        processed = counters.snapshot()['packets'] - begin
+        elapsed = time.perf_counter() - start
+        stop_api.set()
+        for thread in threads:
+            thread.join()
+        results.append((processed / elapsed, len(requests) / elapsed))
+
+    stop_capture.set()
+    worker.join(10)
+    counters.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据面进程基准测试')
+    parser.add_argument('--seconds', type=float, default=5, help='每个阶段的测量时长（秒）')
+    parser.add_argument('--api-threads', type=int, default=4, help='模拟API请求的线程数')
+    parser.add_argument('--alerts', type=int, default=10000, help='每次API请求序列化的告警数量')
+    parser.add_argument('--packets', type=int, default=1000, help='循环处理的数据包数量')
+    args = parser.parse_args()
+
+    alerts = build_index(args.alerts).recent(args.alerts)
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f"可用CPU核数: {cpus}, API线程 {args.api_threads} 个, 每请求序列化 {args.alerts} 条告警")
+    if cpus < 2:
+        print("  警告: 只有1个可用核，数据面进程与Web进程分时共享CPU，本次结果不能验证隔离")
+    # 模块在当前目录下创建 data/，放到临时目录中运行
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for mode, label in (('thread', 'Web进程内的线程'), ('process', '独立数据面进程')):
+                (idle_pps, _), (loaded_pps, api_rps) = measure(mode, args.seconds, args.api_threads,
+                                                               alerts, args.packets)
+                drop = (1 - loaded_pps / idle_pps) * 100 if idle_pps else 0
+                print(f"  {label:<14} 空闲 {idle_pps:>10,.0f} 包/秒, API负载下 {loaded_pps:>10,.0f} 包/秒 "
+                      f"(下降 {drop:5.1f}%), API {api_rps:6.1f} 请求/秒")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""事件负载基准测试：入侵防御、告警与网络监控在高速率负载下的吞吐和内存增长
+
+使用固定种子的 LoadGenerator（Zipf分布的来源IP、成簇的攻击、按比例的严重性）依次测量：
+    生成器本身的事件生成速度
+    block_ip / unblock_ip、process_threat、process_alert 的吞吐
+    统计接口（告警统计、网络统计、TOP IP、阻止列表）和查询接口（按严重性/IP查询告警与威胁）的吞吐
+    长时间运行：按目标速率驱动三个模块的模拟任务，定期采样RSS和各数据结构大小，检查内存是否趋于稳定
+相同的种子和参数每次生成相同的事件序列。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_load --events 50000 --duration 60 --rate 20000 --seed 7
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+
+from modules.simulation.load_generator import LoadGenerator
+
+
+def current_rss_mb():
+    """当前RSS（Linux读取/proc，其他系统退化为峰值RSS）"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def rate(count, func):
+    """执行func，返回每秒处理数"""
+    start = time.perf_counter()
+    func()
+    return count / max(time.perf_counter() - start, 1e-9)
+
+
+def report(label, value, unit='次/秒'):
+    print(f"  {label:<34} {value:>12,.0f} {unit}")
+
+
+def bench_generator(seed, count):
+    print("生成器:")
+    for label, method in (('events()', 'events'), ('threats()', 'threats'), ('alerts()', 'alerts')):
+        generator = LoadGenerator(rate=1000000, seed=seed)
+        report(label, rate(count, lambda: sum(1 for _ in getattr(generator, method)(count))), '事件/秒')
+
+
+def bench_operations(seed, count, block_count):
+    from modules.intrusion_prevention.prevention import IntrusionPrevention
+    from modules.alert_response.alerter import AlertSystem
+    from modules.network_monitoring.monitor import NetworkMonitor
+
+    prevention = IntrusionPrevention()
+    alert_system = AlertSystem()
+    monitor = NetworkMonitor()
+    monitor.set_alert_callback(alert_system.process_alert)
+
+    print("入侵防御:")
+    ips = LoadGenerator(seed=seed).ip_pool[:block_count]
+    quarter = len(ips) // 4
+    report(f'block_ip（前{quarter}个）', rate(quarter, lambda: [prevention.block_ip(ip) for ip in ips[:quarter]]))
+    rest = ips[quarter:-quarter]
+    rate(len(rest), lambda: [prevention.block_ip(ip) for ip in rest])
+    report(f'block_ip（后{quarter}个）', rate(quarter, lambda: [prevention.block_ip(ip) for ip in ips[-quarter:]]))
+    report('unblock_ip', rate(len(ips), lambda: [prevention.unblock_ip(ip) for ip in ips]))
+
+    threats = list(LoadGenerator(seed=seed).threats(count))
+    report('process_threat（auto模式）', rate(count, lambda: [prevention.process_threat(t) for t in threats]))
+    print(f"  威胁 {prevention.threat_seq} 条，阻止IP {len(prevention.blocked_ips)} 个")
+
+    print("告警响应:")
+    alerts = list(LoadGenerator(seed=seed + 1).alerts(count))
+    report('process_alert', rate(count, lambda: [alert_system.process_alert(a) for a in alerts]))
+
+    print("网络监控:")
+    generator = LoadGenerator(rate=count, seed=seed + 2, attack_ratio=0.05, interval=1)
+    monitor.set_load_generator(generator)
+    report('流量事件（含告警回调）', rate(count, monitor._simulate_network_data), '事件/秒')
+
+    hot_ip = max(alerts, key=lambda a: a['severity'] == '高')['src_ip']
+    calls = 200
+    print("统计接口:")
+    report('get_alert_stats', rate(calls, lambda: [alert_system.get_alert_stats() for _ in range(calls)]))
+    report('get_network_stats', rate(calls, lambda: [monitor.get_network_stats() for _ in range(calls)]))
+    report('get_ip_data(20)', rate(calls, lambda: [monitor.get_ip_data(20) for _ in range(calls)]))
+    report('get_blocked_ips', rate(calls, lambda: [prevention.get_blocked_ips() for _ in range(calls)]))
+    print("查询接口:")
+    report('query_alerts(severity=高)', rate(calls, lambda: [alert_system.query_alerts(severity='高')
+                                                            for _ in range(calls)]))
+    report('query_alerts(ip=热点IP)', rate(calls, lambda: [alert_system.query_alerts(ip=hot_ip)
+                                                         for _ in range(calls)]))
+    report('query_threats(severity=高)', rate(calls, lambda: [prevention.query_threats(severity='高')
+                                                             for _ in range(calls)]))
+
+
+def bench_long_run(seed, duration, target_rate, sample_interval):
+    """按目标速率驱动三个模块的模拟任务，定期采样内存"""
+    from modules.intrusion_prevention.prevention import IntrusionPrevention
+    from modules.alert_response.alerter import AlertSystem
+    from modules.network_monitoring.monitor import NetworkMonitor
+
+    prevention = IntrusionPrevention()
+    alert_system = AlertSystem()
+    monitor = NetworkMonitor()
+    monitor.set_alert_callback(alert_system.process_alert)
+    generators = [LoadGenerator(rate=target_rate, seed=seed + i, interval=0.1) for i in range(3)]
+    prevention.set_load_generator(generators[0])
+    alert_system.set_load_generator(generators[1])
+    monitor.set_load_generator(generators[2])
+    tasks = (prevention._simulate_threat_detection, alert_system._simulate_alerts, monitor._simulate_network_data)
+
+    print(f"长时间运行: {duration:.0f} 秒，每个模块目标 {target_rate:,.0f} 事件/秒")
+    print(f"  {'时间(秒)':>8} {'事件/秒':>10} {'丢弃':>9} {'RSS(MB)':>9} {'威胁':>6} {'告警':>6} "
+          f"{'事件':>6} {'每IP表':>7} {'阻止IP':>7}")
+    start = time.monotonic()
+    next_sample = start + sample_interval
+    last_events = 0
+    last_time = start
+    samples = [current_rss_mb()]
+    while time.monotonic() - start < duration:
+        for task in tasks:
+            task()
+        alert_system._maintain()
+        now = time.monotonic()
+        if now >= next_sample:
+            events = sum(g.stats['events'] for g in generators)
+            rss = current_rss_mb()
+            samples.append(rss)
+            print(f"  {now - start:>8.0f} {(events - last_events) / (now - last_time):>10,.0f} "
+                  f"{sum(g.stats['shed'] for g in generators):>9,} {rss:>9.1f} {len(prevention.threats):>6} "
+                  f"{len(alert_system.alerts):>6} {alert_system.correlator.get_stats()['open_incidents']:>6} "
+                  f"{len(monitor.ip_data):>7} {len(prevention.blocked_ips):>7}")
+            last_events, last_time = events, now
+            next_sample += sample_interval
+        time.sleep(0.01)
+
+    total = sum(g.stats['events'] for g in generators)
+    elapsed = time.monotonic() - start
+    half = len(samples) // 2
+    print(f"  共处理 {total:,} 个事件（{total / elapsed:,.0f} 事件/秒），"
+          f"目标速率下丢弃 {sum(g.stats['shed'] for g in generators):,} 个")
+    print(f"  RSS {samples[0]:.1f} MB -> {samples[-1]:.1f} MB，"
+          f"前半程增长 {samples[half] - samples[0]:.1f} MB，后半程增长 {samples[-1] - samples[half]:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='事件负载基准测试')
+    parser.add_argument('--seed', type=int, default=7, help='随机种子')
+    parser.add_argument('--events', type=int, default=50000, help='吞吐测试的事件数量')
+    parser.add_argument('--blocks', type=int, default=2000, help='block_ip 测试的IP数量')
+    parser.add_argument('--duration', type=float, default=60, help='长时间运行的时长（秒），0表示跳过')
+    parser.add_argument('--rate', type=float, default=20000, help='长时间运行时每个模块的目标事件速率')
+    parser.add_argument('--sample-interval', type=float, default=5, help='内存采样间隔（秒）')
+    args = parser.parse_args()
+
+    # 模块在当前目录下创建 data/，放到临时目录中运行
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            bench_generator(args.seed, args.events)
+            bench_operations(args.seed, args.events, args.blocks)
+            if args.duration > 0:
+                bench_long_run(args.seed, args.duration, args.rate, args.sample_interval)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
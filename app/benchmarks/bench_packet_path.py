@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""数据包处理路径基准测试：吞吐量、单包延迟、峰值内存与基线对比
+
+读取pcap（未指定时用 benchmarks.pcap_gen 按种子生成），逐包依次经过：
+    dissect  Scapy解析以太网帧（抓包线程中由Scapy完成的部分）
+    detect   TrafficDetector.process_packet：计数、追踪、缓存与批量写盘
+    monitor  每IP流量统计表 IPStatsTable
+    alert    攻击流量（按pcap标签）生成告警，经 AlertSystem.process_alert 去重、关联
+统计总吞吐、各阶段吞吐、单包端到端延迟分位数和进程峰值RSS。
+未安装Scapy时没有dissect阶段，detect阶段用struct解析帧代替 _extract_packet_info，其余代码路径不变。
+
+--save-baseline 保存结果作为基线；--baseline 与基线比较，吞吐下降或延迟、内存上升超过阈值时
+标记为回归并以退出码1结束（可用于CI）。基线与当前结果的数据包数、场景或解析方式不同时给出提示。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_packet_path --packets 100000 --seed 42 --save-baseline
+    python -m benchmarks.bench_packet_path --packets 100000 --seed 42 --baseline
+"""
+
+import os
+import sys
+import json
+import time
+import array
+import struct
+import socket
+import argparse
+import platform
+import resource
+import tempfile
+from datetime import datetime
+
+from benchmarks.pcap_gen import TrafficGenerator, DEFAULT_MIX, write_pcap, read_pcap, read_labels, parse_mix
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'packet_path.json')
+
+ALERT_TYPES = {
+    'scan': ('端口扫描', '中'),
+    'flood': ('DDoS攻击', '高'),
+    'brute_force': ('暴力破解', '高'),
+    'http_attack': ('Web应用攻击', '高'),
+}
+
+# (指标, 越大越好)
+METRICS = [
+    ('pps', True),
+    ('stage_pps.dissect', True),
+    ('stage_pps.detect', True),
+    ('stage_pps.monitor', True),
+    ('stage_pps.alert', True),
+    ('latency_us.p50', False),
+    ('latency_us.p99', False),
+    ('peak_rss_mb', False),
+]
+
+
+def load_scapy():
+    try:
+        from scapy.layers.l2 import Ether
+        return Ether
+    except ImportError:
+        return None
+
+
+def struct_extractor():
+    """不依赖Scapy的帧解析，返回与 TrafficDetector._extract_packet_info 相同的数据包信息"""
+    def extract(frame):
+        if len(frame) < 34 or frame[12:14] != b'\x08\x00':
+            return None
+        ihl = (frame[14] & 0x0f) * 4
+        proto = frame[23]
+        info = {
+            'timestamp': datetime.now().isoformat(),
+            'src_ip': socket.inet_ntoa(frame[26:30]),
+            'dst_ip': socket.inet_ntoa(frame[30:34]),
+            'src_port': 0,
+            'dst_port': 0,
+            'protocol': 'unknown',
+            'size': len(frame) - 14,
+            'type': 'other'
+        }
+        if proto in (6, 17):
+            info['src_port'], info['dst_port'] = struct.unpack_from('!HH', frame, 14 + ihl)
+        if proto == 6:
+            info['type'], info['protocol'] = 'tcp', 'TCP'
+            if info['dst_port'] in (80, 443):
+                info['type'], info['protocol'] = 'http', 'HTTP/HTTPS'
+        elif proto == 17:
+            info['type'], info['protocol'] = 'udp', 'UDP'
+        elif proto == 1:
+            info['type'], info['protocol'] = 'icmp', 'ICMP'
+        return info
+    return extract
+
+
+def peak_rss_mb():
+    # Linux上ru_maxrss单位为KB，macOS上为字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run_pipeline(records, labels, Ether):
+    """逐包执行处理路径，返回结果"""
+    from modules.traffic_detection.detector import TrafficDetector
+    from modules.network_monitoring.ip_table import IPStatsTable
+    from modules.alert_response.alerter import AlertSystem
+
+    detector = TrafficDetector()
+    extract = detector._extract_packet_info if Ether else struct_extractor()
+    last = [None]
+
+    def capture_info(packet):
+        last[0] = info = extract(packet)
+        return info
+
+    detector._extract_packet_info = capture_info
+    ip_table = IPStatsTable()
+    alert_system = AlertSystem()
+
+    stage_seconds = dict.fromkeys(('dissect', 'detect', 'monitor', 'alert'), 0.0)
+    stage_packets = dict.fromkeys(stage_seconds, 0)
+    latencies = array.array('d')
+    perf_counter = time.perf_counter
+    rss_before = peak_rss_mb()
+    start = perf_counter()
+
+    for i, (timestamp, frame) in enumerate(records):
+        t0 = perf_counter()
+        if Ether:
+            packet = Ether(frame)
+            packet.time = timestamp
+            t1 = perf_counter()
+            stage_seconds['dissect'] += t1 - t0
+            stage_packets['dissect'] += 1
+        else:
+            packet = frame
+            t1 = t0
+
+        last[0] = None
+        detector.process_packet(packet)
+        t2 = perf_counter()
+        stage_seconds['detect'] += t2 - t1
+        stage_packets['detect'] += 1
+
+        info = last[0]
+        if info:
+            ip_table.update(info['src_ip'], out_traffic=info['size'], now=timestamp)
+            ip_table.update(info['dst_ip'], in_traffic=info['size'], now=timestamp)
+        t3 = perf_counter()
+        stage_seconds['monitor'] += t3 - t2
+        stage_packets['monitor'] += 1
+
+        label = labels[i] if labels else 'web'
+        if info and label in ALERT_TYPES:
+            alert_type, severity = ALERT_TYPES[label]
+            alert_system.process_alert({
+                'alert_id': f"ALERT-{i}",
+                'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+                'alert_type': alert_type,
+                'severity': severity,
+                'src_ip': info['src_ip'],
+                'dst_ip': info['dst_ip'],
+                'port': info['dst_port'],
+                'protocol': info['protocol'],
+                'details': f"检测到{alert_type}",
+                'action_taken': '已记录'
+            })
+            t4 = perf_counter()
+            stage_seconds['alert'] += t4 - t3
+            stage_packets['alert'] += 1
+        else:
+            t4 = t3
+        latencies.append(t4 - t0)
+
+    elapsed = perf_counter() - start
+    detector._save_task.cancel()
+    latencies = sorted(latencies)
+    return {
+        'packets': len(latencies),
+        'pps': len(latencies) / elapsed,
+        'stage_pps': {name: stage_packets[name] / seconds
+                      for name, seconds in stage_seconds.items() if stage_packets[name] and seconds},
+        'stage_packets': stage_packets,
+        'latency_us': {
+            'p50': percentile(latencies, 50) * 1e6,
+            'p90': percentile(latencies, 90) * 1e6,
+            'p99': percentile(latencies, 99) * 1e6,
+            'max': latencies[-1] * 1e6
+        },
+        'peak_rss_mb': peak_rss_mb(),
+        'rss_growth_mb': peak_rss_mb() - rss_before,
+        'alerts': len(alert_system.alerts),
+        'incidents': alert_system.get_correlation_stats().get('incidents_opened', 0)
+    }
+
+
+def _get(result, path):
+    value = result
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(result, baseline, threshold):
+    """与基线比较，返回 [(指标, 基线值, 当前值, 变化比例, 是否回归)]"""
+    rows = []
+    for name, higher_is_better in METRICS:
+        base, current = _get(baseline, name), _get(result, name)
+        if not base or current is None:
+            continue
+        change = current / base - 1
+        regression = change < -threshold if higher_is_better else change > threshold
+        rows.append((name, base, current, change, regression))
+    return rows
+
+
+def load_records(args):
+    """读取或生成pcap，返回 ([(时间戳, 帧)], 标签, 数据说明)"""
+    if args.pcap:
+        return list(read_pcap(args.pcap)), read_labels(args.pcap), {'pcap': os.path.basename(args.pcap)}
+    mix = parse_mix(args.mix)
+    path = os.path.join(tempfile.gettempdir(), f'ids_bench_{args.seed}_{args.packets}_{os.getpid()}.pcap')
+    try:
+        write_pcap(path, TrafficGenerator(args.seed).generate(args.packets, mix))
+        return list(read_pcap(path)), read_labels(path), {'seed': args.seed, 'mix': mix}
+    finally:
+        for name in (path, path + '.labels'):
+            if os.path.exists(name):
+                os.remove(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据包处理路径基准测试')
+    parser.add_argument('--pcap', help='使用已有的pcap文件（同名 .labels 文件存在时按标签生成告警）')
+    parser.add_argument('--packets', type=int, default=100000, help='生成的数据包数量')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                        help='场景比例，如 web=70,scan=5,flood=15,brute_force=5,http_attack=5')
+    parser.add_argument('--repeat', type=int, default=1, help='重复次数，取吞吐最高的一次')
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE, help='与基线文件比较')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help='将结果保存为基线文件')
+    parser.add_argument('--threshold', type=float, default=0.1, help='判定回归的变化比例')
+    parser.add_argument('--json', action='store_true', help='以JSON输出结果')
+    args = parser.parse_args()
+
+    Ether = load_scapy()
+    records, labels, source = load_records(args)
+    if labels and len(labels) != len(records):
+        print(f"标签数量({len(labels)})与数据包数量({len(records)})不一致，忽略标签")
+        labels = None
+
+    # 模块在当前目录下创建 data/，放到临时目录中运行
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            runs = [run_pipeline(records, labels, Ether) for _ in range(max(1, args.repeat))]
+        finally:
+            os.chdir(cwd)
+    result = max(runs, key=lambda run: run['pps'])
+    result.update(source, parser='scapy' if Ether else 'struct',
+                  python=platform.python_version(), created=datetime.now().isoformat(timespec='seconds'))
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"数据包 {result['packets']}（解析方式: {result['parser']}），告警 {result['alerts']} 条，"
+              f"事件 {result['incidents']} 个")
+        print(f"  总吞吐 {result['pps']:>12,.0f} 包/秒")
+        for name, pps in result['stage_pps'].items():
+            print(f"  {name:<8} {pps:>12,.0f} 包/秒（{result['stage_packets'][name]} 包）")
+        latency = result['latency_us']
+        print(f"  单包延迟 p50 {latency['p50']:.1f} us, p90 {latency['p90']:.1f} us, "
+              f"p99 {latency['p99']:.1f} us, 最大 {latency['max']:.1f} us")
+        print(f"  峰值RSS {result['peak_rss_mb']:.1f} MB（处理期间增长 {result['rss_growth_mb']:.1f} MB）")
+
+    regressions = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ('packets', 'seed', 'mix', 'pcap', 'parser'):
+            if baseline.get(key) != result.get(key):
+                print(f"提示: 基线的 {key} 为 {baseline.get(key)}，当前为 {result.get(key)}，结果可能不可比")
+        print(f"与基线比较（{args.baseline}，{baseline.get('created')}，阈值 {args.threshold:.0%}）:")
+        for name, base, current, change, regression in compare(result, baseline, args.threshold):
+            regressions += regression
+            print(f"  {name:<20} {base:>14,.1f} -> {current:>14,.1f} ({change:+7.1%}){'  <-- 回归' if regression else ''}")
+        print(f"发现 {regressions} 项回归" if regressions else "未发现回归")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存到 {args.save_baseline}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""中心调度器基准测试：唤醒延迟、线程数量与停止耗时
+
+对比原来的 while+sleep 轮询线程与调度器唤醒任务从"数据到达"到"开始处理"的延迟，
+并在临时目录中启动网络监控、入侵防御、告警系统和推送层，统计运行时线程数与全部停止的耗时。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_scheduler --events 200 --tasks 100
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import threading
+
+from modules.scheduling.scheduler import Scheduler
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def polling_latency(events, poll_interval):
+    """原实现：工作线程每 poll_interval 秒检查一次新数据"""
+    pending = []
+    latencies = []
+    done = threading.Event()
+
+    def worker():
+        while len(latencies) < events:
+            while pending:
+                latencies.append(time.monotonic() - pending.pop())
+            time.sleep(poll_interval)
+        done.set()
+
+    threading.Thread(target=worker, daemon=True).start()
+    for _ in range(events):
+        pending.append(time.monotonic())
+        time.sleep(poll_interval * 0.37)
+    done.wait()
+    return latencies
+
+
+def scheduler_latency(events, tasks):
+    """调度器：新数据到达时唤醒任务，同时有 tasks 个周期任务在运行"""
+    scheduler = Scheduler('bench-scheduler')
+    for i in range(tasks):
+        scheduler.schedule(lambda: None, interval=0.01 + i * 0.001, name=f'周期任务{i}')
+    pending = []
+    latencies = []
+
+    def on_data():
+        while pending:
+            latencies.append(time.monotonic() - pending.pop())
+
+    task = scheduler.schedule(on_data, name='数据处理')
+    for _ in range(events):
+        pending.append(time.monotonic())
+        task.wake()
+        time.sleep(0.002)
+    time.sleep(0.05)
+    scheduler.stop()
+    return latencies
+
+
+def module_lifecycle(seconds):
+    """启动四个模块，返回 (运行时线程数, 停止耗时毫秒)"""
+    from modules.network_monitoring.monitor import NetworkMonitor
+    from modules.intrusion_prevention.prevention import IntrusionPrevention
+    from modules.alert_response.alerter import AlertSystem
+    from modules.network_monitoring.broadcaster import StreamBroadcaster
+
+    broadcaster = StreamBroadcaster()
+    modules = [NetworkMonitor(socketio=broadcaster), IntrusionPrevention(), AlertSystem(), broadcaster]
+    baseline = threading.active_count()
+    modules[0].start_monitoring()
+    modules[1].start_prevention()
+    modules[2].start_alerting()
+    modules[3].start_broadcast()
+    time.sleep(seconds)
+    threads = threading.active_count() - baseline
+
+    start = time.perf_counter()
+    modules[0].stop_monitoring()
+    modules[1].stop_prevention()
+    modules[2].stop_alerting()
+    modules[3].stop_broadcast()
+    return threads, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='中心调度器基准测试')
+    parser.add_argument('--events', type=int, default=200, help='数据到达次数')
+    parser.add_argument('--tasks', type=int, default=100, help='同时运行的周期任务数量')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='原实现的轮询间隔（秒）')
+    parser.add_argument('--seconds', type=float, default=3, help='模块运行时长（秒）')
+    args = parser.parse_args()
+
+    print("数据到达到开始处理的延迟（轮询最多测20次）:")
+    polling = polling_latency(min(args.events, 20), args.poll_interval)
+    print(f"  轮询 sleep({args.poll_interval:g})       p50 {percentile(polling, 50) * 1000:9.3f} ms, "
+          f"p99 {percentile(polling, 99) * 1000:9.3f} ms")
+    woken = scheduler_latency(args.events, args.tasks)
+    print(f"  调度器唤醒（{args.tasks}个周期任务） p50 {percentile(woken, 50) * 1000:9.3f} ms, "
+          f"p99 {percentile(woken, 99) * 1000:9.3f} ms")
+
+    # 模块在当前目录下创建 data/，放到临时目录中运行
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            threads, stop_ms = module_lifecycle(args.seconds)
+        finally:
+            os.chdir(cwd)
+    print(f"四个模块运行时新增线程 {threads} 个（调度器、指标日志写入、邮件发送），全部停止耗时 {stop_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Web服务并发基准测试：并发API客户端与Socket.IO推送客户端
+
+启动服务（开发模式的线程服务器，或 serve.py 的协程多进程模式），启动系统后
+同时运行若干轮询 /api/ 的HTTP客户端和订阅推送的Socket.IO客户端，统计API吞吐、
+延迟分位数以及推送帧的接收情况。需要安装 python-socketio 客户端与 websocket-client。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_server --mode threading --api-clients 50 --ws-clients 200
+    python -m benchmarks.bench_server --mode eventlet --workers 4 --api-clients 50 --ws-clients 200
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+
+import socketio
+
+API_PATHS = ['/api/status', '/api/logs?limit=100', '/api/threats', '/api/traffic?timeframe=hour', '/api/alerts/stats']
+
+
+def start_server(args):
+    env = dict(os.environ)
+    if args.mode == 'threading':
+        env['IDS_PORT'] = str(args.port)
+        command = [sys.executable, 'app.py']
+    else:
+        command = [sys.executable, 'serve.py', '--workers', str(args.workers),
+                   '--port', str(args.port), '--async-mode', args.mode]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    ports = [args.port + i for i in range(args.workers if args.mode != 'threading' else 1)]
+    deadline = time.time() + 60
+    for port in ports:
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.time() > deadline or process.poll() is not None:
+                    process.kill()
+                    raise RuntimeError(f"服务未能在端口 {port} 启动")
+                time.sleep(0.2)
+    return process, ports
+
+
+def api_client(port, stop_event, latencies, errors):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    i = 0
+    while not stop_event.is_set():
+        path = API_PATHS[i % len(API_PATHS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+            latencies.append(time.perf_counter() - start)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+
+
+def ws_client(port, stop_event, counters):
+    client = socketio.Client(reconnection=False)
+
+    @client.on('frame')
+    def on_frame(frame):
+        counters['frames'] += 1
+        return True  # 确认帧
+
+    try:
+        client.connect(f'http://127.0.0.1:{port}', transports=['websocket'])
+        client.emit('subscribe', {'channels': ['network_stats', 'traffic_update', 'new_alert']})
+        counters['connected'] += 1
+        stop_event.wait()
+    except Exception:
+        counters['failed'] += 1
+    finally:
+        client.disconnect()
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Web服务并发基准测试')
+    parser.add_argument('--mode', choices=['threading', 'eventlet', 'gevent'], default='eventlet')
+    parser.add_argument('--workers', type=int, default=1, help='协程模式下的Web工作进程数量')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--api-clients', type=int, default=50, help='并发API客户端数量')
+    parser.add_argument('--ws-clients', type=int, default=200, help='Socket.IO客户端数量')
+    parser.add_argument('--seconds', type=int, default=30, help='测试时长（秒）')
+    args = parser.parse_args()
+
+    process, ports = start_server(args)
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', ports[0], timeout=10)
+        conn.request('POST', '/api/start')
+        conn.getresponse().read()
+
+        stop_event = threading.Event()
+        latencies, errors = [], []
+        counters = {'connected': 0, 'failed': 0, 'frames': 0}
+        threads = []
+        # API请求发往主工作进程，推送连接分散到各工作进程
+        for i in range(args.api_clients):
+            threads.append(threading.Thread(target=api_client, args=(ports[0], stop_event, latencies, errors)))
+        for i in range(args.ws_clients):
+            threads.append(threading.Thread(target=ws_client, args=(ports[i % len(ports)], stop_event, counters)))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        time.sleep(args.seconds)
+        stop_event.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        print(f"模式: {args.mode}, 工作进程 {len(ports)} 个, {args.seconds} 秒")
+        print(f"API: {args.api_clients} 个客户端, {len(latencies) / args.seconds:,.0f} 请求/秒, "
+              f"p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+              f"错误 {len(errors)} 次")
+        print(f"Socket.IO: 连接成功 {counters['connected']}/{args.ws_clients}, 失败 {counters['failed']}, "
+              f"共收到 {counters['frames']:,} 帧（每客户端 {counters['frames'] / max(counters['connected'], 1) / args.seconds:.1f} 帧/秒）")
+    finally:
+        process.terminate()
+        process.wait(timeout=15)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""启动耗时基准测试：导入耗时分析与冷启动到可服务HTTP端口的时间
+
+--profile 以 python -X importtime 导入 app 模块，按顶层包汇总导入耗时并列出最慢的直接导入；
+默认模式多次启动 app.py，测量从启动进程到 /api/status 返回200的时间，与目标值比较。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_startup --profile
+    python -m benchmarks.bench_startup --runs 5 --target-ms 300
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import subprocess
+import http.client
+from collections import defaultdict
+
+
+def import_profile(module, top):
+    """解析 -X importtime 输出：(按顶层包汇总的自身耗时, 最慢的直接导入)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, env=dict(os.environ, IDS_PORT='0'))
+    packages = defaultdict(int)
+    modules = []
+    for line in result.stderr.splitlines():
+        # 格式: import time: 自身(us) | 累计(us) | 缩进表示层级的模块名
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        packages[name.split('.')[0]] += int(self_us)
+        if depth == 1:
+            # 目标模块直接导入的模块
+            modules.append((int(cumulative_us), name))
+    modules.sort(reverse=True)
+    return sorted(packages.items(), key=lambda x: -x[1])[:top], modules[:top], result.returncode, result.stderr
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure_startup(mode, timeout=60):
+    """启动 app.py 直到 /api/status 返回200，返回耗时（毫秒）"""
+    port = free_port()
+    env = dict(os.environ, IDS_PORT=str(port))
+    if mode != 'threading':
+        env['IDS_ASYNC_MODE'] = mode
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'app.py'], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"app.py 已退出，返回码 {process.returncode}")
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+                conn.request('GET', '/api/status')
+                if conn.getresponse().status == 200:
+                    return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("等待服务启动超时")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动耗时基准测试')
+    parser.add_argument('--profile', action='store_true', help='输出导入耗时分析')
+    parser.add_argument('--module', default='app', help='导入耗时分析的模块')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--mode', choices=['threading', 'eventlet', 'gevent'], default='eventlet',
+                        help='服务器模式（threading为带自动重载的开发模式）')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, default=300, help='启动到可服务的目标耗时')
+    args = parser.parse_args()
+
+    if args.profile:
+        packages, modules, returncode, stderr = import_profile(args.module, args.top)
+        if returncode != 0:
+            print(stderr.splitlines()[-1] if stderr else f"导入失败，返回码 {returncode}")
+            sys.exit(1)
+        print(f"导入 {args.module} 按顶层包汇总（自身耗时之和）:")
+        for name, us in packages:
+            print(f"  {name:<30} {us / 1000:8.1f} ms")
+        print("最慢的直接导入（累计耗时）:")
+        for us, name in modules:
+            print(f"  {name:<30} {us / 1000:8.1f} ms")
+        return
+
+    timings = sorted(measure_startup(args.mode) for _ in range(args.runs))
+    median = timings[len(timings) // 2]
+    print(f"模式 {args.mode}, 启动 {args.runs} 次: 中位数 {median:.0f} ms, "
+          f"最快 {timings[0]:.0f} ms, 最慢 {timings[-1]:.0f} ms")
+    print(f"目标 {args.target_ms:.0f} ms: {'通过' if median <= args.target_ms else '未达到'}")
+    sys.exit(0 if median <= args.target_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
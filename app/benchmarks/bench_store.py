@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""事件存储基准测试：EventStore 的持续写入吞吐与查询延迟
+
+使用固定种子的 LoadGenerator 预先生成告警，依次测量：
+    入队（调用方线程把事件转换为行并序列化）和写入线程（分配ID、批量插入）各自的速度
+    端到端写入：生产线程持续调用 add_alert 的同时写入线程提交，直到全部数据落盘
+    当天分区（只有IP索引）与建立延迟索引后的分区上的查询延迟，以及建立延迟索引的耗时
+要求端到端写入不低于 --target 条/秒。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.bench_store --rows 500000 --seed 7
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import threading
+
+from modules.data_storage.store import EventStore
+from modules.simulation.load_generator import LoadGenerator
+
+
+def new_store(path, rows, batch_size):
+    return EventStore(path, batch_size=batch_size, queue_size=rows)
+
+
+def bench_stages(alerts, directory, batch_size):
+    """分别测量入队与写入线程的速度"""
+    store = new_store(os.path.join(directory, 'stages.db'), len(alerts), batch_size)
+    start = time.perf_counter()
+    for alert in alerts:
+        store.add_alert(alert)
+    enqueue = time.perf_counter() - start
+    start = time.perf_counter()
+    store.start_store()
+    store.flush(timeout=600)
+    write = time.perf_counter() - start
+    store.stop_store()
+    print(f"  {'入队（add_alert）':<24} {len(alerts) / enqueue:>12,.0f} 条/秒")
+    print(f"  {'写入线程':<24} {len(alerts) / write:>12,.0f} 条/秒")
+
+
+def bench_ingest(alerts, directory, batch_size):
+    """生产线程与写入线程同时运行，返回 (每秒写入条数, 存储)"""
+    store = new_store(os.path.join(directory, 'ingest.db'), len(alerts), batch_size)
+    store.start_store()
+
+    def produce():
+        add_alert = store.add_alert
+        for alert in alerts:
+            add_alert(alert)
+
+    start = time.perf_counter()
+    producer = threading.Thread(target=produce)
+    producer.start()
+    producer.join()
+    store.flush(timeout=600)
+    elapsed = time.perf_counter() - start
+    stats = store.get_stats()
+    print(f"  {'端到端写入':<24} {len(alerts) / elapsed:>12,.0f} 条/秒"
+          f"（{stats['rows_written']:,} 条，{stats['batches']} 个事务，丢弃 {stats['rows_dropped']}）")
+    return len(alerts) / elapsed, store
+
+
+def bench_queries(store, hot_ip, early_time, repeat=20):
+    queries = (
+        ('最新一页', {}),
+        ('severity=高', {'severity': '高'}),
+        ('type+severity', {'event_type': '端口扫描', 'severity': '低'}),
+        ('ip=热点IP', {'ip': hot_ip}),
+        ('ip=不存在的IP', {'ip': '203.0.113.1'}),
+        ('时间范围（最早1%）', {'end_time': early_time}),
+    )
+    for label, kwargs in queries:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            events, _ = store.query(limit=100, **kwargs)
+        print(f"    {label:<20} {(time.perf_counter() - start) / repeat * 1000:>9.2f} ms  ({len(events)} 条)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='事件存储基准测试')
+    parser.add_argument('--rows', type=int, default=500000, help='写入的告警数量')
+    parser.add_argument('--seed', type=int, default=7, help='随机种子')
+    parser.add_argument('--batch-size', type=int, default=50000, help='每个事务写入的最大条数')
+    parser.add_argument('--target', type=float, default=50000, help='要求的端到端写入速度（条/秒）')
+    args = parser.parse_args()
+
+    generator = LoadGenerator(rate=1000, seed=args.seed, start_time=time.time() - args.rows / 1000)
+    alerts = list(generator.alerts(args.rows))
+    hot_ip = max(alerts[:1000], key=lambda a: a['severity'] == '高')['src_ip']
+    early_time = generator.start_time + args.rows / 1000 / 100
+    print(f"告警 {args.rows:,} 条，每个事务最多 {args.batch_size:,} 条")
+
+    with tempfile.TemporaryDirectory() as directory:
+        print("写入:")
+        bench_stages(alerts[:min(len(alerts), 200000)], directory, args.batch_size)
+        rate, store = bench_ingest(alerts, directory, args.batch_size)
+
+        print("  查询（当天分区，只有IP索引）:")
+        bench_queries(store, hot_ip, early_time)
+        store.stop_store()
+
+        # 模拟跨天：分区不再写入后建立延迟索引
+        conn = store._connect()
+        start = time.perf_counter()
+        store._index_closed_partitions(conn, '99999999')
+        conn.close()
+        print(f"  建立延迟索引: {time.perf_counter() - start:.2f} 秒")
+        print("  查询（已建立全部索引）:")
+        bench_queries(store, hot_ip, early_time)
+
+    print(f"端到端写入 {rate:,.0f} 条/秒，{'达到' if rate >= args.target else '未达到'}要求的 {args.target:,.0f} 条/秒")
+
+
+if __name__ == "__main__":
+    main()
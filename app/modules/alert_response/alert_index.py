@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import heapq
+import threading
+from bisect import bisect_left
+from datetime import datetime
+from collections import deque
+from itertools import islice
+
+
+def _parse_timestamp(value):
+    """将ISO时间字符串转换为epoch秒"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class AlertIndex:
+    """告警存储与二级索引
+
+    告警按到达顺序分配序号，并维护按严重程度、类型、源IP、目标IP的哈希索引
+    和按时间排序的索引。告警按先进先出淘汰，因此每个索引桶中最旧的序号总在队首，
+    淘汰时只需弹出队首，查询开销与结果数量成正比。
+    写入（调度线程）与查询（API线程）并发进行，所有读写都在同一把锁内完成。
+    """
+
+    INDEXED_FIELDS = ('severity', 'alert_type', 'src_ip', 'dst_ip')
+
+    def __init__(self, max_alerts=10000):
+        self.max_alerts = max_alerts
+        self._alerts = []   # 按序号排列的告警，_head 之前的位置已淘汰
+        self._times = []    # 对应的epoch时间戳（非递减）
+        self._head = 0
+        self._base_seq = 0  # _alerts[0] 的序号
+        self._next_seq = 0
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._next_seq - self._base_seq - self._head
+
+    def __iter__(self):
+        with self._lock:
+            return iter(self._alerts[self._head:])
+
+    def add(self, alert):
+        """追加告警并更新索引，返回因超出容量而淘汰的告警（没有则为None）"""
+        with self._lock:
+            return self._add(alert)
+
+    def _add(self, alert):
+        seq = self._next_seq
+        self._next_seq += 1
+
+        timestamp = _parse_timestamp(alert.get('timestamp'))
+        if self._times and timestamp < self._times[-1]:
+            # 时间索引按到达顺序维护，乱序时间戳取前一条的值
+            timestamp = self._times[-1]
+        self._alerts.append(alert)
+        self._times.append(timestamp)
+
+        for field, index in self._indexes.items():
+            key = alert.get(field)
+            bucket = index.get(key)
+            if bucket is None:
+                bucket = index[key] = deque()
+            bucket.append(seq)
+
+        if len(self) > self.max_alerts:
+            return self._retire_oldest()
+        return None
+
+    def _retire_oldest(self):
+        """淘汰最旧的告警并从各索引中移除（调用方持有锁）"""
+        alert = self._alerts[self._head]
+        seq = self._base_seq + self._head
+        self._alerts[self._head] = None
+        self._head += 1
+
+        for field, index in self._indexes.items():
+            key = alert.get(field)
+            bucket = index[key]
+            if bucket and bucket[0] == seq:
+                bucket.popleft()
+            if not bucket:
+                del index[key]
+
+        # 已淘汰位置超过一半时压缩，摊销开销为O(1)
+        if self._head > len(self._alerts) // 2:
+            del self._alerts[:self._head]
+            del self._times[:self._head]
+            self._base_seq += self._head
+            self._head = 0
+        return alert
+
+    def _get(self, seq):
+        """按序号取告警，已淘汰的返回None（调用方持有锁）"""
+        position = seq - self._base_seq
+        if position < self._head:
+            return None
+        return self._alerts[position]
+
+    def _resolve(self, seqs):
+        return [alert for alert in map(self._get, seqs) if alert is not None]
+
+    def recent(self, limit=100):
+        """获取最近的告警"""
+        with self._lock:
+            start = max(self._head, len(self._alerts) - limit)
+            return self._alerts[start:]
+
+    def query(self, field, value, limit=100):
+        """按索引字段查询最近的匹配告警"""
+        with self._lock:
+            bucket = self._indexes[field].get(value)
+            if not bucket:
+                return []
+            seqs = list(islice(reversed(bucket), limit))
+            seqs.reverse()
+            return self._resolve(seqs)
+
+    def query_ip(self, ip_address, limit=100):
+        """按源IP或目标IP查询最近的告警"""
+        with self._lock:
+            src = self._indexes['src_ip'].get(ip_address, ())
+            dst = self._indexes['dst_ip'].get(ip_address, ())
+            seqs = []
+            last = None
+            # 两个索引均按序号递增，从尾部归并并去重
+            for seq in heapq.merge(reversed(src), reversed(dst), reverse=True):
+                if seq != last:
+                    seqs.append(seq)
+                    last = seq
+                    if len(seqs) >= limit:
+                        break
+            seqs.reverse()
+            return self._resolve(seqs)
+
+    def since(self, start_time, limit=1000):
+        """查询指定epoch时间之后的告警"""
+        with self._lock:
+            position = bisect_left(self._times, start_time, self._head)
+            start = max(position, len(self._alerts) - limit)
+            return self._alerts[start:]
+
+    @property
+    def version(self):
+        """下一条告警的序号，有新告警时递增"""
+        return self._next_seq
+
+    def page(self, severity=None, alert_type=None, ip=None, cursor=None, since=None, limit=100):
+        """按条件从新到旧分页查询，返回 (告警列表, 下一页游标)
+
+        cursor: 只返回序号小于cursor的告警（翻页）; since: 只返回序号大于since的告警（增量轮询）。
+        选择最小的索引桶作为候选，其余条件逐条过滤；整个查询在锁内完成，候选序号与告警来自同一时刻的视图。
+        """
+        with self._lock:
+            return self._page(severity, alert_type, ip, cursor, since, limit)
+
+    def _page(self, severity, alert_type, ip, cursor, since, limit):
+        first = self._base_seq + self._head
+        upper = self._next_seq if cursor is None else min(cursor, self._next_seq)
+        lower = first - 1 if since is None else max(since, first - 1)
+
+        candidates = []
+        if ip is not None:
+            candidates.append(self._merged_ip_seqs(ip))
+        if severity is not None:
+            candidates.append(self._indexes['severity'].get(severity, ()))
+        if alert_type is not None:
+            candidates.append(self._indexes['alert_type'].get(alert_type, ()))
+        if candidates:
+            seqs = reversed(min(candidates, key=len))
+        else:
+            seqs = range(upper - 1, lower, -1)
+
+        alerts = []
+        last_seq = None
+        for seq in seqs:
+            if seq >= upper:
+                continue
+            if seq <= lower:
+                break
+            alert = self._get(seq)
+            if alert is None:
+                break
+            if severity is not None and alert.get('severity') != severity:
+                continue
+            if alert_type is not None and alert.get('alert_type') != alert_type:
+                continue
+            if ip is not None and ip not in (alert.get('src_ip'), alert.get('dst_ip')):
+                continue
+            alerts.append(alert)
+            last_seq = seq
+            if len(alerts) >= limit:
+                return alerts, last_seq
+        return alerts, None
+
+    def _merged_ip_seqs(self, ip_address):
+        """源IP与目标IP索引归并后的序号（递增、去重）"""
+        src = self._indexes['src_ip'].get(ip_address, ())
+        dst = self._indexes['dst_ip'].get(ip_address, ())
+        if not dst:
+            return src
+        if not src:
+            return dst
+        return sorted(set(src) | set(dst))
+
+    def keys(self, field):
+        """获取索引字段当前出现的所有取值"""
+        with self._lock:
+            return list(self._indexes[field])
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+from collections import deque
+
+
+class _CountNode:
+    """计数桶：保存当前计数相同的所有键"""
+    __slots__ = ('count', 'keys', 'lower', 'higher')
+
+    def __init__(self, count):
+        self.count = count
+        self.keys = {}
+        self.lower = None
+        self.higher = None
+
+
+class TopCounter:
+    """可增减的精确Top-K计数（Space-Saving的Stream-Summary结构）
+
+    计数每次只变化±1，键在相邻的计数桶之间移动，桶按计数组成双向链表，
+    增减和获取Top-K均为O(1)（K为常数）。
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._nodes = {}
+        self._highest = None
+        self._lowest = None
+
+    def __len__(self):
+        return len(self._counts)
+
+    def get(self, key):
+        return self._counts.get(key, 0)
+
+    def _link(self, node, lower, higher):
+        node.lower, node.higher = lower, higher
+        if lower:
+            lower.higher = node
+        else:
+            self._lowest = node
+        if higher:
+            higher.lower = node
+        else:
+            self._highest = node
+        self._nodes[node.count] = node
+
+    def _unlink(self, node):
+        if node.lower:
+            node.lower.higher = node.higher
+        else:
+            self._lowest = node.higher
+        if node.higher:
+            node.higher.lower = node.lower
+        else:
+            self._highest = node.lower
+        del self._nodes[node.count]
+
+    def increment(self, key):
+        count = self._counts.get(key, 0)
+        node = self._nodes.get(count) if count else None
+        target = self._nodes.get(count + 1)
+        if target is None:
+            target = _CountNode(count + 1)
+            if node:
+                self._link(target, node, node.higher)
+            else:
+                self._link(target, None, self._lowest)
+        target.keys[key] = None
+        self._counts[key] = count + 1
+        if node:
+            del node.keys[key]
+            if not node.keys:
+                self._unlink(node)
+
+    def decrement(self, key):
+        count = self._counts.get(key, 0)
+        if not count:
+            return
+        node = self._nodes[count]
+        if count == 1:
+            del self._counts[key]
+        else:
+            target = self._nodes.get(count - 1)
+            if target is None:
+                target = _CountNode(count - 1)
+                self._link(target, node.lower, node)
+            target.keys[key] = None
+            self._counts[key] = count - 1
+        del node.keys[key]
+        if not node.keys:
+            self._unlink(node)
+
+    def top(self, n=10):
+        """获取计数最高的n个键"""
+        result = []
+        node = self._highest
+        while node and len(result) < n:
+            for key in node.keys:
+                result.append((key, node.count))
+                if len(result) >= n:
+                    break
+            node = node.lower
+        return result
+
+
+class _WindowBucket:
+    __slots__ = ('start', 'total', 'severity', 'types')
+
+    def __init__(self, start):
+        self.start = start
+        self.total = 0
+        self.severity = {}
+        self.types = {}
+
+
+class SlidingWindowStats:
+    """基于时间桶的滑动窗口告警计数"""
+
+    def __init__(self, window, bucket_size):
+        self.window = window
+        self.bucket_size = bucket_size
+        self._buckets = deque()
+        self.total = 0
+        self.severity = {}
+        self.types = {}
+
+    def add(self, alert, now):
+        self.expire(now)
+        start = now - now % self.bucket_size
+        if not self._buckets or self._buckets[-1].start != start:
+            self._buckets.append(_WindowBucket(start))
+        bucket = self._buckets[-1]
+        severity = alert['severity']
+        alert_type = alert['alert_type']
+        bucket.total += 1
+        bucket.severity[severity] = bucket.severity.get(severity, 0) + 1
+        bucket.types[alert_type] = bucket.types.get(alert_type, 0) + 1
+        self.total += 1
+        self.severity[severity] = self.severity.get(severity, 0) + 1
+        self.types[alert_type] = self.types.get(alert_type, 0) + 1
+
+    def view(self, now):
+        """窗口内的计数 (total, severity, types)，不修改窗口状态（已过期但尚未移出的桶从副本中扣除）"""
+        cutoff = now - self.window
+        total = self.total
+        severity = dict(self.severity)
+        types = dict(self.types)
+        for bucket in self._buckets:
+            if bucket.start + self.bucket_size > cutoff:
+                break
+            total -= bucket.total
+            for key, count in bucket.severity.items():
+                severity[key] -= count
+            for key, count in bucket.types.items():
+                types[key] -= count
+        return (total, {k: v for k, v in severity.items() if v},
+                {k: v for k, v in types.items() if v})
+
+    def expire(self, now):
+        """移出窗口外的时间桶，每个桶只移出一次"""
+        cutoff = now - self.window
+        while self._buckets and self._buckets[0].start + self.bucket_size <= cutoff:
+            bucket = self._buckets.popleft()
+            self.total -= bucket.total
+            for severity, count in bucket.severity.items():
+                self.severity[severity] -= count
+                if not self.severity[severity]:
+                    del self.severity[severity]
+            for alert_type, count in bucket.types.items():
+                self.types[alert_type] -= count
+                if not self.types[alert_type]:
+                    del self.types[alert_type]
+
+
+class AlertStats:
+    """随告警到达和淘汰增量维护的统计数据
+
+    写入（告警处理线程）和读取（API线程）使用同一把锁；读取只在锁内复制，不修改统计状态。
+    """
+
+    # 窗口名称 -> (窗口长度, 时间桶大小)，单位秒
+    WINDOWS = {
+        '5m': (300, 10),
+        '1h': (3600, 60),
+        '24h': (86400, 900),
+    }
+
+    def __init__(self):
+        self.total = 0
+        self.severity = {'低': 0, '中': 0, '高': 0}
+        self.types = {}
+        self.src_ips = TopCounter()
+        self.windows = {name: SlidingWindowStats(*spec) for name, spec in self.WINDOWS.items()}
+        self._lock = threading.Lock()
+
+    def add(self, alert, now=None):
+        """记录新到达的告警"""
+        now = now or time.time()
+        with self._lock:
+            self._add(alert, now)
+
+    def _add(self, alert, now):
+        self.total += 1
+        severity = alert['severity']
+        if severity in self.severity:
+            self.severity[severity] += 1
+        self.types[alert['alert_type']] = self.types.get(alert['alert_type'], 0) + 1
+        self.src_ips.increment(alert['src_ip'])
+        for window in self.windows.values():
+            window.add(alert, now)
+
+    def retire(self, alert):
+        """移除被淘汰的告警"""
+        with self._lock:
+            self._retire(alert)
+
+    def _retire(self, alert):
+        self.total -= 1
+        severity = alert['severity']
+        if severity in self.severity:
+            self.severity[severity] -= 1
+        alert_type = alert['alert_type']
+        self.types[alert_type] -= 1
+        if not self.types[alert_type]:
+            del self.types[alert_type]
+        self.src_ips.decrement(alert['src_ip'])
+
+    def snapshot(self, top_n=10):
+        """当前保留告警的统计"""
+        with self._lock:
+            return {
+                'total': self.total,
+                'severity': dict(self.severity),
+                'types': dict(self.types),
+                'top_ips': dict(self.src_ips.top(top_n))
+            }
+
+    def window_snapshot(self, name, now=None):
+        """滑动窗口内的统计"""
+        window = self.windows[name]
+        with self._lock:
+            total, window_severity, types = window.view(now or time.time())
+        severity = {'低': 0, '中': 0, '高': 0}
+        severity.update(window_severity)
+        return {
+            'window': name,
+            'total': total,
+            'severity': severity,
+            'types': types
+        }
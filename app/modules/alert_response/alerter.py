@@ -4,21 +4,37 @@
 import os
 import time
 import json
-import random
 import logging
 import threading
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from .email_sender import EmailSender
+from .alert_index import AlertIndex
+from .alert_stats import AlertStats
+from .throttle import AlertThrottle
+from .correlator import AlertCorrelator, SEVERITY_LEVELS
+from ..metrics.registry import counter, gauge, histogram
+from ..metrics.tracing import TRACER
+from ..scheduling.scheduler import SCHEDULER
+from ..simulation.load_generator import LoadGenerator
 
 logger = logging.getLogger(__name__)
 
+# 运行指标
+ALERTS = counter('ids_alerts_total', '处理的告警数量', ['severity'])
+ALERTS_SUPPRESSED = counter('ids_alerts_suppressed_total', '被频率限制抑制的告警数量')
+NOTIFICATIONS = counter('ids_notifications_total', '发出的通知数量', ['channel'])
+ALERT_PROCESS_SECONDS = histogram('ids_alert_process_seconds', '单条告警的处理耗时（秒）')
+OPEN_INCIDENTS = gauge('ids_open_incidents', '当前未关闭的告警事件数量')
+
 class AlertSystem:
     def __init__(self, socketio=None):
         self.is_running = False
-        self.alert_thread = None
+        self.scheduler = SCHEDULER
+        self._tasks = []
         self.socketio = socketio
+        # process_alert 由监控回调、调度线程和API并发调用，告警处理与事件发布串行执行
+        self._lock = threading.RLock()
         
         # 告警配置
         self.config = {
@@ -28,297 +44,343 @@ class AlertSystem:
             'min_severity': 'medium',  # low, medium, high
             'alert_throttling': True,  # 限制告警频率
             'throttle_period': 300,    # 5分钟内相同IP的相同类型告警只发送一次
+            'throttle_max_keys': 100000,  # 频率限制记录的最大数量
+            'smtp_server': 'localhost',
+            'smtp_port': 587,
+            'smtp_sender': 'ids@localhost',
+            'smtp_username': '',
+            'smtp_password': '',
+            'smtp_use_tls': True,
+            'email_digest_interval': 60,  # 告警每60秒合并为一封摘要邮件
+            'email_digest_max_rows': 100, # 摘要最多列出的告警数，其余汇总为"另有N条"
+            'email_queue_size': 1000,     # 待发送告警队列上限
+            'max_alerts': 10000,          # 内存中保留的告警数量
+            'correlation_enabled': True,  # 将相关告警合并为事件，下游只接收事件更新（新事件的通知同样受频率限制）
+            'correlation_keys': ['src_ip', 'alert_type'],
+            'correlation_window': 60,     # 事件空闲超过60秒后关闭
+            'correlation_max_open': 10000,  # 未关闭事件上限，超出时关闭最久未活跃的事件
+            'incident_update_interval': 10,  # 同一事件的更新通知间隔（秒）
+            'store_raw_alerts': True,     # 启用关联时仍逐条持久化原始告警（/api/logs?history=1 查询原始告警）
         }
         
-        # 告警数据
-        self.alerts = []
-        self.recent_alerts = {}  # 用于告警频率限制
+        # 告警数据（带二级索引）
+        self.alerts = AlertIndex(self.config['max_alerts'])
+        self.alert_stats = AlertStats()  # 增量维护的统计数据
+        self.throttle = AlertThrottle(self.config['throttle_period'], self.config['throttle_max_keys'])  # 用于告警频率限制
+        
+        # 告警关联
+        self.correlator = AlertCorrelator(
+            self.config['correlation_keys'],
+            self.config['correlation_window'],
+            self.config['incident_update_interval'],
+            max_open=self.config['correlation_max_open']
+        )
+        
+        # 后台邮件发送
+        self.email_sender = EmailSender(self.config)
+        
+        # 持久化存储（可选）
+        self.event_store = None
+        
+        # 外部告警输出（Webhook/Syslog等）
+        self.sinks = []
+        
+        # 模拟告警：默认平均每5秒0.2条；压测时换成高速率、固定种子的生成器
+        self.load_generator = LoadGenerator(rate=0.04, interval=5)
         
         # 创建数据目录
         os.makedirs('data/alerts', exist_ok=True)
+        
+        OPEN_INCIDENTS.set_function(lambda: self.correlator.get_stats()['open_incidents'])
     
     def start_alerting(self):
         """启动告警系统"""
         if not self.is_running:
             self.is_running = True
-            self.alert_thread = threading.Thread(target=self._alert_worker)
-            self.alert_thread.daemon = True
-            self.alert_thread.start()
+            self._tasks = [
+                # 模拟告警生成（按负载生成器的调度间隔，默认每5秒）
+                self.scheduler.schedule(self._simulate_alerts, interval=self.load_generator.interval, delay=0,
+                                        name='告警模拟', error_delay=10),
+                # 清理过时的频率限制记录，关闭空闲的告警事件
+                self.scheduler.schedule(self._maintain, interval=5, name='告警维护'),
+                # 每小时保存一次告警数据
+                self.scheduler.schedule(self._save_alerts, interval=3600, name='告警保存')
+            ]
+            self.email_sender.start_sender()
+            for sink in self.sinks:
+                sink.start_sink()
             logger.info("告警系统已启动")
     
     def stop_alerting(self):
         """停止告警系统"""
         if self.is_running:
             self.is_running = False
-            if self.alert_thread:
-                self.alert_thread.join(timeout=2)
+            for task in self._tasks:
+                task.cancel()
+            self._tasks = []
+            with self._lock:
+                for incident, incident_data in self.correlator.close_all():
+                    self._publish_incident(incident, incident_data)
+            self.email_sender.stop_sender()
+            for sink in self.sinks:
+                sink.stop_sink()
             self._save_alerts()
             logger.info("告警系统已停止")
     
-    def _alert_worker(self):
-        """告警处理线程"""
-        last_save_time = time.time()
-        
-        while self.is_running:
-            try:
-                # 模拟告警生成
-                self._simulate_alerts()
-                
-                # 每小时保存一次告警数据
-                current_time = time.time()
-                if current_time - last_save_time >= 3600:  # 3600秒 = 1小时
-                    self._save_alerts()
-                    last_save_time = current_time
-                
-                # 清理过时的告警频率限制记录
-                self._cleanup_throttling()
-                
-                time.sleep(5)  # 每5秒检查一次
-                
-            except Exception as e:
-                logger.error(f"告警处理错误: {str(e)}")
-                time.sleep(10)  # 出错后等待10秒重试
+    def attach_event_store(self, event_store):
+        """接入持久化存储"""
+        self.event_store = event_store
+        logger.info("告警系统已接入持久化存储")
+    
+    def add_sink(self, sink):
+        """添加外部告警输出（名称或溢出目录重复时抛出ValueError）"""
+        spill_dir = os.path.abspath(sink.spill.directory)
+        for existing in self.sinks:
+            if existing.name == sink.name or os.path.abspath(existing.spill.directory) == spill_dir:
+                raise ValueError(f"告警输出重复: {sink.name}（溢出目录 {sink.spill.directory}）")
+        self.sinks.append(sink)
+        if self.is_running:
+            sink.start_sink()
+        logger.info(f"已添加告警输出: {sink.name}")
+    
+    def _maintain(self):
+        """清理频率限制记录并关闭空闲的告警事件"""
+        self._cleanup_throttling()
+        with self._lock:
+            for incident, incident_data in self.correlator.expire():
+                self._publish_incident(incident, incident_data)
+    
+    def set_load_generator(self, load_generator):
+        """设置生成模拟告警的负载生成器（需在启动前设置）"""
+        self.load_generator = load_generator
     
     def _simulate_alerts(self):
-        """模拟生成告警（用于演示）"""
-        # 20%的概率生成告警
-        if random.random() < 0.2:
-            alert_types = [
-                'SQL注入攻击', 'XSS攻击', 'DDoS攻击', '端口扫描', 
-                '暴力破解', '异常流量', '可疑文件下载'
-            ]
-            
-            severity_map = {
-                0: '低',
-                1: '中',
-                2: '高'
-            }
-            
-            alert_type = random.choice(alert_types)
-            severity_level = random.randint(0, 2)
-            severity = severity_map[severity_level]
-            src_ip = f"192.168.1.{random.randint(2, 254)}"
-            dst_ip = f"10.0.0.{random.randint(2, 254)}"
-            
-            # 创建告警数据
-            alert = {
-                'alert_id': f"ALERT-{int(time.time())}-{random.randint(1000, 9999)}",
-                'timestamp': datetime.now().isoformat(),
-                'alert_type': alert_type,
-                'severity': severity,
-                'src_ip': src_ip,
-                'dst_ip': dst_ip,
-                'port': random.randint(1, 65535),
-                'protocol': random.choice(['TCP', 'UDP', 'HTTP']),
-                'details': f"检测到{alert_type}攻击尝试",
-                'action_taken': random.choice(['已阻止', '已记录'])
-            }
-            
-            # 处理告警
+        """按负载生成器的速率生成模拟告警（用于演示和压测）"""
+        generator = self.load_generator
+        for alert in generator.alerts(generator.due()):
             self.process_alert(alert)
     
     def process_alert(self, alert_data):
         """处理告警数据"""
+        start = time.perf_counter()
+        with self._lock:
+            return self._process_alert(alert_data, start)
+    
+    def _process_alert(self, alert_data, start):
         try:
-            # 添加到告警列表
-            self.alerts.append(alert_data)
+            ALERTS.labels(alert_data['severity']).inc()
+            
+            # 添加到告警列表，超出容量时自动淘汰最旧的告警
+            retired = self.alerts.add(alert_data)
+            self.alert_stats.add(alert_data)
+            if retired is not None:
+                self.alert_stats.retire(retired)
+            
+            correlation = self.config['correlation_enabled']
             
-            # 限制告警列表大小
-            if len(self.alerts) > 10000:
-                self.alerts = self.alerts[-10000:]
+            # 写入持久化存储（后台批量提交）
+            if self.event_store and (self.config['store_raw_alerts'] or not correlation):
+                self.event_store.add_alert(alert_data)
             
-            # 检查是否需要发送通知
-            should_notify = self._should_send_notification(alert_data)
+            if correlation:
+                # 关联为事件，下游只接收事件更新
+                incident, incident_data = self.correlator.process(alert_data)
+                if incident_data is not None:
+                    self._publish_incident(incident, incident_data)
             
-            if should_notify:
-                # 发送Web通知
-                if self.config['web_notification'] and self.socketio:
-                    self.socketio.emit('new_alert', alert_data)
+            else:
+                # 外部输出接收全部告警，由输出线程批量发送
+                for sink in self.sinks:
+                    sink.enqueue(alert_data)
                 
-                # 发送邮件通知
-                if self.config['email_notification'] and self.config['email_recipients']:
-                    self._send_email_notification(alert_data)
+                # 检查是否需要发送通知
+                if self._should_send_notification(alert_data):
+                    # 发送Web通知
+                    if self.config['web_notification'] and self.socketio:
+                        self.socketio.emit('new_alert', alert_data)
+                        NOTIFICATIONS.labels('web').inc()
+                    
+                    # 发送邮件通知
+                    if self.config['email_notification'] and self.config['email_recipients']:
+                        self._send_email_notification(alert_data)
             
-            logger.info(f"处理告警: {alert_data['alert_type']}, 严重性: {alert_data['severity']}, 来源: {alert_data['src_ip']}")
+            TRACER.mark('alert_emit')
+            logger.debug(f"处理告警: {alert_data['alert_type']}, 严重性: {alert_data['severity']}, 来源: {alert_data['src_ip']}")
             
             return True
         
         except Exception as e:
             logger.error(f"处理告警失败: {str(e)}")
             return False
+        
+        finally:
+            ALERT_PROCESS_SECONDS.observe(time.perf_counter() - start)
     
-    def _should_send_notification(self, alert_data):
-        """检查是否应该发送通知"""
-        # 检查严重程度
+    def _publish_incident(self, incident, incident_data):
+        """将事件更新（incident_data 为在关联器锁内生成的快照）发送到前端、邮件和持久化存储
+
+        新事件的通知与未关联的告警一样经过频率限制：攻击间歇超过关联窗口时每次都会开启新事件，
+        被限制时不发送新事件的Web和邮件通知，之后的严重程度升级仍会通知。
+        逐条告警只记录DEBUG日志，事件开启和关闭时记录INFO日志。
+        """
+        closed = incident_data['status'] == 'closed'
+        severity = SEVERITY_LEVELS[incident_data['severity']]
+        if incident_data['count'] == 1 and not closed:
+            logger.info(f"告警事件开启: {incident_data['incident_id']} {incident_data['alert_type']}, "
+                        f"来源: {incident_data['src_ip']}, 严重性: {incident_data['severity']}")
+        elif closed:
+            logger.info(f"告警事件关闭: {incident_data['incident_id']} {incident_data['alert_type']}, "
+                        f"来源: {incident_data['src_ip']}, {incident_data['details']}")
+        
+        # 外部输出接收全部事件更新
+        for sink in self.sinks:
+            sink.enqueue(incident_data)
+        
+        if incident_data['count'] == 1 and not closed and not self._should_send_notification(incident_data):
+            incident.email_severity = severity
+        elif self._meets_min_severity(incident_data['severity']):
+            # 发送Web通知
+            if self.config['web_notification'] and self.socketio:
+                self.socketio.emit('incident_update', incident_data)
+                NOTIFICATIONS.labels('web').inc()
+            
+            # 新事件或严重程度升级时发送邮件通知
+            if (self.config['email_notification'] and self.config['email_recipients']
+                    and severity > incident.email_severity):
+                incident.email_severity = severity
+                self._send_email_notification(incident_data)
+        
+        # 事件关闭时写入最终记录
+        if closed and self.event_store:
+            self.event_store.add_incident(incident_data)
+    
+    def _meets_min_severity(self, severity):
+        """检查严重程度是否达到通知下限"""
         severity_levels = {'低': 0, '中': 1, '高': 2}
         min_severity_levels = {'low': 0, 'medium': 1, 'high': 2}
         
-        alert_severity = severity_levels.get(alert_data['severity'], 0)
+        alert_severity = severity_levels.get(severity, 0)
         config_min_severity = min_severity_levels.get(self.config['min_severity'], 1)
         
-        if alert_severity < config_min_severity:
+        return alert_severity >= config_min_severity
+    
+    def _should_send_notification(self, alert_data):
+        """检查是否应该发送通知"""
+        # 检查严重程度
+        if not self._meets_min_severity(alert_data['severity']):
             return False
         
         # 检查告警频率限制
         if self.config['alert_throttling']:
-            alert_key = f"{alert_data['src_ip']}_{alert_data['alert_type']}"
-            current_time = time.time()
+            allowed, suppressed = self.throttle.allow((alert_data['src_ip'], alert_data['alert_type']))
+            if not allowed:
+                ALERTS_SUPPRESSED.inc()
+                return False
             
-            if alert_key in self.recent_alerts:
-                last_time = self.recent_alerts[alert_key]
-                if current_time - last_time < self.config['throttle_period']:
-                    return False
-            
-            self.recent_alerts[alert_key] = current_time
+            # 附带上一周期内被抑制的告警数量
+            if suppressed:
+                alert_data['suppressed_count'] = suppressed
         
         return True
     
     def _send_email_notification(self, alert_data):
-        """发送邮件通知"""
-        # 实际应用中，这里应该连接SMTP服务器发送邮件
-        # 这里只做日志记录
-        recipients = ', '.join(self.config['email_recipients'])
-        logger.info(f"发送邮件告警到: {recipients}, 告警类型: {alert_data['alert_type']}")
-        
-        # 以下是实际发送邮件的代码，需要在配置中添加SMTP设置
-        '''
-        try:
-            # 创建邮件内容
-            msg = MIMEMultipart()
-            msg['From'] = self.config['smtp_sender']
-            msg['To'] = ', '.join(self.config['email_recipients'])
-            msg['Subject'] = f"安全告警: {alert_data['severity']} - {alert_data['alert_type']}"
-            
-            # 邮件正文
-            body = f"""
-            <html>
-            <body>
-                <h2>安全告警</h2>
-                <p><strong>时间:</strong> {alert_data['timestamp']}</p>
-                <p><strong>类型:</strong> {alert_data['alert_type']}</p>
-                <p><strong>严重程度:</strong> {alert_data['severity']}</p>
-                <p><strong>源IP:</strong> {alert_data['src_ip']}</p>
-                <p><strong>目标IP:</strong> {alert_data['dst_ip']}</p>
-                <p><strong>端口:</strong> {alert_data['port']}</p>
-                <p><strong>协议:</strong> {alert_data['protocol']}</p>
-                <p><strong>详情:</strong> {alert_data['details']}</p>
-                <p><strong>操作:</strong> {alert_data['action_taken']}</p>
-            </body>
-            </html>
-            """
-            
-            msg.attach(MIMEText(body, 'html'))
-            
-            # 连接SMTP服务器并发送
-            server = smtplib.SMTP(self.config['smtp_server'], self.config['smtp_port'])
-            server.starttls()
-            server.login(self.config['smtp_username'], self.config['smtp_password'])
-            server.send_message(msg)
-            server.quit()
-            
-            logger.info(f"邮件告警发送成功: {msg['Subject']}")
-            
-        except Exception as e:
-            logger.error(f"发送邮件告警失败: {str(e)}")
-        '''
+        """发送邮件通知（放入后台发送队列，不阻塞告警线程）"""
+        NOTIFICATIONS.labels('email').inc()
+        if not self.email_sender.enqueue(alert_data):
+            logger.warning(f"邮件发送队列已满，丢弃告警: {alert_data['alert_type']}")
+    
+    def get_email_stats(self):
+        """获取邮件发送统计"""
+        return self.email_sender.get_stats()
     
     def _cleanup_throttling(self):
         """清理过时的告警频率限制记录"""
-        current_time = time.time()
-        expired_keys = [k for k, v in self.recent_alerts.items() 
-                       if current_time - v >= self.config['throttle_period']]
+        # 每次最多清理50000条，避免长时间占用调度线程
+        reports = self.throttle.expire(limit=50000)
         
-        for key in expired_keys:
-            del self.recent_alerts[key]
+        if reports:
+            total = sum(count for _, count in reports)
+            logger.info(f"告警频率限制: {len(reports)} 个来源/类型在限制期内共抑制 {total} 条告警")
+    
+    def get_throttle_stats(self, limit=20):
+        """获取告警频率限制统计及被抑制最多的来源"""
+        stats = self.throttle.get_stats()
+        stats['top_suppressed'] = [
+            {'src_ip': key[0], 'alert_type': key[1], 'suppressed': count}
+            for key, count in self.throttle.get_suppressed(limit)
+        ]
+        return stats
     
     def _save_alerts(self):
         """保存告警数据到文件"""
         try:
             if not self.alerts:
                 return
+            
+            # 已接入持久化存储时告警已逐条写入，无需导出快照
+            if self.event_store:
+                self.event_store.flush()
+                return
                 
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f'data/alerts/alerts_{timestamp}.json'
             
             with open(filename, 'w') as f:
-                json.dump(self.alerts[-1000:], f, indent=2)  # 只保存最近1000条
+                json.dump(self.alerts.recent(1000), f, indent=2)  # 只保存最近1000条
             
             logger.info(f"已保存告警数据到 {filename}")
         except Exception as e:
             logger.error(f"保存告警数据失败: {str(e)}")
     
+    def get_incidents(self, limit=100):
+        """获取当前未关闭的告警事件"""
+        return self.correlator.get_open_incidents(limit)
+    
+    def get_correlation_stats(self):
+        """获取告警关联统计"""
+        return self.correlator.get_stats()
+    
+    def get_sink_stats(self):
+        """获取外部告警输出统计"""
+        return [sink.get_stats() for sink in self.sinks]
+    
     def get_recent_alerts(self, limit=100):
         """获取最近的告警数据"""
-        return self.alerts[-limit:] if self.alerts else []
+        return self.alerts.recent(limit)
+    
+    def query_alerts(self, severity=None, alert_type=None, ip=None, cursor=None, since=None, limit=100):
+        """按条件从新到旧分页查询内存中的告警，返回 (告警列表, 下一页游标)"""
+        return self.alerts.page(severity, alert_type, ip, cursor, since, limit)
+    
+    def get_alerts_version(self):
+        """告警数据的版本号（下一条告警的序号）"""
+        return self.alerts.version
     
     def get_alerts_by_severity(self, severity, limit=100):
         """按严重程度获取告警"""
-        filtered = [a for a in self.alerts if a['severity'] == severity]
-        return filtered[-limit:] if filtered else []
+        return self.alerts.query('severity', severity, limit)
     
     def get_alerts_by_type(self, alert_type, limit=100):
         """按告警类型获取告警"""
-        filtered = [a for a in self.alerts if a['alert_type'] == alert_type]
-        return filtered[-limit:] if filtered else []
+        return self.alerts.query('alert_type', alert_type, limit)
     
     def get_alerts_by_ip(self, ip_address, limit=100):
         """按IP地址获取告警"""
-        filtered = [a for a in self.alerts if a['src_ip'] == ip_address or a['dst_ip'] == ip_address]
-        return filtered[-limit:] if filtered else []
+        return self.alerts.query_ip(ip_address, limit)
     
     def get_alerts_by_timeframe(self, hours=24, limit=1000):
         """获取指定时间范围内的告警"""
-        start_time = datetime.now() - timedelta(hours=hours)
-        start_time_str = start_time.isoformat()
-        
-        filtered = [a for a in self.alerts if a['timestamp'] >= start_time_str]
-        return filtered[-limit:] if filtered else []
+        start_time = time.time() - hours * 3600
+        return self.alerts.since(start_time, limit)
     
-    def get_alert_stats(self):
-        """获取告警统计数据"""
-        total_alerts = len(self.alerts)
-        
-        # 按严重程度统计
-        severity_stats = {
-            '低': 0,
-            '中': 0,
-            '高': 0
-        }
-        
-        # 按类型统计
-        type_stats = {}
-        
-        # 按IP统计
-        ip_stats = {}
-        
-        # 计算统计数据
-        for alert in self.alerts:
-            # 严重程度统计
-            severity = alert['severity']
-            if severity in severity_stats:
-                severity_stats[severity] += 1
-            
-            # 类型统计
-            alert_type = alert['alert_type']
-            if alert_type not in type_stats:
-                type_stats[alert_type] = 0
-            type_stats[alert_type] += 1
-            
-            # IP统计
-            src_ip = alert['src_ip']
-            if src_ip not in ip_stats:
-                ip_stats[src_ip] = 0
-            ip_stats[src_ip] += 1
-        
-        # 获取前10个最活跃的IP
-        top_ips = sorted(ip_stats.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        return {
-            'total': total_alerts,
-            'severity': severity_stats,
-            'types': type_stats,
-            'top_ips': dict(top_ips)
-        }
+    def get_alert_stats(self, window=None):
+        """获取告警统计数据
+
+        window为None时统计内存中保留的全部告警，也可以是'5m'、'1h'或'24h'滑动窗口
+        """
+        if window:
+            return self.alert_stats.window_snapshot(window)
+        return self.alert_stats.snapshot()
     
     def update_config(self, new_config):
         """更新告警配置"""
@@ -340,6 +402,40 @@ class AlertSystem:
                     recipients = [r.strip() for r in new_config['email_recipients'].split(',') if r.strip()]
                     self.config['email_recipients'] = recipients
             
+            # 更新SMTP设置
+            for key in ['smtp_server', 'smtp_sender', 'smtp_username', 'smtp_password']:
+                if key in new_config:
+                    self.config[key] = str(new_config[key])
+            
+            if 'smtp_use_tls' in new_config:
+                self.config['smtp_use_tls'] = bool(new_config['smtp_use_tls'])
+            
+            for key in ['smtp_port', 'email_digest_interval', 'email_digest_max_rows']:
+                if key in new_config:
+                    try:
+                        value = int(new_config[key])
+                        if value > 0:
+                            self.config[key] = value
+                    except (ValueError, TypeError):
+                        pass
+            
+            # 更新告警关联设置
+            if 'correlation_enabled' in new_config:
+                self.config['correlation_enabled'] = bool(new_config['correlation_enabled'])
+            if 'store_raw_alerts' in new_config:
+                self.config['store_raw_alerts'] = bool(new_config['store_raw_alerts'])
+            
+            for key, attr in [('correlation_window', 'window'), ('incident_update_interval', 'update_interval'),
+                              ('correlation_max_open', 'max_open')]:
+                if key in new_config:
+                    try:
+                        value = int(new_config[key])
+                        if value > 0:
+                            self.config[key] = value
+                            setattr(self.correlator, attr, value)
+                    except (ValueError, TypeError):
+                        pass
+            
             # 更新最低严重程度
             if 'min_severity' in new_config and new_config['min_severity'] in ['low', 'medium', 'high']:
                 self.config['min_severity'] = new_config['min_severity']
@@ -354,6 +450,7 @@ class AlertSystem:
                     period = int(new_config['throttle_period'])
                     if period > 0:
                         self.config['throttle_period'] = period
+                        self.throttle.period = period
                 except (ValueError, TypeError):
                     pass
             
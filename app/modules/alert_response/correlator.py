@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import random
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+SEVERITY_LEVELS = {'低': 0, '中': 1, '高': 2}
+SEVERITY_NAMES = ['低', '中', '高']
+
+
+class Incident:
+    """由多条相关告警合并而成的事件"""
+
+    MAX_TRACKED = 100  # 端口/目标集合最多保留的数量
+
+    def __init__(self, key_fields, key, alert, now):
+        self.incident_id = f"INC-{int(now)}-{random.randint(1000, 9999)}"
+        self.key = dict(zip(key_fields, key))
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 0
+        self.ports = set()
+        self.targets = set()
+        self.protocols = set()
+        self.severity = 0
+        self.escalated = False
+        self.closed = False
+        self.alert = alert  # 最近一条告警
+        self.last_emit = 0
+        self.email_severity = -1  # 已通过邮件通知的严重程度
+
+    def add(self, alert, now):
+        """合并一条告警，返回严重程度是否升级"""
+        self.count += 1
+        self.last_seen = now
+        self.alert = alert
+        if 'port' in alert and len(self.ports) < self.MAX_TRACKED:
+            self.ports.add(alert['port'])
+        if 'dst_ip' in alert and len(self.targets) < self.MAX_TRACKED:
+            self.targets.add(alert['dst_ip'])
+        if 'protocol' in alert:
+            self.protocols.add(alert['protocol'])
+        severity = SEVERITY_LEVELS.get(alert.get('severity'), 0)
+        if severity > self.severity:
+            upgraded = self.count > 1
+            self.severity = severity
+            return upgraded
+        return False
+
+    def escalate(self):
+        """告警数量超过阈值时提升一级严重程度"""
+        if not self.escalated and self.severity < 2:
+            self.severity += 1
+            self.escalated = True
+            return True
+        return False
+
+    def to_dict(self):
+        """转换为与告警格式兼容的字典，便于前端、邮件和存储直接使用"""
+        severity = SEVERITY_NAMES[self.severity]
+        return {
+            'incident_id': self.incident_id,
+            'alert_id': self.incident_id,
+            'timestamp': datetime.fromtimestamp(self.last_seen).isoformat(),
+            'first_seen': datetime.fromtimestamp(self.first_seen).isoformat(),
+            'last_seen': datetime.fromtimestamp(self.last_seen).isoformat(),
+            'alert_type': self.alert.get('alert_type'),
+            'severity': severity,
+            'src_ip': self.alert.get('src_ip'),
+            'dst_ip': ', '.join(sorted(self.targets)[:5]) or self.alert.get('dst_ip'),
+            'port': ', '.join(str(p) for p in sorted(self.ports)[:10]),
+            'protocol': ', '.join(sorted(self.protocols)),
+            'count': self.count,
+            'port_count': len(self.ports),
+            'target_count': len(self.targets),
+            'escalated': self.escalated,
+            'status': 'closed' if self.closed else 'open',
+            'key': self.key,
+            'details': f"{self.count} 条告警，涉及 {len(self.targets)} 个目标、{len(self.ports)} 个端口",
+            'action_taken': self.alert.get('action_taken', '已记录')
+        }
+
+
+class AlertCorrelator:
+    """告警关联：按关联键和时间窗口将告警合并为事件
+
+    事件按最近活跃时间排列在OrderedDict中，关闭空闲事件只需从队首弹出。
+    事件在窗口内无新告警时关闭；未关闭的事件超过 max_open 个时关闭最久未活跃的事件。
+    下游只在事件新建、严重程度升级、达到更新间隔或关闭时收到通知，攻击期间的通知量与告警量无关。
+    告警处理线程与API线程通过同一把锁访问事件。
+    """
+
+    def __init__(self, key_fields=('src_ip', 'alert_type'), window=60,
+                 update_interval=10, escalation_threshold=100, max_open=10000):
+        self.key_fields = tuple(key_fields)
+        self.window = window                              # 事件空闲超时（秒）
+        self.update_interval = update_interval            # 同一事件两次更新通知的最小间隔（秒）
+        self.escalation_threshold = escalation_threshold  # 告警数量达到阈值时升级严重程度
+        self.max_open = max_open                          # 未关闭事件数量上限
+        self._incidents = OrderedDict()
+        self._closed = []  # 处理告警时关闭（超时或被淘汰）、等待清理流程返回的事件
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'alerts': 0,
+            'incidents_opened': 0,
+            'incidents_closed': 0,
+            'incidents_evicted': 0,
+            'updates_emitted': 0
+        }
+
+    def process(self, alert, now=None):
+        """关联一条告警，返回 (事件, 需要通知下游时为锁内生成的事件快照，否则为None)"""
+        now = now or time.time()
+        with self._lock:
+            return self._process(alert, now)
+
+    def _process(self, alert, now):
+        self.stats['alerts'] += 1
+        key = tuple(alert.get(field) for field in self.key_fields)
+
+        incident = self._incidents.get(key)
+        if incident is not None and now - incident.last_seen > self.window:
+            # 已超过空闲窗口，关闭旧事件并开启新事件
+            self._closed.append(self._close(key))
+            incident = None
+        is_new = incident is None
+        if is_new:
+            incident = Incident(self.key_fields, key, alert, now)
+            self._incidents[key] = incident
+            self.stats['incidents_opened'] += 1
+            if len(self._incidents) > self.max_open:
+                # 队首为最久未活跃的事件
+                self._closed.append(self._close(next(iter(self._incidents))))
+                self.stats['incidents_evicted'] += 1
+        else:
+            self._incidents.move_to_end(key)
+
+        changed = incident.add(alert, now)
+        if incident.count == self.escalation_threshold:
+            changed = incident.escalate() or changed
+
+        notify = is_new or changed or now - incident.last_emit >= self.update_interval
+        if notify:
+            incident.last_emit = now
+            self.stats['updates_emitted'] += 1
+            return incident, incident.to_dict()
+        return incident, None
+
+    def expire(self, now=None):
+        """关闭空闲超时的事件，返回 [(事件, 快照)]"""
+        now = now or time.time()
+        with self._lock:
+            closed, self._closed = self._closed, []
+            while self._incidents:
+                key, incident = next(iter(self._incidents.items()))
+                if now - incident.last_seen <= self.window:
+                    break
+                closed.append(self._close(key))
+            return [(incident, incident.to_dict()) for incident in closed]
+
+    def close_all(self):
+        """关闭全部事件（停止时调用），返回 [(事件, 快照)]"""
+        with self._lock:
+            closed, self._closed = self._closed, []
+            closed += [self._close(key) for key in list(self._incidents)]
+            return [(incident, incident.to_dict()) for incident in closed]
+
+    def _close(self, key):
+        incident = self._incidents.pop(key)
+        incident.closed = True
+        self.stats['incidents_closed'] += 1
+        return incident
+
+    def get_open_incidents(self, limit=100):
+        """获取最近活跃的未关闭事件"""
+        incidents = []
+        with self._lock:
+            for incident in reversed(self._incidents.values()):
+                if len(incidents) >= limit:
+                    break
+                # 事件的端口/目标集合由告警处理线程修改，在锁内转换
+                incidents.append(incident.to_dict())
+        return incidents
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['open_incidents'] = len(self._incidents)
+        if stats['alerts']:
+            stats['reduction_ratio'] = stats['alerts'] / max(stats['updates_emitted'], 1)
+        return stats
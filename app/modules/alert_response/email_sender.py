@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import html
+import time
+import queue
+import logging
+import threading
+from collections import Counter
+
+from ..metrics.counters import ShardedCounters
+
+logger = logging.getLogger(__name__)
+
+# smtplib与email包在启动邮件发送时才导入
+smtplib = None
+MIMEText = None
+MIMEMultipart = None
+
+
+def _load_smtp():
+    global smtplib, MIMEText, MIMEMultipart
+    if smtplib is None:
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        import smtplib
+
+
+def _esc(value):
+    """告警字段来自网络流量，写入HTML前转义"""
+    return html.escape(str(value))
+
+
+class EmailSender:
+    """后台邮件发送：持久SMTP连接、有界队列、失败退避重试、合并摘要
+
+    所有收件人收到同一份摘要；摘要最多列出 email_digest_max_rows 条告警，其余按严重程度汇总为"另有N条"。
+    """
+
+    def __init__(self, config):
+        self.config = config  # 与告警系统共享的配置字典
+        self.is_running = False
+        self.sender_thread = None
+
+        self._queue = queue.Queue(maxsize=config.get('email_queue_size', 1000))
+        self._pending = []               # 摘要中列出的告警 [(入队时间, 告警)]
+        self._overflow = Counter()       # 超出行数上限的告警：严重程度 -> 数量
+        self._overflow_time_total = 0.0  # 超出行数上限的告警入队时间之和（计算投递延迟）
+        self._smtp = None
+        self._last_used = 0
+
+        # 入队计数由产生告警的线程更新，其余由发送线程更新，按线程分片避免计数丢失
+        self.stats = ShardedCounters(
+            ('alerts_queued', 'alerts_dropped', 'alerts_delivered', 'messages_sent', 'send_failures',
+             'retries', 'connections_opened', 'queue_latency_total', 'delivery_latency_total'),
+            max_fields=('queue_latency_max', 'delivery_latency_max'))
+        self._start_time = time.time()
+
+    def start_sender(self):
+        """启动邮件发送线程"""
+        if not self.is_running:
+            _load_smtp()
+            self.is_running = True
+            self._start_time = time.time()
+            self.sender_thread = threading.Thread(target=self._sender_worker)
+            self.sender_thread.daemon = True
+            self.sender_thread.start()
+            logger.info("邮件发送已启动")
+
+    def stop_sender(self):
+        """停止邮件发送，发送剩余摘要后关闭连接"""
+        if self.is_running:
+            self.is_running = False
+            try:
+                # 放入空项唤醒发送线程
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+            if self.sender_thread:
+                self.sender_thread.join(timeout=10)
+            self._close_connection()
+            logger.info("邮件发送已停止")
+
+    def enqueue(self, alert_data):
+        """将告警放入发送队列，队列已满时丢弃并计数"""
+        try:
+            self._queue.put_nowait((time.time(), alert_data))
+            self.stats.inc('alerts_queued')
+            return True
+        except queue.Full:
+            self.stats.inc('alerts_dropped')
+            return False
+
+    def _sender_worker(self):
+        """发送线程：收集告警，到达摘要间隔后按收件人合并发送"""
+        while self.is_running or not self._queue.empty():
+            try:
+                item = self._queue.get(timeout=0.2)
+                if item is None:
+                    continue
+                queue_latency = time.time() - item[0]
+                self.stats.inc('queue_latency_total', queue_latency)
+                self.stats.observe_max('queue_latency_max', queue_latency)
+                if len(self._pending) < self.config.get('email_digest_max_rows', 100):
+                    self._pending.append(item)
+                else:
+                    self._overflow[item[1].get('severity', '')] += 1
+                    self._overflow_time_total += item[0]
+            except queue.Empty:
+                pass
+
+            try:
+                self._flush_due(force=not self.is_running)
+            except Exception as e:
+                logger.error(f"邮件发送错误: {str(e)}")
+
+        self._flush_due(force=True)
+
+    def _flush_due(self, force=False):
+        """摘要到达间隔后发送给所有收件人，每条告警只计一次投递"""
+        batch = self._pending
+        if not batch or not (force or time.time() - batch[0][0] >= self.config.get('email_digest_interval', 60)):
+            return
+        overflow, overflow_time_total = self._overflow, self._overflow_time_total
+        self._pending, self._overflow, self._overflow_time_total = [], Counter(), 0.0
+
+        alerts = [alert for _, alert in batch]
+        sent = failed = 0
+        for recipient in self.config['email_recipients']:
+            if self._send_with_retry(self._build_message(recipient, alerts, overflow)):
+                sent += 1
+            else:
+                failed += 1
+        if sent:
+            # 至少送达一个收件人的告警计为已投递（汇总在"另有N条"中的也计入）
+            delivered = time.time()
+            overflow_count = sum(overflow.values())
+            latency_total = sum(delivered - enqueue_time for enqueue_time, _ in batch)
+            latency_total += overflow_count * delivered - overflow_time_total
+            self.stats.add({'delivery_latency_total': latency_total,
+                            'alerts_delivered': len(batch) + overflow_count, 'messages_sent': sent})
+            self.stats.observe_max('delivery_latency_max', delivered - batch[0][0])
+        if failed:
+            self.stats.inc('send_failures', failed)
+
+    def _send_with_retry(self, msg):
+        """发送邮件，失败时按指数退避重试"""
+        _load_smtp()
+        recipient = msg['To']
+        max_retries = self.config.get('smtp_max_retries', 3)
+        backoff = self.config.get('smtp_retry_backoff', 1)
+
+        for attempt in range(max_retries + 1):
+            try:
+                self._get_connection().send_message(msg)
+                self._last_used = time.time()
+                logger.info(f"邮件告警发送成功: {msg['Subject']}, 收件人: {recipient}")
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                logger.warning(f"发送邮件告警失败 (第{attempt + 1}次): {str(e)}")
+                self._close_connection()
+                if attempt < max_retries:
+                    self.stats.inc('retries')
+                    time.sleep(backoff * (2 ** attempt))
+        return False
+
+    def _get_connection(self):
+        """获取持久SMTP连接，空闲过久时先检查连接是否可用"""
+        if self._smtp is not None and time.time() - self._last_used > 30:
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self._close_connection()
+            except (smtplib.SMTPException, OSError):
+                self._close_connection()
+
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.config['smtp_server'], self.config['smtp_port'], timeout=10)
+            smtp.ehlo()
+            if self.config.get('smtp_use_tls', True):
+                # 服务器（或中间人）不提供STARTTLS时不登录，避免明文发送密码
+                if not smtp.has_extn('starttls'):
+                    smtp.close()
+                    raise smtplib.SMTPNotSupportedError("SMTP服务器不支持STARTTLS，已拒绝明文连接")
+                smtp.starttls()
+                smtp.ehlo()
+            if self.config.get('smtp_username'):
+                smtp.login(self.config['smtp_username'], self.config['smtp_password'])
+            self._smtp = smtp
+            self._last_used = time.time()
+            self.stats.inc('connections_opened')
+        return self._smtp
+
+    def _close_connection(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def _build_message(self, recipient, alerts, overflow=None):
+        """创建邮件内容，多条告警合并为一封摘要邮件，overflow 为未列出的告警按严重程度的数量"""
+        _load_smtp()
+        msg = MIMEMultipart()
+        msg['From'] = self.config['smtp_sender']
+        msg['To'] = recipient
+        overflow_count = sum(overflow.values()) if overflow else 0
+
+        if len(alerts) == 1 and not overflow_count:
+            alert_data = alerts[0]
+            msg['Subject'] = f"安全告警: {alert_data['severity']} - {alert_data['alert_type']}"
+            body = f"""
+            <html>
+            <body>
+                <h2>安全告警</h2>
+                <p><strong>时间:</strong> {_esc(alert_data['timestamp'])}</p>
+                <p><strong>类型:</strong> {_esc(alert_data['alert_type'])}</p>
+                <p><strong>严重程度:</strong> {_esc(alert_data['severity'])}</p>
+                <p><strong>源IP:</strong> {_esc(alert_data['src_ip'])}</p>
+                <p><strong>目标IP:</strong> {_esc(alert_data['dst_ip'])}</p>
+                <p><strong>端口:</strong> {_esc(alert_data.get('port', ''))}</p>
+                <p><strong>协议:</strong> {_esc(alert_data.get('protocol', ''))}</p>
+                <p><strong>详情:</strong> {_esc(alert_data.get('details', ''))}</p>
+                <p><strong>操作:</strong> {_esc(alert_data.get('action_taken', ''))}</p>
+            </body>
+            </html>
+            """
+        else:
+            total = len(alerts) + overflow_count
+            msg['Subject'] = f"安全告警摘要: {total} 条告警"
+            rows = ''.join(
+                f"<tr><td>{_esc(a['timestamp'])}</td><td>{_esc(a['severity'])}</td><td>{_esc(a['alert_type'])}</td>"
+                f"<td>{_esc(a['src_ip'])}</td><td>{_esc(a['dst_ip'])}</td><td>{_esc(a.get('action_taken', ''))}</td></tr>"
+                for a in alerts
+            )
+            if overflow_count:
+                detail = '，'.join(f"{_esc(severity)} {count}" for severity, count in overflow.most_common())
+                rows += f'<tr><td colspan="6">+{overflow_count} 条告警未列出（{detail}）</td></tr>'
+            body = f"""
+            <html>
+            <body>
+                <h2>安全告警摘要</h2>
+                <p>{_esc(alerts[0]['timestamp'])} 起共 {total} 条告警</p>
+                <table border="1" cellpadding="4">
+                    <tr><th>时间</th><th>严重程度</th><th>类型</th><th>源IP</th><th>目标IP</th><th>操作</th></tr>
+                    {rows}
+                </table>
+            </body>
+            </html>
+            """
+
+        msg.attach(MIMEText(body, 'html'))
+        return msg
+
+    def get_stats(self):
+        """获取发送统计：吞吐量、队列延迟和投递延迟"""
+        stats = self.stats.snapshot()
+        elapsed = max(time.time() - self._start_time, 1e-9)
+        delivered = stats['alerts_delivered']
+        dequeued = stats['alerts_queued'] - self._queue.qsize()
+        stats['queue_size'] = self._queue.qsize()
+        stats['messages_per_second'] = stats['messages_sent'] / elapsed
+        stats['alerts_per_second'] = delivered / elapsed
+        stats['avg_queue_latency'] = stats['queue_latency_total'] / dequeued if dequeued else 0
+        stats['avg_delivery_latency'] = stats['delivery_latency_total'] / delivered if delivered else 0
+        return stats
+
+
+# 用于测试
+if __name__ == "__main__":
+    import socketserver
+    logging.basicConfig(level=logging.INFO)
+
+    class _StandInSMTPHandler(socketserver.StreamRequestHandler):
+        """本地SMTP替身：接受所有邮件并计数"""
+
+        def handle(self):
+            self.wfile.write(b"220 stand-in ESMTP\r\n")
+            in_data = False
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    break
+                if in_data:
+                    if line == b".\r\n":
+                        in_data = False
+                        self.server.messages += 1
+                        self.wfile.write(b"250 OK\r\n")
+                    continue
+                command = line[:4].upper()
+                if command == b"EHLO":
+                    self.wfile.write(b"250 stand-in\r\n")
+                elif command == b"DATA":
+                    in_data = True
+                    self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                elif command == b"QUIT":
+                    self.wfile.write(b"221 Bye\r\n")
+                    break
+                else:
+                    self.wfile.write(b"250 OK\r\n")
+
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _StandInSMTPHandler)
+    server.messages = 0
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    sender = EmailSender({
+        'email_recipients': ['admin@example.com', 'ops@example.com'],
+        'smtp_server': '127.0.0.1',
+        'smtp_port': server.server_address[1],
+        'smtp_sender': 'ids@example.com',
+        'email_digest_interval': 1
+    })
+    sender.start_sender()
+
+    try:
+        # 模拟告警突发：1000条告警应被合并为少量摘要邮件，每封最多列出100条
+        for i in range(1000):
+            sender.enqueue({
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'alert_type': '端口扫描' if i else '<script>alert(1)</script>',
+                'severity': '高',
+                'src_ip': f"192.168.1.{i % 250 + 2}",
+                'dst_ip': '10.0.0.1'
+            })
+        time.sleep(2)
+    finally:
+        sender.stop_sender()
+        server.shutdown()
+        print(f"替身服务器收到邮件: {server.messages}")
+        sample = sender._build_message('admin@example.com', [{'timestamp': 't', 'severity': '高', 'src_ip': 'a',
+                                                               'dst_ip': 'b', 'alert_type': '<b>x</b>'}] * 2,
+                                       Counter({'高': 898}))
+        body = sample.get_payload()[0].get_payload(decode=True).decode()
+        print("HTML已转义:", '<b>x</b>' not in body and '&lt;b&gt;' in body, "溢出汇总:", '+898' in body)
+        print(f"发送统计: {sender.get_stats()}")
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import time
+import json
+import hashlib
+import queue
+import socket
+import logging
+import threading
+import http.client
+from urllib.parse import urlsplit
+from datetime import datetime, timezone
+
+from ..metrics.counters import ShardedCounters
+
+logger = logging.getLogger(__name__)
+
+
+def _target_name(kind, host, port, detail=''):
+    """由输出目标生成默认名称（同时作为溢出目录名），不同目标的名称不同"""
+    name = f"{kind}-{re.sub(r'[^A-Za-z0-9.-]', '_', host or '')}-{port}"
+    if detail:
+        name += '-' + hashlib.sha1(detail.encode()).hexdigest()[:8]
+    return name
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后打开，超时后半开试探一次"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+
+    def allow(self):
+        if self.state == self.OPEN and time.time() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        return self.state != self.OPEN
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"告警输出熔断器已打开，{self.reset_timeout}秒后重试")
+            self.state = self.OPEN
+            self.opened_at = time.time()
+
+
+class SpillQueue:
+    """磁盘溢出队列：发送失败的批次按顺序写入文件，超过容量时丢弃最旧的批次"""
+
+    def __init__(self, directory, max_batches=1000):
+        self.directory = directory
+        self.max_batches = max_batches
+        os.makedirs(directory, exist_ok=True)
+        self._files = sorted(f for f in os.listdir(directory) if f.endswith('.json'))
+        self._seq = int(self._files[-1].split('.')[0]) + 1 if self._files else 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._files)
+
+    def push(self, batch):
+        name = f"{self._seq:012d}.json"
+        self._seq += 1
+        with open(os.path.join(self.directory, name), 'w') as f:
+            json.dump(batch, f, ensure_ascii=False)
+        self._files.append(name)
+        while len(self._files) > self.max_batches:
+            os.remove(os.path.join(self.directory, self._files.pop(0)))
+            self.dropped += 1
+
+    def peek(self):
+        """读取最旧的批次（发送成功后再调用 pop 删除）"""
+        if not self._files:
+            return None
+        with open(os.path.join(self.directory, self._files[0])) as f:
+            return json.load(f)
+
+    def pop(self):
+        if self._files:
+            os.remove(os.path.join(self.directory, self._files.pop(0)))
+
+
+class AlertSink:
+    """告警输出基类：后台批量发送、溢出队列重试和熔断
+
+    溢出目录默认为 data/sinks/{name}，子类的默认名称由目标地址生成，同一进程中名称不能重复。
+    """
+
+    def __init__(self, name, batch_size=100, batch_interval=1.0, queue_size=10000,
+                 spill_dir=None, max_spill_batches=1000, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+
+        self.is_running = False
+        self.sink_thread = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.spill = SpillQueue(spill_dir or f"data/sinks/{name}", max_spill_batches)
+
+        # 丢弃计数由入队的线程更新，其余由输出线程更新
+        self.stats = ShardedCounters(
+            ('events_sent', 'batches_sent', 'send_failures', 'events_spilled', 'events_dropped'),
+            max_fields=('lag_max',))
+        self.lag_last = 0.0
+        self._start_time = time.time()
+
+    def start_sink(self):
+        """启动输出线程"""
+        if not self.is_running:
+            self.is_running = True
+            self._start_time = time.time()
+            self.sink_thread = threading.Thread(target=self._sink_worker)
+            self.sink_thread.daemon = True
+            self.sink_thread.start()
+            logger.info(f"告警输出已启动: {self.name}")
+
+    def stop_sink(self):
+        """停止输出线程，未发送的数据写入溢出队列"""
+        if self.is_running:
+            self.is_running = False
+            self._wake_worker()
+            if self.sink_thread:
+                self.sink_thread.join(timeout=5)
+            self.close()
+            logger.info(f"告警输出已停止: {self.name}")
+
+    def enqueue(self, event):
+        """放入发送队列（不阻塞调用方），队列已满时丢弃并计数"""
+        try:
+            self._queue.put_nowait((time.time(), event))
+            return True
+        except queue.Full:
+            self.stats.inc('events_dropped')
+            return False
+
+    def _wake_worker(self):
+        """放入空项唤醒输出线程，停止时不必等到凑批超时"""
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _sink_worker(self):
+        """输出线程：按数量或时间凑批发送"""
+        while self.is_running or not self._queue.empty():
+            batch = []
+            deadline = time.time() + self.batch_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    break
+                batch.append(item)
+
+            try:
+                self._drain_spill()
+                if batch:
+                    self._deliver(batch)
+            except Exception as e:
+                logger.error(f"告警输出 {self.name} 错误: {str(e)}")
+
+    def _deliver(self, batch):
+        """发送一个批次，失败或熔断时写入溢出队列"""
+        events = [event for _, event in batch]
+        if len(self.spill) == 0 and self.breaker.allow() and self._try_send(events):
+            lag = time.time() - batch[0][0]
+            self.lag_last = lag
+            self.stats.observe_max('lag_max', lag)
+            return
+        # 溢出队列非空时也写入溢出队列，保证发送顺序
+        self.spill.push(events)
+        self.stats.inc('events_spilled', len(events))
+
+    def _drain_spill(self):
+        """熔断器允许时按顺序重发溢出队列中的批次"""
+        while len(self.spill) and self.breaker.allow():
+            events = self.spill.peek()
+            if not self._try_send(events):
+                break
+            self.spill.pop()
+
+    def _try_send(self, events):
+        try:
+            self.send_batch(events)
+            self.breaker.record_success()
+            self.stats.add({'events_sent': len(events), 'batches_sent': 1})
+            return True
+        except Exception as e:
+            logger.debug(f"告警输出 {self.name} 发送失败: {str(e)}")
+            self.breaker.record_failure()
+            self.stats.inc('send_failures')
+            self.close()
+            return False
+
+    def send_batch(self, events):
+        """发送一批事件，失败时抛出异常（由子类实现）"""
+        raise NotImplementedError
+
+    def close(self):
+        """关闭连接（由子类实现）"""
+
+    def get_stats(self):
+        """获取输出统计：吞吐量、延迟、溢出与熔断状态"""
+        stats = self.stats.snapshot()
+        stats['lag_last'] = self.lag_last
+        stats['name'] = self.name
+        stats['queue_size'] = self._queue.qsize()
+        stats['spilled_batches'] = len(self.spill)
+        stats['spill_dropped_batches'] = self.spill.dropped
+        stats['breaker_state'] = self.breaker.state
+        stats['events_per_second'] = stats['events_sent'] / max(time.time() - self._start_time, 1e-9)
+        return stats
+
+
+class WebhookSink(AlertSink):
+    """HTTP Webhook输出：每批事件以一个JSON数组POST，复用持久连接"""
+
+    def __init__(self, url, headers=None, timeout=5, **kwargs):
+        parts = urlsplit(url)
+        # 同一主机端口的不同路径也是不同的目标，名称中加入URL的哈希
+        super().__init__(kwargs.pop('name', None) or _target_name('webhook', parts.hostname, parts.port, url),
+                         **kwargs)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        self.headers = {'Content-Type': 'application/json'}
+        self.headers.update(headers or {})
+        self.timeout = timeout
+        self._conn = None
+
+    def send_batch(self, events):
+        if self._conn is None:
+            conn_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self._conn = conn_class(self.host, self.port, timeout=self.timeout)
+        body = json.dumps(events, ensure_ascii=False).encode()
+        self._conn.request('POST', self.path, body=body, headers=self.headers)
+        response = self._conn.getresponse()
+        response.read()
+        if response.status >= 300:
+            raise IOError(f"HTTP {response.status}")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class SyslogSink(AlertSink):
+    """Syslog输出（RFC5424格式）
+
+    TCP按RFC6587八位组计数分帧，一批事件合并为一次发送；
+    UDP按RFC5426每条消息一个数据报。
+    """
+
+    FACILITY = 16  # local0
+    SEVERITY = {'高': 2, '中': 4, '低': 6}  # crit, warning, info
+
+    def __init__(self, host, port=514, protocol='udp', app_name='ids', **kwargs):
+        super().__init__(kwargs.pop('name', None) or _target_name(f'syslog-{protocol}', host, port), **kwargs)
+        self.address = (host, port)
+        self.protocol = protocol
+        self.app_name = app_name
+        self.hostname = socket.gethostname()
+        self._sock = None
+
+    def _format(self, event):
+        pri = self.FACILITY * 8 + self.SEVERITY.get(event.get('severity'), 5)
+        timestamp = datetime.now(timezone.utc).isoformat()
+        msgid = event.get('incident_id', event.get('alert_id', '-')).replace(' ', '_') or '-'
+        msg = json.dumps(event, ensure_ascii=False)
+        return f"<{pri}>1 {timestamp} {self.hostname} {self.app_name} {os.getpid()} {msgid} - {msg}".encode()
+
+    def send_batch(self, events):
+        if self._sock is None:
+            if self.protocol == 'tcp':
+                self._sock = socket.create_connection(self.address, timeout=5)
+            else:
+                self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        messages = [self._format(event) for event in events]
+        if self.protocol == 'tcp':
+            self._sock.sendall(b''.join(b"%d %s" % (len(m), m) for m in messages))
+        else:
+            for message in messages:
+                self._sock.sendto(message, self.address)
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def create_sink(target, **kwargs):
+    """根据地址创建输出：http(s)://... 为Webhook，udp://host:port 或 tcp://host:port 为Syslog"""
+    parts = urlsplit(target)
+    if parts.scheme in ('http', 'https'):
+        return WebhookSink(target, **kwargs)
+    if parts.scheme in ('udp', 'tcp'):
+        return SyslogSink(parts.hostname, parts.port or 514, parts.scheme, **kwargs)
+    raise ValueError(f"不支持的告警输出地址: {target}")
+
+
+# 用于测试
+if __name__ == "__main__":
+    import tempfile
+    import http.server
+    import socketserver
+    logging.basicConfig(level=logging.INFO)
+
+    received = {'webhook': 0, 'syslog': 0}
+
+    class _WebhookHandler(http.server.BaseHTTPRequestHandler):
+        """本地Webhook替身"""
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            received['webhook'] += len(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    class _SyslogHandler(socketserver.StreamRequestHandler):
+        """本地Syslog(TCP)替身，解析八位组计数分帧"""
+
+        def handle(self):
+            while True:
+                length = b''
+                while not length.endswith(b' '):
+                    ch = self.rfile.read(1)
+                    if not ch:
+                        return
+                    length += ch
+                self.rfile.read(int(length))
+                received['syslog'] += 1
+
+    # Webhook服务稍后才启动，先取一个空闲端口
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    webhook_port = probe.getsockname()[1]
+    probe.close()
+
+    syslog_server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SyslogHandler)
+    syslog_server.daemon_threads = True
+    threading.Thread(target=syslog_server.serve_forever, daemon=True).start()
+
+    spill_root = tempfile.mkdtemp()
+    webhook = create_sink(f"http://127.0.0.1:{webhook_port}/alerts",
+                          spill_dir=os.path.join(spill_root, 'webhook'), reset_timeout=1)
+    syslog = create_sink(f"tcp://127.0.0.1:{syslog_server.server_address[1]}",
+                         spill_dir=os.path.join(spill_root, 'syslog'))
+    for sink in (webhook, syslog):
+        sink.start_sink()
+
+    try:
+        # Webhook服务尚未启动：批次写入溢出队列，熔断器打开
+        for i in range(5000):
+            event = {'alert_id': f"ALERT-{i}", 'alert_type': '端口扫描', 'severity': '高', 'src_ip': '192.168.1.10'}
+            webhook.enqueue(event)
+            syslog.enqueue(event)
+        time.sleep(2)
+        print(f"Webhook服务启动前: {webhook.get_stats()}")
+
+        # 启动Webhook服务后溢出队列被重发
+        http_server = http.server.ThreadingHTTPServer(('127.0.0.1', webhook_port), _WebhookHandler)
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+        time.sleep(3)
+    finally:
+        for sink in (webhook, syslog):
+            sink.stop_sink()
+            print(sink.get_stats())
+        print(f"替身服务收到: {received}")
+        http_server.shutdown()
+        syslog_server.shutdown()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import heapq
+import threading
+from collections import OrderedDict
+
+
+class AlertThrottle:
+    """告警频率限制存储
+
+    所有键共用同一限制周期，因此按插入顺序排列的OrderedDict同时也是按过期时间排列的队列：
+    过期清理只需从队首弹出，开销与过期键数量成正比，不再全量扫描。
+    超过最大容量时淘汰最早的键。被抑制的告警按键计数，过期、被淘汰或再次放行时返回计数
+    （被淘汰的键在下一次 expire() 时一并返回）。告警处理线程、调度线程与API线程通过同一把锁访问。
+    """
+
+    def __init__(self, period=300, max_keys=100000):
+        self.period = period
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # (src_ip, alert_type) -> 最近一次放行时间
+        self._suppressed = {}  # 仍在限制期内的键 -> 被抑制的告警数量
+        self._evicted = []     # 因容量淘汰、等待 expire() 返回的 [(键, 数量)]
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'allowed': 0,
+            'suppressed': 0,
+            'expired': 0,
+            'evicted': 0,
+            'evicted_suppressed': 0
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def allow(self, key, now=None):
+        """检查是否放行，返回 (是否放行, 上一周期内被抑制的告警数量)"""
+        now = now or time.time()
+        with self._lock:
+            return self._allow(key, now)
+
+    def _allow(self, key, now):
+        last_time = self._entries.get(key)
+        if last_time is not None and now - last_time < self.period:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            self.stats['suppressed'] += 1
+            return False, 0
+
+        suppressed = 0
+        self._entries[key] = now
+        if last_time is not None:
+            # 移到队尾，保持插入顺序即过期顺序
+            self._entries.move_to_end(key)
+            suppressed = self._suppressed.pop(key, 0)
+        self.stats['allowed'] += 1
+
+        if len(self._entries) > self.max_keys:
+            evicted = self._evict_oldest()
+            if evicted[1]:
+                self.stats['evicted_suppressed'] += evicted[1]
+                # 待返回的记录同样受容量限制，超出时只计入统计
+                if len(self._evicted) < self.max_keys:
+                    self._evicted.append(evicted)
+        return True, suppressed
+
+    def _evict_oldest(self):
+        """淘汰最早的键，返回 (键, 被抑制的告警数量)"""
+        key, _ = self._entries.popitem(last=False)
+        self.stats['evicted'] += 1
+        return key, self._suppressed.pop(key, 0)
+
+    def expire(self, now=None, limit=None):
+        """清理已过限制周期的键，返回其中被抑制过告警的 [(键, 数量)]（含上次清理后因容量被淘汰的键）"""
+        now = now or time.time()
+        with self._lock:
+            return self._expire(now, limit)
+
+    def _expire(self, now, limit):
+        cutoff = now - self.period
+        reports, self._evicted = self._evicted, []
+        entries = self._entries
+        while entries and (limit is None or limit > 0):
+            key, last_time = entries.popitem(last=False)
+            if last_time > cutoff:
+                entries[key] = last_time
+                entries.move_to_end(key, last=False)
+                break
+            suppressed = self._suppressed.pop(key, 0)
+            if suppressed:
+                reports.append((key, suppressed))
+            self.stats['expired'] += 1
+            if limit is not None:
+                limit -= 1
+        return reports
+
+    def get_suppressed(self, limit=100):
+        """获取当前被抑制告警最多的键"""
+        with self._lock:
+            return heapq.nlargest(limit, self._suppressed.items(), key=lambda x: x[1])
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['keys'] = len(self._entries)
+            stats['suppressing_keys'] = len(self._suppressed)
+        return stats
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+from multiprocessing.connection import Client, Listener
+
+from .shm_channels import SharedCounters, EventRing
+from ..metrics.registry import REGISTRY, gauge
+from ..metrics.tracing import TRACER
+from ..scheduling.scheduler import SCHEDULER
+
+logger = logging.getLogger(__name__)
+
+# 数据面通过共享内存发布的计数
+COUNTER_FIELDS = (
+    'heartbeat_ms', 'capture_running', 'prevention_running',
+    'packets_total', 'packets_tcp', 'packets_udp', 'packets_icmp', 'packets_http', 'packets_other',
+    'packet_bytes', 'threats', 'blocks', 'unblocks', 'blocked_ips'
+)
+
+# 运行指标（控制面进程中由共享计数提供）
+DATA_PLANE_COUNTERS = gauge('ids_data_plane_counter', '数据面进程发布的计数', ['field'])
+
+# 包含 modules 包的目录，数据面进程以 python -m 启动
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _metric_total(name):
+    metric = REGISTRY.get(name)
+    return metric.total() if metric else 0
+
+
+class DataPlane:
+    """数据面（在独立进程中运行）：抓包、检测与防御
+
+    计数每100ms以顺序锁发布到共享内存，威胁逐条写入共享内存环形缓冲区，
+    控制面的请求处理和JSON生成不再与抓包争用同一个GIL。命令通道只传递启停和配置。
+    进程分离只消除GIL争用，CPU仍可能被Web进程占满：单核机器上API负载下抓包吞吐仍下降约55%，
+    多核机器上的效果尚未测量（见 benchmarks/bench_data_plane.py）。
+    """
+
+    def __init__(self, counters_name, ring_name, interface=None, mode='auto', cluster=None):
+        from ..traffic_detection.detector import TrafficDetector
+        from ..intrusion_prevention.prevention import IntrusionPrevention
+
+        self.counters = SharedCounters(COUNTER_FIELDS, name=counters_name)
+        self.ring = EventRing(name=ring_name)
+        self.detector = TrafficDetector(interface)
+        self.prevention = IntrusionPrevention(mode)
+        self.prevention.set_threat_callback(self._forward_threat)
+
+        # 集群阻止列表同步修改的是阻止状态，随防御模块放在数据面
+        self.cluster_sync = None
+        if cluster:
+            from ..intrusion_prevention.cluster_sync import BlockListSync
+            self.cluster_sync = BlockListSync(*cluster)
+            self.prevention.attach_cluster_sync(self.cluster_sync)
+
+        self.commands = {
+            'start': self.start,
+            'stop': self.stop,
+            'set_mode': self.prevention.set_mode,
+            'set_block_threshold': self.prevention.set_block_threshold,
+            'set_block_duration': self.prevention.set_block_duration,
+            'block_ip': self.prevention.block_ip,
+            'unblock_ip': self.prevention.unblock_ip,
+            'get_blocked_ips': self.prevention.get_blocked_ips,
+            'get_latency': TRACER.report,
+        }
+        self._publish_task = SCHEDULER.schedule(self.publish_counters, interval=0.1, delay=0, name='数据面计数发布')
+
+    def _forward_threat(self, threat):
+        if not self.ring.push_event('threat', threat):
+            logger.warning("事件缓冲区已满，威胁未转发到控制面")
+
+    def start(self):
+        """启动防御、集群同步和抓包"""
+        self.prevention.start_prevention()
+        if self.cluster_sync:
+            self.cluster_sync.start_sync()
+        self.detector.start_capture()
+        self.publish_counters()
+        return True
+
+    def stop(self):
+        self.detector.stop_capture()
+        self.prevention.stop_prevention()
+        if self.cluster_sync:
+            self.cluster_sync.stop_sync()
+        self.publish_counters()
+        return True
+
+    def publish_counters(self):
+        """从本进程的运行指标汇总计数并发布到共享内存"""
+        values = {
+            'heartbeat_ms': time.time() * 1000,
+            'capture_running': self.detector.is_running,
+            'prevention_running': self.prevention.is_running,
+            'packet_bytes': _metric_total('ids_packet_bytes_total'),
+            'threats': _metric_total('ids_threats_total'),
+            'blocks': _metric_total('ids_blocks_total'),
+            'unblocks': _metric_total('ids_unblocks_total'),
+            'blocked_ips': len(self.prevention.blocked_ips)
+        }
+        packets = REGISTRY.get('ids_packets_total')
+        total = 0
+        for labels, child in (packets.children() if packets else []):
+            count = child.value()
+            values[f'packets_{labels[0]}'] = count
+            total += count
+        values['packets_total'] = total
+        self.counters.publish(values)
+
+    def serve(self, conn):
+        """处理控制面的命令，直到收到shutdown或控制面断开"""
+        while True:
+            try:
+                command, kwargs = conn.recv()
+            except (EOFError, OSError):
+                logger.warning("控制面已断开")
+                break
+            if command == 'shutdown':
+                conn.send((True, None))
+                break
+            handler = self.commands.get(command)
+            try:
+                if handler is None:
+                    raise ValueError(f"未知命令: {command}")
+                conn.send((True, handler(**kwargs)))
+            except Exception as e:
+                logger.error(f"执行命令 {command} 失败: {str(e)}")
+                conn.send((False, str(e)))
+        self.close()
+
+    def close(self):
+        if self.detector.is_running or self.prevention.is_running:
+            self.stop()
+        self._publish_task.cancel()
+        self.counters.close()
+        self.ring.close()
+
+
+class DataPlaneClient:
+    """控制面一侧的数据面代理
+
+    启动数据面进程，通过命令通道控制启停和配置，从共享内存读取计数，
+    由调度任务读取环形缓冲区中的威胁，维护最近威胁列表并写入持久化存储。
+    提供与入侵防御模块相同的 threat_seq / query_threats 查询接口。
+    """
+
+    def __init__(self, interface=None, mode='auto', cluster=None, ring_capacity=4 * 1024 * 1024,
+                 max_threats=1000, batch_size=1000):
+        self.interface = interface
+        self.mode = mode
+        self.cluster = cluster
+        self.ring_capacity = ring_capacity
+        self.max_threats = max_threats
+        self.batch_size = batch_size
+
+        self.process = None
+        self.counters = None
+        self.ring = None
+        self.event_store = None
+        self._conn = None
+        self._socket_dir = None
+        self._drain_task = None
+        self._lock = threading.Lock()
+
+        # 最近的威胁（threats[-1] 的序号为 threat_seq）
+        self.threats = []
+        self.threat_seq = 0
+
+    def attach_event_store(self, event_store):
+        """接入持久化存储（威胁在控制面写入）"""
+        self.event_store = event_store
+        logger.info("数据面代理已接入持久化存储")
+
+    @property
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start_process(self, timeout=30):
+        """创建共享内存并启动数据面进程"""
+        if self.is_alive:
+            return
+        self.counters = SharedCounters(COUNTER_FIELDS, create=True)
+        self.ring = EventRing(self.ring_capacity, create=True)
+        self._socket_dir = tempfile.mkdtemp(prefix='ids-data-plane-')
+        address = os.path.join(self._socket_dir, 'control.sock')
+        authkey = os.urandom(16)
+
+        command = [sys.executable, '-m', 'modules.data_plane.process',
+                   '--counters', self.counters.name, '--ring', self.ring.name,
+                   '--address', address, '--mode', self.mode]
+        if self.interface:
+            command += ['--interface', self.interface]
+        if self.cluster:
+            host, port, peers = self.cluster
+            command += ['--cluster-bind', f'{host}:{port}', '--cluster-peers', ','.join(peers)]
+        env = dict(os.environ, IDS_DATA_PLANE_KEY=authkey.hex())
+        env['PYTHONPATH'] = os.pathsep.join(p for p in (_APP_ROOT, env.get('PYTHONPATH')) if p)
+        self.process = subprocess.Popen(command, env=env)
+
+        # 数据面构造完模块后才开始监听
+        deadline = time.time() + timeout
+        while True:
+            try:
+                self._conn = Client(address, family='AF_UNIX', authkey=authkey)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if self.process.poll() is not None or time.time() > deadline:
+                    self._cleanup()
+                    raise RuntimeError("数据面进程启动失败")
+                time.sleep(0.05)
+
+        for field in COUNTER_FIELDS:
+            DATA_PLANE_COUNTERS.labels(field).set_function(lambda field=field: self.get_counters().get(field, 0))
+        self._drain_task = SCHEDULER.schedule(self._drain, interval=0.05, delay=0, name='数据面事件读取')
+        logger.info(f"数据面进程已启动，PID {self.process.pid}")
+
+    def stop_process(self, timeout=10):
+        """停止数据面进程并释放共享内存"""
+        if self.process is None:
+            return
+        if self.is_alive:
+            try:
+                self.call('shutdown')
+            except Exception as e:
+                logger.error(f"通知数据面退出失败: {str(e)}")
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._drain()
+        self._cleanup()
+        logger.info("数据面进程已停止")
+
+    def _cleanup(self):
+        if self._drain_task:
+            self._drain_task.cancel()
+            self._drain_task = None
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+        for field in COUNTER_FIELDS:
+            DATA_PLANE_COUNTERS.labels(field).set_function(None)
+        if self.counters:
+            self.counters.close()
+            self.counters = None
+        if self.ring:
+            self.ring.close()
+            self.ring = None
+        if self._socket_dir:
+            for name in os.listdir(self._socket_dir):
+                os.unlink(os.path.join(self._socket_dir, name))
+            os.rmdir(self._socket_dir)
+            self._socket_dir = None
+        self.process = None
+
+    def call(self, command, **kwargs):
+        """发送命令并等待结果（命令通道一次只处理一个请求）"""
+        with self._lock:
+            if self._conn is None:
+                raise RuntimeError("数据面进程未运行")
+            self._conn.send((command, kwargs))
+            ok, result = self._conn.recv()
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def start_data_plane(self):
+        """启动数据面（首次调用时启动进程）"""
+        self.start_process()
+        return self.call('start')
+
+    def stop_data_plane(self):
+        result = self.call('stop')
+        self._drain()
+        return result
+
+    def get_counters(self):
+        """共享内存中计数的一致快照"""
+        counters = self.counters
+        if counters is None:
+            return {}
+        return counters.snapshot()
+
+    def _drain(self):
+        """读取环形缓冲区中的事件"""
+        ring = self.ring
+        if ring is None:
+            return
+        events = ring.pop_events(self.batch_size)
+        for kind, data in events:
+            if kind == 'threat':
+                self.threats.append(data)
+                self.threat_seq += 1
+                if len(self.threats) > self.max_threats:
+                    self.threats = self.threats[-self.max_threats:]
+                if self.event_store:
+                    self.event_store.add_threat(data)
+        if len(events) >= self.batch_size and self._drain_task:
+            # 还有积压，立即再读一批
+            self._drain_task.wake()
+
+    def query_threats(self, severity=None, threat_type=None, ip=None, cursor=None, since=None, limit=100):
+        """按条件从新到旧分页查询最近的威胁"""
+        from ..intrusion_prevention.prevention import query_threat_list
+        return query_threat_list(self.threats, self.threat_seq, severity, threat_type, ip, cursor, since, limit)
+
+    def get_stats(self):
+        counters = self.get_counters()
+        return {
+            'alive': self.is_alive,
+            'pid': self.process.pid if self.process else None,
+            'heartbeat_age': round(time.time() - counters['heartbeat_ms'] / 1000, 3) if counters else None,
+            'counters': counters,
+            'ring': self.ring.get_stats() if self.ring else None,
+            'threats_received': self.threat_seq
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据面进程（由控制面启动）')
+    parser.add_argument('--counters', required=True, help='共享计数的共享内存名')
+    parser.add_argument('--ring', required=True, help='事件环形缓冲区的共享内存名')
+    parser.add_argument('--address', required=True, help='命令通道的Unix套接字路径')
+    parser.add_argument('--interface', help='抓包接口，默认所有接口')
+    parser.add_argument('--mode', default='auto', help='防御模式')
+    parser.add_argument('--cluster-bind', help='集群同步监听地址 host:port')
+    parser.add_argument('--cluster-peers', help='集群同步对端，逗号分隔')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] [数据面] %(message)s')
+    cluster = None
+    if args.cluster_peers:
+        host, port = (args.cluster_bind or '0.0.0.0:9470').rsplit(':', 1)
+        cluster = (host, int(port), [p for p in args.cluster_peers.split(',') if p])
+
+    plane = DataPlane(args.counters, args.ring, args.interface, args.mode, cluster)
+    listener = Listener(args.address, family='AF_UNIX', authkey=bytes.fromhex(os.environ.pop('IDS_DATA_PLANE_KEY')))
+    try:
+        conn = listener.accept()
+    finally:
+        listener.close()
+    logger.info(f"数据面进程已就绪，PID {os.getpid()}")
+    plane.serve(conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+from multiprocessing import shared_memory, resource_tracker
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# 本进程连接共享内存时是否需要从资源跟踪器取消登记（首次连接时确定）
+_untrack_attached = None
+
+
+def _attach(name):
+    """连接已存在的共享内存段；创建方负责释放，连接方不登记到资源跟踪器"""
+    global _untrack_attached
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 之前没有track参数：连接时会登记到资源跟踪器，独立启动的进程退出时
+        # 它的跟踪器会删除共享内存段，因此取消登记；fork出的子进程与父进程共用跟踪器，
+        # 本进程也创建过共享内存时跟踪器同样已在运行，这两种情况不能取消
+        if _untrack_attached is None:
+            _untrack_attached = resource_tracker._resource_tracker._fd is None
+        shm = shared_memory.SharedMemory(name=name)
+        if _untrack_attached:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _loads(payload):
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+
+class SharedCounters:
+    """共享内存中的一组64位整数计数（单写者，多读者）
+
+    写者用顺序锁发布：序号先变为奇数，写入全部值后再变为偶数；
+    读者读到相同的偶数序号时得到一致的快照，期间被写入打断时重读，双方都不加锁。
+    """
+
+    def __init__(self, fields, name=None, create=False):
+        self.fields = tuple(fields)
+        size = 8 * (len(self.fields) + 1)
+        if create:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = _attach(name)
+        self._created = create
+        # 第0个为顺序锁序号，其后依次为各计数
+        self._values = self._shm.buf[:size].cast('q')
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def publish(self, values):
+        """发布一组计数（未给出的字段保持原值）"""
+        slots = self._values
+        slots[0] += 1
+        for i, field in enumerate(self.fields, 1):
+            if field in values:
+                slots[i] = int(values[field])
+        slots[0] += 1
+
+    def snapshot(self, retries=1000):
+        """读取一致的快照"""
+        slots = self._values
+        for _ in range(retries):
+            seq = slots[0]
+            if seq & 1:
+                continue
+            values = slots.tolist()
+            if slots[0] == seq:
+                return dict(zip(self.fields, values[1:]))
+        raise RuntimeError("共享计数持续被写入，无法读取一致快照")
+
+    def close(self):
+        self._values.release()
+        self._shm.close()
+        if self._created:
+            self._shm.unlink()
+
+
+class EventRing:
+    """共享内存中的单生产者/单消费者事件环形缓冲区
+
+    每条记录为4字节长度 + 载荷，按4字节对齐；到达末尾放不下时写入回绕标记从头开始。
+    写位置和读位置单调递增，分别只由生产者和消费者修改。缓冲区已满时丢弃新事件并计数，
+    生产者（数据面）永远不会因为消费者（控制面）处理慢而阻塞。
+    """
+
+    HEADER_SIZE = 64
+    WRAP = 0xFFFFFFFF
+
+    def __init__(self, capacity=4 * 1024 * 1024, name=None, create=False):
+        if create:
+            capacity -= capacity % 8
+            self._shm = shared_memory.SharedMemory(create=True, size=self.HEADER_SIZE + capacity)
+        else:
+            self._shm = _attach(name)
+        self._created = create
+        buf = self._shm.buf
+        # 写位置、读位置、丢弃数、容量
+        self._header = buf[:32].cast('Q')
+        if create:
+            self._header[3] = capacity
+        self.capacity = self._header[3]
+        self._data = buf[self.HEADER_SIZE:self.HEADER_SIZE + self.capacity]
+        self._lengths = self._data.cast('I')
+        self._push_lock = threading.Lock()  # 同一进程内的多个生产者线程
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def push(self, payload):
+        """写入一条记录，缓冲区已满时返回False"""
+        size = (4 + len(payload) + 3) & ~3
+        with self._push_lock:
+            write, read = self._header[0], self._header[1]
+            offset = write % self.capacity
+            tail = self.capacity - offset
+            needed = size + (tail if tail < size else 0)
+            if size > self.capacity // 2 or write + needed - read > self.capacity:
+                self._header[2] += 1
+                return False
+            if tail < size:
+                self._lengths[offset // 4] = self.WRAP
+                write += tail
+                offset = 0
+            self._data[offset + 4:offset + 4 + len(payload)] = payload
+            self._lengths[offset // 4] = len(payload)
+            # 先写数据再推进写位置，消费者只会读到完整的记录
+            self._header[0] = write + size
+        return True
+
+    def pop(self, max_records=1000):
+        """读取最多max_records条记录"""
+        records = []
+        write, read = self._header[0], self._header[1]
+        while read < write and len(records) < max_records:
+            offset = read % self.capacity
+            length = self._lengths[offset // 4]
+            if length == self.WRAP:
+                read += self.capacity - offset
+                continue
+            records.append(bytes(self._data[offset + 4:offset + 4 + length]))
+            read += (4 + length + 3) & ~3
+        self._header[1] = read
+        return records
+
+    def push_event(self, kind, data):
+        return self.push(_dumps({'k': kind, 'd': data}))
+
+    def pop_events(self, max_records=1000):
+        """读取事件，返回 [(类型, 数据)]"""
+        events = []
+        for payload in self.pop(max_records):
+            event = _loads(payload)
+            events.append((event['k'], event['d']))
+        return events
+
+    def get_stats(self):
+        write, read, dropped = self._header[0], self._header[1], self._header[2]
+        return {
+            'capacity': self.capacity,
+            'used_bytes': write - read,
+            'written_bytes': write,
+            'dropped': dropped
+        }
+
+    def close(self):
+        self._lengths.release()
+        self._data.release()
+        self._header.release()
+        self._shm.close()
+        if self._created:
+            self._shm.unlink()
+
+
+# 用于测试
+if __name__ == "__main__":
+    counters = SharedCounters(('packets', 'threats'), create=True)
+    reader = SharedCounters(('packets', 'threats'), name=counters.name)
+    counters.publish({'packets': 1200, 'threats': 3})
+    print("计数快照:", reader.snapshot())
+
+    ring = EventRing(capacity=4096, create=True)
+    consumer = EventRing(name=ring.name)
+    for i in range(100):
+        ring.push_event('threat', {'seq': i, 'src_ip': f'192.168.1.{i}'})
+        if i % 7 == 6:
+            print(f"读取 {len(consumer.pop_events())} 条", end='; ')
+    print("\n环形缓冲区:", consumer.get_stats())
+
+    reader.close()
+    counters.close()
+    consumer.close()
+    ring.close()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import math
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 各数据源的列：数值列与分类列（分类列按 代码+词表 存储）
+SOURCES = {
+    'traffic': {
+        'numeric': ('size', 'src_port', 'dst_port'),
+        'categorical': ('protocol', 'type', 'src_ip', 'dst_ip'),
+    },
+    'monitoring': {
+        'numeric': ('traffic_in', 'traffic_out', 'connections', 'packets_processed',
+                    'threats_detected', 'ips_blocked'),
+        'categorical': (),
+    },
+}
+
+AGGREGATIONS = ('sum', 'count', 'mean', 'min', 'max')
+
+# 单次降采样查询的上限：时间桶数（保留期内按分钟降采样约4.5万个），以及 桶数 x 分组数（每个单元一个float64）
+MAX_SERIES_BUCKETS = 50000
+MAX_SERIES_CELLS = 10000000
+
+
+def _day_range(day):
+    start = datetime.strptime(day, '%Y%m%d')
+    return start.timestamp(), (start + timedelta(days=1)).timestamp()
+
+
+class TrafficAnalytics:
+    """历史流量分析查询层
+
+    归档数据（抓包流量JSON文件、监控指标日志段）按天转换为列式缓存（NumPy数组，
+    分类列存为代码+词表），已结束的日期只转换一次。查询先按时间范围选出需要的日期，
+    只加载这些日期的列，再用向量化运算完成降采样、分组和百分位计算。
+    结束时间已过去的查询结果缓存在内存中。查询范围限制在最近 retention_days 天内。
+    """
+
+    def __init__(self, traffic_dir='data/traffic', metrics_log=None, cache_dir='data/analytics',
+                 day_cache_size=64, result_cache_size=256, retention_days=31):
+        self.traffic_dir = traffic_dir
+        self.retention_days = retention_days
+        self.metrics_log = metrics_log
+        self.cache_dir = cache_dir
+        self.day_cache_size = day_cache_size
+        self.result_cache_size = result_cache_size
+        self.utc_offset = -time.timezone
+
+        self._lock = threading.Lock()
+        self._days = OrderedDict()     # (数据源, 日期) -> (列数据, 源文件标记)
+        self._results = OrderedDict()  # 查询参数 -> 结果
+
+        self.stats = {
+            'queries': 0,
+            'result_cache_hits': 0,
+            'days_built': 0,
+            'days_loaded': 0
+        }
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # ---------- 归档数据按天加载 ----------
+
+    def _list_sources(self, source, days):
+        """一次列出归档目录，按文件名中的日期挑出各天的归档文件 {日期: [路径]}"""
+        result = {day: [] for day in days}
+        if source == 'traffic':
+            try:
+                names = sorted(os.listdir(self.traffic_dir))
+            except FileNotFoundError:
+                return result
+            # 文件名是保存时间，次日的第一个文件可能包含前一天末尾的数据包
+            next_days = {_next_day(day): day for day in days}
+            for name in names:
+                # traffic_YYYYMMDD_HHMMSS.json
+                if not (name.startswith('traffic_') and name.endswith('.json')):
+                    continue
+                day = name[8:16]
+                path = os.path.join(self.traffic_dir, name)
+                if day in result:
+                    result[day].append(path)
+                previous = next_days.pop(day, None)
+                if previous is not None:
+                    result[previous].append(path)
+        elif source == 'monitoring' and self.metrics_log:
+            segments = self.metrics_log.segments()
+            for day in days:
+                day_start, day_end = _day_range(day)
+                # 与当天有重叠的段：起始时间早于当天结束，且下一段起始时间晚于当天开始
+                for i, (start, path) in enumerate(segments):
+                    next_start = segments[i + 1][0] if i + 1 < len(segments) else float('inf')
+                    if start < day_end and next_start > day_start:
+                        result[day].append(path)
+        return result
+
+    def _stamp(self, files):
+        """源文件标记（数量与最新修改时间），用于判断缓存是否过期"""
+        mtime = 0
+        for path in files:
+            try:
+                mtime = max(mtime, os.path.getmtime(path))
+            except OSError:
+                pass
+        return len(files), mtime
+
+    def _load_day(self, source, day, files):
+        """加载某天的列数据：内存缓存 -> 磁盘缓存 -> 从归档构建"""
+        today = time.strftime('%Y%m%d')
+        stamp = self._stamp(files)
+        key = (source, day)
+
+        with self._lock:
+            cached = self._days.get(key)
+            if cached is not None and cached[1] == stamp:
+                self._days.move_to_end(key)
+                return cached[0]
+
+        cache_path = os.path.join(self.cache_dir, f"{source}_{day}.npz")
+        columns = None
+        if day < today and os.path.exists(cache_path):
+            with np.load(cache_path, allow_pickle=False) as data:
+                if tuple(data['_stamp'].tolist()) == stamp:
+                    columns = {k: data[k] for k in data.files if k != '_stamp'}
+                    self.stats['days_loaded'] += 1
+
+        if columns is None:
+            columns = self._build_day(source, day, files)
+            self.stats['days_built'] += 1
+            if day < today and files:
+                # 已结束的日期写入磁盘缓存，之后不再解析归档
+                tmp_path = f"{cache_path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, _stamp=np.array(stamp, dtype=np.float64), **columns)
+                os.replace(tmp_path, cache_path)
+
+        with self._lock:
+            self._days[key] = (columns, stamp)
+            while len(self._days) > self.day_cache_size:
+                self._days.popitem(last=False)
+        return columns
+
+    def _build_day(self, source, day, files):
+        """解析某天的归档文件，生成按时间排序的列数据"""
+        spec = SOURCES[source]
+        day_start, day_end = _day_range(day)
+        records = []
+        if source == 'traffic':
+            for path in files:
+                try:
+                    with open(path, 'r') as f:
+                        records.extend(json.load(f))
+                except (OSError, ValueError) as e:
+                    logger.error(f"读取流量归档失败: {path}: {str(e)}")
+            ts = [_parse_time(r.get('timestamp')) for r in records]
+        else:
+            records = list(self.metrics_log.read(day_start, day_end))
+            ts = [r['ts'] for r in records]
+
+        ts = np.array(ts, dtype=np.float64)
+        order = np.argsort(ts, kind='stable')
+        keep = order[(ts[order] >= day_start) & (ts[order] < day_end)]
+        columns = {'ts': ts[keep]}
+        for name in spec['numeric']:
+            values = np.array([r.get(name) or 0 for r in records], dtype=np.float64)
+            columns[name] = values[keep]
+        for name in spec['categorical']:
+            values = np.array([str(r.get(name, '')) for r in records], dtype=str)
+            vocab, codes = np.unique(values[keep], return_inverse=True)
+            columns[f"{name}.vocab"] = vocab
+            columns[f"{name}.codes"] = codes.astype(np.int32)
+        return columns
+
+    def _load_range(self, source, start, end, fields=(), categorical=None):
+        """加载 [start, end) 范围内的列，分类列合并词表后返回 (时间, 数值列, 代码, 词表)"""
+        if source not in SOURCES:
+            raise ValueError(f"未知数据源: {source}")
+        days = []
+        current = datetime.fromtimestamp(start).replace(hour=0, minute=0, second=0, microsecond=0)
+        while current.timestamp() < end:
+            days.append(current.strftime('%Y%m%d'))
+            current += timedelta(days=1)
+
+        files = self._list_sources(source, days)
+        parts = []
+        for day in days:
+            parts.append(self._load_day(source, day, files[day]))
+            # 协程服务器下每加载一天让出一次执行权，长范围查询不阻塞其他请求
+            time.sleep(0)
+        parts = [p for p in parts if len(p['ts'])]
+        if not parts:
+            empty = np.zeros(0)
+            return empty, {f: empty for f in fields}, np.zeros(0, dtype=np.int64), np.array([], dtype=str)
+
+        masks = [(p['ts'] >= start) & (p['ts'] < end) for p in parts]
+        ts = np.concatenate([p['ts'][m] for p, m in zip(parts, masks)])
+        values = {f: np.concatenate([p[f][m] for p, m in zip(parts, masks)]) for f in fields}
+
+        codes = np.zeros(len(ts), dtype=np.int64)
+        vocab = np.array([], dtype=str)
+        if categorical:
+            # 合并各天的词表，并把各天的代码映射到合并后的词表
+            vocab = np.unique(np.concatenate([p[f"{categorical}.vocab"] for p in parts]))
+            codes = np.concatenate([
+                np.searchsorted(vocab, p[f"{categorical}.vocab"])[p[f"{categorical}.codes"][m]]
+                for p, m in zip(parts, masks)
+            ]) if vocab.size else codes
+        return ts, values, codes, vocab
+
+    # ---------- 查询 ----------
+
+    def _cached(self, key, end, compute):
+        """结束时间已过去的查询结果可以缓存"""
+        self.stats['queries'] += 1
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.stats['result_cache_hits'] += 1
+                return self._results[key]
+        result = compute()
+        if end <= time.time():
+            with self._lock:
+                self._results[key] = result
+                while len(self._results) > self.result_cache_size:
+                    self._results.popitem(last=False)
+        return result
+
+    def _clamp(self, start, end):
+        """结束时间不晚于当前时间，开始时间不早于保留期（避免逐日遍历到1970年）"""
+        now = time.time()
+        end = min(end or now, now)
+        if not (math.isfinite(start) and math.isfinite(end)):
+            raise ValueError("无效的时间范围")
+        return max(start, now - self.retention_days * 86400), end
+
+    def _align(self, start, end, interval):
+        """时间范围按降采样间隔对齐（本地时区），结束时间默认取上一个完整间隔"""
+        start, end = self._clamp(start, end)
+        end = (int(end) + self.utc_offset) // interval * interval - self.utc_offset
+        start = (int(start) + self.utc_offset) // interval * interval - self.utc_offset
+        return start, end
+
+    def series(self, source, field, start, end=None, interval=60, agg='sum', group_by=None, limit_groups=20):
+        """降采样时间序列，可按分类列分组（例如按协议统计每分钟字节数）"""
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"不支持的聚合方式: {agg}")
+        interval = max(1, int(interval))
+        start, end = self._align(start, end, interval)
+        if (end - start) // interval > MAX_SERIES_BUCKETS:
+            raise ValueError(f"时间桶过多: {(end - start) // interval}（上限 {MAX_SERIES_BUCKETS}），请增大interval或缩小时间范围")
+        key = ('series', source, field, start, end, interval, agg, group_by, limit_groups)
+
+        def compute():
+            fields = () if agg == 'count' else (field,)
+            ts, values, codes, vocab = self._load_range(source, start, end, fields, group_by)
+            buckets = ((ts - start) // interval).astype(np.int64)
+            num_buckets = max(0, (end - start) // interval)
+            num_groups = max(len(vocab), 1) if group_by else 1
+            index = buckets * num_groups + (codes if group_by else 0)
+            size = num_buckets * num_groups
+            if size > MAX_SERIES_CELLS:
+                raise ValueError(f"分组过多: {num_groups} 组 x {num_buckets} 个时间桶，请缩小时间范围或增大interval")
+            column = values.get(field)
+
+            counts = np.bincount(index, minlength=size)[:size]
+            if agg == 'count':
+                matrix = counts
+            elif agg in ('sum', 'mean'):
+                matrix = np.bincount(index, weights=column, minlength=size)[:size]
+                if agg == 'mean':
+                    matrix = np.divide(matrix, counts, out=np.zeros(size), where=counts > 0)
+            else:
+                import pandas as pd  # pandas导入较慢，只在需要分组计算时加载
+                frame = pd.DataFrame({'index': index, 'value': column})
+                grouped = getattr(frame.groupby('index')['value'], agg)()
+                matrix = np.zeros(size)
+                matrix[grouped.index.values] = grouped.values
+            matrix = np.asarray(matrix, dtype=np.float64).reshape(num_buckets, num_groups)
+
+            timestamps = [datetime.fromtimestamp(start + i * interval).isoformat() for i in range(num_buckets)]
+            if not group_by:
+                return {'interval': interval, 'timestamps': timestamps, 'series': {field: matrix[:, 0].tolist()}}
+            # 只返回合计最大的分组
+            totals = matrix.sum(axis=0)
+            top = np.argsort(-totals)[:limit_groups] if len(vocab) else []
+            return {
+                'interval': interval,
+                'timestamps': timestamps,
+                'series': {str(vocab[g]): matrix[:, g].tolist() for g in top}
+            }
+
+        return self._cached(key, end, compute)
+
+    def percentiles(self, source, field, start, end=None, percentiles=(50, 95, 99), group_by=None, limit_groups=20):
+        """数值列的百分位分布，可按分类列分组"""
+        start, end = self._clamp(start, end)
+        key = ('percentiles', source, field, int(start), int(end), tuple(percentiles), group_by, limit_groups)
+
+        def compute():
+            ts, values, codes, vocab = self._load_range(source, start, end, (field,), group_by)
+            column = values[field]
+            quantiles = [p / 100 for p in percentiles]
+            if not group_by:
+                result = np.quantile(column, quantiles).tolist() if len(column) else [None] * len(quantiles)
+                return {'count': int(len(column)), 'percentiles': dict(zip(map(str, percentiles), result))}
+            import pandas as pd
+            frame = pd.DataFrame({'group': codes, 'value': column})
+            grouped = frame.groupby('group')['value']
+            sizes = grouped.size().sort_values(ascending=False).head(limit_groups)
+            table = grouped.quantile(quantiles).unstack()
+            return {
+                str(vocab[g]): {
+                    'count': int(sizes[g]),
+                    'percentiles': dict(zip(map(str, percentiles), table.loc[g].tolist()))
+                }
+                for g in sizes.index
+            }
+
+        return self._cached(key, end, compute)
+
+    def top(self, source, group_by, start, end=None, field=None, limit=10):
+        """按分类列分组的合计（field为空时统计记录数），返回最大的limit组"""
+        start, end = self._clamp(start, end)
+        key = ('top', source, group_by, int(start), int(end), field, limit)
+
+        def compute():
+            fields = (field,) if field else ()
+            ts, values, codes, vocab = self._load_range(source, start, end, fields, group_by)
+            if not len(vocab):
+                return []
+            totals = np.bincount(codes, weights=values[field] if field else None, minlength=len(vocab))
+            order = np.argsort(-totals)[:limit]
+            return [{'key': str(vocab[i]), 'value': float(totals[i])} for i in order if totals[i] > 0]
+
+        return self._cached(key, end, compute)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['days_in_memory'] = len(self._days)
+        stats['cached_results'] = len(self._results)
+        return stats
+
+
+def _next_day(day):
+    return (datetime.strptime(day, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d')
+
+
+def _parse_time(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return float('nan')
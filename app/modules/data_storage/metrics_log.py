@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import gzip
+import json
+import time
+import zlib
+import queue
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = 'metrics_'
+SEGMENT_SUFFIX = '.ndjson.gz'
+
+
+class MetricsLog:
+    """按段轮转的追加式监控指标日志
+
+    记录在调用线程序列化为一行JSON后进入有界队列，由单个写入线程顺序追加到
+    gzip压缩的当前段。段按时间或压缩后大小轮转，文件名包含段起始的epoch秒，
+    按时间读取时先二分定位起始段，再在段内顺序扫描。当前段定期以同步刷新点写出，
+    读取方可以读到刷新点之前的全部记录。
+    """
+
+    def __init__(self, directory='data/monitoring/metrics', segment_seconds=3600,
+                 segment_bytes=64 * 1024 * 1024, retention_days=30,
+                 flush_interval=5, queue_size=10000):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_bytes
+        self.retention_days = retention_days
+        self.flush_interval = flush_interval
+
+        self.is_running = False
+        self.writer_thread = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._raw = None
+        self._gzip = None
+        self._segment_start = 0
+
+        self.stats = {
+            'records_written': 0,
+            'records_dropped': 0,
+            'segments_created': 0,
+            'segments_deleted': 0
+        }
+
+        os.makedirs(directory, exist_ok=True)
+
+    def start_log(self):
+        """启动写入线程"""
+        if not self.is_running:
+            self.is_running = True
+            self.writer_thread = threading.Thread(target=self._writer_worker)
+            self.writer_thread.daemon = True
+            self.writer_thread.start()
+            logger.info(f"监控指标日志已启动: {self.directory}")
+
+    def stop_log(self):
+        """停止写入线程并关闭当前段"""
+        if self.is_running:
+            self.is_running = False
+            try:
+                # 放入空项唤醒写入线程
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+            if self.writer_thread:
+                self.writer_thread.join(timeout=10)
+            logger.info("监控指标日志已停止")
+
+    def append(self, record, ts=None):
+        """追加一条记录（在调用线程序列化，写盘在后台完成）"""
+        ts = ts or time.time()
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        try:
+            # 时间戳放在行首，读取时无需解析整行即可按时间过滤
+            self._queue.put_nowait((ts, f'{{"ts":{ts:.3f},{line[1:]}\n'.encode('utf-8')))
+            return True
+        except queue.Full:
+            self.stats['records_dropped'] += 1
+            return False
+
+    def _writer_worker(self):
+        last_flush = time.time()
+        last_retention = 0
+        try:
+            while self.is_running or not self._queue.empty():
+                try:
+                    item = self._queue.get(timeout=1)
+                    if item is not None:
+                        self._write(*item)
+                except queue.Empty:
+                    pass
+                except Exception as e:
+                    logger.error(f"写入监控指标日志失败: {str(e)}")
+                    time.sleep(1)
+
+                current_time = time.time()
+                if self._gzip and current_time - last_flush >= self.flush_interval:
+                    self._gzip.flush(zlib.Z_SYNC_FLUSH)
+                    last_flush = current_time
+                if current_time - last_retention >= 3600:
+                    self.delete_expired_segments()
+                    last_retention = current_time
+        finally:
+            self._close_segment()
+
+    def _write(self, ts, line):
+        if self._gzip is None or ts >= self._segment_start + self.segment_seconds \
+                or self._raw.tell() >= self.segment_bytes:
+            self._open_segment(ts)
+        self._gzip.write(line)
+        self.stats['records_written'] += 1
+
+    def _open_segment(self, ts):
+        """关闭当前段，以记录时间为起点开启新段"""
+        self._close_segment()
+        start = int(ts)
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{start}{SEGMENT_SUFFIX}")
+        self._raw = open(path, 'ab')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='ab')
+        self._segment_start = start - start % self.segment_seconds if self.segment_seconds else start
+        self.stats['segments_created'] += 1
+
+    def _close_segment(self):
+        if self._gzip is not None:
+            self._gzip.close()
+            self._raw.close()
+            self._gzip = None
+            self._raw = None
+
+    def segments(self):
+        """按起始时间排序的段列表 [(起始epoch秒, 路径)]"""
+        result = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                start = name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+                if start.isdigit():
+                    result.append((int(start), os.path.join(self.directory, name)))
+        result.sort()
+        return result
+
+    def delete_expired_segments(self):
+        """删除超过保留期限的段（按下一段的起始时间判断段内最后的记录时间）"""
+        cutoff = time.time() - self.retention_days * 86400
+        segments = self.segments()
+        for (start, path), (next_start, _) in zip(segments, segments[1:]):
+            if next_start > cutoff:
+                break
+            try:
+                os.remove(path)
+                self.stats['segments_deleted'] += 1
+                logger.info(f"已删除过期监控指标段: {path}")
+            except OSError as e:
+                logger.error(f"删除监控指标段失败: {str(e)}")
+
+    def read(self, start=None, end=None, limit=None):
+        """按时间顺序读取 [start, end) 范围内的记录"""
+        segments = self.segments()
+        if start is not None:
+            # 定位到包含start的段：起始时间不大于start的最后一段
+            first = max(bisect.bisect_right([s for s, _ in segments], start) - 1, 0)
+            segments = segments[first:]
+        count = 0
+        for segment_start, path in segments:
+            if end is not None and segment_start >= end:
+                break
+            for record in self._read_segment(path, start, end):
+                yield record
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+    def _read_segment(self, path, start, end):
+        try:
+            with gzip.open(path, 'rb') as f:
+                for line in _complete_lines(f):
+                    # 行首固定为 {"ts":<epoch>, 先按时间过滤再解析整行
+                    ts = float(line[6:line.index(b',', 6)])
+                    if start is not None and ts < start:
+                        continue
+                    if end is not None and ts >= end:
+                        return
+                    yield json.loads(line)
+        except OSError as e:
+            logger.error(f"读取监控指标段失败: {path}: {str(e)}")
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['queue_size'] = self._queue.qsize()
+        stats['segments'] = len(self.segments())
+        return stats
+
+
+def _complete_lines(f):
+    """逐行读取gzip流；正在写入的段末尾不完整时停止"""
+    try:
+        for line in f:
+            if line.endswith(b'\n'):
+                yield line
+    except EOFError:
+        return
+
+
+# 用于测试
+if __name__ == "__main__":
+    import random
+    import tempfile
+    logging.basicConfig(level=logging.INFO)
+
+    directory = tempfile.mkdtemp()
+    metrics_log = MetricsLog(directory, segment_seconds=3600)
+    metrics_log.start_log()
+
+    # 模拟两天的每秒监控记录
+    now = int(time.time()) - 2 * 86400
+    count = 2 * 86400
+    start = time.time()
+    for i in range(count):
+        ts = now + i
+        while not metrics_log.append({
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts)),
+            'traffic_in': random.randint(100, 1500) * 1024,
+            'traffic_out': random.randint(50, 800) * 1024,
+            'connections': random.randint(10, 100),
+            'protocol_stats': {'TCP': i * 3, 'UDP': i, 'HTTP': i * 2}
+        }, ts=ts):
+            time.sleep(0.01)
+    metrics_log.stop_log()
+    elapsed = time.time() - start
+    size = sum(os.path.getsize(path) for _, path in metrics_log.segments())
+    print(f"写入 {count} 条, {count / elapsed:,.0f} 条/秒, {len(metrics_log.segments())} 个段, "
+          f"共 {size / 1024:.0f} KB（{size / count:.1f} 字节/条）")
+
+    start = time.time()
+    records = list(metrics_log.read(now + 86400 + 1800, now + 86400 + 1860))
+    print(f"按时间定位读取 {len(records)} 条, 耗时 {(time.time() - start) * 1000:.1f} ms")
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import math
+import time
+import json
+import sqlite3
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# 各类事件的表前缀及字段映射（类型字段名不同）
+EVENT_KINDS = {
+    'alerts': 'alert_type',
+    'threats': 'threat_type',
+    'incidents': 'alert_type',
+}
+
+# 写入当天分区时维护的索引（按IP查询选择性高，没有索引时需扫描整个分区）
+_LIVE_INDEXES = (('src', '(src_ip)'), ('dst', '(dst_ip)'))
+# 分区不再写入后才批量建立的索引；当天分区按ID从新到旧扫描即可满足这些条件
+_DEFERRED_INDEXES = (('ts', '(ts)'), ('type', '(type, severity)'))
+
+
+def _to_epoch(value):
+    """将epoch秒或ISO时间字符串转换为epoch秒，无法解析时抛出ValueError"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        epoch = float(value)
+    else:
+        try:
+            epoch = datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            try:
+                epoch = float(value)
+            except ValueError:
+                raise ValueError(f"无效的时间: {value}") from None
+    if not math.isfinite(epoch):
+        raise ValueError(f"无效的时间: {value}")
+    return epoch
+
+
+def _dumps(event):
+    """序列化事件（安装了orjson时使用orjson），无法序列化的值转换为字符串"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(event, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(event, ensure_ascii=False, default=str)
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class EventStore:
+    """告警与威胁的持久化存储（SQLite WAL，按天分区）
+
+    写入经过有界队列由后台线程批量提交；每天的数据写入独立的分区表，
+    过期数据按整表删除。查询使用递增的事件ID作为游标，从新到旧分页。
+    事件在入队时即转换为行（JSON列已序列化），写入线程只分配ID并按大事务批量插入；
+    当天分区只维护IP索引，时间和类型索引在分区不再写入后一次性建立。
+    """
+
+    def __init__(self, db_path='data/ids_events.db', retention_days=30,
+                 batch_size=50000, flush_interval=0.5, queue_size=200000, cache_mb=64):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.cache_mb = cache_mb
+
+        self.is_running = False
+        self.writer_thread = None
+        # deque 的 append/popleft 是线程安全的，容量由 _enqueue 检查
+        self._queue = deque()
+        self._local = threading.local()
+        self._partitions = {kind: set() for kind in EVENT_KINDS}
+        self._indexed = {kind: set() for kind in EVENT_KINDS}  # 已建立延迟索引的分区
+        self._next_id = {}
+        self._committed_id = {}  # 各类事件已提交的最大ID（用于判断查询结果是否变化）
+        self._flush_event = threading.Event()
+        self._flushed = threading.Event()
+        self._day_cache = (0, 0, '')  # (当天开始, 次日开始, 分区名)
+
+        self.stats = {
+            'rows_written': 0,
+            'rows_dropped': 0,
+            'batches': 0,
+            'partitions_dropped': 0
+        }
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._load_partitions()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        # 页大小只在新建数据库时生效，较大的页减少批量插入时的页分裂
+        conn.execute('PRAGMA page_size=8192')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self):
+        """每个线程使用独立的只读连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _load_partitions(self):
+        """加载已有分区并恢复事件ID"""
+        conn = self._connect()
+        try:
+            names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+            for kind in EVENT_KINDS:
+                prefix = f"{kind}_"
+                self._partitions[kind] = {n[len(prefix):] for n in names if n.startswith(prefix) and n[len(prefix):].isdigit()}
+                self._indexed[kind] = {day for day in self._partitions[kind]
+                                       if all(f"{kind}_{day}_{name}" in indexes for name, _ in _DEFERRED_INDEXES)}
+                max_id = 0
+                for day in self._partitions[kind]:
+                    row = conn.execute(f"SELECT MAX(id) FROM {kind}_{day}").fetchone()
+                    max_id = max(max_id, row[0] or 0)
+                self._next_id[kind] = max_id + 1
+                self._committed_id[kind] = max_id
+        finally:
+            conn.close()
+
+    def start_store(self):
+        """启动后台写入线程"""
+        if not self.is_running:
+            self.is_running = True
+            self.writer_thread = threading.Thread(target=self._writer_worker)
+            self.writer_thread.daemon = True
+            self.writer_thread.start()
+            logger.info(f"事件存储已启动: {self.db_path}")
+
+    def stop_store(self):
+        """停止写入线程，写入剩余数据"""
+        if self.is_running:
+            self.is_running = False
+            self._flush_event.set()
+            if self.writer_thread:
+                self.writer_thread.join(timeout=10)
+            logger.info("事件存储已停止")
+
+    def add_alert(self, alert):
+        """写入告警（异步）"""
+        return self._enqueue('alerts', alert)
+
+    def add_threat(self, threat):
+        """写入威胁（异步）"""
+        return self._enqueue('threats', threat)
+
+    def add_incident(self, incident):
+        """写入已关闭的告警事件（异步）"""
+        return self._enqueue('incidents', incident)
+
+    def _enqueue(self, kind, event):
+        if len(self._queue) >= self.queue_size:
+            self.stats['rows_dropped'] += 1
+            return False
+        # 入队时转换为行并序列化，之后对事件字典的修改不影响已入队的数据
+        ingest_time = time.time()
+        self._queue.append((kind, ingest_time, (
+            _to_epoch(event.get('timestamp')) or ingest_time,
+            event.get('severity'),
+            event.get(EVENT_KINDS[kind]),
+            event.get('src_ip'),
+            event.get('dst_ip'),
+            _dumps(event)
+        )))
+        return True
+
+    def flush(self, timeout=5):
+        """等待队列中已有的数据写入完成"""
+        if not self.is_running:
+            return False
+        self._flushed.clear()
+        self._flush_event.set()
+        return self._flushed.wait(timeout)
+
+    def _writer_worker(self):
+        """写入线程：按批量大小或时间间隔提交"""
+        conn = self._connect()
+        conn.execute(f'PRAGMA cache_size=-{self.cache_mb * 1024}')
+        last_retention = 0
+        indexed_day = None
+        try:
+            while self.is_running or self._queue:
+                self._flush_event.wait(self.flush_interval)
+                self._flush_event.clear()
+                try:
+                    while self._queue:
+                        self._write_batch(conn)
+                    self._flushed.set()
+
+                    current_time = time.time()
+                    today = self._partition_day(current_time)
+                    if today != indexed_day:
+                        self._index_closed_partitions(conn, today)
+                        indexed_day = today
+                    if current_time - last_retention >= 3600:
+                        self.drop_expired_partitions(conn)
+                        last_retention = current_time
+                except Exception as e:
+                    logger.error(f"事件存储写入错误: {str(e)}")
+                    time.sleep(1)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn):
+        """在单个事务中写入一批事件"""
+        rows = {}
+        next_id = self._next_id
+        popleft = self._queue.popleft
+        for _ in range(self.batch_size):
+            try:
+                kind, ingest_time, row = popleft()
+            except IndexError:
+                break
+            day = self._partition_day(ingest_time)
+            event_id = next_id[kind]
+            next_id[kind] = event_id + 1
+            batch = rows.get((kind, day))
+            if batch is None:
+                batch = rows[(kind, day)] = []
+            batch.append((event_id, *row))
+
+        if not rows:
+            return
+        with conn:
+            for (kind, day), batch in rows.items():
+                if day not in self._partitions[kind]:
+                    self._create_partition(conn, kind, day)
+                conn.executemany(
+                    f"INSERT INTO {kind}_{day} (id, ts, severity, type, src_ip, dst_ip, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    batch
+                )
+                self.stats['rows_written'] += len(batch)
+        for kind, _ in rows:
+            self._committed_id[kind] = self._next_id[kind] - 1
+        self.stats['batches'] += 1
+
+    def _partition_day(self, ingest_time):
+        """计算写入时间所属的分区（缓存当天范围，避免逐条格式化）"""
+        start, end, day = self._day_cache
+        if not start <= ingest_time < end:
+            local = time.localtime(ingest_time)
+            day = time.strftime('%Y%m%d', local)
+            start = time.mktime((local.tm_year, local.tm_mon, local.tm_mday, 0, 0, 0, 0, 0, -1))
+            end = time.mktime((local.tm_year, local.tm_mon, local.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+            self._day_cache = (start, end, day)
+        return day
+
+    def _create_partition(self, conn, kind, day):
+        """创建单日分区表及写入期间维护的索引"""
+        table = f"{kind}_{day}"
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                severity TEXT,
+                type TEXT,
+                src_ip TEXT,
+                dst_ip TEXT,
+                data TEXT NOT NULL
+            )
+        """)
+        for name, columns in _LIVE_INDEXES:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_{name} ON {table} {columns}")
+        # 分区集合由查询线程无锁遍历，写入线程只替换为新集合，不原地修改
+        self._partitions[kind] = self._partitions[kind] | {day}
+
+    def _index_closed_partitions(self, conn, today):
+        """为当天之前的分区建立延迟索引（批量建索引比逐行维护快得多）"""
+        for kind in EVENT_KINDS:
+            for day in sorted(self._partitions[kind] - self._indexed[kind]):
+                if day >= today:
+                    continue
+                table = f"{kind}_{day}"
+                start = time.time()
+                with conn:
+                    for name, columns in _DEFERRED_INDEXES:
+                        conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_{name} ON {table} {columns}")
+                self._indexed[kind].add(day)
+                logger.info(f"已为分区 {table} 建立索引，耗时 {time.time() - start:.2f} 秒")
+
+    def drop_expired_partitions(self, conn=None):
+        """删除超过保留期限的分区表（与创建分区一样只在写入线程中调用）"""
+        cutoff = time.strftime('%Y%m%d', time.localtime(time.time() - self.retention_days * 86400))
+        own_conn = conn is None
+        conn = conn or self._connect()
+        try:
+            for kind in EVENT_KINDS:
+                for day in sorted(self._partitions[kind]):
+                    if day >= cutoff:
+                        break
+                    with conn:
+                        conn.execute(f"DROP TABLE IF EXISTS {kind}_{day}")
+                    self._partitions[kind] = self._partitions[kind] - {day}
+                    self._indexed[kind].discard(day)
+                    self.stats['partitions_dropped'] += 1
+                    logger.info(f"已删除过期分区: {kind}_{day}")
+        finally:
+            if own_conn:
+                conn.close()
+
+    def query(self, kind='alerts', severity=None, event_type=None, ip=None,
+              start_time=None, end_time=None, cursor=None, since=None, limit=100):
+        """按条件从新到旧查询事件，返回 (事件列表, 下一页游标)
+
+        cursor: 只返回ID小于cursor的事件（翻页）; since: 只返回ID大于since的事件（增量轮询）
+        """
+        start_time = _to_epoch(start_time)
+        end_time = _to_epoch(end_time)
+
+        conditions = []
+        params = []
+        if cursor:
+            conditions.append('id < ?')
+            params.append(int(cursor))
+        if since:
+            conditions.append('id > ?')
+            params.append(int(since))
+        if severity:
+            conditions.append('severity = ?')
+            params.append(severity)
+        if event_type:
+            conditions.append('type = ?')
+            params.append(event_type)
+        if ip:
+            conditions.append('(src_ip = ? OR dst_ip = ?)')
+            params.extend([ip, ip])
+        if start_time is not None:
+            conditions.append('ts >= ?')
+            params.append(start_time)
+        if end_time is not None:
+            conditions.append('ts < ?')
+            params.append(end_time)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        # 分区按写入日期划分，按时间范围裁剪时前后各留一天余量
+        days = sorted(self._partitions[kind], reverse=True)
+        if start_time is not None:
+            first_day = time.strftime('%Y%m%d', time.localtime(start_time - 86400))
+            days = [d for d in days if d >= first_day]
+        if end_time is not None:
+            last_day = time.strftime('%Y%m%d', time.localtime(end_time + 86400))
+            days = [d for d in days if d <= last_day]
+
+        conn = self._reader()
+        events = []
+        last_id = None
+        for day in days:
+            remaining = limit - len(events)
+            if remaining <= 0:
+                break
+            try:
+                rows = conn.execute(
+                    f"SELECT id, data FROM {kind}_{day} {where} ORDER BY id DESC LIMIT ?",
+                    params + [remaining]
+                ).fetchall()
+            except sqlite3.OperationalError:
+                # 分区已被保留策略删除
+                continue
+            for event_id, data in rows:
+                events.append(_loads(data))
+                last_id = event_id
+
+        next_cursor = last_id if len(events) >= limit else None
+        return events, next_cursor
+
+    def latest_id(self, kind='alerts'):
+        """已提交的最新事件ID"""
+        return self._committed_id.get(kind, 0)
+
+    def version(self, kind='alerts'):
+        """查询结果的版本标识：有新事件提交或分区被删除时变化"""
+        return f"{self._committed_id.get(kind, 0)}.{self.stats['partitions_dropped']}"
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['queue_size'] = len(self._queue)
+        stats['partitions'] = {kind: sorted(days) for kind, days in self._partitions.items()}
+        return stats
+
+
+# 用于测试
+if __name__ == "__main__":
+    import random
+    import tempfile
+    logging.basicConfig(level=logging.INFO)
+
+    store = EventStore(os.path.join(tempfile.mkdtemp(), 'events.db'))
+    store.start_store()
+
+    try:
+        # 写入吞吐量测试
+        count = 200000
+        start = time.time()
+        for i in range(count):
+            store.add_alert({
+                'alert_id': f"ALERT-{i}",
+                'timestamp': datetime.now().isoformat(),
+                'alert_type': random.choice(['SQL注入攻击', 'XSS攻击', 'DDoS攻击', '端口扫描']),
+                'severity': random.choice(['低', '中', '高']),
+                'src_ip': f"192.168.1.{random.randint(2, 254)}",
+                'dst_ip': f"10.0.0.{random.randint(2, 254)}"
+            })
+        store.flush(timeout=60)
+        elapsed = time.time() - start
+        print(f"写入 {count} 条, 耗时 {elapsed:.2f} 秒, {count / elapsed:,.0f} 条/秒")
+
+        # 游标分页查询
+        page, cursor = store.query(severity='高', limit=50)
+        print(f"第一页: {len(page)} 条, 下一页游标: {cursor}")
+        page, cursor = store.query(severity='高', cursor=cursor, limit=50)
+        print(f"第二页: {len(page)} 条, 下一页游标: {cursor}")
+        print(store.get_stats())
+    finally:
+        store.stop_store()
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import hmac
+import time
+import zlib
+import random
+import socket
+import struct
+import hashlib
+import logging
+import threading
+
+from ..metrics.counters import ShardedCounters
+
+logger = logging.getLogger(__name__)
+
+# 消息类型
+MSG_DELTA = 1    # 增量条目
+MSG_DIGEST = 2   # 分桶摘要（反熵）
+MSG_REQUEST = 3  # 请求指定分桶的全部条目
+
+PROTOCOL_VERSION = 2
+NUM_BUCKETS = 128       # 摘要分桶数量，128 * 8 字节可放入单个数据报
+MAX_DATAGRAM = 1400     # 避免IP分片
+
+# 报文尾部的消息认证码（共享密钥的keyed BLAKE2b，覆盖报文头和正文）
+_MAC_SIZE = 16
+# 报文头: 魔数, 协议版本, 消息类型, 发送节点ID, 条目数量
+_HEADER = struct.Struct('!2sBBIH')
+_MAGIC = b'IB'
+# 条目: 版本号, 来源节点ID, 过期时间(epoch秒, 0为永久), 是否阻止
+_ENTRY = struct.Struct('!QIIB')
+_DIGEST = struct.Struct(f'!{NUM_BUCKETS}Q')
+
+
+def _pack_ip(ip_address):
+    """将IP地址编码为 地址族字节 + 原始地址"""
+    if ':' in ip_address:
+        return b'\x06' + socket.inet_pton(socket.AF_INET6, ip_address)
+    return b'\x04' + socket.inet_pton(socket.AF_INET, ip_address)
+
+
+def _unpack_ip(data, offset):
+    """从报文中解码IP地址，返回 (IP字符串, 新偏移)"""
+    family = data[offset]
+    if family == 4:
+        return socket.inet_ntop(socket.AF_INET, data[offset + 1:offset + 5]), offset + 5
+    if family == 6:
+        return socket.inet_ntop(socket.AF_INET6, data[offset + 1:offset + 17]), offset + 17
+    raise ValueError(f"未知的地址族: {family}")
+
+
+def _bucket_of(ip_address):
+    """计算IP所属的摘要分桶"""
+    return zlib.crc32(ip_address.encode()) % NUM_BUCKETS
+
+
+def _derive_key(secret):
+    """由共享密钥派生MAC密钥（BLAKE2b密钥最长64字节）"""
+    if isinstance(secret, str):
+        secret = secret.encode()
+    return hashlib.sha256(b'ids-cluster-sync:' + secret).digest()
+
+
+def _entry_hash(ip_address, entry):
+    """计算条目的64位哈希，分桶摘要为桶内哈希的异或"""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(ip_address.encode())
+    h.update(_ENTRY.pack(*entry))
+    return int.from_bytes(h.digest(), 'big')
+
+
+class BlockListSync:
+    """多节点阻止列表同步（版本化增量 + 分桶摘要反熵，基于UDP）
+
+    每个报文带共享密钥（key，默认取环境变量 IDS_CLUSTER_KEY）的MAC，只接受来自已配置节点地址且MAC正确的报文。
+    解除阻止记录为带时间的墓碑，与过期条目一样在 gc_grace 后清理。
+    """
+
+    def __init__(self, bind_host='0.0.0.0', bind_port=9470, peers=None, node_id=None, key=None):
+        key = key if key is not None else os.environ.get('IDS_CLUSTER_KEY')
+        if not key:
+            raise ValueError("集群同步需要共享密钥（环境变量 IDS_CLUSTER_KEY）")
+        self._key = _derive_key(key)
+        self.bind_host = bind_host
+        self.bind_port = bind_port
+        self.peers = [self._parse_peer(p) for p in (peers or [])]
+        self._peer_set = set(self.peers)
+        self.node_id = node_id if node_id is not None else zlib.crc32(
+            f"{socket.gethostname()}:{bind_port}:{random.random()}".encode())
+
+        self.is_running = False
+        self.sync_thread = None
+        self.update_callback = None  # 远端变更回调: callback(ip, blocked, expiry)
+
+        self.gossip_interval = 0.2   # 反熵摘要发送间隔（秒）
+        self.gc_grace = 600          # 过期条目保留时间（秒），防止被旧副本复活
+
+        # 阻止状态: ip -> (version, origin, expiry, blocked)
+        self._entries = {}
+        self._buckets = [set() for _ in range(NUM_BUCKETS)]
+        self._digests = [0] * NUM_BUCKETS
+        self._clock = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._sock = None
+
+        # 发送（调用方线程）与接收线程同时更新，按线程分片计数
+        self.stats = ShardedCounters(('messages_sent', 'messages_received', 'messages_rejected', 'bytes_sent',
+                                      'remote_updates', 'digest_mismatches'))
+
+    @staticmethod
+    def _parse_peer(peer):
+        """解析 host:port 形式的节点地址（主机名解析为IPv4地址，与 recvfrom 返回的来源地址比较）"""
+        if isinstance(peer, tuple):
+            host, port = peer
+        else:
+            host, port = peer.rsplit(':', 1)
+        return (socket.gethostbyname(host), int(port))
+
+    def set_update_callback(self, callback):
+        """设置远端变更回调函数"""
+        self.update_callback = callback
+
+    def start_sync(self):
+        """启动同步"""
+        if not self.is_running:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            self._sock.bind((self.bind_host, self.bind_port))
+            self._sock.settimeout(0.05)
+            self.is_running = True
+            self.sync_thread = threading.Thread(target=self._sync_worker)
+            self.sync_thread.daemon = True
+            self.sync_thread.start()
+            logger.info(f"阻止列表同步已启动，监听: {self.bind_host}:{self.bind_port}，节点数: {len(self.peers)}")
+
+    def stop_sync(self):
+        """停止同步"""
+        if self.is_running:
+            self.is_running = False
+            if self.sync_thread:
+                self.sync_thread.join(timeout=2)
+            self._sock.close()
+            logger.info("阻止列表同步已停止")
+
+    def publish_block(self, ip_address, expiry=0):
+        """发布本地阻止操作"""
+        self._publish(ip_address, int(expiry or 0), True)
+
+    def publish_unblock(self, ip_address):
+        """发布本地解除阻止操作"""
+        self._publish(ip_address, None, False)
+
+    def _publish(self, ip_address, expiry, blocked):
+        with self._lock:
+            if not blocked:
+                # 墓碑保留到被覆盖的阻止条目过期之后，清理墓碑时旧副本上的阻止也已失效
+                old = self._entries.get(ip_address)
+                expiry = max(int(time.time()), old[2] if old else 0)
+            self._clock += 1
+            entry = (self._clock, self.node_id, expiry, 1 if blocked else 0)
+            self._store(ip_address, entry)
+            self._pending.append((ip_address, entry))
+
+    def _store(self, ip_address, entry):
+        """写入条目并增量更新分桶摘要（调用方持有锁）"""
+        bucket = _bucket_of(ip_address)
+        old = self._entries.get(ip_address)
+        if old is not None:
+            self._digests[bucket] ^= _entry_hash(ip_address, old)
+        self._entries[ip_address] = entry
+        self._buckets[bucket].add(ip_address)
+        self._digests[bucket] ^= _entry_hash(ip_address, entry)
+
+    def _merge(self, ip_address, entry):
+        """合并远端条目，(版本号, 来源节点) 较大者胜出"""
+        expiry = entry[2]
+        if expiry and expiry + self.gc_grace < time.time():
+            return False
+        old = self._entries.get(ip_address)
+        if old is not None and (old[0], old[1]) >= (entry[0], entry[1]):
+            return False
+        self._clock = max(self._clock, entry[0])
+        self._store(ip_address, entry)
+        return True
+
+    def _collect_garbage(self):
+        """清理过期已久的条目"""
+        cutoff = time.time() - self.gc_grace
+        with self._lock:
+            expired = [ip for ip, e in self._entries.items() if e[2] and e[2] < cutoff]
+            for ip in expired:
+                bucket = _bucket_of(ip)
+                self._digests[bucket] ^= _entry_hash(ip, self._entries.pop(ip))
+                self._buckets[bucket].discard(ip)
+
+    def _sync_worker(self):
+        """同步线程：接收报文、刷新增量、定期发送摘要"""
+        last_gossip = 0
+        last_gc = time.time()
+
+        while self.is_running:
+            try:
+                try:
+                    data, addr = self._sock.recvfrom(65535)
+                    self._handle_message(data, addr)
+                except socket.timeout:
+                    pass
+
+                self._flush_pending()
+
+                current_time = time.time()
+                if current_time - last_gossip >= self.gossip_interval and self.peers:
+                    self._send_digest(random.choice(self.peers))
+                    last_gossip = current_time
+
+                if current_time - last_gc >= 60:
+                    self._collect_garbage()
+                    last_gc = current_time
+
+            except Exception as e:
+                if self.is_running:
+                    logger.error(f"阻止列表同步错误: {str(e)}")
+
+    def _flush_pending(self):
+        """将待发送的本地增量广播给所有节点"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+        for datagram in self._encode_entries(pending):
+            for peer in self.peers:
+                self._send(datagram, peer)
+
+    def _sign(self, datagram):
+        return hashlib.blake2b(datagram, key=self._key, digest_size=_MAC_SIZE).digest()
+
+    def _send(self, datagram, peer):
+        datagram += self._sign(datagram)
+        try:
+            self._sock.sendto(datagram, peer)
+            self.stats.add({'messages_sent': 1, 'bytes_sent': len(datagram)})
+        except OSError as e:
+            logger.debug(f"发送同步报文到 {peer} 失败: {str(e)}")
+
+    def _encode_entries(self, entries):
+        """将条目打包为若干不超过 MAX_DATAGRAM 的增量报文"""
+        body = []
+        size = _HEADER.size
+        for ip_address, entry in entries:
+            record = _pack_ip(ip_address) + _ENTRY.pack(*entry)
+            if size + len(record) > MAX_DATAGRAM - _MAC_SIZE:
+                yield _HEADER.pack(_MAGIC, PROTOCOL_VERSION, MSG_DELTA, self.node_id, len(body)) + b''.join(body)
+                body = []
+                size = _HEADER.size
+            body.append(record)
+            size += len(record)
+        if body:
+            yield _HEADER.pack(_MAGIC, PROTOCOL_VERSION, MSG_DELTA, self.node_id, len(body)) + b''.join(body)
+
+    def _send_digest(self, peer):
+        with self._lock:
+            digest = _DIGEST.pack(*self._digests)
+        header = _HEADER.pack(_MAGIC, PROTOCOL_VERSION, MSG_DIGEST, self.node_id, NUM_BUCKETS)
+        self._send(header + digest, peer)
+
+    def _send_buckets(self, buckets, peer):
+        """发送指定分桶内的全部条目"""
+        with self._lock:
+            entries = [(ip, self._entries[ip]) for b in buckets for ip in self._buckets[b]]
+        for datagram in self._encode_entries(entries):
+            self._send(datagram, peer)
+
+    def _handle_message(self, data, addr):
+        """处理收到的同步报文（丢弃非配置节点发来的和MAC不正确的报文）"""
+        if addr not in self._peer_set or len(data) < _HEADER.size + _MAC_SIZE:
+            self.stats.inc('messages_rejected')
+            return
+        data, mac = data[:-_MAC_SIZE], data[-_MAC_SIZE:]
+        if not hmac.compare_digest(mac, self._sign(data)):
+            self.stats.inc('messages_rejected')
+            return
+        magic, version, msg_type, sender, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != PROTOCOL_VERSION or sender == self.node_id:
+            return
+        self.stats.inc('messages_received')
+        offset = _HEADER.size
+
+        if msg_type == MSG_DELTA:
+            changed = []
+            with self._lock:
+                for _ in range(count):
+                    ip_address, offset = _unpack_ip(data, offset)
+                    entry = _ENTRY.unpack_from(data, offset)
+                    offset += _ENTRY.size
+                    if self._merge(ip_address, entry):
+                        changed.append((ip_address, entry))
+            self.stats.inc('remote_updates', len(changed))
+            if self.update_callback:
+                for ip_address, entry in changed:
+                    self.update_callback(ip_address, bool(entry[3]), entry[2])
+
+        elif msg_type == MSG_DIGEST:
+            remote = _DIGEST.unpack_from(data, offset)
+            with self._lock:
+                diff = [i for i in range(NUM_BUCKETS) if self._digests[i] != remote[i]]
+            if diff:
+                self.stats.inc('digest_mismatches')
+                # 推送本地条目，同时拉取对端条目
+                self._send_buckets(diff, addr)
+                header = _HEADER.pack(_MAGIC, PROTOCOL_VERSION, MSG_REQUEST, self.node_id, len(diff))
+                self._send(header + bytes(diff), addr)
+
+        elif msg_type == MSG_REQUEST:
+            buckets = [b for b in data[offset:offset + count] if b < NUM_BUCKETS]
+            self._send_buckets(buckets, addr)
+
+    def is_blocked(self, ip_address):
+        """查询同步状态中IP是否处于阻止状态"""
+        entry = self._entries.get(ip_address)
+        if entry is None or not entry[3]:
+            return False
+        return not entry[2] or entry[2] > time.time()
+
+    def get_digest(self):
+        """获取当前摘要（用于比较节点是否收敛）"""
+        with self._lock:
+            return tuple(self._digests)
+
+    def get_stats(self):
+        """获取同步统计信息"""
+        stats = self.stats.snapshot()
+        stats['entries'] = len(self._entries)
+        stats['peers'] = len(self.peers)
+        return stats
+
+
+# 用于测试
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    # 在本机启动3个节点，组成全互联集群
+    ports = [19470, 19471, 19472]
+    nodes = []
+    for port in ports:
+        peers = [f"127.0.0.1:{p}" for p in ports if p != port]
+        nodes.append(BlockListSync('127.0.0.1', port, peers, key='demo-cluster-key'))
+    for node in nodes:
+        node.start_sync()
+
+    try:
+        # 在第一个节点上阻止10000个IP
+        start = time.time()
+        expiry = time.time() + 3600
+        for i in range(10000):
+            nodes[0].publish_block(f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}", expiry)
+
+        # 等待所有节点摘要一致
+        while time.time() - start < 10:
+            digests = {node.get_digest() for node in nodes}
+            if len(digests) == 1:
+                break
+            time.sleep(0.01)
+
+        print(f"收敛耗时: {time.time() - start:.3f} 秒")
+
+        # 未认证的报文（伪造的解除阻止）被丢弃
+        forged = BlockListSync('127.0.0.1', 19479, [f"127.0.0.1:{ports[1]}"], key='wrong-key')
+        forged._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        forged._sock.bind(('127.0.0.1', 19479))
+        forged.publish_unblock("10.0.0.1")
+        forged._flush_pending()
+        forged._sock.close()
+
+        # 解除阻止后墓碑同步到所有节点，原阻止过期且超过 gc_grace 后被清理
+        nodes[0].publish_block("192.0.2.1", time.time() + 1)
+        nodes[0].publish_unblock("192.0.2.1")
+        time.sleep(0.5)
+        print("伪造报文被忽略:", nodes[1].is_blocked("10.0.0.1"),
+              "解除阻止已同步:", not any(node.is_blocked("192.0.2.1") for node in nodes))
+        for node in nodes:
+            node.gc_grace = -2
+            node._collect_garbage()
+        print("墓碑已清理:", all("192.0.2.1" not in node._entries for node in nodes))
+        for node in nodes:
+            print(f"节点 {node.bind_port}: {node.get_stats()}")
+    finally:
+        for node in nodes:
+            node.stop_sync()
@@ -4,134 +4,192 @@
 import os
 import time
 import json
-import random
 import logging
 import threading
 import subprocess
 from datetime import datetime
 from collections import defaultdict
 
+from ..metrics.registry import counter, gauge
+from ..metrics.tracing import TRACER
+from ..scheduling.scheduler import SCHEDULER
+from ..simulation.load_generator import LoadGenerator
+
 logger = logging.getLogger(__name__)
 
+# 运行指标
+THREATS = counter('ids_threats_total', '检测到的威胁数量', ['type', 'severity'])
+BLOCKS = counter('ids_blocks_total', 'IP阻止次数（local为本机决策，cluster为集群同步）', ['origin'])
+UNBLOCKS = counter('ids_unblocks_total', 'IP解除阻止次数', ['origin'])
+BLOCKED_IPS = gauge('ids_blocked_ips', '当前被阻止的IP数量')
+
+def query_threat_list(threats, last_seq, severity=None, threat_type=None, ip=None, cursor=None, since=None, limit=100):
+    """在最近的威胁列表（末尾序号为last_seq）中按条件从新到旧分页查询
+
+    cursor: 只返回序号小于cursor的威胁（翻页）; since: 只返回序号大于since的威胁（增量轮询）
+    """
+    first = last_seq - len(threats) + 1
+    upper = last_seq if cursor is None else min(cursor - 1, last_seq)
+    lower = first if since is None else max(since + 1, first)
+
+    result = []
+    for seq in range(upper, lower - 1, -1):
+        threat = threats[seq - first]
+        if severity is not None and threat.get('severity') != severity:
+            continue
+        if threat_type is not None and threat.get('threat_type') != threat_type:
+            continue
+        if ip is not None and ip not in (threat.get('src_ip'), threat.get('dst_ip')):
+            continue
+        result.append(threat)
+        if len(result) >= limit:
+            return result, seq
+    return result, None
+
 class IntrusionPrevention:
     def __init__(self, mode='auto'):
         self.is_running = False
-        self.prevention_thread = None
+        self.scheduler = SCHEDULER
+        self._tasks = []
         self.mode = mode  # 'monitor', 'auto', 'strict'
         
         # 威胁数据
         self.threats = []
+        self.threat_seq = 0  # 已记录的威胁总数，threats[-1] 的序号为 threat_seq
         self.blocked_ips = set()
+        self.blocks_file = 'data/threats/blocked_ips.json'
+        self._lock = threading.Lock()        # 保护 blocked_ips（调度线程与集群同步线程同时修改）
+        self._file_lock = threading.Lock()   # 保护阻止记录文件
+        self._pending_blocks = []            # 尚未写入文件的阻止事件
         self.ip_threats = defaultdict(int)
         self.block_threshold = 3  # 默认阻止阈值
         self.block_duration = 60  # 默认阻止时间（分钟）
+        self.cluster_sync = None  # 集群阻止列表同步（可选）
+        self.event_store = None   # 持久化存储（可选）
+        self.threat_callback = None  # 威胁处理完成后的回调（可选）
         
         # 创建数据目录
         os.makedirs('data/threats', exist_ok=True)
+        
+        # 模拟威胁：默认平均每5秒0.3条；压测时换成高速率、固定种子的生成器
+        self.load_generator = LoadGenerator(rate=0.06, interval=5)
+        
+        BLOCKED_IPS.set_function(lambda: len(self.blocked_ips))
+        
+        # 阻止事件合并写盘：集群同步一次带来大量阻止时每秒最多重写一次文件
+        self._persist_task = self.scheduler.schedule(self._persist_blocks, name='IP阻止记录保存', min_gap=1)
     
     def start_prevention(self):
         """启动入侵防御"""
         if not self.is_running:
             self.is_running = True
-            self.prevention_thread = threading.Thread(target=self._prevention_worker)
-            self.prevention_thread.daemon = True
-            self.prevention_thread.start()
+            self._tasks = [
+                # 按负载生成器的调度间隔生成模拟威胁（默认每5秒）
+                self.scheduler.schedule(self._simulate_threat_detection, interval=self.load_generator.interval,
+                                        delay=0, name='威胁检测', error_delay=10),
+                # 每小时清理一次过期的IP阻止
+                self.scheduler.schedule(self._cleanup_blocks, interval=3600, name='过期阻止清理')
+            ]
             logger.info(f"入侵防御已启动，模式: {self.mode}")
     
     def stop_prevention(self):
         """停止入侵防御"""
         if self.is_running:
             self.is_running = False
-            if self.prevention_thread:
-                self.prevention_thread.join(timeout=2)
+            for task in self._tasks:
+                task.cancel()
+            self._tasks = []
+            self._persist_blocks()
             self._save_threat_data()
             logger.info("入侵防御已停止")
     
-    def _prevention_worker(self):
-        """防御工作线程"""
-        last_cleanup_time = time.time()
-        
-        while self.is_running:
-            try:
-                # 模拟检测威胁
-                self._simulate_threat_detection()
-                
-                # 每小时清理一次过期的IP阻止
-                current_time = time.time()
-                if current_time - last_cleanup_time >= 3600:  # 3600秒 = 1小时
-                    self._cleanup_blocks()
-                    last_cleanup_time = current_time
-                
-                time.sleep(5)  # 每5秒检查一次
-                
-            except Exception as e:
-                logger.error(f"入侵防御错误: {str(e)}")
-                time.sleep(10)  # 出错后等待10秒重试
+    def attach_event_store(self, event_store):
+        """接入持久化存储"""
+        self.event_store = event_store
+        logger.info("入侵防御已接入持久化存储")
+    
+    def set_threat_callback(self, callback):
+        """设置威胁回调（例如数据面进程把威胁转发给控制面）"""
+        self.threat_callback = callback
+    
+    def attach_cluster_sync(self, cluster_sync):
+        """接入集群阻止列表同步"""
+        self.cluster_sync = cluster_sync
+        cluster_sync.set_update_callback(self._apply_cluster_update)
+        logger.info("入侵防御已接入集群同步")
+    
+    def _apply_cluster_update(self, ip_address, blocked, expiry):
+        """应用其他节点同步过来的阻止状态"""
+        if blocked:
+            if not expiry or expiry > time.time():
+                self.block_ip(ip_address, 'cluster', replicate=False, expiry=expiry or None)
+        else:
+            self.unblock_ip(ip_address, replicate=False)
+    
+    def set_load_generator(self, load_generator):
+        """设置生成模拟威胁的负载生成器（需在启动前设置）"""
+        self.load_generator = load_generator
     
     def _simulate_threat_detection(self):
-        """模拟威胁检测（用于演示）"""
-        # 30%的概率生成威胁
-        if random.random() < 0.3:
-            threat_types = [
-                'SQL注入', 'XSS攻击', 'DDoS攻击', '端口扫描', 
-                '暴力破解', '异常流量', '病毒/木马'
-            ]
-            
-            threat_type = random.choice(threat_types)
-            severity = random.choice(['低', '中', '高'])
-            src_ip = f"192.168.1.{random.randint(2, 254)}"
-            dst_ip = f"10.0.0.{random.randint(2, 254)}"
-            
-            # 创建威胁数据
-            threat = {
-                'threat_id': f"THREAT-{int(time.time())}-{random.randint(1000, 9999)}",
-                'timestamp': datetime.now().isoformat(),
-                'threat_type': threat_type,
-                'severity': severity,
-                'src_ip': src_ip,
-                'dst_ip': dst_ip,
-                'port': random.randint(1, 65535),
-                'protocol': random.choice(['TCP', 'UDP', 'HTTP']),
-                'details': f"检测到{threat_type}攻击尝试",
-                'blocked': False,
-                'action_taken': '监控'
-            }
-            
-            # 添加到威胁列表
-            self.threats.append(threat)
-            
-            # 限制威胁列表大小
-            if len(self.threats) > 1000:
-                self.threats = self.threats[-1000:]
-            
-            # 增加IP威胁计数
-            self.ip_threats[src_ip] += 1
-            
-            # 根据防御模式执行操作
-            if self.mode != 'monitor':
-                # 自动模式：超过阈值自动阻止
-                if self.mode == 'auto' and self.ip_threats[src_ip] >= self.block_threshold:
-                    self.block_ip(src_ip, threat['threat_id'])
-                    threat['blocked'] = True
-                    threat['action_taken'] = '已阻止'
-                
-                # 严格模式：高危威胁直接阻止
-                elif self.mode == 'strict' and severity == '高':
-                    self.block_ip(src_ip, threat['threat_id'])
-                    threat['blocked'] = True
-                    threat['action_taken'] = '已阻止'
-            
-            logger.info(f"检测到威胁: {threat_type}, 来源: {src_ip}, 严重性: {severity}, 操作: {threat['action_taken']}")
+        """按负载生成器的速率生成模拟威胁（用于演示和压测）"""
+        generator = self.load_generator
+        for threat in generator.threats(generator.due()):
+            self.process_threat(threat)
     
-    def block_ip(self, ip_address, threat_id=None):
-        """阻止指定的IP地址"""
-        if ip_address in self.blocked_ips:
-            return False
+    def process_threat(self, threat):
+        """记录威胁，并根据防御模式决定是否阻止来源IP"""
+        owner = TRACER.begin()
+        threat_type = threat['threat_type']
+        severity = threat['severity']
+        src_ip = threat['src_ip']
         
-        try:
+        # 添加到威胁列表
+        self.threats.append(threat)
+        self.threat_seq += 1
+        THREATS.labels(threat_type, severity).inc()
+        TRACER.mark('detect')
+        
+        # 限制威胁列表大小
+        if len(self.threats) > 1000:
+            self.threats = self.threats[-1000:]
+        
+        # 增加IP威胁计数
+        self.ip_threats[src_ip] += 1
+        TRACER.mark('score')
+        
+        # 根据防御模式执行操作
+        if self.mode != 'monitor':
+            # 自动模式：超过阈值自动阻止
+            if self.mode == 'auto' and self.ip_threats[src_ip] >= self.block_threshold:
+                self.block_ip(src_ip, threat['threat_id'])
+                threat['blocked'] = True
+                threat['action_taken'] = '已阻止'
+            
+            # 严格模式：高危威胁直接阻止
+            elif self.mode == 'strict' and severity == '高':
+                self.block_ip(src_ip, threat['threat_id'])
+                threat['blocked'] = True
+                threat['action_taken'] = '已阻止'
+        
+        # 写入持久化存储（后台批量提交）
+        if self.event_store:
+            self.event_store.add_threat(threat)
+        if self.threat_callback:
+            self.threat_callback(threat)
+        
+        logger.info(f"检测到威胁: {threat_type}, 来源: {src_ip}, 严重性: {severity}, 操作: {threat['action_taken']}")
+        TRACER.end(owner)
+    
+    def block_ip(self, ip_address, threat_id=None, replicate=True, expiry=None):
+        """阻止指定的IP地址（expiry为集群同步来的过期时间，默认按 block_duration 计算）"""
+        with self._lock:
+            if ip_address in self.blocked_ips:
+                return False
             # 记录阻止操作
             self.blocked_ips.add(ip_address)
-            
+        
+        TRACER.mark('block_decision')
+        try:
             # 实际环境中，这里应该调用系统防火墙命令阻止IP
             if os.name == 'posix':  # Linux/Mac系统
                 # 这里仅为示例，实际使用时应确保命令安全
@@ -142,36 +200,30 @@ class IntrusionPrevention:
                 #                 'name=IDS_Block', 'dir=in', 'action=block', f'remoteip={ip_address}'])
                 pass
             
+            TRACER.mark('firewall_flush')
             logger.info(f"已阻止IP地址: {ip_address}")
+            BLOCKS.labels('local' if replicate else 'cluster').inc()
             
-            # 记录阻止事件
+            # 记录阻止事件（集群同步的阻止沿用来源节点的过期时间，各节点同时解除）
+            now = datetime.now()
+            if expiry is None:
+                expiry = now.timestamp() + self.block_duration * 60
             block_event = {
                 'ip': ip_address,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now.isoformat(),
                 'threat_id': threat_id,
-                'duration': self.block_duration,
-                'expiry': datetime.now().timestamp() + self.block_duration * 60
+                'duration': max(0, round((expiry - now.timestamp()) / 60)),
+                'expiry': expiry
             }
             
-            # 保存阻止事件
-            try:
-                blocks_file = 'data/threats/blocked_ips.json'
-                blocks = []
-                
-                if os.path.exists(blocks_file):
-                    with open(blocks_file, 'r') as f:
-                        try:
-                            blocks = json.load(f)
-                        except json.JSONDecodeError:
-                            blocks = []
-                
-                blocks.append(block_event)
-                
-                with open(blocks_file, 'w') as f:
-                    json.dump(blocks, f, indent=2)
+            # 保存阻止事件（由调度线程合并写入）
+            with self._lock:
+                self._pending_blocks.append(block_event)
+            self._persist_task.wake()
             
-            except Exception as e:
-                logger.error(f"保存IP阻止记录失败: {str(e)}")
+            # 同步到集群中的其他节点
+            if replicate and self.cluster_sync:
+                self.cluster_sync.publish_block(ip_address, block_event['expiry'])
             
             return True
         
@@ -179,15 +231,15 @@ class IntrusionPrevention:
             logger.error(f"阻止IP地址失败: {str(e)}")
             return False
     
-    def unblock_ip(self, ip_address):
+    def unblock_ip(self, ip_address, replicate=True):
         """解除对IP地址的阻止"""
-        if ip_address not in self.blocked_ips:
-            return False
-        
-        try:
+        with self._lock:
+            if ip_address not in self.blocked_ips:
+                return False
             # 从阻止集合中移除
             self.blocked_ips.remove(ip_address)
-            
+        
+        try:
             # 实际环境中，这里应该调用系统防火墙命令解除阻止
             if os.name == 'posix':  # Linux/Mac系统
                 # subprocess.run(['iptables', '-D', 'INPUT', '-s', ip_address, '-j', 'DROP'])
@@ -198,39 +250,73 @@ class IntrusionPrevention:
                 pass
             
             logger.info(f"已解除对IP地址的阻止: {ip_address}")
+            UNBLOCKS.labels('local' if replicate else 'cluster').inc()
+            
+            # 同步到集群中的其他节点
+            if replicate and self.cluster_sync:
+                self.cluster_sync.publish_unblock(ip_address)
+            
             return True
         
         except Exception as e:
             logger.error(f"解除IP地址阻止失败: {str(e)}")
             return False
     
+    def _persist_blocks(self):
+        """把尚未保存的阻止事件追加到阻止记录文件"""
+        with self._lock:
+            pending, self._pending_blocks = self._pending_blocks, []
+        if not pending:
+            return
+        
+        try:
+            with self._file_lock:
+                blocks = []
+                if os.path.exists(self.blocks_file):
+                    with open(self.blocks_file, 'r') as f:
+                        try:
+                            blocks = json.load(f)
+                        except json.JSONDecodeError:
+                            blocks = []
+                
+                blocks.extend(pending)
+                
+                # 先写临时文件再替换，读取方不会读到写了一半的文件
+                tmp_file = self.blocks_file + '.tmp'
+                with open(tmp_file, 'w') as f:
+                    json.dump(blocks, f, indent=2)
+                os.replace(tmp_file, self.blocks_file)
+        
+        except Exception as e:
+            logger.error(f"保存IP阻止记录失败: {str(e)}")
+    
     def _cleanup_blocks(self):
         """清理过期的IP阻止"""
         current_time = time.time()
-        blocks_file = 'data/threats/blocked_ips.json'
+        self._persist_blocks()
         
         try:
-            if os.path.exists(blocks_file):
-                with open(blocks_file, 'r') as f:
-                    try:
-                        blocks = json.load(f)
-                    except json.JSONDecodeError:
-                        blocks = []
-                
-                # 找出过期的阻止
-                expired_blocks = [b for b in blocks if b.get('expiry', 0) <= current_time]
-                active_blocks = [b for b in blocks if b.get('expiry', 0) > current_time]
-                
-                # 解除过期的阻止
-                for block in expired_blocks:
-                    if block['ip'] in self.blocked_ips:
+            with self._file_lock:
+                if os.path.exists(self.blocks_file):
+                    with open(self.blocks_file, 'r') as f:
+                        try:
+                            blocks = json.load(f)
+                        except json.JSONDecodeError:
+                            blocks = []
+                    
+                    # 找出过期的阻止
+                    expired_blocks = [b for b in blocks if b.get('expiry', 0) <= current_time]
+                    active_blocks = [b for b in blocks if b.get('expiry', 0) > current_time]
+                    
+                    # 解除过期的阻止
+                    for block in expired_blocks:
                         self.unblock_ip(block['ip'])
-                
-                # 更新阻止文件
-                with open(blocks_file, 'w') as f:
-                    json.dump(active_blocks, f, indent=2)
-                
-                logger.info(f"已清理 {len(expired_blocks)} 个过期的IP阻止")
+                    
+                    # 更新阻止文件
+                    with open(self.blocks_file, 'w') as f:
+                        json.dump(active_blocks, f, indent=2)
+                    
+                    logger.info(f"已清理 {len(expired_blocks)} 个过期的IP阻止")
         
         except Exception as e:
             logger.error(f"清理过期IP阻止失败: {str(e)}")
@@ -238,6 +324,11 @@ class IntrusionPrevention:
     def _save_threat_data(self):
         """保存威胁数据到文件"""
         try:
+            # 已接入持久化存储时威胁已逐条写入，无需导出快照
+            if self.event_store:
+                self.event_store.flush()
+                return
+            
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f'data/threats/threats_{timestamp}.json'
             
@@ -284,9 +375,14 @@ class IntrusionPrevention:
         """获取最近的威胁数据"""
         return self.threats[-limit:] if self.threats else []
     
+    def query_threats(self, severity=None, threat_type=None, ip=None, cursor=None, since=None, limit=100):
+        """按条件从新到旧分页查询最近的威胁，返回 (威胁列表, 下一页游标)"""
+        return query_threat_list(self.threats, self.threat_seq, severity, threat_type, ip, cursor, since, limit)
+    
     def get_blocked_ips(self):
         """获取当前被阻止的IP列表"""
-        return list(self.blocked_ips)
+        with self._lock:
+            return list(self.blocked_ips)
     
     def get_ip_threat_count(self, ip_address):
         """获取特定IP的威胁计数"""
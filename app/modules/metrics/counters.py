@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from .registry import _ShardedCells
+
+
+class ShardedCounters:
+    """一组命名计数：按线程分片累加，读取时汇总为一致的快照
+
+    inc() 只写当前线程的分片，不加锁，多个线程的热点路径互不争用；
+    add() 一次更新多个计数，快照中这些更新要么全部可见，要么全部不可见；
+    热点路径上固定的增量先用 prepare() 转换为下标，再用 apply() 更新，省去每次的字典构造和字段查找。
+    max_fields 中的字段记录最大值（如最大延迟），汇总时取各分片的最大值，其余字段求和。
+    """
+
+    def __init__(self, fields, max_fields=()):
+        self.fields = tuple(fields) + tuple(f for f in max_fields if f not in fields)
+        # 分片第0项为版本号
+        self._index = {field: i for i, field in enumerate(self.fields, 1)}
+        self._shards = _ShardedCells(len(self.fields) + 1, versioned=True,
+                                     max_indexes=[self._index[f] for f in max_fields])
+        self._local = self._shards._local
+
+    def _cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            return self._shards.cell()
+
+    def inc(self, field, amount=1):
+        """增加一个计数"""
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._shards.cell()
+        cell[self._index[field]] += amount
+
+    def add(self, deltas):
+        """同时增加多个计数 {字段: 增量}"""
+        index = self._index
+        cell = self._cell()
+        cell[0] += 1
+        try:
+            for field, amount in deltas.items():
+                cell[index[field]] += amount
+        finally:
+            cell[0] += 1
+
+    def prepare(self, deltas):
+        """把 {字段: 增量} 转换为 apply() 使用的 ((下标, 增量), ...)，字段不存在时抛出KeyError"""
+        return tuple((self._index[field], amount) for field, amount in deltas.items())
+
+    def apply(self, prepared):
+        """同时增加 prepare() 转换过的多个计数，快照中全部可见或全部不可见"""
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._shards.cell()
+        # 下标已在 prepare() 中校验，更新过程不会抛出异常，版本号总能恢复为偶数
+        cell[0] += 1
+        for i, amount in prepared:
+            cell[i] += amount
+        cell[0] += 1
+
+    def observe_max(self, field, value):
+        """记录最大值字段"""
+        cell = self._cell()
+        i = self._index[field]
+        if value > cell[i]:
+            cell[i] = value
+
+    def snapshot(self):
+        """所有计数的一致快照 {字段: 值}"""
+        return dict(zip(self.fields, self._shards.totals()[1:]))
+
+    def __getitem__(self, field):
+        return self.snapshot()[field]
+
+    def total(self):
+        """所有求和字段之和"""
+        snapshot = self.snapshot()
+        return sum(snapshot[f] for f in self.fields if self._index[f] not in self._shards.max_indexes)
+
+
+# 用于测试
+if __name__ == "__main__":
+    import threading
+
+    stats = ShardedCounters(('total', 'tcp', 'udp'), max_fields=('max_size',))
+
+    deltas = {t: stats.prepare({'total': 1, t: 1}) for t in ('tcp', 'udp')}
+
+    def worker(seed):
+        for i in range(100000):
+            stats.apply(deltas['tcp' if (i + seed) % 3 else 'udp'])
+            stats.observe_max('max_size', (i * seed) % 1500)
+
+    threads = [threading.Thread(target=worker, args=(s,)) for s in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    inconsistent = 0
+    while any(thread.is_alive() for thread in threads):
+        snapshot = stats.snapshot()
+        if snapshot['total'] != snapshot['tcp'] + snapshot['udp']:
+            inconsistent += 1
+    for thread in threads:
+        thread.join()
+    print(stats.snapshot(), f"不一致的快照: {inconsistent}")
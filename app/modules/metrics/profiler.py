@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# 路径显示为相对 app 目录（项目外的文件只保留最后两级）
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 线程阻塞等待时栈顶所在的文件，skip_idle 时不计入
+_IDLE_FILES = ('threading.py', 'selectors.py', 'queue.py', 'socketserver.py', 'connection.py')
+
+
+def _short_path(filename):
+    if filename.startswith(_APP_ROOT + os.sep):
+        return filename[len(_APP_ROOT) + 1:]
+    return os.sep.join(filename.split(os.sep)[-2:])
+
+
+class SamplingProfiler:
+    """按需启动的采样分析器：定时抓取所有线程的调用栈，输出折叠栈（flamegraph.pl / speedscope 格式）
+
+    只在 start() 后的 duration 秒内由一个采样线程运行，其余时间没有线程、钩子或计数，开销为零。
+    采样只读取 sys._current_frames()，不在被分析的线程中插桩；栈按代码对象聚合，结束后才格式化为文本。
+    协程模式（eventlet/gevent）下所有绿色线程共用一个系统线程，只能采到当前正在运行的那一个。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stacks = Counter()
+        self._labels = {}
+        self.status = {'running': False, 'samples': 0}
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=10, interval=0.01, skip_idle=False):
+        """开始采样duration秒（每interval秒一次），已在采样时返回False"""
+        with self._lock:
+            if self.is_running:
+                return False
+            self._stop.clear()
+            self._stacks = Counter()
+            self._labels = {}
+            self.status = {
+                'running': True,
+                'started': time.time(),
+                'duration': duration,
+                'interval': interval,
+                'skip_idle': skip_idle,
+                'samples': 0,
+                'elapsed': 0.0,
+                'sampler_cpu_seconds': 0.0
+            }
+            self._thread = threading.Thread(target=self._run, args=(duration, interval, skip_idle),
+                                            name='采样分析器', daemon=True)
+            self._thread.start()
+        logger.info(f"采样分析已启动: {duration} 秒，间隔 {interval * 1000:.0f} ms")
+        return True
+
+    def stop(self, timeout=5):
+        """提前结束采样并等待采样线程退出"""
+        thread = self._thread
+        if thread is None:
+            return False
+        self._stop.set()
+        thread.join(timeout)
+        return True
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = \
+                f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+        return label
+
+    def _run(self, duration, interval, skip_idle):
+        own = threading.get_ident()
+        stacks = self._stacks
+        status = self.status
+        start = time.monotonic()
+        cpu_start = time.thread_time()
+        deadline = start + duration
+        names = {}
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            if frames.keys() - names.keys():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                if skip_idle and os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                stacks[(names.get(ident, f"thread-{ident}"), tuple(codes))] += 1
+            status['samples'] += 1
+            status['elapsed'] = time.monotonic() - start
+            status['sampler_cpu_seconds'] = time.thread_time() - cpu_start
+        status['running'] = False
+        logger.info(f"采样分析已结束: {status['samples']} 次采样，采样线程CPU {status['sampler_cpu_seconds']:.3f} 秒")
+
+    def collapsed(self):
+        """折叠栈文本：每行为 "线程;外层函数;...;内层函数 次数"，按次数降序"""
+        merged = Counter()
+        for (thread_name, codes), count in list(self._stacks.items()):
+            merged[';'.join([thread_name.replace(';', ':')] + [self._label(code) for code in reversed(codes)])] += count
+        return ''.join(f"{stack} {count}\n" for stack, count in merged.most_common())
+
+    def top_functions(self, limit=20):
+        """按采样次数排序的函数：(函数, 自身次数, 累计次数)"""
+        own, total = Counter(), Counter()
+        for (_, codes), count in list(self._stacks.items()):
+            own[codes[0]] += count
+            for code in set(codes):
+                total[code] += count
+        return [(self._label(code), own[code], count) for code, count in total.most_common(limit)]
+
+    def get_status(self):
+        status = dict(self.status)
+        status['running'] = self.is_running
+        status['stacks'] = len(self._stacks)
+        return status
+
+
+class MemoryProfiler:
+    """按需开启的 tracemalloc 内存分析：快照、TOP分配位置和两次快照之间的增长
+
+    tracemalloc 未开启时没有任何开销；开启后每次分配都要记录调用栈（frames 层），
+    会明显变慢并占用额外内存，诊断结束后应调用 stop()。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline = None
+        self._baseline_time = None
+
+    @property
+    def is_tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=10):
+        """开启内存分配追踪，已开启时返回False"""
+        with self._lock:
+            if tracemalloc.is_tracing():
+                return False
+            tracemalloc.start(frames)
+            self._baseline = None
+            logger.info(f"内存分配追踪已开启，记录 {frames} 层调用栈")
+            return True
+
+    def stop(self):
+        """关闭追踪并释放快照"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                return False
+            tracemalloc.stop()
+            self._baseline = None
+            self._baseline_time = None
+            logger.info("内存分配追踪已关闭")
+            return True
+
+    def _take(self):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("内存分配追踪未开启")
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+    def snapshot(self, limit=20, group_by='lineno'):
+        """拍摄快照作为之后 diff() 的基线，返回当前的TOP分配位置"""
+        snapshot = self._take()
+        with self._lock:
+            self._baseline = snapshot
+            self._baseline_time = time.time()
+        return self._format(snapshot.statistics(group_by)[:limit], group_by)
+
+    def top(self, limit=20, group_by='lineno'):
+        """当前的TOP分配位置（不改变基线）"""
+        return self._format(self._take().statistics(group_by)[:limit], group_by)
+
+    def diff(self, limit=20, group_by='lineno'):
+        """当前与基线快照相比增长最多的分配位置"""
+        baseline = self._baseline
+        if baseline is None:
+            raise RuntimeError("没有基线快照，请先拍摄快照")
+        return self._format(self._take().compare_to(baseline, group_by)[:limit], group_by)
+
+    def _format(self, stats, group_by):
+        result = []
+        for stat in stats:
+            frame = stat.traceback[0]
+            item = {
+                'site': f"{_short_path(frame.filename)}:{frame.lineno}",
+                'size_kb': round(stat.size / 1024, 1),
+                'count': stat.count
+            }
+            if hasattr(stat, 'size_diff'):
+                item['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+                item['count_diff'] = stat.count_diff
+            if group_by == 'traceback':
+                item['traceback'] = [f"{_short_path(f.filename)}:{f.lineno}" for f in stat.traceback]
+            result.append(item)
+        return result
+
+    def get_status(self):
+        status = {'tracing': tracemalloc.is_tracing(), 'baseline_time': self._baseline_time}
+        if status['tracing']:
+            current, peak = tracemalloc.get_traced_memory()
+            status.update(traceback_limit=tracemalloc.get_traceback_limit(),
+                          traced_kb=round(current / 1024, 1), traced_peak_kb=round(peak / 1024, 1),
+                          overhead_kb=round(tracemalloc.get_tracemalloc_memory() / 1024, 1))
+        return status
+
+
+# 全局分析器
+PROFILER = SamplingProfiler()
+MEMORY_PROFILER = MemoryProfiler()
+
+
+# 用于测试
+if __name__ == "__main__":
+    def busy():
+        total = 0
+        for i in range(3000000):
+            total += i * i
+        return total
+
+    def leak(store):
+        for i in range(20000):
+            store.append({'seq': i, 'payload': 'x' * 64})
+
+    worker = threading.Thread(target=lambda: [busy() for _ in range(3)], name='计算线程')
+    worker.start()
+    PROFILER.start(duration=2, interval=0.005)
+    worker.join()
+    PROFILER.stop()
+    print("采样状态:", PROFILER.get_status())
+    print(PROFILER.collapsed()[:600])
+    for name, own, total in PROFILER.top_functions(5):
+        print(f"  {own:>5} {total:>5}  {name}")
+
+    MEMORY_PROFILER.start()
+    MEMORY_PROFILER.snapshot()
+    store = []
+    leak(store)
+    print("内存增长:")
+    for item in MEMORY_PROFILER.diff(limit=3):
+        print("  ", item)
+    print(MEMORY_PROFILER.get_status())
+    MEMORY_PROFILER.stop()
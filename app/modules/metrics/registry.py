@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import math
+import time
+import bisect
+import threading
+
+# 默认的延迟直方图分桶（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _ShardedCells:
+    """每个线程独占一个累加单元，写入时不加锁，采集时求和
+
+    单元只由所属线程写入，因此 cell[i] += n 不会与其他线程冲突。
+    线程结束后其单元在采集时合并到基础值中并释放。
+    versioned 为True时单元第0项为版本号：写入线程一次更新多项时先后将其加1，
+    采集时跳过版本号为奇数（正在更新）的单元状态。max_indexes 中的项按最大值汇总。
+    """
+
+    def __init__(self, width, versioned=False, max_indexes=()):
+        self.width = width
+        self.versioned = versioned
+        self.max_indexes = frozenset(max_indexes)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cells = []           # [(线程, 单元)]
+        self._retired = [0] * width
+
+    def cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = [0] * self.width
+            with self._lock:
+                self._cells.append((threading.current_thread(), cell))
+            return cell
+
+    def _read(self, cell):
+        # list() 在持有GIL时一次复制完成
+        values = list(cell)
+        while self.versioned and values[0] & 1:
+            # 所属线程正在更新多项，让出执行权等它完成
+            time.sleep(0)
+            values = list(cell)
+        return values
+
+    def _merge(self, totals, values):
+        if self.max_indexes:
+            for i, value in enumerate(values):
+                if i in self.max_indexes:
+                    if value > totals[i]:
+                        totals[i] = value
+                else:
+                    totals[i] += value
+        else:
+            for i, value in enumerate(values):
+                totals[i] += value
+
+    def totals(self):
+        with self._lock:
+            alive = []
+            snapshots = []
+            for thread, cell in self._cells:
+                if thread.is_alive():
+                    alive.append((thread, cell))
+                    snapshots.append(self._read(cell))
+                else:
+                    self._merge(self._retired, self._read(cell))
+            self._cells = alive
+            totals = list(self._retired)
+            for values in snapshots:
+                self._merge(totals, values)
+        return totals
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _ShardedCells(1)
+        self._local = self._shards._local
+
+    def inc(self, amount=1):
+        try:
+            self._local.cell[0] += amount
+        except AttributeError:
+            self._shards.cell()[0] += amount
+
+    def value(self):
+        return self._shards.totals()[0]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+        self._function = None
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, function):
+        """采集时调用函数获取当前值"""
+        self._function = function
+
+    def value(self):
+        return self._function() if self._function else self._value
+
+
+class _HistogramChild:
+    def __init__(self, upper_bounds):
+        self.upper_bounds = upper_bounds
+        # 各桶计数（不累积，最后一个为+Inf）及观测值之和
+        self._shards = _ShardedCells(len(upper_bounds) + 2)
+        self._local = self._shards._local
+        self._sum_index = len(upper_bounds) + 1
+
+    def observe(self, value):
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._shards.cell()
+        cell[bisect.bisect_left(self.upper_bounds, value)] += 1
+        cell[self._sum_index] += value
+
+    def time(self):
+        """计时上下文：with histogram.time(): ..."""
+        return _Timer(self)
+
+    def value(self):
+        totals = self._shards.totals()
+        return totals[:-1], totals[-1]
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _Metric:
+    """带标签的指标，labels() 返回子指标；无标签时直接调用子指标方法"""
+
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """获取标签值对应的子指标（热点路径应缓存返回值）"""
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要标签: {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def children(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def total(self):
+        """所有子指标的值之和"""
+        return sum(child.value() for _, child in self.children())
+
+    def _label_text(self, values, extra=None):
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.metric_type}")
+        for values, child in self.children():
+            lines.append(f"{self.name}{self._label_text(values)} {_format(child.value())}")
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default.set(value)
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.upper_bounds = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def total(self):
+        return sum(sum(child.value()[0]) for _, child in self.children())
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for values, child in self.children():
+            counts, total_sum = child.value()
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (math.inf,), counts):
+                cumulative += count
+                le = '+Inf' if bound == math.inf else _format(bound)
+                lines.append(f"{self.name}_bucket{self._label_text(values, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {_format(total_sum)}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+
+
+class MetricsRegistry:
+    """指标注册表，按Prometheus文本格式输出，输出结果短时间缓存"""
+
+    def __init__(self, cache_seconds=1.0):
+        self.cache_seconds = cache_seconds
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._cache = (0, '')
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为其他类型")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """生成文本格式输出（缓存cache_seconds秒，频繁抓取时不重复汇总）"""
+        rendered_at, text = self._cache
+        now = time.monotonic()
+        if now - rendered_at < self.cache_seconds:
+            return text
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for _, metric in metrics:
+            metric.render(lines)
+        text = '\n'.join(lines) + '\n'
+        self._cache = (now, text)
+        return text
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value):
+    if isinstance(value, float):
+        if value == math.inf:
+            return '+Inf'
+        if value.is_integer():
+            return str(int(value))
+        return repr(value)
+    return str(value)
+
+
+# 进程内默认注册表，各模块在导入时注册自己的指标
+REGISTRY = MetricsRegistry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.gauge(name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
+
+
+# 用于测试
+if __name__ == "__main__":
+    registry = MetricsRegistry()
+    packets = registry.counter('ids_packets_total', '捕获的数据包数量', ['type'])
+    latency = registry.histogram('ids_process_seconds', '处理耗时')
+    tcp = packets.labels('tcp')
+
+    def worker():
+        for i in range(200000):
+            tcp.inc()
+            latency.observe(i % 100 / 10000)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    print(f"4线程各 200000 次计数+直方图观测, 耗时 {elapsed:.2f} 秒, "
+          f"{elapsed / 800000 * 1e9:.0f} ns/次")
+    print(registry.render())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import random
+import logging
+import threading
+
+from .registry import _ShardedCells
+
+logger = logging.getLogger(__name__)
+
+# 处理流水线的阶段（按先后顺序）
+STAGES = ('capture', 'parse', 'detect', 'score', 'block_decision', 'firewall_flush', 'alert_emit')
+
+
+class HdrHistogram:
+    """对数-线性分桶的延迟直方图（微秒，HDR风格）
+
+    数值按二进制量级分段，每段再线性细分为 2^(precision_bits-1) 个子桶，
+    相对误差不超过 1/2^(precision_bits-1)。记录为O(1)的下标计算，按线程分片累加。
+    """
+
+    def __init__(self, precision_bits=7, max_value=3600 * 1000000):
+        self.precision_bits = precision_bits
+        self.half = 1 << (precision_bits - 1)
+        self.max_value = max_value
+        self.size = self._index(max_value) + 1
+        # 各桶计数，末尾为数值之和
+        self._shards = _ShardedCells(self.size + 1)
+        self._local = self._shards._local
+
+    def _index(self, value):
+        shift = value.bit_length() - self.precision_bits
+        if shift <= 0:
+            return value
+        return (shift + 1) * self.half + (value >> shift) - self.half
+
+    def _lowest(self, index):
+        """桶对应的最小值"""
+        if index < 2 * self.half:
+            return index
+        shift = index // self.half - 1
+        return (index - shift * self.half) << shift
+
+    def record(self, value):
+        value = min(max(int(value), 0), self.max_value)
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._shards.cell()
+        cell[self._index(value)] += 1
+        cell[-1] += value
+
+    def snapshot(self):
+        totals = self._shards.totals()
+        return totals[:-1], totals[-1]
+
+    def summary(self, percentiles=(50, 99, 99.9)):
+        """返回计数、平均值、最大值及各百分位（毫秒）"""
+        counts, total_sum = self.snapshot()
+        count = sum(counts)
+        result = {'count': count}
+        if not count:
+            return result
+        targets = sorted((p, max(1, int(count * p / 100 + 0.5))) for p in percentiles)
+        cumulative = 0
+        highest = 0
+        t = 0
+        for index, bucket_count in enumerate(counts):
+            if not bucket_count:
+                continue
+            cumulative += bucket_count
+            highest = index
+            while t < len(targets) and cumulative >= targets[t][1]:
+                # 取桶的中间值作为百分位估计
+                value = (self._lowest(index) + self._lowest(index + 1)) / 2
+                result[f"p{targets[t][0]:g}"] = round(value / 1000, 3)
+                t += 1
+        result['mean'] = round(total_sum / count / 1000, 3)
+        result['max'] = round(self._lowest(highest + 1) / 1000, 3)
+        return result
+
+
+class _Trace:
+    __slots__ = ('marks', 'trace_id')
+
+    def __init__(self, trace_id, ts):
+        self.trace_id = trace_id
+        self.marks = [('start', ts)]
+
+
+class PipelineTracer:
+    """端到端流水线延迟追踪
+
+    处理流程在同一线程内传递时，通过线程局部的"当前追踪"记录各阶段时间点：
+    begin() 开始（可传入抓包时间），mark() 标记阶段，end() 结束并把各阶段与端到端
+    耗时记入直方图。没有进行中的追踪时 mark() 直接返回。端到端耗时超过阈值的追踪
+    按采样率写入慢追踪日志。
+    """
+
+    def __init__(self, stages=STAGES, slow_threshold_ms=None, slow_sample_rate=0.1, slow_log=None):
+        self.stages = tuple(stages)
+        self.enabled = True
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_sample_rate = slow_sample_rate
+        self.slow_log = slow_log  # 具有 append(record) 方法的日志（如 MetricsLog）
+        self._local = threading.local()
+        self._histograms = {stage: HdrHistogram() for stage in self.stages}
+        self._histograms['total'] = HdrHistogram()
+        self._next_id = 0
+
+    def begin(self, ts=None, trace_id=None):
+        """开始追踪；当前线程已有进行中的追踪时返回False（由外层负责结束）"""
+        if not self.enabled or getattr(self._local, 'trace', None) is not None:
+            return False
+        if trace_id is None:
+            self._next_id += 1
+            trace_id = self._next_id
+        self._local.trace = _Trace(trace_id, ts or time.time())
+        return True
+
+    def mark(self, stage, ts=None):
+        """标记当前追踪到达某个阶段"""
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace.marks.append((stage, ts or time.time()))
+
+    def end(self, owner=True):
+        """结束当前追踪（owner为begin()的返回值）"""
+        if not owner:
+            return
+        trace = self._local.trace
+        self._local.trace = None
+        if trace is None or len(trace.marks) < 2:
+            return
+
+        marks = trace.marks
+        stage_us = {}
+        previous = marks[0][1]
+        for stage, ts in marks[1:]:
+            elapsed = (ts - previous) * 1000000
+            previous = ts
+            histogram = self._histograms.get(stage)
+            if histogram is not None:
+                histogram.record(elapsed)
+                stage_us[stage] = stage_us.get(stage, 0) + elapsed
+        total_us = (marks[-1][1] - marks[0][1]) * 1000000
+        self._histograms['total'].record(total_us)
+
+        if (self.slow_log is not None and self.slow_threshold_ms is not None
+                and total_us >= self.slow_threshold_ms * 1000 and random.random() < self.slow_sample_rate):
+            self.slow_log.append({
+                'trace_id': trace.trace_id,
+                'start': marks[0][1],
+                'total_ms': round(total_us / 1000, 3),
+                'stages_ms': {stage: round(us / 1000, 3) for stage, us in stage_us.items()}
+            })
+
+    def report(self):
+        """各阶段及端到端的延迟分布（毫秒）"""
+        return {name: histogram.summary() for name, histogram in self._histograms.items()}
+
+
+# 进程内默认追踪器
+TRACER = PipelineTracer()
+
+
+# 用于测试
+if __name__ == "__main__":
+    tracer = PipelineTracer()
+    count = 100000
+    start = time.perf_counter()
+    for i in range(count):
+        base = time.time()
+        owner = tracer.begin(base)
+        tracer.mark('parse', base + 0.00005)
+        tracer.mark('detect', base + 0.0002 + random.expovariate(1 / 0.0005))
+        tracer.mark('block_decision', base + 0.001)
+        tracer.mark('firewall_flush', base + 0.001 + random.expovariate(1 / 0.005))
+        tracer.end(owner)
+    elapsed = time.perf_counter() - start
+    print(f"{count} 条追踪, {elapsed / count * 1e6:.1f} 微秒/条")
+    for name, summary in tracer.report().items():
+        print(f"  {name:<15} {summary}")
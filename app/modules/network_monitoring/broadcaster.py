@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+
+from ..scheduling.scheduler import SCHEDULER
+
+logger = logging.getLogger(__name__)
+
+# 状态类频道只保留最新值并按差量发送，其余频道按事件发送
+STATE_CHANNELS = ('network_stats', 'traffic_update', 'status_update', 'threat_update')
+
+
+def diff(old, new):
+    """计算两个JSON兼容值之间的差量，无变化时返回None
+
+    差量节点: {'v': 值} 整体替换; {'d': {键: 子节点}, 'r': [删除的键]} 字典差量;
+    {'s': k, 'a': [...]} 列表左移k项并追加（适用于滑动的历史数据）
+    """
+    if old == new:
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = {}
+        for key, value in new.items():
+            if key in old:
+                node = diff(old[key], value)
+                if node is not None:
+                    changes[key] = node
+            else:
+                changes[key] = {'v': value}
+        removed = [key for key in old if key not in new]
+        node = {'d': changes}
+        if removed:
+            node['r'] = removed
+        return node
+    if isinstance(old, list) and isinstance(new, list) and old and new:
+        for shift in range(0, min(len(old), 10) + 1):
+            keep = len(old) - shift
+            if keep <= len(new) and old[shift:] == new[:keep]:
+                return {'s': shift, 'a': new[keep:]}
+    return {'v': new}
+
+
+class _Client:
+    """单个客户端的订阅和确认状态"""
+
+    def __init__(self, sid, channels):
+        self.sid = sid
+        self.channels = set(channels)
+        self.acked_versions = {}    # 频道 -> 客户端已确认的状态版本
+        self.acked_events = {}      # 频道 -> 客户端已确认的事件序号
+        self.pending = None         # 已发送未确认的帧: (帧序号, 状态版本, 事件序号)
+        self.pending_since = 0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+
+
+class StreamBroadcaster:
+    """合并与差量推送层
+
+    模块通过 emit() 发布数据（与socketio.emit接口兼容），有新数据或客户端确认时唤醒调度任务，
+    最多每隔 interval 秒为每个客户端生成一帧：状态频道只发送相对客户端最近确认版本的差量，事件频道发送未确认的事件。
+    客户端未确认上一帧时跳过本轮，下一帧直接携带最新值，不为慢客户端积压队列。
+    """
+
+    def __init__(self, socketio=None, interval=0.25, state_channels=STATE_CHANNELS,
+                 history=32, event_buffer=1000, max_events_per_frame=100, ack_timeout=5):
+        self.socketio = socketio
+        self.interval = interval
+        self.state_channels = set(state_channels)
+        self.history = history
+        self.max_events_per_frame = max_events_per_frame
+        self.ack_timeout = ack_timeout
+
+        self.is_running = False
+        self.scheduler = SCHEDULER
+        self._flush_task = None
+        self._lock = threading.Lock()
+        self._versions = {}      # 频道 -> OrderedDict(版本 -> 快照)
+        self._events = {}        # 频道 -> deque((序号, 事件))
+        self._event_buffer = event_buffer
+        self._event_seq = 0
+        self._frame_seq = 0
+        self._clients = {}
+        self.event_bus = None    # 多工作进程部署时转发到其他进程（可选）
+
+        self.stats = {
+            'published': 0,
+            'frames_sent': 0,
+            'frames_skipped': 0
+        }
+
+    def start_broadcast(self):
+        """注册推送任务"""
+        if not self.is_running:
+            self.is_running = True
+            # 空闲时不执行；确认超时的客户端由周期执行兜底
+            self._flush_task = self.scheduler.schedule(self.flush_frames, interval=self.ack_timeout, delay=0,
+                                                       name='推送帧', min_gap=self.interval)
+            logger.info(f"推送层已启动，帧间隔: {int(self.interval * 1000)}ms")
+
+    def stop_broadcast(self):
+        """取消推送任务"""
+        if self.is_running:
+            self.is_running = False
+            self._flush_task.cancel()
+            self._flush_task = None
+            logger.info("推送层已停止")
+
+    def _wake(self):
+        task = self._flush_task
+        if task is not None:
+            task.wake()
+
+    def attach_event_bus(self, event_bus):
+        """发布的数据同时转发到消息队列，由其他工作进程的推送层接收"""
+        self.event_bus = event_bus
+        logger.info("推送层已接入消息队列")
+
+    def emit(self, event, data=None, **kwargs):
+        """发布数据（兼容socketio.emit的调用方式）"""
+        self.publish(event, data)
+
+    def publish(self, channel, data):
+        """发布状态或事件"""
+        with self._lock:
+            self.stats['published'] += 1
+            if channel in self.state_channels:
+                versions = self._versions.setdefault(channel, OrderedDict())
+                version = next(reversed(versions)) + 1 if versions else 1
+                # 发布方的字典可能继续被修改，保存快照
+                data = versions[version] = copy.deepcopy(data)
+                while len(versions) > self.history:
+                    versions.popitem(last=False)
+            else:
+                self._event_seq += 1
+                events = self._events.setdefault(channel, deque(maxlen=self._event_buffer))
+                events.append((self._event_seq, data))
+        if self.event_bus:
+            self.event_bus.publish(channel, data)
+        self._wake()
+
+    def add_client(self, sid, channels=None):
+        """注册客户端，默认订阅全部频道"""
+        with self._lock:
+            if channels is None:
+                channels = self.state_channels | set(self._events) | {'new_alert', 'incident_update'}
+            client = _Client(sid, channels)
+            # 新客户端只接收连接之后的事件
+            for channel in client.channels:
+                client.acked_events[channel] = self._event_seq
+            self._clients[sid] = client
+        self._wake()
+
+    def remove_client(self, sid):
+        with self._lock:
+            self._clients.pop(sid, None)
+
+    def subscribe(self, sid, channels):
+        """订阅频道"""
+        with self._lock:
+            client = self._clients.get(sid)
+            if client:
+                for channel in channels:
+                    if channel not in client.channels:
+                        client.channels.add(channel)
+                        client.acked_events.setdefault(channel, self._event_seq)
+
+    def unsubscribe(self, sid, channels):
+        """取消订阅频道"""
+        with self._lock:
+            client = self._clients.get(sid)
+            if client:
+                for channel in channels:
+                    client.channels.discard(channel)
+                    client.acked_versions.pop(channel, None)
+                    client.acked_events.pop(channel, None)
+
+    def resync(self, sid):
+        """客户端状态与服务端不一致时，下一帧发送完整状态"""
+        with self._lock:
+            client = self._clients.get(sid)
+            if client:
+                client.acked_versions.clear()
+                client.pending = None
+        self._wake()
+
+    def ack(self, sid, frame_seq):
+        """客户端确认收到帧"""
+        with self._lock:
+            client = self._clients.get(sid)
+            if client and client.pending and client.pending[0] == frame_seq:
+                _, versions, event_seqs = client.pending
+                client.acked_versions.update(versions)
+                client.acked_events.update(event_seqs)
+                client.pending = None
+        self._wake()
+
+    def flush_frames(self, now=None):
+        """为每个客户端生成并发送一帧"""
+        now = now or time.time()
+        outgoing = []
+        with self._lock:
+            self._frame_seq += 1
+            # 订阅和确认进度相同的客户端共享同一帧，每轮只计算一次
+            frame_cache = {}
+            delta_cache = {}
+            for client in self._clients.values():
+                if client.pending:
+                    if now - client.pending_since < self.ack_timeout:
+                        # 上一帧未确认：跳过本轮，不积压
+                        client.frames_skipped += 1
+                        self.stats['frames_skipped'] += 1
+                        continue
+                    client.pending = None
+                channels = tuple(sorted(client.channels))
+                signature = (
+                    channels,
+                    tuple(client.acked_versions.get(c, 0) for c in channels),
+                    tuple(client.acked_events.get(c, 0) for c in channels)
+                )
+                built = frame_cache.get(signature)
+                if built is None:
+                    built = frame_cache[signature] = self._build_frame(client, delta_cache)
+                frame, versions, event_seqs = built
+                if frame:
+                    client.pending = (frame['seq'], versions, event_seqs)
+                    outgoing.append((client, frame))
+
+        for i, (client, frame) in enumerate(outgoing, 1):
+            self._send(client, frame, now)
+            if i % 50 == 0:
+                # 协程服务器下让出执行权，客户端很多时不阻塞其他请求
+                time.sleep(0)
+        return len(outgoing)
+
+    def _build_frame(self, client, delta_cache):
+        """生成帧，返回 (帧, 帧内状态版本, 帧内事件序号)，无新数据时帧为None"""
+        state = {}
+        versions = {}
+        for channel in client.channels & self.state_channels:
+            channel_versions = self._versions.get(channel)
+            if not channel_versions:
+                continue
+            latest = next(reversed(channel_versions))
+            base = client.acked_versions.get(channel, 0)
+            if base == latest:
+                continue
+            key = (channel, base, latest)
+            node = delta_cache.get(key)
+            if node is None:
+                if base in channel_versions:
+                    node = diff(channel_versions[base], channel_versions[latest]) or {'d': {}}
+                else:
+                    # 客户端版本已过期或首次发送：发送完整状态
+                    node = {'v': channel_versions[latest]}
+                delta_cache[key] = node
+            state[channel] = {'b': base if base in channel_versions else 0, 'n': latest, 'p': node}
+            versions[channel] = latest
+
+        events = {}
+        missed = {}
+        event_seqs = {}
+        for channel in client.channels - self.state_channels:
+            channel_events = self._events.get(channel)
+            if not channel_events:
+                continue
+            last_seq = client.acked_events.get(channel, 0)
+            if channel_events[-1][0] <= last_seq:
+                continue
+            new_events = []
+            for seq, data in reversed(channel_events):
+                if seq <= last_seq:
+                    break
+                new_events.append(data)
+            new_events.reverse()
+            if len(new_events) > self.max_events_per_frame:
+                # 慢客户端只接收最新的事件，并告知丢弃数量
+                missed[channel] = len(new_events) - self.max_events_per_frame
+                new_events = new_events[-self.max_events_per_frame:]
+            events[channel] = new_events
+            event_seqs[channel] = channel_events[-1][0]
+
+        if not state and not events:
+            return None, versions, event_seqs
+        frame = {'seq': self._frame_seq, 'state': state, 'events': events}
+        if missed:
+            frame['missed'] = missed
+        return frame, versions, event_seqs
+
+    def _send(self, client, frame, now):
+        client.pending_since = now
+        client.frames_sent += 1
+        self.stats['frames_sent'] += 1
+        if self.socketio:
+            sid = client.sid
+            self.socketio.emit('frame', frame, to=sid, callback=lambda *args: self.ack(sid, frame['seq']))
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['clients'] = len(self._clients)
+            stats['channels'] = sorted(set(self._versions) | set(self._events))
+            return stats
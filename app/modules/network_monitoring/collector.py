@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import hmac
+import time
+import json
+import zlib
+import queue
+import socket
+import hashlib
+import struct
+import logging
+import threading
+import socketserver
+from collections import defaultdict
+
+from .sketches import HyperLogLog, CountMinSketch, SpaceSaving
+from ..scheduling.scheduler import SCHEDULER
+
+logger = logging.getLogger(__name__)
+
+# 汇总报文: 长度前缀 + zlib压缩的负载 + HMAC-SHA256（共享密钥，覆盖长度前缀和负载）
+_FRAME = struct.Struct('!I')
+_MAC_SIZE = 32
+# 负载头: 魔数, 版本, 时间段开始, 时间段结束, 各段长度(计数器, HLL, CMS, TopK)
+_SUMMARY = struct.Struct('!2sBdd4I')
+_MAGIC = b'SS'
+_VERSION = 2
+# 单个汇总通常只有几KB，超出上限的报文直接断开连接
+MAX_FRAME = 1024 * 1024         # 压缩后
+MAX_SUMMARY = 8 * 1024 * 1024   # 解压后
+
+
+def _load_key(key):
+    """共享密钥默认取环境变量 IDS_COLLECTOR_KEY"""
+    key = key if key is not None else os.environ.get('IDS_COLLECTOR_KEY')
+    if not key:
+        raise ValueError("统计汇总需要共享密钥（环境变量 IDS_COLLECTOR_KEY）")
+    return key.encode() if isinstance(key, str) else key
+
+
+def _sign(key, data):
+    return hmac.new(key, data, hashlib.sha256).digest()
+
+
+class IntervalSummary:
+    """单个时间段的统计汇总，大小固定，与流量规模无关"""
+
+    def __init__(self, sensor_id='', start_time=None):
+        self.sensor_id = sensor_id
+        self.start_time = start_time or time.time()
+        self.end_time = self.start_time
+        self.protocol_stats = defaultdict(int)
+        self.attack_stats = defaultdict(int)
+        self.distinct_ips = HyperLogLog()
+        self.ip_traffic = CountMinSketch()
+        self.top_talkers = SpaceSaving()
+
+    def encode(self, key):
+        """编码为紧凑的二进制报文，key 为共享密钥"""
+        counters = json.dumps({
+            'sensor_id': self.sensor_id,
+            'protocols': self.protocol_stats,
+            'attacks': self.attack_stats
+        }, ensure_ascii=False).encode()
+        hll = self.distinct_ips.to_bytes()
+        cms = self.ip_traffic.to_bytes()
+        topk = json.dumps(self.top_talkers.to_list()).encode()
+        header = _SUMMARY.pack(_MAGIC, _VERSION, self.start_time, self.end_time,
+                               len(counters), len(hll), len(cms), len(topk))
+        payload = zlib.compress(header + counters + hll + cms + topk)
+        frame = _FRAME.pack(len(payload)) + payload
+        return frame + _sign(key, frame)
+
+    @classmethod
+    def decode(cls, payload):
+        """从报文负载解码（解压后超过 MAX_SUMMARY 时抛出ValueError）"""
+        decompressor = zlib.decompressobj()
+        data = decompressor.decompress(payload, MAX_SUMMARY)
+        if decompressor.unconsumed_tail:
+            raise ValueError("统计汇总解压后过大")
+        magic, version, start_time, end_time, n_counters, n_hll, n_cms, n_topk = _SUMMARY.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("无效的统计汇总报文")
+        offset = _SUMMARY.size
+        counters = json.loads(data[offset:offset + n_counters])
+        offset += n_counters
+        summary = cls(counters['sensor_id'], start_time)
+        summary.end_time = end_time
+        summary.protocol_stats.update(counters['protocols'])
+        summary.attack_stats.update(counters['attacks'])
+        summary.distinct_ips = HyperLogLog.from_bytes(data[offset:offset + n_hll])
+        offset += n_hll
+        summary.ip_traffic = CountMinSketch.from_bytes(data[offset:offset + n_cms])
+        offset += n_cms
+        summary.top_talkers = SpaceSaving.from_list(json.loads(data[offset:offset + n_topk]))
+        return summary
+
+
+class StatsAgent:
+    """传感器推送代理：按时间段汇总本地统计并推送到中心收集器
+
+    调度线程只切换时间段并放入发送队列，连接和发送在专用的发送线程中进行，
+    收集器不可达时不会阻塞共享的调度线程；队列满时丢弃最新的汇总并计数。
+    """
+
+    def __init__(self, collector_host, collector_port=9471, sensor_id=None, interval=5, key=None, queue_size=12):
+        self.collector_addr = (collector_host, collector_port)
+        self.sensor_id = sensor_id or socket.gethostname()
+        self.interval = interval
+        self._key = _load_key(key)
+
+        self.is_running = False
+        self.scheduler = SCHEDULER
+        self._flush_task = None
+        self.sender_thread = None
+        self._sock = None
+        self._lock = threading.Lock()
+        self._summary = IntervalSummary(self.sensor_id)
+        self._queue = queue.Queue(maxsize=queue_size)
+
+        self.stats = {
+            'summaries_sent': 0,
+            'summaries_dropped': 0,
+            'bytes_sent': 0,
+            'send_failures': 0
+        }
+
+    def record_protocol(self, protocol, count=1):
+        """记录协议计数"""
+        with self._lock:
+            self._summary.protocol_stats[protocol] += count
+
+    def record_attack(self, attack_type, count=1):
+        """记录攻击计数"""
+        with self._lock:
+            self._summary.attack_stats[attack_type] += count
+
+    def record_ip(self, ip_address, traffic=0):
+        """记录IP及其流量"""
+        with self._lock:
+            self._summary.distinct_ips.add(ip_address)
+            if traffic:
+                self._summary.ip_traffic.add(ip_address, traffic)
+                self._summary.top_talkers.add(ip_address, traffic)
+
+    def start_agent(self):
+        """启动推送代理"""
+        if not self.is_running:
+            self.is_running = True
+            self.sender_thread = threading.Thread(target=self._sender_worker, name='统计汇总发送')
+            self.sender_thread.daemon = True
+            self.sender_thread.start()
+            # 每个时间段推送一次汇总
+            self._flush_task = self.scheduler.schedule(self.flush, interval=self.interval, name='统计汇总推送')
+            logger.info(f"统计推送代理已启动，收集器: {self.collector_addr[0]}:{self.collector_addr[1]}")
+
+    def stop_agent(self):
+        """停止推送代理"""
+        if self.is_running:
+            self.is_running = False
+            self._flush_task.cancel()
+            self._flush_task = None
+            self.flush()
+            # 空项让发送线程发完队列中的汇总后退出
+            try:
+                self._queue.put(None, timeout=10)
+            except queue.Full:
+                logger.warning("统计汇总发送队列已满，未发送的汇总将被丢弃")
+            self.sender_thread.join(timeout=10)
+            if self._sock:
+                self._sock.close()
+                self._sock = None
+            logger.info("统计推送代理已停止")
+
+    def flush(self):
+        """结束当前时间段，把汇总放入发送队列（不阻塞）"""
+        with self._lock:
+            summary, self._summary = self._summary, IntervalSummary(self.sensor_id)
+        summary.end_time = self._summary.start_time
+        try:
+            self._queue.put_nowait(summary)
+            return True
+        except queue.Full:
+            self.stats['summaries_dropped'] += 1
+            return False
+
+    def _sender_worker(self):
+        """发送线程：编码并发送队列中的汇总"""
+        while True:
+            summary = self._queue.get()
+            if summary is None:
+                break
+            self._send(summary.encode(self._key))
+
+    def _send(self, frame):
+        for _ in range(2):  # 连接断开时重连一次
+            try:
+                if self._sock is None:
+                    self._sock = socket.create_connection(self.collector_addr, timeout=5)
+                self._sock.sendall(frame)
+                self.stats['summaries_sent'] += 1
+                self.stats['bytes_sent'] += len(frame)
+                return True
+            except OSError as e:
+                if self._sock:
+                    self._sock.close()
+                    self._sock = None
+                logger.debug(f"推送统计汇总失败: {str(e)}")
+        self.stats['send_failures'] += 1
+        return False
+
+
+class _SummaryHandler(socketserver.StreamRequestHandler):
+    """处理单个传感器连接：报文过大或认证失败时断开"""
+
+    def handle(self):
+        collector = self.server.collector
+        while collector.is_running:
+            header = self.rfile.read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                break
+            (length,) = _FRAME.unpack(header)
+            if length > MAX_FRAME:
+                collector.reject(self.client_address, f"报文过大 ({length} 字节)")
+                break
+            payload = self.rfile.read(length)
+            mac = self.rfile.read(_MAC_SIZE)
+            if len(payload) < length or len(mac) < _MAC_SIZE:
+                break
+            if not hmac.compare_digest(mac, _sign(collector._key, header + payload)):
+                collector.reject(self.client_address, "认证失败")
+                break
+            try:
+                collector.merge_summary(IntervalSummary.decode(payload), len(payload))
+            except Exception as e:
+                logger.error(f"解析统计汇总失败: {str(e)}")
+
+
+class _CollectorServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StatsCollector:
+    """中心收集器：合并多个传感器的统计汇总（只接受带正确共享密钥签名的报文）"""
+
+    def __init__(self, host='0.0.0.0', port=9471, sensor_timeout=30, key=None):
+        self.host = host
+        self.port = port
+        self.sensor_timeout = sensor_timeout
+        self._key = _load_key(key)
+        self.rejected = 0
+
+        self.is_running = False
+        self.server = None
+        self.server_thread = None
+        self._lock = threading.Lock()
+
+        # 全局合并结果
+        self.protocol_stats = defaultdict(int)
+        self.attack_stats = defaultdict(int)
+        self.distinct_ips = HyperLogLog()
+        self.ip_traffic = CountMinSketch()
+        self.top_talkers = SpaceSaving()
+        self.sensors = {}
+
+    def start_collector(self):
+        """启动收集器"""
+        if not self.is_running:
+            self.server = _CollectorServer((self.host, self.port), _SummaryHandler)
+            self.server.collector = self
+            self.port = self.server.server_address[1]
+            self.is_running = True
+            self.server_thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.2})
+            self.server_thread.daemon = True
+            self.server_thread.start()
+            logger.info(f"统计收集器已启动，监听: {self.host}:{self.port}")
+
+    def stop_collector(self):
+        """停止收集器"""
+        if self.is_running:
+            self.is_running = False
+            self.server.shutdown()
+            self.server.server_close()
+            logger.info("统计收集器已停止")
+
+    def reject(self, address, reason):
+        """记录被拒绝的传感器连接"""
+        with self._lock:
+            self.rejected += 1
+        logger.warning(f"拒绝统计汇总连接 {address[0]}:{address[1]}: {reason}")
+
+    def merge_summary(self, summary, size=0):
+        """合并单个传感器的汇总，开销与流量规模无关"""
+        with self._lock:
+            for protocol, count in summary.protocol_stats.items():
+                self.protocol_stats[protocol] += count
+            for attack_type, count in summary.attack_stats.items():
+                self.attack_stats[attack_type] += count
+            self.distinct_ips.merge(summary.distinct_ips)
+            self.ip_traffic.merge(summary.ip_traffic)
+            self.top_talkers.merge(summary.top_talkers)
+
+            sensor = self.sensors.setdefault(summary.sensor_id, {
+                'summaries': 0,
+                'bytes_received': 0,
+                'last_seen': 0
+            })
+            sensor['summaries'] += 1
+            sensor['bytes_received'] += size
+            sensor['last_seen'] = summary.end_time
+
+    def get_fleet_stats(self, top_n=10):
+        """获取全网汇总统计"""
+        now = time.time()
+        with self._lock:
+            # Top-K候选按合并后的Count-Min估计值排序
+            talkers = sorted(
+                ({'ip': ip, 'traffic': self.ip_traffic.estimate(ip)} for ip in self.top_talkers.counts),
+                key=lambda x: x['traffic'],
+                reverse=True
+            )[:top_n]
+            return {
+                'sensors': {
+                    sensor_id: dict(info, online=now - info['last_seen'] < self.sensor_timeout)
+                    for sensor_id, info in self.sensors.items()
+                },
+                'protocol_stats': dict(self.protocol_stats),
+                'attack_stats': dict(self.attack_stats),
+                'distinct_ips': self.distinct_ips.count(),
+                'top_talkers': talkers,
+                'rejected_connections': self.rejected
+            }
+
+
+# 用于测试
+if __name__ == "__main__":
+    import random
+    logging.basicConfig(level=logging.INFO)
+
+    collector = StatsCollector('127.0.0.1', 0, key='demo-key')
+    collector.start_collector()
+
+    # 在本机模拟3个传感器和1个使用错误密钥的传感器
+    agents = [StatsAgent('127.0.0.1', collector.port, sensor_id=f"sensor-{i}", interval=1, key='demo-key')
+              for i in range(3)]
+    intruder = StatsAgent('127.0.0.1', collector.port, sensor_id="intruder", interval=1, key='wrong-key')
+    intruder.record_protocol('TCP', 10 ** 9)
+    intruder.start_agent()
+    unreachable = StatsAgent('192.0.2.1', 9471, sensor_id="unreachable", key='demo-key')
+    for agent in agents:
+        agent.start_agent()
+
+    try:
+        for _ in range(30000):
+            agent = random.choice(agents)
+            ip = f"192.168.{random.randint(0, 3)}.{random.randint(2, 254)}"
+            agent.record_ip(ip, random.randint(64, 1500))
+            agent.record_protocol(random.choice(['TCP', 'UDP', 'HTTP']))
+        time.sleep(2.5)
+        for agent in agents:
+            print(f"{agent.sensor_id}: {agent.stats}")
+        print(json.dumps(collector.get_fleet_stats(5), ensure_ascii=False, indent=2))
+
+        # 收集器不可达时，调度线程上的 flush 立即返回
+        unreachable.start_agent()
+        start = time.perf_counter()
+        unreachable.flush()
+        print(f"不可达收集器 flush 耗时: {(time.perf_counter() - start) * 1000:.2f} ms")
+    finally:
+        for agent in agents + [intruder, unreachable]:
+            agent.stop_agent()
+        collector.stop_collector()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import queue
+import socket
+import struct
+import logging
+import threading
+import socketserver
+
+logger = logging.getLogger(__name__)
+
+# 消息: 长度前缀 + JSON负载 {"c": 频道, "d": 数据}
+_FRAME = struct.Struct('!I')
+# 连接建立后客户端先发送一个字节声明角色
+_ROLE_PUBLISHER = b'P'
+_ROLE_SUBSCRIBER = b'S'
+
+
+def _encode(channel, data):
+    payload = json.dumps({'c': channel, 'd': data}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return _FRAME.pack(len(payload)) + payload
+
+
+def _read_frame(rfile):
+    header = rfile.read(_FRAME.size)
+    if len(header) < _FRAME.size:
+        return None
+    (length,) = _FRAME.unpack(header)
+    payload = rfile.read(length)
+    if len(payload) < length:
+        return None
+    return payload
+
+
+class _BusHandler(socketserver.StreamRequestHandler):
+    """处理单个工作进程连接"""
+
+    def handle(self):
+        broker = self.server.broker
+        role = self.rfile.read(1)
+        if role == _ROLE_SUBSCRIBER:
+            subscriber = broker._add_subscriber(self.request)
+            # 订阅连接只接收消息，读到EOF或连接被重置说明对端已断开
+            try:
+                self.rfile.read()
+            except OSError:
+                pass
+            broker._remove_subscriber(subscriber)
+            return
+        while broker.is_running:
+            payload = _read_frame(self.rfile)
+            if payload is None:
+                break
+            broker._fan_out(_FRAME.pack(len(payload)) + payload)
+
+
+class _Subscriber:
+    """一个订阅连接：有界发送队列和专用的发送线程
+
+    转发时只放入队列，慢订阅方只阻塞自己的发送线程；队列满时丢弃新消息并计数。
+    """
+
+    def __init__(self, broker, sock, queue_size):
+        self.broker = broker
+        self.sock = sock
+        self.address = sock.getpeername()
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.sender_thread = threading.Thread(target=self._send_worker, name='消息转发发送')
+        self.sender_thread.daemon = True
+        self.sender_thread.start()
+
+    def put(self, frame):
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self):
+        """让发送线程退出（队列满时先清空）"""
+        while True:
+            try:
+                self._queue.put_nowait(None)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _send_worker(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            try:
+                self.sock.sendall(frame)
+            except OSError:
+                self.broker.stats['send_failures'] += 1
+                self.broker._remove_subscriber(self)
+                # 关闭连接让处理线程的读取返回
+                try:
+                    self.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                return
+
+
+class _BrokerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class EventBusBroker:
+    """本地消息队列：把发布方的消息原样转发给所有订阅方
+
+    多个Web工作进程部署时的本地替代方案，只在本机回环地址监听，
+    发布方为运行各模块的主工作进程，订阅方为其他工作进程的推送层。
+    每个订阅方有自己的发送队列（queue_size 条），发布方的处理线程不会被慢订阅方阻塞。
+    """
+
+    def __init__(self, host='127.0.0.1', port=9472, queue_size=10000):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.is_running = False
+        self.server = None
+        self.server_thread = None
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+        self.stats = {
+            'messages': 0,
+            'bytes': 0,
+            'dropped': 0,
+            'send_failures': 0
+        }
+
+    def start_broker(self):
+        """启动转发服务"""
+        if not self.is_running:
+            self.server = _BrokerServer((self.host, self.port), _BusHandler)
+            self.server.broker = self
+            self.port = self.server.server_address[1]
+            self.is_running = True
+            self.server_thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.2})
+            self.server_thread.daemon = True
+            self.server_thread.start()
+            logger.info(f"消息转发服务已启动，监听: {self.host}:{self.port}")
+
+    def stop_broker(self):
+        """停止转发服务"""
+        if self.is_running:
+            self.is_running = False
+            self.server.shutdown()
+            self.server.server_close()
+            with self._lock:
+                subscribers, self._subscribers = self._subscribers, []
+            for subscriber in subscribers:
+                subscriber.close()
+            logger.info("消息转发服务已停止")
+
+    def _add_subscriber(self, sock):
+        subscriber = _Subscriber(self, sock, self.queue_size)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def _remove_subscriber(self, subscriber):
+        with self._lock:
+            if subscriber not in self._subscribers:
+                return
+            self._subscribers.remove(subscriber)
+        subscriber.close()
+
+    def _fan_out(self, frame):
+        """放入各订阅方的发送队列（不阻塞）"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        self.stats['messages'] += 1
+        self.stats['bytes'] += len(frame)
+        for subscriber in subscribers:
+            if not subscriber.put(frame):
+                self.stats['dropped'] += 1
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        stats['subscribers'] = len(subscribers)
+        stats['subscriber_queues'] = [{
+            'address': f"{subscriber.address[0]}:{subscriber.address[1]}",
+            'queued': subscriber._queue.qsize(),
+            'dropped': subscriber.dropped
+        } for subscriber in subscribers]
+        return stats
+
+
+class EventBusClient:
+    """消息队列客户端：发布方异步发送，订阅方在后台线程回调
+
+    连接断开后自动重连；发布队列已满时丢弃消息，不阻塞调用方。
+    """
+
+    def __init__(self, host='127.0.0.1', port=9472, queue_size=10000):
+        self.address = (host, port)
+        self.is_running = False
+        self.worker_thread = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._callback = None
+        self._sock = None
+
+        self.stats = {
+            'published': 0,
+            'received': 0,
+            'dropped': 0,
+            'reconnects': 0
+        }
+
+    def start_publisher(self):
+        """以发布方身份启动"""
+        self._start(self._publish_worker, '发布')
+
+    def start_subscriber(self, callback):
+        """以订阅方身份启动，收到消息时调用 callback(频道, 数据)"""
+        self._callback = callback
+        self._start(self._subscribe_worker, '订阅')
+
+    def _start(self, target, role_name):
+        if not self.is_running:
+            self.is_running = True
+            self.worker_thread = threading.Thread(target=target)
+            self.worker_thread.daemon = True
+            self.worker_thread.start()
+            logger.info(f"消息队列{role_name}端已启动: {self.address[0]}:{self.address[1]}")
+
+    def stop(self):
+        if self.is_running:
+            self.is_running = False
+            if self._sock:
+                try:
+                    self._sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            if self.worker_thread:
+                self.worker_thread.join(timeout=2)
+
+    def publish(self, channel, data):
+        """发布消息（序列化在后台线程完成，data应为发布后不再修改的快照）"""
+        try:
+            self._queue.put_nowait((channel, data))
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def _connect(self, role):
+        while self.is_running:
+            try:
+                sock = socket.create_connection(self.address, timeout=5)
+                sock.settimeout(None)
+                sock.sendall(role)
+                self._sock = sock
+                return sock
+            except OSError as e:
+                logger.debug(f"连接消息队列失败: {str(e)}")
+                self.stats['reconnects'] += 1
+                time.sleep(1)
+        return None
+
+    def _publish_worker(self):
+        sock = None
+        while self.is_running:
+            try:
+                channel, data = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            frame = _encode(channel, data)
+            for _ in range(2):  # 连接断开时重连一次
+                if sock is None:
+                    sock = self._connect(_ROLE_PUBLISHER)
+                    if sock is None:
+                        return
+                try:
+                    sock.sendall(frame)
+                    self.stats['published'] += 1
+                    break
+                except OSError:
+                    sock.close()
+                    sock = None
+            else:
+                self.stats['dropped'] += 1
+        if sock:
+            sock.close()
+
+    def _subscribe_worker(self):
+        while self.is_running:
+            sock = self._connect(_ROLE_SUBSCRIBER)
+            if sock is None:
+                return
+            with sock, sock.makefile('rb') as rfile:
+                while self.is_running:
+                    payload = _read_frame(rfile)
+                    if payload is None:
+                        break
+                    self.stats['received'] += 1
+                    try:
+                        message = json.loads(payload)
+                        self._callback(message['c'], message['d'])
+                    except Exception as e:
+                        logger.error(f"处理消息队列消息失败: {str(e)}")
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['queue_size'] = self._queue.qsize()
+        return stats
+
+
+# 用于测试
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    broker = EventBusBroker(port=0, queue_size=1000)
+    broker.start_broker()
+
+    received = []
+    subscribers = []
+    for _ in range(3):
+        subscriber = EventBusClient(port=broker.port)
+        subscriber.start_subscriber(lambda channel, data: received.append((channel, data)))
+        subscribers.append(subscriber)
+    time.sleep(0.5)
+
+    publisher = EventBusClient(port=broker.port)
+    publisher.start_publisher()
+    count = 10000
+    start = time.time()
+    for i in range(count):
+        while not publisher.publish('network_stats', {'traffic_in': i, 'protocol_stats': {'TCP': i}}):
+            time.sleep(0.01)
+    while len(received) < 3 * count and time.time() - start < 30:
+        time.sleep(0.05)
+    elapsed = time.time() - start
+    print(f"发布 {count} 条, 3个订阅方共收到 {len(received)} 条, 耗时 {elapsed:.2f} 秒")
+    print(broker.get_stats())
+
+    # 不读取的订阅方：填满套接字缓冲区后只丢弃发给它的消息，其他订阅方照常接收
+    stalled = socket.create_connection(('127.0.0.1', broker.port))
+    stalled.sendall(_ROLE_SUBSCRIBER)
+    time.sleep(0.2)
+    received.clear()
+    payload = {'events': ['x' * 200] * 20}
+    start = time.time()
+    for i in range(count):
+        while not publisher.publish('alerts', payload):
+            time.sleep(0.01)
+    while len(received) < 3 * count and time.time() - start < 30:
+        time.sleep(0.05)
+    print(f"有一个订阅方停止读取时: 其他订阅方收到 {len(received)} 条, 耗时 {time.time() - start:.2f} 秒")
+    print(broker.get_stats())
+    stalled.close()
+    publisher.stop()
+    for subscriber in subscribers:
+        subscriber.stop()
+    broker.stop_broker()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import array
+import heapq
+import socket
+import struct
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+_IPV6_FLAG = 1 << 128
+
+
+def pack_ip(ip):
+    """IP地址字符串转换为整数键（IPv6加标志位，避免与IPv4冲突）"""
+    try:
+        return struct.unpack('!I', socket.inet_aton(ip))[0]
+    except OSError:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big') | _IPV6_FLAG
+
+
+def unpack_ip(key):
+    """整数键转换回IP地址字符串"""
+    if key & _IPV6_FLAG:
+        return socket.inet_ntop(socket.AF_INET6, (key ^ _IPV6_FLAG).to_bytes(16, 'big'))
+    return socket.inet_ntoa(struct.pack('!I', key))
+
+
+class IPStatsTable:
+    """容量有限的每IP统计表
+
+    以整数化的IP地址为键，计数器按列存放在定长数组中（每列一个array），
+    槽位在淘汰后复用，内存上限由max_entries决定。键按最近访问顺序排列在OrderedDict中，
+    表满时淘汰最久未访问的IP，空闲超时的IP由 expire_idle() 从队首批量清理。
+    流量计数只增不减，因此按流量排名的TOP-N可以在每次更新时增量维护，读取时无需全表排序：
+    候选集合最多保留2倍于top_n的IP，门槛值记录曾被挤出候选集合的最大流量，
+    集合外的IP流量都不超过门槛。只有超过门槛的IP才进入候选集合，
+    候选被淘汰时直接删除；读取时超过门槛的候选不足所需数量才从全表重建。
+    """
+
+    def __init__(self, max_entries=100000, idle_timeout=3600, top_n=50):
+        self.max_entries = max_entries
+        self.idle_timeout = idle_timeout
+        self.top_n = top_n
+
+        self._lock = threading.Lock()
+        self._slots = OrderedDict()  # 整数键 -> 槽位（按最近访问排序）
+        self._free = []
+        self.in_traffic = array.array('q')
+        self.out_traffic = array.array('q')
+        self.threats = array.array('q')
+        self.last_seen = array.array('q')  # epoch秒
+        self.blocked = bytearray()
+        self._blocked_count = 0
+
+        self._top = {}         # TOP-N候选: 整数键 -> 总流量
+        self._top_size = top_n * 2
+        self._top_bar = 0      # 候选集合外IP的流量上限
+
+        self.stats = {
+            'evicted': 0,
+            'expired': 0,
+            'top_rebuilds': 0
+        }
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, ip):
+        return pack_ip(ip) in self._slots
+
+    def update(self, ip, in_traffic=0, out_traffic=0, threats=0, now=None):
+        """累加IP的流量与威胁计数，并更新最近访问时间"""
+        key = pack_ip(ip)
+        now = int(now or time.time())
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._allocate(key)
+            else:
+                self._slots.move_to_end(key)
+            self.in_traffic[slot] += in_traffic
+            self.out_traffic[slot] += out_traffic
+            self.threats[slot] += threats
+            self.last_seen[slot] = now
+            if in_traffic or out_traffic:
+                self._update_top(key, self.in_traffic[slot] + self.out_traffic[slot])
+
+    def _allocate(self, key):
+        if len(self._slots) >= self.max_entries:
+            self._remove(*self._slots.popitem(last=False))
+            self.stats['evicted'] += 1
+        if self._free:
+            slot = self._free.pop()
+            self.in_traffic[slot] = 0
+            self.out_traffic[slot] = 0
+            self.threats[slot] = 0
+            self.blocked[slot] = 0
+        else:
+            slot = len(self.in_traffic)
+            self.in_traffic.append(0)
+            self.out_traffic.append(0)
+            self.threats.append(0)
+            self.last_seen.append(0)
+            self.blocked.append(0)
+        self._slots[key] = slot
+        return slot
+
+    def _remove(self, key, slot):
+        """释放槽位（调用方已从_slots中移除键）"""
+        if self.blocked[slot]:
+            self._blocked_count -= 1
+        self._free.append(slot)
+        self._top.pop(key, None)
+
+    def _update_top(self, key, total):
+        top = self._top
+        if key in top:
+            top[key] = total
+        elif total > self._top_bar:
+            top[key] = total
+            if len(top) > self._top_size:
+                # 挤出流量最小的候选，门槛随之提高
+                dropped = min(top, key=top.get)
+                self._top_bar = max(self._top_bar, top.pop(dropped))
+
+    def _rebuild_top(self):
+        """从全表重新选出候选集合"""
+        self.stats['top_rebuilds'] += 1
+        totals = ((key, self.in_traffic[slot] + self.out_traffic[slot]) for key, slot in self._slots.items())
+        self._top = dict(heapq.nlargest(self._top_size, totals, key=lambda x: x[1]))
+        full = len(self._slots) > len(self._top)
+        self._top_bar = min(self._top.values()) if full else 0
+
+    def expire_idle(self, now=None, limit=None):
+        """清理空闲超时的IP，返回清理数量"""
+        cutoff = int(now or time.time()) - self.idle_timeout
+        removed = 0
+        with self._lock:
+            while self._slots and (limit is None or removed < limit):
+                key, slot = next(iter(self._slots.items()))
+                if self.last_seen[slot] > cutoff:
+                    break
+                del self._slots[key]
+                self._remove(key, slot)
+                removed += 1
+            self.stats['expired'] += removed
+        return removed
+
+    def set_blocked(self, ip, blocked=True):
+        """设置IP的阻止状态，IP不在表中时返回False"""
+        with self._lock:
+            slot = self._slots.get(pack_ip(ip))
+            if slot is None:
+                return False
+            if bool(self.blocked[slot]) != blocked:
+                self.blocked[slot] = 1 if blocked else 0
+                self._blocked_count += 1 if blocked else -1
+            return True
+
+    def blocked_count(self):
+        return self._blocked_count
+
+    def _entry(self, slot):
+        return {
+            'in_traffic': self.in_traffic[slot],
+            'out_traffic': self.out_traffic[slot],
+            'threats': self.threats[slot],
+            'last_seen': datetime.fromtimestamp(self.last_seen[slot]).isoformat(),
+            'is_blocked': bool(self.blocked[slot])
+        }
+
+    def get(self, ip):
+        """获取单个IP的统计数据"""
+        with self._lock:
+            slot = self._slots.get(pack_ip(ip))
+            return None if slot is None else self._entry(slot)
+
+    def top(self, limit=10):
+        """按总流量获取前limit个IP，返回 [(IP, 统计数据)]"""
+        with self._lock:
+            if limit <= self.top_n:
+                exact = [key for key, total in self._top.items() if total >= self._top_bar]
+                if len(exact) < limit and len(self._slots) > len(exact):
+                    self._rebuild_top()
+                    exact = list(self._top)
+                keys = heapq.nlargest(limit, exact, key=self._top.get)
+            else:
+                keys = heapq.nlargest(
+                    limit, self._slots,
+                    key=lambda k: self.in_traffic[self._slots[k]] + self.out_traffic[self._slots[k]]
+                )
+            return [(unpack_ip(key), self._entry(self._slots[key])) for key in keys]
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['entries'] = len(self._slots)
+        stats['capacity'] = self.max_entries
+        stats['blocked'] = self._blocked_count
+        stats['memory_bytes'] = (self.in_traffic.itemsize * 4 + 1) * len(self.in_traffic)
+        return stats
+
+
+# 用于测试
+if __name__ == "__main__":
+    import random
+
+    table = IPStatsTable(max_entries=100000, idle_timeout=300, top_n=50)
+
+    # 模拟伪造源地址洪泛：大量只出现一次的随机IP，混合少量持续活跃的IP
+    heavy = [f"192.168.1.{i}" for i in range(2, 22)]
+    count = 1000000
+    start = time.time()
+    now = int(start)
+    for i in range(count):
+        if i % 10 == 0:
+            table.update(random.choice(heavy), in_traffic=random.randint(1000, 5000), out_traffic=100, now=now)
+        else:
+            table.update(f"{random.randint(1, 223)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(0, 255)}",
+                         in_traffic=random.randint(1, 100), now=now)
+        if i % 100000 == 0:
+            now += 60
+    elapsed = time.time() - start
+    print(f"更新 {count} 次, {count / elapsed:,.0f} 次/秒")
+    print(f"表大小: {len(table)}, 统计: {table.get_stats()}")
+
+    start = time.time()
+    for _ in range(1000):
+        top = table.top(5)
+    print(f"TOP-5 查询: {(time.time() - start):.3f} ms/次")
+    for ip, data in top:
+        print(f"  {ip}: {data['in_traffic'] + data['out_traffic']}")
+
+    print(f"空闲清理: {table.expire_idle(now=now + 301)} 个")
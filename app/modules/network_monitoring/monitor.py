@@ -3,160 +3,166 @@
 
 import os
 import time
-import json
 import random
 import logging
-import threading
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime
+
+from .timeseries import TimeSeriesStore
+from .ip_table import IPStatsTable
+from ..data_storage.metrics_log import MetricsLog
+from ..metrics.registry import gauge, histogram
+from ..metrics.counters import ShardedCounters
+from ..metrics.tracing import TRACER
+from ..scheduling.scheduler import SCHEDULER
+from ..simulation.load_generator import LoadGenerator
 
 logger = logging.getLogger(__name__)
 
+# 运行指标
+MONITOR_EMIT_SECONDS = histogram('ids_monitor_emit_seconds', '生成并推送一次监控数据的耗时（秒）')
+IP_TABLE_ENTRIES = gauge('ids_ip_table_entries', '每IP统计表中的IP数量')
+
 class NetworkMonitor:
-    def __init__(self, socketio=None):
+    def __init__(self, socketio=None, max_ip_entries=100000, ip_idle_timeout=3600):
         self.socketio = socketio  # Socket.IO连接，用于实时发送数据
         self.is_running = False
-        self.monitor_thread = None
+        self.scheduler = SCHEDULER
+        self._tasks = []
+        self.stats_agent = None  # 中心收集器推送代理（可选）
+        self.alert_callback = None  # 告警交由告警系统统一处理和推送（可选）
         
         # 网络状态数据
-        self.traffic_history = []
-        self.protocol_stats = {
-            'TCP': 0,
-            'UDP': 0,
-            'HTTP': 0,
-            'HTTPS': 0,
-            'ICMP': 0,
-            'DNS': 0,
-            'Other': 0
-        }
-        self.attack_stats = {
-            'SQL注入': 0,
-            'XSS攻击': 0,
-            'DDoS攻击': 0,
-            '端口扫描': 0,
-            '暴力破解': 0,
-            '异常流量': 0,
-            '病毒/木马': 0
-        }
-        self.ip_data = defaultdict(lambda: {
-            'in_traffic': 0,
-            'out_traffic': 0,
-            'threats': 0,
-            'last_seen': datetime.now().isoformat(),
-            'is_blocked': False
-        })
+        self.traffic_history = []  # 最近的原始数据点，用于实时推送
+        # 协议与攻击类型计数（按线程分片，读取时汇总为快照）
+        self.protocol_stats = ShardedCounters(('TCP', 'UDP', 'HTTP', 'HTTPS', 'ICMP', 'DNS', 'Other'))
+        self.attack_stats = ShardedCounters(('SQL注入', 'XSS攻击', 'DDoS攻击', '端口扫描', '暴力破解', '异常流量', '病毒/木马'))
+        # 每IP统计：容量有限，超出时淘汰最久未活跃的IP
+        self.ip_data = IPStatsTable(max_entries=max_ip_entries, idle_timeout=ip_idle_timeout)
+        
+        # 模拟流量：默认每秒20个连接（约0.3个攻击）；压测时换成高速率、固定种子的生成器
+        self.load_generator = LoadGenerator(rate=20, interval=1, attack_ratio=0.015)
         
         # 创建数据目录
         os.makedirs('data/monitoring', exist_ok=True)
+        
+        # 多分辨率流量历史（1秒/1分钟/1小时/1天），重启后从文件恢复
+        self.traffic_store = TimeSeriesStore(('incoming', 'outgoing'), 'data/monitoring/traffic_timeseries.npz')
+        
+        # 每秒的监控快照追加到按段轮转的压缩日志，由后台线程写盘
+        self.metrics_log = MetricsLog('data/monitoring/metrics')
+        
+        IP_TABLE_ENTRIES.set_function(lambda: len(self.ip_data))
     
     def start_monitoring(self):
         """启动网络监控"""
         if not self.is_running:
             self.is_running = True
-            self.monitor_thread = threading.Thread(target=self._monitor_network)
-            self.monitor_thread.daemon = True
-            self.monitor_thread.start()
+            self.metrics_log.start_log()
+            self._tasks = [
+                # 每秒采集一次数据，推送到前端并记录监控快照
+                self.scheduler.schedule(self._monitor_tick, interval=1, delay=0,
+                                        name='网络监控', error_delay=5),
+                # 每分钟持久化一次流量时间序列，并清理空闲IP
+                self.scheduler.schedule(self._persist, interval=60, name='流量序列持久化')
+            ]
             logger.info("网络监控已启动")
     
     def stop_monitoring(self):
         """停止网络监控"""
         if self.is_running:
             self.is_running = False
-            if self.monitor_thread:
-                self.monitor_thread.join(timeout=2)
-            self._save_monitoring_data()
+            for task in self._tasks:
+                task.cancel()
+            self._tasks = []
+            self.metrics_log.stop_log()
+            self.traffic_store.save()
             logger.info("网络监控已停止")
     
-    def _monitor_network(self):
-        """网络监控线程函数"""
-        last_emit_time = time.time()
-        
-        while self.is_running:
-            try:
-                # 模拟获取网络数据
-                self._simulate_network_data()
-                
-                # 每秒发送一次数据到前端
-                current_time = time.time()
-                if current_time - last_emit_time >= 1 and self.socketio:
-                    self._emit_monitoring_data()
-                    last_emit_time = current_time
-                
-                # 每分钟保存一次监控数据
-                if len(self.traffic_history) >= 60:
-                    self._save_monitoring_data()
-                
-                time.sleep(1)  # 每秒更新一次
-                
-            except Exception as e:
-                logger.error(f"网络监控错误: {str(e)}")
-                time.sleep(5)  # 出错后等待5秒重试
+    def attach_stats_agent(self, stats_agent):
+        """接入中心收集器推送代理"""
+        self.stats_agent = stats_agent
+        logger.info(f"网络监控已接入统计推送代理: {stats_agent.sensor_id}")
+    
+    def set_alert_callback(self, callback):
+        """设置告警回调（通常为告警系统的 process_alert）"""
+        self.alert_callback = callback
+    
+    def _monitor_tick(self):
+        """采集一次网络数据并推送"""
+        # 模拟获取网络数据
+        self._simulate_network_data()
+        self._emit_monitoring_data()
+    
+    def _persist(self):
+        """持久化流量时间序列并清理空闲IP"""
+        self.traffic_store.save()
+        self.ip_data.expire_idle(time.time())
+    
+    def set_load_generator(self, load_generator):
+        """设置生成模拟流量的负载生成器（需在启动前设置）"""
+        self.load_generator = load_generator
     
     def _simulate_network_data(self):
-        """模拟生成网络监控数据（用于演示）"""
-        # 生成流量数据
+        """按负载生成器的速率生成模拟流量事件（用于演示和压测）"""
+        generator = self.load_generator
         timestamp = datetime.now().isoformat()
-        incoming = random.randint(100, 1500)  # 100KB - 1.5MB
-        outgoing = random.randint(50, 800)    # 50KB - 800KB
+        incoming = outgoing = 0
+        protocols = {}
+        
+        for event in generator.events(generator.due()):
+            # 每个事件为一次连接：入站为请求流量，出站为响应流量
+            src_ip = event['src_ip']
+            in_traffic = event['bytes']
+            out_traffic = in_traffic // 3
+            incoming += in_traffic
+            outgoing += out_traffic
+            protocols[event['protocol']] = protocols.get(event['protocol'], 0) + 1
+            self.ip_data.update(src_ip, in_traffic, out_traffic)
+            if self.stats_agent:
+                self.stats_agent.record_ip(src_ip, in_traffic + out_traffic)
+            
+            attack_type = event['attack_type']
+            if attack_type:
+                self.attack_stats.inc(attack_type)
+                if self.stats_agent:
+                    self.stats_agent.record_attack(attack_type)
+                self.ip_data.update(src_ip, threats=1)
+                
+                # 告警交由告警系统处理，避免前端收到重复的告警流
+                alert_data = generator.alert(event)
+                owner = TRACER.begin()
+                TRACER.mark('detect')
+                if self.alert_callback:
+                    self.alert_callback(alert_data)
+                elif self.socketio:
+                    self.socketio.emit('new_alert', alert_data)
+                    TRACER.mark('alert_emit')
+                TRACER.end(owner)
         
-        # 添加到历史数据中
+        # 更新协议统计
+        self.protocol_stats.add(protocols)
+        if self.stats_agent:
+            for protocol, count in protocols.items():
+                self.stats_agent.record_protocol(protocol, count)
+        
+        # 添加到历史数据中（KB）
+        incoming //= 1024
+        outgoing //= 1024
         self.traffic_history.append({
             'timestamp': timestamp,
             'incoming': incoming,
             'outgoing': outgoing
         })
+        self.traffic_store.add(time.time(), (incoming, outgoing))
         
         # 限制历史记录大小
         if len(self.traffic_history) > 300:  # 保留最近300个数据点
             self.traffic_history = self.traffic_history[-300:]
-        
-        # 更新协议统计
-        protocols = list(self.protocol_stats.keys())
-        for _ in range(3):  # 随机更新几个协议的计数
-            protocol = random.choice(protocols)
-            self.protocol_stats[protocol] += random.randint(1, 10)
-        
-        # 更新攻击类型统计
-        if random.random() < 0.3:  # 30%概率生成攻击数据
-            attack_types = list(self.attack_stats.keys())
-            attack_type = random.choice(attack_types)
-            self.attack_stats[attack_type] += 1
-            
-            # 生成告警数据
-            alert_data = {
-                'timestamp': timestamp,
-                'alert_id': f"ALERT-{int(time.time())}-{random.randint(1000, 9999)}",
-                'alert_type': attack_type,
-                'severity': random.choice(['低', '中', '高']),
-                'src_ip': f"192.168.1.{random.randint(2, 254)}",
-                'dst_ip': f"10.0.0.{random.randint(2, 254)}",
-                'port': random.randint(1, 65535),
-                'protocol': random.choice(['TCP', 'UDP', 'HTTP']),
-                'details': f"检测到{attack_type}攻击尝试"
-            }
-            
-            # 更新IP数据
-            src_ip = alert_data['src_ip']
-            self.ip_data[src_ip]['threats'] += 1
-            self.ip_data[src_ip]['last_seen'] = timestamp
-            
-            # 发送告警数据到前端
-            if self.socketio:
-                self.socketio.emit('new_alert', alert_data)
-        
-        # 随机更新一些IP统计数据
-        for _ in range(5):
-            ip = f"192.168.1.{random.randint(2, 254)}"
-            self.ip_data[ip]['in_traffic'] += random.randint(1, 100)
-            self.ip_data[ip]['out_traffic'] += random.randint(1, 50)
-            self.ip_data[ip]['last_seen'] = timestamp
     
     def _emit_monitoring_data(self):
-        """向前端发送监控数据"""
+        """向前端发送监控数据，并追加到监控指标日志"""
+        start = time.perf_counter()
         try:
-            if not self.socketio:
-                return
-            
             # 获取最新流量数据点
             current_traffic = self.traffic_history[-1] if self.traffic_history else {
                 'timestamp': datetime.now().isoformat(),
@@ -168,12 +174,10 @@ class NetworkMonitor:
             total_in = sum(point['incoming'] for point in self.traffic_history[-60:] if point)
             total_out = sum(point['outgoing'] for point in self.traffic_history[-60:] if point)
             
-            # 获取TOP 5 IP列表
-            top_ips = sorted(
-                self.ip_data.items(), 
-                key=lambda x: x[1]['in_traffic'] + x[1]['out_traffic'], 
-                reverse=True
-            )[:5]
+            # 获取TOP 5 IP列表（增量维护，无需全表排序）
+            top_ips = self.ip_data.top(5)
+            protocol_stats = self.protocol_stats.snapshot()
+            attack_stats = self.attack_stats.snapshot()
             
             # 准备网络状态数据
             network_stats = {
@@ -182,54 +186,34 @@ class NetworkMonitor:
                 'traffic_out': current_traffic['outgoing'] * 1024,  # 转换为字节
                 'connections': random.randint(10, 100),
                 'packets_processed': random.randint(100, 1000),
-                'threats_detected': sum(self.attack_stats.values()),
-                'ips_blocked': sum(1 for ip_data in self.ip_data.values() if ip_data['is_blocked']),
-                'protocol_stats': self.protocol_stats,
-                'attack_stats': self.attack_stats,
+                'threats_detected': sum(attack_stats.values()),
+                'ips_blocked': self.ip_data.blocked_count(),
+                'protocol_stats': protocol_stats,
+                'attack_stats': attack_stats,
                 'ip_data': dict(top_ips)
             }
             
+            # 保存监控数据（只入队，写盘在后台线程完成）
+            self.metrics_log.append(network_stats)
+            
+            if not self.socketio:
+                return
+            
             # 发送网络统计数据
             self.socketio.emit('network_stats', network_stats)
             
             # 发送流量历史数据
             traffic_data = {
                 'history': self.traffic_history[-60:],  # 最近60个数据点
-                'protocols': self.protocol_stats
+                'protocols': protocol_stats
             }
             self.socketio.emit('traffic_update', traffic_data)
             
-            # 保存监控数据
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'data/monitoring/monitoring_{timestamp}.json'
-            with open(filename, 'w') as f:
-                json.dump(network_stats, f)
-            logger.info(f"已保存监控数据到 {filename}")
-            
         except Exception as e:
             logger.error(f"发送监控数据错误: {str(e)}")
-    
-    def _save_monitoring_data(self):
-        """保存监控数据到文件"""
-        try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'data/monitoring/monitoring_{timestamp}.json'
-            
-            # 准备保存的数据
-            data_to_save = {
-                'traffic_history': self.traffic_history,
-                'protocol_stats': self.protocol_stats,
-                'attack_stats': self.attack_stats,
-                'ip_data': {k: v for k, v in self.ip_data.items()}
-            }
-            
-            # 写入文件
-            with open(filename, 'w') as f:
-                json.dump(data_to_save, f)
-            
-            logger.info(f"已保存监控数据到 {filename}")
-        except Exception as e:
-            logger.error(f"保存监控数据失败: {str(e)}")
+        
+        finally:
+            MONITOR_EMIT_SECONDS.observe(time.perf_counter() - start)
     
     def get_network_stats(self):
         """获取网络统计信息"""
@@ -239,91 +223,56 @@ class NetworkMonitor:
                 'total_in': sum(point['incoming'] for point in self.traffic_history[-60:]),
                 'total_out': sum(point['outgoing'] for point in self.traffic_history[-60:])
             },
-            'protocols': self.protocol_stats,
-            'attacks': self.attack_stats
+            'protocols': self.protocol_stats.snapshot(),
+            'attacks': self.attack_stats.snapshot()
         }
     
     def get_ip_data(self, limit=20):
         """获取IP数据列表"""
-        sorted_ips = sorted(
-            self.ip_data.items(),
-            key=lambda x: x[1]['in_traffic'] + x[1]['out_traffic'],
-            reverse=True
-        )[:limit]
-        
-        return {ip: data for ip, data in sorted_ips}
+        return dict(self.ip_data.top(limit))
     
     def block_ip(self, ip_address):
         """阻止特定IP地址"""
-        if ip_address in self.ip_data:
-            self.ip_data[ip_address]['is_blocked'] = True
+        if self.ip_data.set_blocked(ip_address, True):
             logger.info(f"已阻止IP地址: {ip_address}")
             return True
         return False
     
     def unblock_ip(self, ip_address):
         """解除对特定IP的阻止"""
-        if ip_address in self.ip_data:
-            self.ip_data[ip_address]['is_blocked'] = False
+        if self.ip_data.set_blocked(ip_address, False):
             logger.info(f"已解除对IP地址的阻止: {ip_address}")
             return True
         return False
     
     def get_traffic_by_timeframe(self, timeframe='hour'):
         """按不同时间范围获取流量数据"""
-        now = datetime.now()
+        now = time.time()
         if timeframe == 'hour':
             # 过去一小时的数据（每分钟一个数据点）
-            start_time = now - timedelta(hours=1)
-            return [p for p in self.traffic_history if datetime.fromisoformat(p['timestamp']) >= start_time]
+            return self._traffic_points(now - 3600, now, '1m')
         elif timeframe == 'day':
             # 过去24小时的数据（每小时一个数据点）
-            start_time = now - timedelta(days=1)
-            return self._aggregate_traffic_data(
-                [p for p in self.traffic_history if datetime.fromisoformat(p['timestamp']) >= start_time],
-                'hour'
-            )
+            return self._traffic_points(now - 86400, now, '1h')
         elif timeframe == 'week':
             # 过去一周的数据（每天一个数据点）
-            start_time = now - timedelta(days=7)
-            return self._aggregate_traffic_data(
-                [p for p in self.traffic_history if datetime.fromisoformat(p['timestamp']) >= start_time],
-                'day'
-            )
+            return self._traffic_points(now - 7 * 86400, now, '1d')
         else:
             return self.traffic_history[-60:]  # 默认返回最近60个数据点
     
-    def _aggregate_traffic_data(self, data, interval):
-        """聚合流量数据，按指定间隔（小时/天）"""
-        if not data:
-            return []
-        
-        aggregated = {}
-        for point in data:
-            timestamp = datetime.fromisoformat(point['timestamp'])
-            if interval == 'hour':
-                key = timestamp.replace(minute=0, second=0, microsecond=0).isoformat()
-            elif interval == 'day':
-                key = timestamp.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-            else:
-                key = point['timestamp']
-            
-            if key not in aggregated:
-                aggregated[key] = {'timestamp': key, 'incoming': 0, 'outgoing': 0, 'count': 0}
-            
-            aggregated[key]['incoming'] += point['incoming']
-            aggregated[key]['outgoing'] += point['outgoing']
-            aggregated[key]['count'] += 1
-        
-        # 计算平均值
-        for key, value in aggregated.items():
-            if value['count'] > 0:
-                value['incoming'] = value['incoming'] // value['count']
-                value['outgoing'] = value['outgoing'] // value['count']
-            del value['count']
-        
-        # 按时间排序
-        return sorted(aggregated.values(), key=lambda x: x['timestamp'])
+    def _traffic_points(self, start, end, resolution):
+        """从时间序列存储读取流量数据点（平均值取整，附带最大值）"""
+        points = self.traffic_store.points(start, end, resolution)
+        return [
+            {
+                'timestamp': point['timestamp'],
+                'incoming': int(point['incoming']),
+                'outgoing': int(point['outgoing']),
+                'incoming_max': int(point['incoming_max']),
+                'outgoing_max': int(point['outgoing_max'])
+            }
+            for point in points
+        ]
 
 # 用于测试
 if __name__ == "__main__":
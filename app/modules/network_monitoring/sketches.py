@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import math
+import array
+import hashlib
+
+# 可合并的概率统计结构：各结构大小固定，与流量规模无关
+
+
+def _hash64(key):
+    """计算键的64位哈希"""
+    return int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), 'little')
+
+
+def _to_bytes(arr):
+    """数组统一按小端序序列化"""
+    if sys.byteorder == 'big':
+        arr = array.array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _from_bytes(typecode, data):
+    arr = array.array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+class HyperLogLog:
+    """HyperLogLog基数估计（去重IP数量），合并为逐寄存器取最大值"""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+
+    def add(self, key):
+        h = _hash64(key)
+        index = h >> (64 - self.precision)
+        remaining = (h << self.precision) & 0xFFFFFFFFFFFFFFFF
+        rank = 64 - self.precision + 1 if remaining == 0 else 65 - remaining.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # 小基数时使用线性计数修正
+            estimate = m * math.log(m / zeros)
+        return int(estimate)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        hll = cls(int(math.log2(len(data))))
+        hll.registers = bytearray(data)
+        return hll
+
+
+class CountMinSketch:
+    """Count-Min频率估计（每IP流量），合并为逐单元相加"""
+
+    def __init__(self, width=1024, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = array.array('Q', bytes(8 * width * depth))
+
+    def _indexes(self, key):
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'little')
+        b = int.from_bytes(digest[8:], 'little') | 1
+        return [row * self.width + (a + row * b) % self.width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        for i in self._indexes(key):
+            self.table[i] += count
+
+    def estimate(self, key):
+        return min(self.table[i] for i in self._indexes(key))
+
+    def merge(self, other):
+        table = self.table
+        for i, value in enumerate(other.table):
+            if value:
+                table[i] += value
+
+    def to_bytes(self):
+        return _to_bytes(self.table)
+
+    @classmethod
+    def from_bytes(cls, data, depth=4):
+        table = _from_bytes('Q', data)
+        sketch = cls(len(table) // depth, depth)
+        sketch.table = table
+        return sketch
+
+
+class SpaceSaving:
+    """Space-Saving Top-K统计，最多保留 capacity 个候选"""
+
+    def __init__(self, capacity=50):
+        self.capacity = capacity
+        self.counts = {}  # key -> [count, error]
+
+    def add(self, key, count=1):
+        entry = self.counts.get(key)
+        if entry is not None:
+            entry[0] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = [count, 0]
+        else:
+            # 替换当前最小的候选
+            min_key = min(self.counts, key=lambda k: self.counts[k][0])
+            min_count = self.counts.pop(min_key)[0]
+            self.counts[key] = [min_count + count, min_count]
+
+    def merge(self, other):
+        for key, (count, error) in other.counts.items():
+            self.add(key, count)
+
+    def top(self, n=10):
+        items = sorted(self.counts.items(), key=lambda x: x[1][0], reverse=True)[:n]
+        return [(key, entry[0]) for key, entry in items]
+
+    def to_list(self):
+        return [[key, count, error] for key, (count, error) in self.counts.items()]
+
+    @classmethod
+    def from_list(cls, items, capacity=50):
+        sketch = cls(capacity)
+        for key, count, error in items[:capacity]:
+            sketch.counts[key] = [count, error]
+        return sketch
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 各分辨率: (名称, 桶宽度秒数, 桶数量)
+RESOLUTIONS = (
+    ('1s', 1, 3600),        # 1小时
+    ('1m', 60, 1440),       # 1天
+    ('1h', 3600, 24 * 31),  # 31天
+    ('1d', 86400, 366),     # 1年
+)
+
+
+class TimeSeriesStore:
+    """多分辨率环形时间序列存储
+
+    每个分辨率是一组固定大小的NumPy数组（和、最小值、最大值、计数、桶起始时间），
+    写入时同时更新所有分辨率的对应桶，无需后台汇总。桶位置由epoch秒直接计算，
+    按时间范围读取只需计算下标，不扫描数据。桶起始时间用于识别被覆盖的旧桶。
+    桶边界按本地时区对齐，按天汇总的桶从本地零点开始。
+    """
+
+    def __init__(self, fields, path=None, resolutions=RESOLUTIONS):
+        self.fields = tuple(fields)
+        self.path = path
+        self.resolutions = tuple(resolutions)
+        self.utc_offset = -time.timezone
+        self._lock = threading.Lock()
+        self._levels = {}
+        for name, step, slots in self.resolutions:
+            self._levels[name] = self._empty_level(step, slots)
+        self.last_write = 0
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def _empty_level(self, step, slots):
+        width = len(self.fields)
+        return {
+            'step': step,
+            'slots': slots,
+            'start': np.full(slots, -1, dtype=np.int64),
+            'sum': np.zeros((slots, width), dtype=np.float64),
+            'min': np.zeros((slots, width), dtype=np.float64),
+            'max': np.zeros((slots, width), dtype=np.float64),
+            'count': np.zeros(slots, dtype=np.int64),
+        }
+
+    def add(self, timestamp, values):
+        """写入一个数据点（values与fields顺序一致），同时汇总到所有分辨率"""
+        ts = int(timestamp) + self.utc_offset
+        values = np.asarray(values, dtype=np.float64)
+        with self._lock:
+            for level in self._levels.values():
+                step = level['step']
+                bucket = ts // step
+                idx = bucket % level['slots']
+                start = bucket * step - self.utc_offset
+                if level['start'][idx] != start:
+                    # 桶属于更早的周期，重置后复用
+                    level['start'][idx] = start
+                    level['sum'][idx] = values
+                    level['min'][idx] = values
+                    level['max'][idx] = values
+                    level['count'][idx] = 1
+                else:
+                    level['sum'][idx] += values
+                    np.minimum(level['min'][idx], values, out=level['min'][idx])
+                    np.maximum(level['max'][idx], values, out=level['max'][idx])
+                    level['count'][idx] += 1
+            self.last_write = max(self.last_write, ts - self.utc_offset)
+
+    def select_resolution(self, span, max_points=1500):
+        """选择能覆盖时间跨度且点数不超过max_points的最细分辨率"""
+        for name, step, slots in self.resolutions:
+            if span <= step * slots and span / step <= max_points:
+                return name
+        return self.resolutions[-1][0]
+
+    def range(self, resolution, start, end):
+        """读取 [start, end) 范围内的桶，返回 (桶起始时间, 和, 最小值, 最大值, 计数) 数组"""
+        level = self._levels[resolution]
+        step, slots = level['step'], level['slots']
+        first = (int(start) + self.utc_offset) // step
+        last = (int(end) + self.utc_offset - 1) // step
+        # 超出环形容量的部分已被覆盖
+        first = max(first, last - slots + 1)
+        if last < first:
+            empty = np.zeros((0, len(self.fields)))
+            return np.zeros(0, dtype=np.int64), empty, empty, empty, np.zeros(0, dtype=np.int64)
+
+        buckets = np.arange(first, last + 1, dtype=np.int64)
+        idx = buckets % slots
+        with self._lock:
+            starts = level['start'][idx]
+            valid = starts == buckets * step - self.utc_offset
+            idx = idx[valid]
+            return (starts[valid], level['sum'][idx], level['min'][idx],
+                    level['max'][idx], level['count'][idx])
+
+    def points(self, start, end, resolution=None, max_points=1500):
+        """读取时间范围内的数据点（平均值/最小值/最大值），返回JSON兼容的列表"""
+        resolution = resolution or self.select_resolution(end - start, max_points)
+        starts, sums, mins, maxs, counts = self.range(resolution, start, end)
+        avgs = sums / np.maximum(counts, 1)[:, None]
+        result = []
+        for i, bucket_start in enumerate(starts.tolist()):
+            point = {'timestamp': datetime.fromtimestamp(bucket_start).isoformat(), 'count': int(counts[i])}
+            for j, field in enumerate(self.fields):
+                point[field] = float(avgs[i, j])
+                point[f"{field}_min"] = float(mins[i, j])
+                point[f"{field}_max"] = float(maxs[i, j])
+            result.append(point)
+        return result
+
+    def save(self, path=None):
+        """持久化到压缩文件（先写临时文件再替换）"""
+        path = path or self.path
+        if not path:
+            return False
+        arrays = {'fields': np.array(self.fields)}
+        with self._lock:
+            for name, level in self._levels.items():
+                for key in ('start', 'sum', 'min', 'max', 'count'):
+                    arrays[f"{name}.{key}"] = level[key].copy()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+        return True
+
+    def load(self, path=None):
+        """从文件恢复，字段或分辨率不一致的部分忽略"""
+        path = path or self.path
+        try:
+            with np.load(path) as data:
+                if tuple(data['fields'].tolist()) != self.fields:
+                    logger.warning(f"时间序列文件字段不一致，忽略: {path}")
+                    return False
+                for name, level in self._levels.items():
+                    if f"{name}.start" not in data or data[f"{name}.start"].shape != level['start'].shape:
+                        continue
+                    for key in ('start', 'sum', 'min', 'max', 'count'):
+                        level[key] = data[f"{name}.{key}"].copy()
+                    written = level['start'][level['count'] > 0]
+                    if written.size:
+                        self.last_write = max(self.last_write, int(written.max()))
+            logger.info(f"已加载时间序列数据: {path}")
+            return True
+        except Exception as e:
+            logger.error(f"加载时间序列数据失败: {str(e)}")
+            return False
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                name: {
+                    'step': level['step'],
+                    'slots': level['slots'],
+                    'filled': int(np.count_nonzero(level['count']))
+                }
+                for name, level in self._levels.items()
+            }
+
+
+# 用于测试
+if __name__ == "__main__":
+    import tempfile
+    logging.basicConfig(level=logging.INFO)
+
+    path = os.path.join(tempfile.mkdtemp(), 'traffic.npz')
+    store = TimeSeriesStore(('incoming', 'outgoing'), path)
+
+    # 写入8天的每秒数据
+    now = int(time.time())
+    count = 8 * 86400
+    start = time.time()
+    for ts in range(now - count, now):
+        store.add(ts, (ts % 1500, ts % 800))
+    elapsed = time.time() - start
+    print(f"写入 {count} 个数据点, {count / elapsed:,.0f} 点/秒")
+
+    for label, span in (('hour', 3600), ('day', 86400), ('week', 7 * 86400)):
+        start = time.time()
+        points = store.points(now - span, now, max_points=200)
+        print(f"{label}: {len(points)} 个点, 耗时 {(time.time() - start) * 1000:.2f} ms")
+
+    store.save()
+    print(f"文件大小: {os.path.getsize(path) / 1024:.0f} KB")
+    restored = TimeSeriesStore(('incoming', 'outgoing'), path)
+    print(f"恢复后一周数据点: {len(restored.points(now - 7 * 86400, now, max_points=200))}")
+    print(restored.get_stats())
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import heapq
+import logging
+import itertools
+import threading
+
+from ..metrics.registry import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+# 运行指标
+TASK_SECONDS = histogram('ids_scheduler_task_seconds', '调度任务单次执行耗时（秒）', ['task'])
+TASK_LATENESS = histogram('ids_scheduler_lateness_seconds', '调度任务实际执行时间晚于计划的时间（秒）')
+TASK_ERRORS = counter('ids_scheduler_task_errors_total', '调度任务执行出错次数', ['task'])
+
+
+class ScheduledTask:
+    """调度器中的一个任务
+
+    interval 不为None时周期执行；wake() 把下次执行提前（新数据到达时立即处理），
+    两次执行之间至少间隔 min_gap 秒，短时间内的多次唤醒合并为一次执行。
+    一次性任务（oneshot）执行完且没有再次安排时从调度器中移除。
+    """
+
+    def __init__(self, scheduler, func, name, interval, min_gap, error_delay, oneshot=False):
+        self.scheduler = scheduler
+        self.func = func
+        self.name = name
+        self.interval = interval
+        self.oneshot = oneshot
+        self.min_gap = min_gap
+        self.error_delay = error_delay
+        self.cancelled = False
+
+        self._due = None          # 下次执行时间（monotonic），None表示等待唤醒
+        self._wake_due = None     # 执行期间收到的唤醒
+        self._running = False
+        self._last_start = float('-inf')
+        self._seconds = TASK_SECONDS.labels(name)
+
+        self.stats = {
+            'runs': 0,
+            'errors': 0,
+            'total_seconds': 0.0,
+            'max_seconds': 0.0
+        }
+
+    def wake(self, delay=0):
+        """请求在 delay 秒内执行一次（已经安排得更早时不做任何事）"""
+        due = self._due
+        if due is not None and due <= time.monotonic() + delay:
+            return
+        self.scheduler._wake(self, delay)
+
+    def cancel(self, wait=True):
+        """取消任务；wait为True时等待正在进行的执行结束"""
+        self.scheduler._cancel(self, wait)
+
+    def __repr__(self):
+        return f"<ScheduledTask {self.name} interval={self.interval}>"
+
+
+class Scheduler:
+    """中心调度器：一个线程按时间堆执行各模块的周期任务和唤醒任务
+
+    各模块不再各自启动 while+sleep 的工作线程，而是把清理、持久化、推送等工作注册为任务。
+    新任务或唤醒比当前等待的时间更早时立即唤醒调度线程，取消任务后不再执行，
+    停止时不需要等待任何 sleep 结束。任务应当短小，耗时的阻塞操作仍放在独立线程。
+    """
+
+    def __init__(self, name='ids-scheduler'):
+        self.name = name
+        self.is_running = False
+        self.scheduler_thread = None
+        self._cond = threading.Condition()
+        self._heap = []              # (执行时间, 序号, 任务)
+        self._seq = itertools.count()
+        self._tasks = {}             # 按注册顺序，移除为O(1)
+
+    def schedule(self, func, interval=None, delay=None, name=None, min_gap=0, error_delay=None):
+        """注册任务
+
+        interval: 执行周期（秒），None表示只在唤醒时执行
+        delay: 首次执行的延迟，默认一个周期之后；interval为None时给出delay即为一次性任务
+        min_gap: 两次执行的最小间隔，用于合并频繁的唤醒
+        error_delay: 出错后下次执行的最小延迟
+        """
+        task = ScheduledTask(self, func, name or getattr(func, '__qualname__', repr(func)),
+                             interval, min_gap, error_delay, oneshot=interval is None and delay is not None)
+        with self._cond:
+            self._tasks[task] = None
+            if delay is None:
+                delay = interval
+            if delay is not None:
+                self._push(task, time.monotonic() + delay)
+        self.start()
+        return task
+
+    def call_soon(self, func, name=None):
+        """尽快在调度线程中执行一次"""
+        return self.schedule(func, delay=0, name=name)
+
+    def start(self):
+        """启动调度线程（已在运行时不做任何事）"""
+        with self._cond:
+            if self.is_running:
+                return
+            self.is_running = True
+            self.scheduler_thread = threading.Thread(target=self._run, name=self.name)
+            self.scheduler_thread.daemon = True
+            self.scheduler_thread.start()
+        logger.info("调度器已启动")
+
+    def stop(self, timeout=5):
+        """停止调度线程；正在执行的任务执行完后立即退出"""
+        with self._cond:
+            if not self.is_running:
+                return
+            self.is_running = False
+            self._cond.notify_all()
+        if self.scheduler_thread and self.scheduler_thread is not threading.current_thread():
+            self.scheduler_thread.join(timeout)
+        logger.info("调度器已停止")
+
+    def get_stats(self):
+        """各任务的执行统计"""
+        now = time.monotonic()
+        with self._cond:
+            tasks = list(self._tasks)
+        return {
+            'running': self.is_running,
+            'tasks': [{
+                'name': task.name,
+                'interval': task.interval,
+                'next_run_in': round(task._due - now, 3) if task._due is not None else None,
+                'runs': task.stats['runs'],
+                'errors': task.stats['errors'],
+                'avg_ms': round(task.stats['total_seconds'] / task.stats['runs'] * 1000, 3) if task.stats['runs'] else 0,
+                'max_ms': round(task.stats['max_seconds'] * 1000, 3)
+            } for task in tasks]
+        }
+
+    def _push(self, task, due):
+        task._due = due
+        heapq.heappush(self._heap, (due, next(self._seq), task))
+        if self._heap[0][2] is task:
+            self._cond.notify()
+
+    def _wake(self, task, delay):
+        with self._cond:
+            if task.cancelled:
+                return
+            due = max(time.monotonic() + delay, task._last_start + task.min_gap)
+            if task._running:
+                # 执行结束后再安排，避免同一任务并发执行
+                if task._wake_due is None or due < task._wake_due:
+                    task._wake_due = due
+            elif task._due is None or due < task._due:
+                self._push(task, due)
+
+    def _cancel(self, task, wait):
+        with self._cond:
+            task.cancelled = True
+            task._due = None
+            self._tasks.pop(task, None)
+            if wait and threading.current_thread() is not self.scheduler_thread:
+                while task._running:
+                    self._cond.wait()
+
+    def _next_task(self):
+        """等待并取出下一个到期的任务；调度器停止时返回None"""
+        with self._cond:
+            while self.is_running:
+                now = time.monotonic()
+                if self._heap and self._heap[0][0] <= now:
+                    due, _, task = heapq.heappop(self._heap)
+                    # 已取消或已被唤醒重新安排的旧条目
+                    if task.cancelled or task._due != due:
+                        continue
+                    task._due = None
+                    task._running = True
+                    task._last_start = now
+                    TASK_LATENESS.observe(now - due)
+                    return task
+                self._cond.wait(self._heap[0][0] - now if self._heap else None)
+            return None
+
+    def _run(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            start = task._last_start
+            failed = False
+            try:
+                task.func()
+            except Exception as e:
+                failed = True
+                task.stats['errors'] += 1
+                TASK_ERRORS.labels(task.name).inc()
+                logger.error(f"调度任务 {task.name} 执行错误: {str(e)}")
+            elapsed = time.monotonic() - start
+            task.stats['runs'] += 1
+            task.stats['total_seconds'] += elapsed
+            task.stats['max_seconds'] = max(task.stats['max_seconds'], elapsed)
+            task._seconds.observe(elapsed)
+            if task.interval is not None and elapsed > task.interval:
+                logger.warning(f"调度任务 {task.name} 耗时 {elapsed:.2f} 秒，超过执行周期 {task.interval} 秒")
+
+            with self._cond:
+                task._running = False
+                if not task.cancelled:
+                    due = task._wake_due
+                    if task.interval is not None:
+                        next_due = start + task.interval
+                        if due is None or next_due < due:
+                            due = next_due
+                    if failed and task.error_delay is not None:
+                        due = max(due or 0, start + task.error_delay)
+                    task._wake_due = None
+                    if due is not None:
+                        self._push(task, due)
+                    elif task.oneshot:
+                        # 一次性任务已完成，之后的 wake() 不再执行
+                        task.cancelled = True
+                        self._tasks.pop(task, None)
+                self._cond.notify_all()
+
+
+# 全局调度器，各模块注册任务时自动启动
+SCHEDULER = Scheduler()
+
+
+# 用于测试
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    ticks = []
+    periodic = SCHEDULER.schedule(lambda: ticks.append(time.monotonic()), interval=0.1, name='周期任务')
+    woken = []
+    on_data = SCHEDULER.schedule(lambda: woken.append(time.monotonic()), name='唤醒任务', min_gap=0.05)
+
+    time.sleep(0.55)
+    sent = time.monotonic()
+    on_data.wake()
+    time.sleep(0.05)
+    print(f"周期任务执行 {len(ticks)} 次，唤醒到执行延迟 {(woken[0] - sent) * 1000:.2f} ms")
+
+    # 一次性任务执行完后从任务列表中移除，取消的一次性任务也立即移除
+    done = [SCHEDULER.call_soon(lambda: None, name='一次性任务') for _ in range(1000)]
+    pending = [SCHEDULER.schedule(lambda: None, delay=60, name='延迟任务') for _ in range(1000)]
+    for task in pending:
+        task.cancel()
+    time.sleep(0.1)
+    print(f"一次性任务完成后剩余任务数: {len(SCHEDULER.get_stats()['tasks'])}")
+
+    start = time.monotonic()
+    periodic.cancel()
+    on_data.cancel()
+    SCHEDULER.stop()
+    print(f"取消并停止耗时 {(time.monotonic() - start) * 1000:.2f} ms")
+    print(SCHEDULER.get_stats())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import random
+import bisect
+import itertools
+from datetime import datetime
+
+ATTACK_TYPES = ('SQL注入', 'XSS攻击', 'DDoS攻击', '端口扫描', '暴力破解', '异常流量', '病毒/木马')
+ATTACK_WEIGHTS = (10, 8, 15, 25, 20, 15, 7)
+PROTOCOLS = ('TCP', 'UDP', 'HTTP', 'HTTPS', 'ICMP', 'DNS', 'Other')
+PROTOCOL_WEIGHTS = (25, 10, 20, 30, 3, 10, 2)
+PORTS = {'TCP': (22, 25, 3306, 3389, 8080), 'UDP': (53, 123, 161, 1900), 'HTTP': (80, 8080),
+         'HTTPS': (443, 8443), 'ICMP': (0,), 'DNS': (53,), 'Other': (0,)}
+ATTACK_PROTOCOLS = {'SQL注入': 'HTTP', 'XSS攻击': 'HTTP', 'DDoS攻击': 'TCP', '端口扫描': 'TCP',
+                    '暴力破解': 'TCP', '异常流量': 'UDP', '病毒/木马': 'HTTP'}
+DEFAULT_SEVERITY_MIX = {'低': 50, '中': 35, '高': 15}
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+class LoadGenerator:
+    """可复现的事件负载生成器
+
+    事件序列只由种子决定，与生成速度和调用时机无关：
+    - 来源IP服从Zipf分布（少数IP产生大部分事件，排名与地址的对应关系随种子打乱）
+    - 攻击成簇出现：空闲时每个事件以 burst_rate 的概率开始一次爆发，
+      爆发期间 burst_share 比例的事件来自同一攻击者、同一攻击类型，平均持续 burst_length 个事件
+    - 严重性按 severity_mix 的比例抽取，爆发中的攻击事件多为高危
+    rate 为每秒事件数，事件时间戳从 start_time 起按速率等间隔递增；due() 按实际经过的时间计算本次应生成的数量，
+    积压超过 max_backlog 秒的事件被丢弃并计数（消费方跟不上时不会无限积压）。
+    """
+
+    def __init__(self, rate=1.0, seed=None, interval=1.0, attack_ratio=0.3, ip_count=10000, zipf_s=1.1,
+                 burst_rate=0.0002, burst_length=500, burst_share=0.8, severity_mix=None, max_backlog=1.0,
+                 start_time=None):
+        if rate <= 0:
+            raise ValueError("事件速率必须大于0")
+        self.rate = rate
+        self.seed = seed
+        self.interval = interval  # 建议的调度间隔（秒）
+        self.attack_ratio = attack_ratio
+        self.burst_rate = burst_rate
+        self.burst_length = burst_length
+        self.burst_share = burst_share
+        self.max_backlog = max_backlog
+        self.rng = random.Random(seed)
+
+        rng = self.rng
+        # IP池：排名越靠前的IP权重越大，地址随机打乱
+        pool = [f"192.168.{(i // 253) % 256}.{i % 253 + 2}" if i < 64768 else
+                f"{45 + (i >> 16) % 150}.{(i >> 8) & 255}.{i & 255}.{(i * 7) % 254 + 1}"
+                for i in range(ip_count)]
+        rng.shuffle(pool)
+        self.ip_pool = pool
+        self._ip_cdf = _cumulative(1.0 / (rank ** zipf_s) for rank in range(1, ip_count + 1))
+        self._attack_cdf = _cumulative(ATTACK_WEIGHTS)
+        self._protocol_cdf = _cumulative(PROTOCOL_WEIGHTS)
+        severity_mix = severity_mix or DEFAULT_SEVERITY_MIX
+        self.severities = tuple(severity_mix)
+        self._severity_cdf = _cumulative(severity_mix.values())
+
+        self.seq = 0
+        self.start_time = time.time() if start_time is None else start_time
+        self._id_prefix = seed if seed is not None else int(self.start_time)
+        self._burst = None  # [攻击者IP, 目标IP, 攻击类型, 剩余事件数]
+        self._due_time = None
+        self._owed = 0.0
+        self.stats = {'events': 0, 'attack_events': 0, 'bursts': 0, 'shed': 0}
+
+    def _pick(self, cdf):
+        return bisect.bisect(cdf, self.rng.random() * cdf[-1])
+
+    def source_ip(self):
+        """按Zipf分布抽取来源IP"""
+        return self.ip_pool[min(self._pick(self._ip_cdf), len(self.ip_pool) - 1)]
+
+    def _next(self, attacks_only):
+        """生成下一个事件（元组，尚未格式化）"""
+        rng = self.rng
+        self.seq += 1
+        seq = self.seq
+        timestamp = self.start_time + seq / self.rate
+
+        burst = self._burst
+        if burst is None and rng.random() < self.burst_rate:
+            attack_type = ATTACK_TYPES[self._pick(self._attack_cdf)]
+            burst = self._burst = [self.source_ip(), f"10.0.0.{rng.randint(2, 254)}", attack_type,
+                                   max(1, int(rng.expovariate(1 / self.burst_length)))]
+            self.stats['bursts'] += 1
+
+        if burst is not None and rng.random() < self.burst_share:
+            src_ip, dst_ip, attack_type = burst[0], burst[1], burst[2]
+            severity = '高' if rng.random() < 0.6 else self.severities[self._pick(self._severity_cdf)]
+            burst[3] -= 1
+            if burst[3] <= 0:
+                self._burst = None
+        else:
+            src_ip, dst_ip = self.source_ip(), f"10.0.0.{rng.randint(2, 254)}"
+            attack_type = None
+            if attacks_only or rng.random() < self.attack_ratio:
+                attack_type = ATTACK_TYPES[self._pick(self._attack_cdf)]
+            severity = self.severities[self._pick(self._severity_cdf)]
+
+        if attack_type:
+            protocol = ATTACK_PROTOCOLS[attack_type]
+            self.stats['attack_events'] += 1
+        else:
+            protocol = PROTOCOLS[self._pick(self._protocol_cdf)]
+        ports = PORTS[protocol]
+        port = ports[int(rng.random() * len(ports))]
+        size = int(rng.lognormvariate(9, 1.5))  # 流量字节数，中位数约8KB，长尾
+        self.stats['events'] += 1
+        return seq, timestamp, src_ip, dst_ip, port, protocol, size, attack_type, severity
+
+    def events(self, count, attacks_only=False):
+        """生成count个事件 {seq, timestamp, src_ip, dst_ip, port, protocol, bytes, attack_type, severity}
+
+        attack_type 为None表示正常流量；attacks_only 时只生成攻击事件
+        """
+        for _ in range(count):
+            seq, timestamp, src_ip, dst_ip, port, protocol, size, attack_type, severity = self._next(attacks_only)
+            yield {
+                'seq': seq,
+                'timestamp': timestamp,
+                'src_ip': src_ip,
+                'dst_ip': dst_ip,
+                'port': port,
+                'protocol': protocol,
+                'bytes': size,
+                'attack_type': attack_type,
+                'severity': severity
+            }
+
+    def threats(self, count):
+        """生成count条威胁（入侵防御模块的威胁格式）"""
+        for seq, timestamp, src_ip, dst_ip, port, protocol, _, attack_type, severity in (
+                self._next(True) for _ in range(count)):
+            yield {
+                'threat_id': f"THREAT-{self._id_prefix}-{seq}",
+                'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+                'threat_type': attack_type,
+                'severity': severity,
+                'src_ip': src_ip,
+                'dst_ip': dst_ip,
+                'port': port,
+                'protocol': protocol,
+                'details': f"检测到{attack_type}攻击尝试",
+                'blocked': False,
+                'action_taken': '监控'
+            }
+
+    def alerts(self, count):
+        """生成count条告警（告警响应模块的告警格式）"""
+        for _ in range(count):
+            yield self.alert(self._next(True))
+
+    def alert(self, event):
+        """把攻击事件（_next 的元组或 events() 的字典）格式化为告警"""
+        if isinstance(event, dict):
+            event = (event['seq'], event['timestamp'], event['src_ip'], event['dst_ip'], event['port'],
+                     event['protocol'], event['bytes'], event['attack_type'], event['severity'])
+        seq, timestamp, src_ip, dst_ip, port, protocol, _, attack_type, severity = event
+        return {
+            'alert_id': f"ALERT-{self._id_prefix}-{seq}",
+            'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+            'alert_type': attack_type,
+            'severity': severity,
+            'src_ip': src_ip,
+            'dst_ip': dst_ip,
+            'port': port,
+            'protocol': protocol,
+            'details': f"检测到{attack_type}攻击尝试",
+            'action_taken': '已记录'
+        }
+
+    def due(self, now=None):
+        """距上次调用按速率应生成的事件数（首次调用按一个调度间隔计算）"""
+        now = time.monotonic() if now is None else now
+        elapsed = self.interval if self._due_time is None else now - self._due_time
+        self._due_time = now
+        self._owed += elapsed * self.rate
+        limit = self.rate * max(self.max_backlog, self.interval)
+        if self._owed > limit:
+            self.stats['shed'] += int(self._owed - limit)
+            self._owed = limit
+        count = int(self._owed)
+        self._owed -= count
+        return count
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['rate'] = self.rate
+        stats['seed'] = self.seed
+        return stats
+
+
+# 用于测试
+if __name__ == "__main__":
+    from collections import Counter
+
+    generator = LoadGenerator(rate=1000000, seed=7, start_time=1700000000)
+    start = time.perf_counter()
+    events = list(generator.events(200000))
+    elapsed = time.perf_counter() - start
+    print(f"生成 {len(events)} 个事件，{len(events) / elapsed:,.0f} 个/秒")
+
+    sources = Counter(event['src_ip'] for event in events)
+    top = sources.most_common(10)
+    print(f"来源IP {len(sources)} 个，前10个IP占 {sum(n for _, n in top) / len(events):.1%}: {top[:3]}")
+    print("严重性:", Counter(event['severity'] for event in events))
+    print("攻击类型:", Counter(event['attack_type'] for event in events).most_common())
+    print("统计:", generator.get_stats())
+
+    again = LoadGenerator(rate=1000000, seed=7, start_time=1700000000)
+    print("同一种子结果相同:", list(again.events(1000)) == events[:1000])
@@ -3,28 +3,51 @@
 
 import os
 import time
-import threading
 import logging
 import json
+import itertools
 from datetime import datetime
-from scapy.all import sniff, IP, TCP, UDP, ICMP
-from scapy.layers.http import HTTP
+
+from ..metrics.registry import counter, histogram
+from ..metrics.counters import ShardedCounters
+from ..metrics.tracing import TRACER
+from ..scheduling.scheduler import SCHEDULER
 
 logger = logging.getLogger(__name__)
 
+# Scapy导入需要数秒和数十MB内存，首次抓包或处理数据包时才加载
+AsyncSniffer = IP = TCP = UDP = ICMP = HTTP = None
+
+
+def _load_scapy():
+    global AsyncSniffer, IP, TCP, UDP, ICMP, HTTP
+    if IP is None:
+        start = time.perf_counter()
+        from scapy.all import AsyncSniffer, IP, TCP, UDP, ICMP
+        from scapy.layers.http import HTTP
+        logger.info(f"Scapy已加载，耗时 {time.perf_counter() - start:.2f} 秒")
+
+# 运行指标（热点路径使用预先绑定标签的子指标）
+PACKETS = counter('ids_packets_total', '捕获的数据包数量', ['type'])
+PACKET_BYTES = counter('ids_packet_bytes_total', '捕获的数据包载荷字节数')
+PACKET_PROCESS_SECONDS = histogram('ids_packet_process_seconds', '单个数据包的处理耗时（秒）')
+_PACKET_COUNTERS = {t: PACKETS.labels(t) for t in ('tcp', 'udp', 'icmp', 'http', 'other')}
+
 class TrafficDetector:
     def __init__(self, interface=None):
         self.interface = interface  # 如果为None，则会监听所有接口
         self.is_running = False
-        self.capture_thread = None
-        self.packet_stats = {
-            'total': 0,
-            'tcp': 0,
-            'udp': 0,
-            'icmp': 0,
-            'http': 0,
-            'other': 0
-        }
+        self.sniffer = None
+        self._pending_batches = []  # 待写盘的流量数据批次
+        self._file_seq = itertools.count(1)  # 同一时刻写入的多个文件用序号区分
+        # 写盘在调度线程中进行，不阻塞抓包线程；攒满一批时唤醒
+        self._save_task = SCHEDULER.schedule(self._flush_batches, name='流量数据保存')
+        # 抓包线程写入、API线程读取，按线程分片计数
+        self.packet_stats = ShardedCounters(('total', 'tcp', 'udp', 'icmp', 'http', 'other'))
+        # 每个包一次原子更新：total == tcp + udp + icmp + other，HTTP同时计入TCP
+        self._packet_deltas = {t: self.packet_stats.prepare({'total': 1, t: 1})
+                               for t in ('tcp', 'udp', 'icmp', 'other')}
+        self._packet_deltas['http'] = self.packet_stats.prepare({'total': 1, 'tcp': 1, 'http': 1})
         self.traffic_data = []
         self.suspicious_ips = set()
         self.packet_callback = None  # 可以设置回调来处理捕获的数据包
@@ -38,27 +61,45 @@ class TrafficDetector:
     
     def process_packet(self, packet):
         """处理捕获的数据包"""
-        # 更新计数
-        self.packet_stats['total'] += 1
+        start = time.perf_counter()
+        
+        # 流水线追踪从内核抓包时间开始
+        owner = TRACER.begin(float(packet.time) if hasattr(packet, 'time') else None)
+        TRACER.mark('capture')
         
         # 提取和分析数据包
         packet_info = self._extract_packet_info(packet)
+        TRACER.mark('parse')
+        
+        # 更新计数（总数与类型在同一次更新中）
+        self.packet_stats.apply(self._packet_deltas[packet_info['type'] if packet_info else 'other'])
         
         # 保存流量数据
         if packet_info:
+            _PACKET_COUNTERS[packet_info['type']].inc()
+            PACKET_BYTES.inc(packet_info['size'])
             self.traffic_data.append(packet_info)
             
             # 定期保存流量数据，防止内存占用过多
             if len(self.traffic_data) >= 1000:
-                self._save_traffic_data()
+                self._pending_batches.append(self.traffic_data)
                 self.traffic_data = []
+                self._save_task.wake()
+        
+        else:
+            _PACKET_COUNTERS['other'].inc()
         
         # 如果有设置回调，调用回调函数
         if self.packet_callback:
             self.packet_callback(packet)
+        
+        TRACER.end(owner)
+        PACKET_PROCESS_SECONDS.observe(time.perf_counter() - start)
     
     def _extract_packet_info(self, packet):
         """提取数据包的关键信息"""
+        if IP is None:
+            _load_scapy()
         packet_type = 'other'
         src_ip = dst_ip = 'unknown'
         src_port = dst_port = 0
@@ -74,7 +115,6 @@ class TrafficDetector:
                 # TCP数据包
                 if TCP in packet:
                     packet_type = 'tcp'
-                    self.packet_stats['tcp'] += 1
                     src_port = packet[TCP].sport
                     dst_port = packet[TCP].dport
                     protocol = 'TCP'
@@ -82,13 +122,11 @@ class TrafficDetector:
                     # 检查是否是HTTP
                     if packet.haslayer(HTTP) or dst_port == 80 or dst_port == 443:
                         packet_type = 'http'
-                        self.packet_stats['http'] += 1
                         protocol = 'HTTP/HTTPS'
                 
                 # UDP数据包
                 elif UDP in packet:
                     packet_type = 'udp'
-                    self.packet_stats['udp'] += 1
                     src_port = packet[UDP].sport
                     dst_port = packet[UDP].dport
                     protocol = 'UDP'
@@ -96,7 +134,6 @@ class TrafficDetector:
                 # ICMP数据包
                 elif ICMP in packet:
                     packet_type = 'icmp'
-                    self.packet_stats['icmp'] += 1
                     protocol = 'ICMP'
                 
                 # 计算载荷大小
@@ -120,14 +157,24 @@ class TrafficDetector:
         
         return None
     
-    def _save_traffic_data(self):
-        """保存流量数据到文件"""
+    def _flush_batches(self, final=False):
+        """把已攒满的批次合并写入一个文件（final为True时连同未满一批的剩余数据一起写入）"""
+        batches, self._pending_batches = self._pending_batches, []
+        if final:
+            batches.append(self.traffic_data)
+            self.traffic_data = []
+        traffic_data = [info for batch in batches for info in batch]
+        if traffic_data:
+            self._save_traffic_data(traffic_data)
+    
+    def _save_traffic_data(self, traffic_data):
+        """保存流量数据到文件（文件名带微秒和序号，'x' 模式不覆盖已有文件）"""
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'data/traffic/traffic_{timestamp}.json'
-            with open(filename, 'w') as f:
-                json.dump(self.traffic_data, f)
-            logger.info(f"已保存流量数据到 {filename}，共 {len(self.traffic_data)} 条记录")
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            filename = f'data/traffic/traffic_{timestamp}_{next(self._file_seq)}.json'
+            with open(filename, 'x') as f:
+                json.dump(traffic_data, f)
+            logger.info(f"已保存流量数据到 {filename}，共 {len(traffic_data)} 条记录")
         except Exception as e:
             logger.error(f"保存流量数据失败: {str(e)}")
     
@@ -135,36 +182,41 @@ class TrafficDetector:
         """开始捕获网络流量"""
         if not self.is_running:
             self.is_running = True
-            self.capture_thread = threading.Thread(target=self._capture_traffic)
-            self.capture_thread.daemon = True
-            self.capture_thread.start()
+            try:
+                _load_scapy()
+                # AsyncSniffer 在自己的线程中抓包，stop() 通过控制管道立即中断等待，无需等下一个数据包
+                self.sniffer = AsyncSniffer(
+                    iface=self.interface,
+                    prn=self.process_packet,
+                    store=False  # 不存储数据包，以节省内存
+                )
+                self.sniffer.start()
+            except Exception as e:
+                # 没有权限、接口不存在或未安装Scapy时保持停止状态
+                logger.error(f"流量捕获错误: {str(e)}")
+                self.is_running = False
+                self.sniffer = None
+                return False
             logger.info(f"流量捕获已启动，监听接口: {self.interface or '所有'}")
-    
-    def _capture_traffic(self):
-        """捕获网络流量的线程函数"""
-        try:
-            sniff(
-                iface=self.interface,
-                prn=self.process_packet,
-                store=0,  # 不存储数据包，以节省内存
-                stop_filter=lambda p: not self.is_running  # 当self.is_running为False时停止
-            )
-        except Exception as e:
-            logger.error(f"流量捕获错误: {str(e)}")
-            self.is_running = False
+            return True
+        return False
     
     def stop_capture(self):
         """停止捕获网络流量"""
         if self.is_running:
             self.is_running = False
-            if self.capture_thread:
-                self.capture_thread.join(timeout=2)
-            self._save_traffic_data()  # 保存剩余的流量数据
+            try:
+                if self.sniffer and self.sniffer.running:
+                    self.sniffer.stop()
+            except Exception as e:
+                logger.error(f"流量捕获错误: {str(e)}")
+            self.sniffer = None
+            self._flush_batches(final=True)  # 已攒满的批次和剩余的流量数据写入同一个文件
             logger.info("流量捕获已停止")
     
     def get_traffic_stats(self):
         """获取流量统计信息"""
-        return self.packet_stats
+        return self.packet_stats.snapshot()
     
     def get_recent_traffic(self, limit=100):
         """获取最近的流量数据"""
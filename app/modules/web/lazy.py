@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class LazyModule:
+    """模块代理：首次访问属性时才调用工厂函数导入并构造模块
+
+    工厂函数负责导入模块类、构造实例并完成与其他模块的连接，
+    构造只执行一次，之后的属性访问直接转发到实例。
+    """
+
+    def __init__(self, factory, name):
+        self._factory = factory
+        self._name = name
+        self._instance = None
+        self._lock = threading.RLock()
+
+    def _lazy_get(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    self._instance = self._factory()
+                    logger.info(f"{self._name}已初始化，耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+                instance = self._instance
+        return instance
+
+    @property
+    def _lazy_loaded(self):
+        return self._instance is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._lazy_get(), attr)
+
+    def __repr__(self):
+        state = '已初始化' if self._instance is not None else '未初始化'
+        return f"<LazyModule {self._name} {state}>"
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import gzip
+import time
+
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 小于该大小的响应不压缩
+GZIP_MIN_SIZE = 1024
+
+# 进程启动标识：重启后各模块的序号从头计数，ETag中包含它，避免命中重启前的缓存
+_ETAG_EPOCH = f"{int(time.time()):x}"
+
+
+def dumps(payload):
+    """序列化为UTF-8编码的紧凑JSON（安装了orjson时使用orjson）"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200, etag=None):
+    """生成JSON响应；带ETag时客户端可条件请求，客户端支持时gzip压缩"""
+    body = dumps(payload)
+    response = Response(body, status=status, mimetype='application/json')
+    if etag:
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'no-cache'
+    if len(body) >= GZIP_MIN_SIZE and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def make_etag(*parts):
+    """由数据版本号生成弱ETag（同一URL下版本不变则内容不变）"""
+    return 'W/"' + '-'.join([_ETAG_EPOCH] + [str(p) for p in parts]) + '"'
+
+
+def not_modified(etag):
+    """客户端缓存仍有效时返回304响应，否则返回None"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (if_none_match.strip() == '*'
+                          or etag in (tag.strip() for tag in if_none_match.split(','))):
+        return Response(status=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+    return None
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""生产模式启动脚本：协程服务器 + 多个Web工作进程
+
+启动本地消息转发服务，再以 IDS_ASYNC_MODE 启动 N 个 app.py 工作进程，
+第 i 个工作进程监听 port+i。0号为主工作进程，运行各模块并处理 /api/ 请求；
+其他工作进程通过消息队列接收推送数据，只负责页面和 Socket.IO 连接。
+
+前端负载均衡需要：/api/ 转发到 0号工作进程；/socket.io/ 按客户端IP保持会话
+（Socket.IO长轮询要求同一客户端的请求落在同一进程），例如 nginx 的 ip_hash。
+
+运行方式（在 app 目录下）:
+    python serve.py --workers 4 --port 8080 --async-mode eventlet
+"""
+
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import subprocess
+
+from modules.network_monitoring.event_bus import EventBusBroker
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生产模式启动')
+    parser.add_argument('--workers', type=int, default=1, help='Web工作进程数量')
+    parser.add_argument('--port', type=int, default=8080, help='0号工作进程端口，其余依次加1')
+    parser.add_argument('--async-mode', choices=['eventlet', 'gevent'], default='eventlet')
+    parser.add_argument('--bus-port', type=int, default=9472, help='本地消息转发服务端口')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    broker = None
+    if args.workers > 1:
+        broker = EventBusBroker('127.0.0.1', args.bus_port)
+        broker.start_broker()
+
+    workers = []
+    for worker_id in range(args.workers):
+        env = dict(os.environ)
+        env['IDS_ASYNC_MODE'] = args.async_mode
+        env['IDS_WORKER_ID'] = str(worker_id)
+        env['IDS_PORT'] = str(args.port + worker_id)
+        if broker:
+            env['IDS_EVENT_BUS'] = f"127.0.0.1:{broker.port}"
+        workers.append(subprocess.Popen([sys.executable, 'app.py'], env=env))
+        logger.info(f"工作进程 {worker_id} 已启动，端口 {args.port + worker_id}")
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    try:
+        # 任一工作进程退出时停止全部
+        while not stopping and all(worker.poll() is None for worker in workers):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+        for worker in workers:
+            try:
+                worker.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+        if broker:
+            broker.stop_broker()
+        logger.info("所有工作进程已停止")
+
+
+if __name__ == "__main__":
+    main()
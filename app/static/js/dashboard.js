@@ -3,6 +3,7 @@
 $(document).ready(function() {
     // 连接WebSocket
     const socket = io();
+    const stream = StreamClient(socket, ['network_stats', 'threat_update', 'status_update']);
     
     // 图表对象
     let trafficChart = null;
@@ -205,7 +206,7 @@ $(document).ready(function() {
         });
         
         // 处理网络统计数据更新
-        socket.on('network_stats', function(data) {
+        stream.on('network_stats', function(data) {
             updateDashboardStats(data);
             updateTrafficChart(data);
             updateProtocolChart(data);
@@ -213,13 +214,13 @@ $(document).ready(function() {
         });
         
         // 处理威胁数据更新
-        socket.on('threat_update', function(data) {
+        stream.on('threat_update', function(data) {
             updateThreatList(data);
             updateAttackChart(data);
         });
         
         // 处理状态更新
-        socket.on('status_update', function(data) {
+        stream.on('status_update', function(data) {
             updateSystemStatus(true, data.is_running);
         });
     }
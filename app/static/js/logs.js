@@ -3,6 +3,7 @@
 $(document).ready(function() {
     // 连接WebSocket
     const socket = io();
+    const stream = StreamClient(socket, ['new_alert', 'incident_update']);
     
     let logs = [];
     let filteredLogs = [];
@@ -280,7 +281,7 @@ $(document).ready(function() {
             addSystemEvent('警告', '与服务器的连接已断开');
         });
         
-        socket.on('new_alert', function(data) {
+        stream.on('new_alert', function(data) {
             // 添加到日志数组
             logs.unshift(data);
             
@@ -303,5 +304,23 @@ $(document).ready(function() {
             const severity = severityMap[data.severity] || data.severity || '未知';
             addSystemEvent('告警', `${severity} - ${data.alert_type || data.threat_type || '未知'} 来自 ${data.src_ip || '未知'}`);
         });
+        
+        stream.on('incident_update', function(data) {
+            // 同一事件的更新替换已有记录
+            const index = logs.findIndex(log => log.incident_id === data.incident_id);
+            if (index >= 0) {
+                logs[index] = data;
+            } else {
+                logs.unshift(data);
+                addSystemEvent('告警', `${data.severity || '未知'} - ${data.alert_type || '未知'} 来自 ${data.src_ip || '未知'}（事件）`);
+            }
+            
+            if (currentFilter === 'all' || data.severity === currentFilter) {
+                applyFilterAndSort();
+                renderLogs();
+            }
+            
+            $('#totalLogs').text(logs.length);
+        });
     }
 }); 
\ No newline at end of file
@@ -0,0 +1,62 @@
+// 实时数据流客户端：订阅频道、应用差量帧并确认
+
+function StreamClient(socket, channels) {
+    const handlers = {};
+    const state = {};     // 频道 -> 当前完整状态
+    const versions = {};  // 频道 -> 当前状态版本
+
+    // 应用差量节点（格式见 broadcaster.diff）
+    function applyPatch(value, node) {
+        if ('v' in node) {
+            return node.v;
+        }
+        if ('s' in node) {
+            return (value || []).slice(node.s).concat(node.a);
+        }
+        const result = Object.assign({}, value);
+        for (const key in node.d) {
+            result[key] = applyPatch(result[key], node.d[key]);
+        }
+        (node.r || []).forEach(key => delete result[key]);
+        return result;
+    }
+
+    function dispatch(channel, data) {
+        (handlers[channel] || []).forEach(handler => handler(data));
+    }
+
+    socket.on('connect', function() {
+        // 重连后服务端按新客户端处理，从完整状态开始
+        Object.keys(versions).forEach(channel => delete versions[channel]);
+        socket.emit('subscribe', {channels: channels});
+    });
+
+    socket.on('frame', function(frame, ack) {
+        let outOfSync = false;
+        for (const channel in frame.state) {
+            const update = frame.state[channel];
+            if (!('v' in update.p) && versions[channel] !== update.b) {
+                outOfSync = true;
+                continue;
+            }
+            state[channel] = applyPatch(state[channel], update.p);
+            versions[channel] = update.n;
+            dispatch(channel, state[channel]);
+        }
+        for (const channel in frame.events) {
+            frame.events[channel].forEach(event => dispatch(channel, event));
+        }
+        if (ack) {
+            ack(frame.seq);
+        }
+        if (outOfSync) {
+            socket.emit('resync');
+        }
+    });
+
+    return {
+        on: function(channel, handler) {
+            (handlers[channel] = handlers[channel] || []).push(handler);
+        }
+    };
+}